@@ -0,0 +1,107 @@
+# benchmarks/hedge.py
+# ===================
+#
+# Copying
+# -------
+#
+# Copyright (c) 2023 cloudguard authors and contributors.
+#
+# This file is part of the *cloudguard* project.
+#
+# *cloudguard* is a free software project. You can redistribute it and/or
+# modify it following the terms of the MIT License.
+#
+# This software project is distributed *as is*, WITHOUT WARRANTY OF ANY KIND;
+# including but not limited to the WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE and NONINFRINGEMENT.
+#
+# You should have received a copy of the MIT License along with *cloudguard*.
+# If not, see <http://opensource.org/licenses/MIT>.
+#
+"""Measure the latency percentiles of ``GET`` requests to a region with a slow
+tail, with and without hedging.
+
+The mock region answers most requests quickly and a small share of them after
+a long stall, which hedging is expected to hide from the p99 latency.
+
+Usage::
+
+    python benchmarks/hedge.py [--requests N] [--slow-ratio R]
+                               [--slow-seconds S]
+
+"""
+import sys
+import time
+import random
+import typing as ty
+import argparse
+
+from pathlib import Path
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx
+
+from cloudguard.hedge import HedgeStats
+from cloudguard.client import APIClient
+from cloudguard.config import Config
+from cloudguard.credentials import APICredentials
+
+
+#: Time, in seconds, taken by the mock region to answer a fast request.
+FAST_SECONDS: float = 0.005
+
+
+def measure(
+    hedge: bool, requests: int, slow_ratio: float, slow_seconds: float
+) -> ty.Tuple[ty.List[float], ty.Optional[HedgeStats]]:
+    """Send the requests and return their sorted latencies with the counters
+    of the hedging layer.
+
+    """
+    rng = random.Random(0)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        slow = rng.random() < slow_ratio
+        time.sleep(slow_seconds if slow else FAST_SECONDS)
+        return httpx.Response(200, json={})
+
+    config = Config(region="us")
+    config.credentials.api = APICredentials("benchmark", "benchmark")
+    config.transport.hedge = hedge
+    latencies = []
+    with APIClient(config, transport=httpx.MockTransport(handler)) as client:
+        for _ in range(requests):
+            start = time.perf_counter()
+            client.get("/v2/CloudAccounts").read()
+            latencies.append(time.perf_counter() - start)
+
+        return sorted(latencies), client.hedge_stats
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--slow-ratio", type=float, default=0.02)
+    parser.add_argument("--slow-seconds", type=float, default=0.3)
+    args = parser.parse_args()
+
+    print(f"{'hedging':<8} {'p50 ms':>7} {'p99 ms':>7} {'hedged':>7} {'wins':>5}")
+    for hedge in (False, True):
+        latencies, stats = measure(
+            hedge, args.requests, args.slow_ratio, args.slow_seconds
+        )
+        p50 = latencies[len(latencies) // 2] * 1000
+        p99 = latencies[int(len(latencies) * 0.99)] * 1000
+        hedged, wins = (stats.hedged, stats.wins) if stats else (0, 0)
+        print(
+            f"{'on' if hedge else 'off':<8} {p50:>7.1f} {p99:>7.1f}"
+            f" {hedged:>7} {wins:>5}"
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+# benchmarks/import_time.py
+# =========================
+#
+# Copying
+# -------
+#
+# Copyright (c) 2023 cloudguard authors and contributors.
+#
+# This file is part of the *cloudguard* project.
+#
+# *cloudguard* is a free software project. You can redistribute it and/or
+# modify it following the terms of the MIT License.
+#
+# This software project is distributed *as is*, WITHOUT WARRANTY OF ANY KIND;
+# including but not limited to the WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE and NONINFRINGEMENT.
+#
+# You should have received a copy of the MIT License along with *cloudguard*.
+# If not, see <http://opensource.org/licenses/MIT>.
+#
+"""Measure the cost of ``import cloudguard`` in a fresh interpreter.
+
+Each run imports the package in a new process with ``-X importtime`` and reads
+the cumulative time reported for ``cloudguard``. The benchmark fails when the
+median exceeds the given budget or when importing the package pulled in one
+of the modules which are meant to be loaded lazily.
+
+Usage::
+
+    python benchmarks/import_time.py [--runs N] [--budget MICROSECONDS]
+
+"""
+import sys
+import argparse
+import statistics
+import subprocess
+
+from pathlib import Path
+
+
+#: Root of the repository, added to the path of the measured interpreter.
+ROOT: Path = Path(__file__).resolve().parent.parent
+#: Modules which must not be imported by ``import cloudguard`` alone.
+LAZY_MODULES = ("asyncio", "httpx", "xdg", "cloudguard.session", "cloudguard.client")
+#: Default budget, in microseconds, of the cumulative import time.
+DEFAULT_BUDGET: int = 20_000
+
+#: Code run by the measured interpreter.
+PROBE = f"""
+import sys
+sys.path.insert(0, {str(ROOT)!r})
+import cloudguard
+print(",".join(m for m in {LAZY_MODULES!r} if m in sys.modules))
+"""
+
+
+def measure() -> tuple:
+    """Import the package in a fresh interpreter.
+
+
+    :return: The cumulative import time of the package, in microseconds, and
+             the lazy modules which were imported.
+    :rtype: tuple
+
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    cumulative = None
+    for line in proc.stderr.splitlines():
+        fields = [f.strip() for f in line.split("|")]
+        if len(fields) == 3 and fields[2] == "cloudguard":
+            cumulative = int(fields[1])
+
+    loaded = [m for m in proc.stdout.strip().split(",") if m]
+    return cumulative, loaded
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--budget", type=int, default=DEFAULT_BUDGET)
+    args = parser.parse_args()
+
+    timings = []
+    loaded = set()
+    for _ in range(args.runs):
+        cumulative, modules = measure()
+        timings.append(cumulative)
+        loaded.update(modules)
+
+    median = statistics.median(timings)
+    print(f"import cloudguard: median {median:.0f}us, min {min(timings)}us,")
+    print(f"                   max {max(timings)}us over {args.runs} runs")
+
+    status = 0
+    if loaded:
+        print(f"FAIL: eagerly imported: {', '.join(sorted(loaded))}")
+        status = 1
+    if median > args.budget:
+        print(f"FAIL: median above the {args.budget}us budget")
+        status = 1
+
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+# benchmarks/mockapi.py
+# =====================
+#
+# Copying
+# -------
+#
+# Copyright (c) 2023 cloudguard authors and contributors.
+#
+# This file is part of the *cloudguard* project.
+#
+# *cloudguard* is a free software project. You can redistribute it and/or
+# modify it following the terms of the MIT License.
+#
+# This software project is distributed *as is*, WITHOUT WARRANTY OF ANY KIND;
+# including but not limited to the WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE and NONINFRINGEMENT.
+#
+# You should have received a copy of the MIT License along with *cloudguard*.
+# If not, see <http://opensource.org/licenses/MIT>.
+#
+"""In-process stand-in for the CloudGuard (Dome9) API.
+
+The mock answers requests through :class:`httpx.MockTransport`, for both the
+synchronous and the asynchronous clients, and can simulate latency, throttling
+and large payloads. It serves:
+
+* ``GET /v2/ping``: an empty object.
+* ``POST /v2/Compliance/Finding/search``: findings paginated with the
+  ``searchAfter`` cursor.
+* ``GET /v2/protected-asset``: assets paginated with ``pageNumber`` and
+  ``pageSize``.
+* ``GET /v2/export``: every finding in a single response, generated as it is
+  sent.
+
+"""
+import json
+import time
+import typing as ty
+import asyncio
+import threading
+
+import httpx
+
+
+#: Severities given to the generated findings.
+SEVERITIES = ("Low", "Medium", "High", "Critical")
+#: Regions given to the generated records.
+REGIONS = ("us_east_1", "eu_west_1", "ap_southeast_1")
+#: Entity types given to the generated records.
+ENTITY_TYPES = ("Instance", "S3Bucket", "SecurityGroup", "IamRole", "Lambda")
+
+
+def finding(i: int, padding: int = 0) -> ty.Dict[str, ty.Any]:
+    """Generate the finding of the given index."""
+    return {
+        "id": f"finding-{i:08d}",
+        "ruleId": f"D9.AWS.{i % 97:04d}",
+        "ruleName": f"Rule {i % 97}",
+        "severity": SEVERITIES[i % len(SEVERITIES)],
+        "region": REGIONS[i % len(REGIONS)],
+        "cloudAccountId": f"account-{i % 13:04d}",
+        "entityType": ENTITY_TYPES[i % len(ENTITY_TYPES)],
+        "entityExternalId": f"arn:aws:example::{i}",
+        "createdTime": f"2023-01-{1 + i % 28:02d}T00:00:00Z",
+        "lastSeenTime": f"2023-02-{1 + i % 28:02d}T00:00:00Z",
+        "description": "x" * padding,
+    }
+
+
+def asset(i: int, padding: int = 0) -> ty.Dict[str, ty.Any]:
+    """Generate the protected asset of the given index."""
+    return {
+        "id": f"asset-{i:08d}",
+        "entityId": f"i-{i:012x}",
+        "name": f"asset {i}",
+        "type": ENTITY_TYPES[i % len(ENTITY_TYPES)],
+        "region": REGIONS[i % len(REGIONS)],
+        "cloudAccountId": f"account-{i % 13:04d}",
+        "tags": [{"key": "index", "value": str(i)}],
+        "description": "x" * padding,
+    }
+
+
+class MockCloudGuardAPI(object):
+    """Stand-in for the CloudGuard API.
+
+
+    :param records: Number of findings and assets served.
+    :type records: int
+
+    :param page_size: Default number of records per page.
+    :type page_size: int
+
+    :param latency: Time, in seconds, taken to answer each request.
+    :type latency: float
+
+    :param throttle_every: Answer every n-th request with a ``429`` response.
+                           Never throttle when ``0``.
+    :type throttle_every: int
+
+    :param padding: Number of filler bytes added to each record.
+    :type padding: int
+
+    """
+
+    def __init__(
+        self,
+        records: int = 1000,
+        page_size: int = 100,
+        latency: float = 0.0,
+        throttle_every: int = 0,
+        padding: int = 0,
+    ):
+        self.records = records
+        self.page_size = page_size
+        self.latency = latency
+        self.throttle_every = throttle_every
+        self.padding = padding
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def transport(self) -> httpx.MockTransport:
+        """Get a transport answering requests from the mock, usable by both
+        the synchronous and the asynchronous clients.
+
+        """
+        return _Transport(self)
+
+    def _count(self) -> int:
+        with self._lock:
+            self.requests += 1
+            return self.requests
+
+    def respond(self, request: httpx.Request) -> httpx.Response:
+        """Answer a request, ignoring the simulated latency."""
+        n = self._count()
+        if self.throttle_every and n % self.throttle_every == 0:
+            return httpx.Response(429, headers={"Retry-After": "0"})
+
+        path = request.url.path
+        if path == "/v2/ping":
+            return httpx.Response(200, json={})
+        if path == "/v2/Compliance/Finding/search":
+            return self._search(request)
+        if path == "/v2/protected-asset":
+            return self._assets(request)
+        if path == "/v2/export":
+            return httpx.Response(
+                200,
+                stream=_ExportStream(self),
+                headers={"Content-Type": "application/json"},
+            )
+        return httpx.Response(404, json={"message": "not found"})
+
+    def _json(self, payload: ty.Any) -> httpx.Response:
+        return httpx.Response(
+            200,
+            content=json.dumps(payload).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+
+    def _search(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content or b"{}")
+        size = int(body.get("pageSize") or self.page_size)
+        start = int((body.get("searchAfter") or [0])[0])
+        end = min(self.records, start + size)
+        return self._json(
+            {
+                "findings": [finding(i, self.padding) for i in range(start, end)],
+                "searchAfter": [end] if end < self.records else None,
+                "totalFindingsCount": self.records,
+            }
+        )
+
+    def _assets(self, request: httpx.Request) -> httpx.Response:
+        size = int(request.url.params.get("pageSize", self.page_size))
+        page = int(request.url.params.get("pageNumber", 1))
+        start = (page - 1) * size
+        return self._json(
+            [
+                asset(i, self.padding)
+                for i in range(start, min(self.records, start + size))
+            ]
+        )
+
+
+class _ExportStream(httpx.SyncByteStream, httpx.AsyncByteStream):
+    """Body of the export, generated one finding at a time."""
+
+    def __init__(self, api: MockCloudGuardAPI):
+        self.api = api
+
+    def __iter__(self) -> ty.Iterator[bytes]:
+        yield b"["
+        for i in range(self.api.records):
+            yield (b"," if i else b"") + json.dumps(
+                finding(i, self.api.padding)
+            ).encode()
+        yield b"]"
+
+    async def __aiter__(self) -> ty.AsyncIterator[bytes]:
+        for chunk in self:
+            yield chunk
+
+
+class _Transport(httpx.MockTransport):
+    """Transport simulating the latency of the mock."""
+
+    def __init__(self, api: MockCloudGuardAPI):
+        super().__init__(api.respond)
+        self.api = api
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        if self.api.latency:
+            time.sleep(self.api.latency)
+        return super().handle_request(request)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if self.api.latency:
+            await asyncio.sleep(self.api.latency)
+        return await super().handle_async_request(request)
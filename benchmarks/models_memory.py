@@ -0,0 +1,109 @@
+# benchmarks/models_memory.py
+# ===========================
+#
+# Copying
+# -------
+#
+# Copyright (c) 2023 cloudguard authors and contributors.
+#
+# This file is part of the *cloudguard* project.
+#
+# *cloudguard* is a free software project. You can redistribute it and/or
+# modify it following the terms of the MIT License.
+#
+# This software project is distributed *as is*, WITHOUT WARRANTY OF ANY KIND;
+# including but not limited to the WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE and NONINFRINGEMENT.
+#
+# You should have received a copy of the MIT License along with *cloudguard*.
+# If not, see <http://opensource.org/licenses/MIT>.
+#
+"""Compare the memory held by decoded findings as raw dictionaries and as
+:class:`~cloudguard.models.Finding` models.
+
+The findings are decoded from JSON, as received from the API, so that each
+record holds its own copy of the strings it shares with other records. The
+memory retained by the decoded records is measured with :mod:`tracemalloc`.
+
+Usage::
+
+    python benchmarks/models_memory.py [--records N]
+
+"""
+import gc
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+
+from pathlib import Path
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from mockapi import finding
+
+from cloudguard.models import Finding
+
+
+def measure(build) -> tuple:
+    """Build records and measure the memory they retain.
+
+
+    :return: The retained memory, in bytes, and the build time, in seconds.
+    :rtype: tuple
+
+    """
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    records = build()
+    seconds = time.perf_counter() - start
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+    return size, seconds
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=100_000)
+    args = parser.parse_args()
+
+    lines = [
+        json.dumps(
+            {
+                **finding(i),
+                "description": f"Rule {i % 97} checks the configuration.",
+                "remediation": f"Follow the remediation guide of rule {i % 97}.",
+            }
+        )
+        for i in range(args.records)
+    ]
+
+    raw, raw_seconds = measure(lambda: [json.loads(x) for x in lines])
+    models, model_seconds = measure(
+        lambda: [Finding.from_dict(json.loads(x)) for x in lines]
+    )
+
+    print(
+        f"{'representation':<16} {'bytes/record':>13} {'total MiB':>10} {'build s':>8}"
+    )
+    for name, size, seconds in (
+        ("dict", raw, raw_seconds),
+        ("Finding", models, model_seconds),
+    ):
+        print(
+            f"{name:<16} {size / args.records:>13.0f} {size / 2**20:>10.1f}"
+            f" {seconds:>8.2f}"
+        )
+    print(f"memory saved: {1 - models / raw:.0%}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+# benchmarks/offload.py
+# =====================
+#
+# Copying
+# -------
+#
+# Copyright (c) 2023 cloudguard authors and contributors.
+#
+# This file is part of the *cloudguard* project.
+#
+# *cloudguard* is a free software project. You can redistribute it and/or
+# modify it following the terms of the MIT License.
+#
+# This software project is distributed *as is*, WITHOUT WARRANTY OF ANY KIND;
+# including but not limited to the WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE and NONINFRINGEMENT.
+#
+# You should have received a copy of the MIT License along with *cloudguard*.
+# If not, see <http://opensource.org/licenses/MIT>.
+#
+"""Measure how long the event loop is blocked while large responses are
+decoded, in the event loop itself and through
+:class:`~cloudguard.offload.Offloader` with a thread pool and a process pool.
+
+A ticker task records the delay of each of its wake-ups while the responses
+are fetched concurrently with :meth:`~cloudguard.client.AsyncAPIClient.ajson`.
+The body of the responses is rendered once beforehand so that only its
+decoding is measured.
+
+Usage::
+
+    python benchmarks/offload.py [--records N] [--responses N]
+
+"""
+import sys
+import json
+import time
+import typing as ty
+import asyncio
+import argparse
+
+from pathlib import Path
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import httpx
+
+from mockapi import finding
+
+from cloudguard.client import AsyncAPIClient
+from cloudguard.config import Config
+from cloudguard.offload import Offloader
+from cloudguard.credentials import APICredentials
+
+
+#: Interval, in seconds, at which the ticker expects to wake up.
+TICK: float = 0.001
+
+
+def count_high(findings: ty.List[ty.Dict[str, ty.Any]]) -> int:
+    """Reduce the findings to the number of high severity ones."""
+    return sum(1 for f in findings if f["severity"] == "High")
+
+
+async def measure(
+    body: bytes, responses: int, offloader: ty.Optional[Offloader]
+) -> ty.Tuple[float, float]:
+    """Fetch and decode responses while measuring the event loop lag.
+
+
+    :return: The total duration and the worst event loop lag, in seconds.
+    :rtype: tuple
+
+    """
+    config = Config(region="us")
+    config.credentials.api = APICredentials("benchmark", "benchmark")
+    worst = 0.0
+    done = asyncio.Event()
+
+    async def ticker() -> None:
+        nonlocal worst
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(TICK)
+            worst = max(worst, time.perf_counter() - start - TICK)
+
+    async with AsyncAPIClient(
+        config,
+        offloader=offloader,
+        transport=httpx.MockTransport(lambda _: httpx.Response(200, content=body)),
+    ) as client:
+        task = asyncio.ensure_future(ticker())
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(
+                client.ajson("GET", "/v2/export", transform=count_high)
+                for _ in range(responses)
+            )
+        )
+        seconds = time.perf_counter() - start
+        done.set()
+        await task
+
+    return seconds, worst
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=20_000)
+    parser.add_argument("--responses", type=int, default=8)
+    args = parser.parse_args()
+
+    body = json.dumps([finding(i, padding=256) for i in range(args.records)]).encode()
+
+    print(f"{'decoding':<10} {'total s':>8} {'worst lag ms':>13}")
+    for name, factory in (
+        ("inline", lambda: None),
+        ("threads", lambda: Offloader(processes=False)),
+        ("processes", lambda: Offloader()),
+    ):
+        offloader = factory()
+        if offloader is not None:
+            # Start the workers beforehand.
+            list(offloader.executor.map(abs, range(64)))
+        try:
+            seconds, worst = asyncio.run(measure(body, args.responses, offloader))
+        finally:
+            if offloader is not None:
+                offloader.close()
+        print(f"{name:<10} {seconds:>8.2f} {worst * 1000:>13.1f}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+# benchmarks/shared_ratelimit.py
+# ==============================
+#
+# Copying
+# -------
+#
+# Copyright (c) 2023 cloudguard authors and contributors.
+#
+# This file is part of the *cloudguard* project.
+#
+# *cloudguard* is a free software project. You can redistribute it and/or
+# modify it following the terms of the MIT License.
+#
+# This software project is distributed *as is*, WITHOUT WARRANTY OF ANY KIND;
+# including but not limited to the WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE and NONINFRINGEMENT.
+#
+# You should have received a copy of the MIT License along with *cloudguard*.
+# If not, see <http://opensource.org/licenses/MIT>.
+#
+"""Measure the aggregate request rate of several processes limited by a token
+bucket, each with its own bucket and with a bucket shared through
+:class:`~cloudguard.ratelimit.FileBackend`.
+
+Each process takes tokens as fast as the bucket allows for a fixed duration.
+With a bucket per process, the aggregate rate grows with the number of
+processes; with a shared bucket, it stays at the configured rate.
+
+Usage::
+
+    python benchmarks/shared_ratelimit.py [--processes N] [--rate R]
+                                          [--seconds S]
+
+"""
+import sys
+import time
+import argparse
+import tempfile
+import multiprocessing
+
+from pathlib import Path
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from cloudguard.ratelimit import FileBackend, TokenBucket
+
+
+def worker(path: str, rate: float, seconds: float, results) -> None:
+    """Take tokens for a fixed duration and report how many were taken."""
+    backend = FileBackend(path) if path else None
+    bucket = TokenBucket(rate, burst=1, backend=backend)
+    count = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        bucket.acquire()
+        count += 1
+    results.put(count)
+
+
+def run(processes: int, rate: float, seconds: float, path: str) -> float:
+    """Run the workers and return their aggregate rate."""
+    results = multiprocessing.Queue()
+    workers = [
+        multiprocessing.Process(target=worker, args=(path, rate, seconds, results))
+        for _ in range(processes)
+    ]
+    for p in workers:
+        p.start()
+    total = sum(results.get() for _ in workers)
+    for p in workers:
+        p.join()
+    return total / seconds
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=50.0)
+    parser.add_argument("--seconds", type=float, default=2.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'bucket':<12} {'requests/s':>11} {'limit':>7}")
+        for name, path in (("per process", ""), ("shared", f"{tmp}/bucket")):
+            rate = run(args.processes, args.rate, args.seconds, path)
+            print(f"{name:<12} {rate:>11.1f} {args.rate:>7.1f}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,446 @@
+# benchmarks/suite.py
+# ===================
+#
+# Copying
+# -------
+#
+# Copyright (c) 2023 cloudguard authors and contributors.
+#
+# This file is part of the *cloudguard* project.
+#
+# *cloudguard* is a free software project. You can redistribute it and/or
+# modify it following the terms of the MIT License.
+#
+# This software project is distributed *as is*, WITHOUT WARRANTY OF ANY KIND;
+# including but not limited to the WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE and NONINFRINGEMENT.
+#
+# You should have received a copy of the MIT License along with *cloudguard*.
+# If not, see <http://opensource.org/licenses/MIT>.
+#
+"""Measure the overhead of the SDK against a local stand-in of the CloudGuard
+API.
+
+Every scenario runs offline against :mod:`mockapi`. Each one is run twice: a
+first time to measure the throughput and the latency of each operation, a
+second time under :mod:`tracemalloc` to measure the allocations and the peak
+memory.
+
+Usage::
+
+    python benchmarks/suite.py [--scenario NAME ...] [--requests N]
+                               [--latency SECONDS] [--json]
+
+"""
+import gc
+import os
+import sys
+import json
+import time
+import typing as ty
+import asyncio
+import argparse
+import tempfile
+import statistics
+import dataclasses as dc
+import tracemalloc
+
+from pathlib import Path
+
+import httpx
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from mockapi import REGIONS, SEVERITIES, MockCloudGuardAPI, finding
+
+import cloudguard.config
+
+from cloudguard.store import RecordStore
+from cloudguard.client import APIClient, AsyncAPIClient
+from cloudguard.config import Config
+from cloudguard.export import ExportJob, export
+from cloudguard.fanout import FanOut
+from cloudguard.metrics import Metrics
+from cloudguard.cassette import RecordTransport, ReplayTransport
+from cloudguard.pipeline import Stage, Pipeline
+from cloudguard.pagination import PagePaginator, CursorPaginator
+from cloudguard.credentials import APICredentials
+
+
+#: Type definition of a scenario: it receives the benchmark options and returns
+#: the latency of each operation it ran.
+Scenario = ty.Callable[[argparse.Namespace], ty.List[float]]
+
+#: Registered scenarios, by name.
+SCENARIOS: ty.Dict[str, Scenario] = {}
+
+
+@dc.dataclass
+class Result(object):
+    """Measurements of a scenario."""
+
+    name: str
+    operations: int
+    seconds: float
+    p50_ms: float
+    p99_ms: float
+    allocated_blocks: int = 0
+    peak_kib: float = 0.0
+
+    @property
+    def ops_per_second(self) -> float:
+        return self.operations / self.seconds if self.seconds else 0.0
+
+
+def scenario(fn: Scenario) -> Scenario:
+    """Register a scenario."""
+    SCENARIOS[fn.__name__] = fn
+    return fn
+
+
+def make_config(region: str = "us") -> Config:
+    """Build a configuration which does not depend on the environment."""
+    config = Config(region=region)
+    config.credentials.api = APICredentials("benchmark", "benchmark")
+    config.retry.backoff_factor = 0.0
+    return config
+
+
+def timed(fn: ty.Callable[[], ty.Any]) -> float:
+    """Call a function and return its duration, in seconds."""
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+async def atimed(coro: ty.Awaitable) -> float:
+    """Await a coroutine and return its duration, in seconds."""
+    start = time.perf_counter()
+    await coro
+    return time.perf_counter() - start
+
+
+@scenario
+def config_load(args: argparse.Namespace) -> ty.List[float]:
+    """Load the configuration from files, as done by every session."""
+    with tempfile.TemporaryDirectory() as d:
+        Path(d, "config").write_text("[default]\nregion = eu1\n")
+        Path(d, "credentials").write_text(
+            "[default]\napi_key = key\napi_secret = secret\n"
+        )
+        os.environ[cloudguard.config.ENV_CLOUDGUARD_CONFIG] = str(Path(d, "config"))
+        os.environ[cloudguard.config.ENV_CLOUDGUARD_CREDENTIALS] = str(
+            Path(d, "credentials")
+        )
+        try:
+            return [timed(Config.load) for _ in range(args.requests)]
+        finally:
+            del os.environ[cloudguard.config.ENV_CLOUDGUARD_CONFIG]
+            del os.environ[cloudguard.config.ENV_CLOUDGUARD_CREDENTIALS]
+
+
+@scenario
+def client_create(args: argparse.Namespace) -> ty.List[float]:
+    """Create and close a client."""
+    config = make_config()
+    transport = MockCloudGuardAPI().transport()
+
+    def create() -> None:
+        APIClient(config, transport=transport).close()
+
+    return [timed(create) for _ in range(min(args.requests, 500))]
+
+
+@scenario
+def sync_get(args: argparse.Namespace) -> ty.List[float]:
+    """Send sequential requests with the synchronous client."""
+    api = MockCloudGuardAPI(latency=args.latency)
+    with APIClient(make_config(), transport=api.transport()) as client:
+        return [timed(lambda: client.get("/v2/ping")) for _ in range(args.requests)]
+
+
+@scenario
+def sync_get_metrics(args: argparse.Namespace) -> ty.List[float]:
+    """Send sequential requests with the synchronous client, measuring them."""
+    api = MockCloudGuardAPI(latency=args.latency)
+    with APIClient(
+        make_config(), metrics=Metrics(), transport=api.transport()
+    ) as client:
+        return [timed(lambda: client.get("/v2/ping")) for _ in range(args.requests)]
+
+
+@scenario
+def sync_throttled(args: argparse.Namespace) -> ty.List[float]:
+    """Send sequential requests, one in ten being throttled."""
+    api = MockCloudGuardAPI(latency=args.latency, throttle_every=10)
+    with APIClient(make_config(), transport=api.transport()) as client:
+        return [timed(lambda: client.get("/v2/ping")) for _ in range(args.requests)]
+
+
+@scenario
+def sync_paginate(args: argparse.Namespace) -> ty.List[float]:
+    """Iterate over paginated assets with the synchronous client."""
+    api = MockCloudGuardAPI(records=args.records, latency=args.latency)
+    latencies = []
+    with APIClient(make_config(), transport=api.transport()) as client:
+        last = time.perf_counter()
+        for _ in client.paginate("GET", "/v2/protected-asset", PagePaginator()):
+            now = time.perf_counter()
+            latencies.append(now - last)
+            last = now
+    return latencies
+
+
+@scenario
+def replay_paginate(args: argparse.Namespace) -> ty.List[float]:
+    """Iterate over paginated assets replayed from a cassette, recorded in
+    memory from the mock beforehand.
+
+    """
+    config = make_config()
+    recorder = RecordTransport(MockCloudGuardAPI(records=args.records).transport())
+    with APIClient(config, transport=recorder) as client:
+        for _ in client.paginate("GET", "/v2/protected-asset", PagePaginator()):
+            pass
+
+    latencies = []
+    transport = ReplayTransport(recorder.cassette, latency=args.latency or None)
+    with APIClient(config, transport=transport) as client:
+        last = time.perf_counter()
+        for _ in client.paginate("GET", "/v2/protected-asset", PagePaginator()):
+            now = time.perf_counter()
+            latencies.append(now - last)
+            last = now
+    return latencies
+
+
+@scenario
+def sync_large_payload(args: argparse.Namespace) -> ty.List[float]:
+    """Download and decode a single large response."""
+    api = MockCloudGuardAPI(records=args.records, padding=512)
+    with APIClient(make_config(), transport=api.transport()) as client:
+        return [timed(lambda: client.get("/v2/export").json()) for _ in range(5)]
+
+
+@scenario
+def sync_stream_large_payload(args: argparse.Namespace) -> ty.List[float]:
+    """Decode the records of a single large response as it is received."""
+    api = MockCloudGuardAPI(records=args.records, padding=512)
+    latencies = []
+    with APIClient(make_config(), transport=api.transport()) as client:
+        last = time.perf_counter()
+        for _ in client.stream_items("GET", "/v2/export"):
+            now = time.perf_counter()
+            latencies.append(now - last)
+            last = now
+    return latencies
+
+
+@scenario
+def export_ndjson(args: argparse.Namespace) -> ty.List[float]:
+    """Export paginated findings to a compressed NDJSON file."""
+    api = MockCloudGuardAPI(records=args.records, latency=args.latency)
+    with tempfile.TemporaryDirectory() as tmp, APIClient(
+        make_config(), transport=api.transport()
+    ) as client:
+        job = ExportJob(
+            client,
+            "POST",
+            "/v2/Compliance/Finding/search",
+            CursorPaginator("findings"),
+            Path(tmp) / "findings.ndjson.gz",
+        )
+        return [timed(lambda: export(job, resume=False)) for _ in range(3)]
+
+
+@scenario
+def async_get(args: argparse.Namespace) -> ty.List[float]:
+    """Send concurrent requests with the asynchronous client."""
+    api = MockCloudGuardAPI(latency=args.latency)
+
+    async def run() -> ty.List[float]:
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def one() -> float:
+            async with semaphore:
+                return await atimed(client.get("/v2/ping"))
+
+        async with AsyncAPIClient(make_config(), transport=api.transport()) as client:
+            return await asyncio.gather(*(one() for _ in range(args.requests)))
+
+    return asyncio.run(run())
+
+
+@scenario
+def async_paginate(args: argparse.Namespace) -> ty.List[float]:
+    """Iterate over paginated findings with the asynchronous client."""
+    api = MockCloudGuardAPI(records=args.records, latency=args.latency)
+
+    async def run() -> ty.List[float]:
+        latencies = []
+        async with AsyncAPIClient(make_config(), transport=api.transport()) as client:
+            last = time.perf_counter()
+            async for _ in client.apaginate(
+                "POST", "/v2/Compliance/Finding/search", CursorPaginator("findings")
+            ):
+                now = time.perf_counter()
+                latencies.append(now - last)
+                last = now
+        return latencies
+
+    return asyncio.run(run())
+
+
+@scenario
+def fan_out(args: argparse.Namespace) -> ty.List[float]:
+    """Send the same request to many tenants across regions."""
+    api = MockCloudGuardAPI(latency=args.latency)
+    regions = ("us", "eu1", "ap1", "ap2", "ap3", "cace1")
+    targets = [
+        (APICredentials(f"key-{i}", "secret"), regions[i % len(regions)])
+        for i in range(args.concurrency)
+    ]
+
+    async def run() -> ty.List[float]:
+        latencies = []
+        fan_out = FanOut(
+            targets,
+            config=make_config(),
+            max_concurrency=args.concurrency,
+            transport=api.transport(),
+        )
+        async with fan_out:
+            for _ in range(max(1, args.requests // len(targets))):
+                last = time.perf_counter()
+                async for _ in fan_out.request("GET", "/v2/ping"):
+                    now = time.perf_counter()
+                    latencies.append(now - last)
+                    last = now
+        return latencies
+
+    return asyncio.run(run())
+
+
+@scenario
+def pipeline_enrich(args: argparse.Namespace) -> ty.List[float]:
+    """Fetch a detail per listed asset through a bounded pipeline."""
+    api = MockCloudGuardAPI(records=args.records, latency=args.latency)
+
+    async def run() -> ty.List[float]:
+        latencies = []
+        async with AsyncAPIClient(make_config(), transport=api.transport()) as client:
+
+            async def detail(asset: ty.Any) -> httpx.Response:
+                return await client.get("/v2/ping", params={"id": asset["id"]})
+
+            pipeline = Pipeline([Stage(detail, concurrency=args.concurrency)])
+            last = time.perf_counter()
+            async for result in pipeline.run(
+                client.apaginate("GET", "/v2/protected-asset", PagePaginator())
+            ):
+                if not result.ok:
+                    raise result.error
+                now = time.perf_counter()
+                latencies.append(now - last)
+                last = now
+        return latencies
+
+    return asyncio.run(run())
+
+
+@scenario
+def store_query(args: argparse.Namespace) -> ty.List[float]:
+    """Run reporting queries against findings held in a local store."""
+    latencies = []
+    with RecordStore() as store:
+        store.insert("findings", (finding(i) for i in range(args.records)))
+        for i in range(min(args.requests, 500)):
+            severity = SEVERITIES[i % len(SEVERITIES)]
+            region = REGIONS[i % len(REGIONS)]
+            latencies.append(
+                timed(
+                    lambda: list(
+                        store.query("findings", severity=severity, region=region)
+                    )
+                )
+            )
+            latencies.append(timed(lambda: store.count("findings", group_by="rule_id")))
+    return latencies
+
+
+def percentile(values: ty.List[float], p: float) -> float:
+    """Get the given percentile of a list of values."""
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[int(p) - 1]
+
+
+def run(name: str, args: argparse.Namespace) -> Result:
+    """Run a scenario and gather its measurements."""
+    fn = SCENARIOS[name]
+
+    gc.collect()
+    start = time.perf_counter()
+    latencies = fn(args)
+    seconds = time.perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    blocks = sys.getallocatedblocks()
+    fn(args)
+    blocks = sys.getallocatedblocks() - blocks
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return Result(
+        name=name,
+        operations=len(latencies),
+        seconds=seconds,
+        p50_ms=percentile(latencies, 50) * 1000,
+        p99_ms=percentile(latencies, 99) * 1000,
+        allocated_blocks=blocks,
+        peak_kib=peak / 1024,
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--scenario", action="append", choices=sorted(SCENARIOS), default=[]
+    )
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--records", type=int, default=10_000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    results = [run(name, args) for name in args.scenario or SCENARIOS]
+
+    if args.json:
+        print(
+            json.dumps(
+                [{**dc.asdict(r), "ops_per_second": r.ops_per_second} for r in results],
+                indent=2,
+            )
+        )
+        return 0
+
+    print(
+        f"{'scenario':<20} {'ops':>7} {'ops/s':>10} {'p50 ms':>9} {'p99 ms':>9}"
+        f" {'blocks':>8} {'peak KiB':>10}"
+    )
+    for r in results:
+        print(
+            f"{r.name:<20} {r.operations:>7} {r.ops_per_second:>10.0f}"
+            f" {r.p50_ms:>9.3f} {r.p99_ms:>9.3f} {r.allocated_blocks:>8}"
+            f" {r.peak_kib:>10.1f}"
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
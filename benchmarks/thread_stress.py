@@ -0,0 +1,133 @@
+# benchmarks/thread_stress.py
+# ===========================
+#
+# Copying
+# -------
+#
+# Copyright (c) 2023 cloudguard authors and contributors.
+#
+# This file is part of the *cloudguard* project.
+#
+# *cloudguard* is a free software project. You can redistribute it and/or
+# modify it following the terms of the MIT License.
+#
+# This software project is distributed *as is*, WITHOUT WARRANTY OF ANY KIND;
+# including but not limited to the WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE and NONINFRINGEMENT.
+#
+# You should have received a copy of the MIT License along with *cloudguard*.
+# If not, see <http://opensource.org/licenses/MIT>.
+#
+"""Stress the thread-safe synchronous mode of the SDK.
+
+Many threads race to set up the default session and to use its client while
+requests are answered by an in-process transport. The run fails when more than
+one default session or client was created, or when a response was lost or
+mixed up with another one.
+
+Usage::
+
+    python benchmarks/thread_stress.py [--threads N] [--requests N]
+
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+
+from pathlib import Path
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx
+
+import cloudguard
+import cloudguard.client
+
+
+def handler(request: httpx.Request) -> httpx.Response:
+    """Echo the requested item."""
+    return httpx.Response(200, json={"item": int(request.url.params["item"])})
+
+
+class CountingAPIClient(cloudguard.client.APIClient):
+    """Client counting its instances and answering from memory."""
+
+    instances = 0
+    lock = threading.Lock()
+
+    def __init__(self, config, **kwargs):
+        with self.lock:
+            CountingAPIClient.instances += 1
+        super().__init__(config, transport=httpx.MockTransport(handler), **kwargs)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=20_000)
+    args = parser.parse_args()
+
+    os.environ.setdefault("CLOUDGUARD_API_KEY", "stress")
+    os.environ.setdefault("CLOUDGUARD_API_SECRET", "stress")
+    os.environ.setdefault("CLOUDGUARD_REGION", "us")
+    cloudguard.client.APIClient = CountingAPIClient
+    sys.setswitchinterval(1e-6)
+
+    failures = []
+    sessions = set()
+    clients = set()
+    barrier = threading.Barrier(args.threads)
+
+    def race() -> None:
+        barrier.wait()
+        session = cloudguard.default_session()
+        sessions.add(id(session))
+        clients.add(id(session.client))
+
+    threads = [threading.Thread(target=race) for _ in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    if len(sessions) != 1:
+        failures.append(f"{len(sessions)} default sessions were created")
+    if CountingAPIClient.instances != 1 or len(clients) != 1:
+        failures.append(f"{CountingAPIClient.instances} clients were created")
+
+    session = cloudguard.default_session()
+    start = time.perf_counter()
+    results = list(
+        session.map(
+            lambda client, i: client.get("/", params={"item": i}).json()["item"],
+            range(args.requests),
+            max_workers=args.threads,
+        )
+    )
+    elapsed = time.perf_counter() - start
+
+    if results != list(range(args.requests)):
+        failures.append("responses were lost or reordered")
+    if CountingAPIClient.instances != 1:
+        failures.append(f"{CountingAPIClient.instances} clients were created")
+    if session.client.retry_stats.requests != args.requests:
+        failures.append(
+            f"{session.client.retry_stats.requests} requests were counted"
+            f" instead of {args.requests}"
+        )
+
+    print(
+        f"{args.requests} requests over {args.threads} threads in {elapsed:.2f}s"
+        f" ({args.requests / elapsed:.0f} req/s)"
+    )
+    for failure in failures:
+        print(f"FAIL: {failure}")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -18,33 +18,78 @@
 # You should have received a copy of the MIT License along with *cloudguard*.
 # If not, see <http://opensource.org/licenses/MIT>.
 #
+import sys
+import types
 import typing as ty
-import asyncio
 import logging
+import importlib
+import threading
 
-from cloudguard.session import Session, AsyncSession
 
+if ty.TYPE_CHECKING:
+    import asyncio
+
+    from cloudguard.session import Session, AsyncSession
+
+
+#: Attributes of the package lazily imported from its modules, by name. This
+#: keeps ``import cloudguard`` cheap until a session is actually used.
+_LAZY_ATTRIBUTES: ty.Dict[str, str] = {
+    "AsyncSession": "cloudguard.session",
+    "Session": "cloudguard.session",
+}
 
 #: The default CloudGuard session.
-_DEFAULT_SESSION: ty.Optional[ty.Union[AsyncSession, Session]] = None
+_DEFAULT_SESSION: "ty.Optional[ty.Union[AsyncSession, Session]]" = None
+#: Lock protecting the set up of the default session.
+_DEFAULT_SESSION_LOCK = threading.RLock()
+#: Background task warming up the connections of an asynchronous default
+#: session.
+_DEFAULT_SESSION_WARM_UP: "ty.Optional[asyncio.Task]" = None
+
+
+def __getattr__(name: str) -> ty.Any:
+    """Import the lazy attributes and the modules of the package on first
+    access.
+
+    """
+    if (module := _LAZY_ATTRIBUTES.get(name)) is not None:
+        value = globals()[name] = getattr(importlib.import_module(module), name)
+        return value
+
+    try:
+        return importlib.import_module(f"{__name__}.{name}")
+    except ModuleNotFoundError as e:
+        if e.name != f"{__name__}.{name}":
+            raise
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> ty.List[str]:
+    """List the attributes of the package, including the lazy ones."""
+    return sorted({*globals(), *_LAZY_ATTRIBUTES})
 
 
-def default_session() -> ty.Union[AsyncSession, Session]:
-    """Get the SDK's default session.
+def default_session() -> "ty.Union[AsyncSession, Session]":
+    """Get the SDK's default session. It is safe to call from several threads;
+    the session is set up only once.
 
 
     :returns: The session used by the SDK by default.
     :rtype: ~typing.Union[~cloudguard.session.Session, ~cloudguard.session.AsyncSession]
 
     """
-    if _DEFAULT_SESSION is None:
-        setup_default_session()
-    return _DEFAULT_SESSION
+    if (default := _DEFAULT_SESSION) is None:
+        with _DEFAULT_SESSION_LOCK:
+            if (default := _DEFAULT_SESSION) is None:
+                setup_default_session()
+                default = _DEFAULT_SESSION
+    return default
 
 
 def session(
     force_async: bool = False, force_sync: bool = False, *args, **kwargs
-) -> ty.Union[AsyncSession, Session]:
+) -> "ty.Union[AsyncSession, Session]":
     """Create a new CloudGuard session. By default, when an asynchronous runtime
     is detected, an asynchronous session is returned. This can be changed by the
      ``force_async`` or ``force_sync`` parameters.
@@ -63,6 +108,10 @@ def session(
     :rtype: ~typing.Union[~cloudguard.session.Session, ~cloudguard.session.AsyncSession]
 
     """
+    import asyncio
+
+    from cloudguard.session import Session, AsyncSession
+
     if force_async and force_sync:
         raise ValueError("`force_async` and `force_sync` cannot be set both.")
     if force_async:
@@ -78,13 +127,73 @@ def session(
         return AsyncSession(*args, **kwargs)
 
 
-def setup_default_session(*args, **kwargs) -> None:
-    """Set up the SDK's default session. All parameters are provided to the
-    session maker.
+def setup_default_session(*args, warm_up: int = 0, **kwargs) -> None:
+    """Set up the SDK's default session. All other parameters are provided to
+    the session maker. The previous default session, if any, is closed.
+
+
+    :param warm_up: Number of connections to open ahead of time. For an
+                    asynchronous session, they are opened in a background task
+                    of the running event loop.
+    :type warm_up: int
+
+
+    :raise RuntimeError: When warming up an asynchronous session without a
+                         running event loop. The default session is left
+                         unchanged.
 
     """
-    global _DEFAULT_SESSION
-    _DEFAULT_SESSION = session(*args, **kwargs)
+    import asyncio
+
+    from cloudguard.session import AsyncSession
+
+    global _DEFAULT_SESSION, _DEFAULT_SESSION_WARM_UP
+
+    new = session(*args, **kwargs)
+    loop = None
+    if warm_up and isinstance(new, AsyncSession):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            new.close()
+            raise RuntimeError(
+                "expected a running event loop to warm up an asynchronous"
+                " session, call setup_default_session from a coroutine"
+            ) from None
+
+    with _DEFAULT_SESSION_LOCK:
+        previous, _DEFAULT_SESSION = _DEFAULT_SESSION, new
+    if previous is not None:
+        previous.close()
+
+    if not warm_up:
+        return
+    if loop is not None:
+        _DEFAULT_SESSION_WARM_UP = loop.create_task(new.warm_up(warm_up))
+    else:
+        new.warm_up(warm_up)
+
+
+class _Package(types.ModuleType):
+    """Type of the package's module.
+
+    Importing a submodule binds it to an attribute of its package. As the
+    :mod:`cloudguard.session` module is imported lazily, this would replace the
+    :func:`~cloudguard.session` function once a session is first created.
+
+    """
+
+    def __setattr__(self, name: str, value: ty.Any) -> None:
+        """Set an attribute of the package, keeping the functions shadowed by
+        a submodule of the same name.
+
+        """
+        if isinstance(value, types.ModuleType) and callable(self.__dict__.get(name)):
+            return
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _Package
 
 
 # Ensure that the library does not emit log messages.
@@ -0,0 +1,319 @@
+# cloudguard/auth.py
+# ==================
+#
+# Copying
+# -------
+#
+# Copyright (c) 2023 cloudguard authors and contributors.
+#
+# This file is part of the *cloudguard* project.
+#
+# *cloudguard* is a free software project. You can redistribute it and/or
+# modify it following the terms of the MIT License.
+#
+# This software project is distributed *as is*, WITHOUT WARRANTY OF ANY KIND;
+# including but not limited to the WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE and NONINFRINGEMENT.
+#
+# You should have received a copy of the MIT License along with *cloudguard*.
+# If not, see <http://opensource.org/licenses/MIT>.
+#
+import os
+import time
+import base64
+import typing as ty
+import logging
+import threading
+
+import httpx
+
+import cloudguard.config
+
+from cloudguard.config import Credentials
+from cloudguard.credentials import APICredentials
+
+
+log = logging.getLogger(__name__)
+
+
+#: Default interval, in seconds, between two reloads of the credentials from
+#: the environment or the credentials file.
+DEFAULT_REFRESH_INTERVAL: float = 60.0
+
+
+class CredentialProvider(object):
+    """Provide the current CloudGuard API credentials, reloading them from
+    their source when stale.
+
+    Credentials are swapped atomically, so that concurrent requests use either
+    the previous or the new credentials but never a mix of both.
+
+
+    :param refresh_interval: Interval, in seconds, between two reloads of the
+                             credentials. Credentials are only reloaded on
+                             demand when ``None``.
+    :type refresh_interval: float
+
+    """
+
+    def __init__(self, refresh_interval: ty.Optional[float] = None):
+        """Constructor for :class:`cloudguard.auth.CredentialProvider`."""
+        self.refresh_interval = refresh_interval
+        self._credentials: ty.Optional[APICredentials] = None
+        self._expires = 0.0
+        self._lock = threading.Lock()
+
+    def load(self) -> ty.Optional[APICredentials]:
+        """Load the credentials from their source.
+
+
+        :return: The loaded credentials or ``None`` when unavailable.
+        :rtype: ~cloudguard.credentials.APICredentials
+
+        """
+        raise NotImplementedError
+
+    def get(self) -> APICredentials:
+        """Get the current credentials, reloading them when stale.
+
+
+        :return: The current credentials.
+        :rtype: ~cloudguard.credentials.APICredentials
+
+
+        :raise ValueError: When no credentials could be loaded.
+
+        """
+        credentials = self._credentials
+        if credentials is None or (
+            self.refresh_interval is not None and time.monotonic() >= self._expires
+        ):
+            with self._lock:
+                if self._credentials is credentials:
+                    self._reload()
+                credentials = self._credentials
+        return credentials
+
+    def refresh(self) -> APICredentials:
+        """Reload the credentials from their source, e.g. after they were
+        rejected.
+
+
+        :return: The current credentials.
+        :rtype: ~cloudguard.credentials.APICredentials
+
+
+        :raise ValueError: When no credentials could be loaded.
+
+        """
+        with self._lock:
+            self._reload()
+            return self._credentials
+
+    def _reload(self) -> None:
+        """Reload the credentials, keeping the previous ones when unavailable."""
+        try:
+            credentials = self.load()
+        except Exception as e:
+            if self._credentials is None:
+                raise
+            log.warning(f"Could not reload credentials from {self!r}: {e!r}")
+            credentials = None
+
+        if credentials is None and self._credentials is None:
+            raise ValueError(f"expected credentials from {self!r}, got: none")
+        if credentials is not None and credentials != self._credentials:
+            if self._credentials is not None:
+                log.info(f"Rotated credentials to API key {credentials.key}")
+            self._credentials = credentials
+        if self.refresh_interval is not None:
+            self._expires = time.monotonic() + self.refresh_interval
+
+
+class StaticProvider(CredentialProvider):
+    """Provide credentials which only change when set explicitly.
+
+
+    :param credentials: The credentials.
+    :type credentials: ~cloudguard.credentials.APICredentials
+
+    """
+
+    def __init__(self, credentials: ty.Optional[APICredentials]):
+        """Constructor for :class:`cloudguard.auth.StaticProvider`."""
+        super().__init__()
+        self._credentials = credentials
+
+    def __repr__(self) -> str:
+        """Formal representation of the provider."""
+        return f"{self.__class__.__name__}({self._credentials!r})"
+
+    def load(self) -> ty.Optional[APICredentials]:
+        """Get the credentials."""
+        return self._credentials
+
+    def set(self, credentials: APICredentials) -> None:
+        """Replace the credentials.
+
+
+        :param credentials: The new credentials.
+        :type credentials: ~cloudguard.credentials.APICredentials
+
+
+        :return: ``None``
+
+        """
+        with self._lock:
+            self._credentials = credentials
+
+
+class FileProvider(CredentialProvider):
+    """Provide the credentials of a credentials file, reloaded when the file
+    is modified.
+
+
+    :param path: Path to the credentials file. Defaults to the file used by
+                 :meth:`~cloudguard.config.Credentials.load_from_file`.
+    :type path: ~os.PathLike
+
+    :param refresh_interval: Interval, in seconds, between two checks of the
+                             file.
+    :type refresh_interval: float
+
+    """
+
+    def __init__(
+        self,
+        path: ty.Optional[os.PathLike] = None,
+        refresh_interval: ty.Optional[float] = DEFAULT_REFRESH_INTERVAL,
+    ):
+        """Constructor for :class:`cloudguard.auth.FileProvider`."""
+        super().__init__(refresh_interval)
+        self.path = path
+        self._mtime: ty.Optional[int] = None
+
+    def __repr__(self) -> str:
+        """Formal representation of the provider."""
+        return f"{self.__class__.__name__}({self.path!r})"
+
+    def load(self) -> ty.Optional[APICredentials]:
+        """Read the credentials from the file, unless it was not modified."""
+        path = self.path
+        if path is None:
+            path = (
+                os.environ.get(cloudguard.config.ENV_CLOUDGUARD_CREDENTIALS)
+                or cloudguard.config.CLOUDGUARD_CREDENTIALS_PATH
+            )
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime is not None and mtime == self._mtime:
+            return self._credentials
+
+        self._mtime = mtime
+        return getattr(Credentials.load_from_file(path), "api", None)
+
+
+class EnvProvider(CredentialProvider):
+    """Provide the credentials of the environment variables.
+
+
+    :param refresh_interval: Interval, in seconds, between two reads of the
+                             environment.
+    :type refresh_interval: float
+
+    """
+
+    def __init__(self, refresh_interval: ty.Optional[float] = DEFAULT_REFRESH_INTERVAL):
+        """Constructor for :class:`cloudguard.auth.EnvProvider`."""
+        super().__init__(refresh_interval)
+
+    def __repr__(self) -> str:
+        """Formal representation of the provider."""
+        return f"{self.__class__.__name__}()"
+
+    def load(self) -> ty.Optional[APICredentials]:
+        """Read the credentials from the environment variables."""
+        return getattr(Credentials.load_from_env(), "api", None)
+
+
+class CallbackProvider(CredentialProvider):
+    """Provide the credentials returned by a function, e.g. reading them from a
+    secrets manager.
+
+
+    :param fn: Function returning the current credentials.
+    :type fn: ~typing.Callable[[], ~cloudguard.credentials.APICredentials]
+
+    :param refresh_interval: Interval, in seconds, between two calls of the
+                             function. The function is only called again when
+                             the credentials are rejected when ``None``.
+    :type refresh_interval: float
+
+    """
+
+    def __init__(
+        self,
+        fn: ty.Callable[[], ty.Optional[APICredentials]],
+        refresh_interval: ty.Optional[float] = None,
+    ):
+        """Constructor for :class:`cloudguard.auth.CallbackProvider`."""
+        super().__init__(refresh_interval)
+        self.fn = fn
+
+    def __repr__(self) -> str:
+        """Formal representation of the provider."""
+        return f"{self.__class__.__name__}({self.fn!r})"
+
+    def load(self) -> ty.Optional[APICredentials]:
+        """Call the function."""
+        return self.fn()
+
+
+class ProviderAuth(httpx.Auth):
+    """Authenticate each request with the current credentials of a provider.
+
+    A request whose credentials are rejected is sent again once when the
+    provider has new credentials, so that requests made while a key is being
+    rotated do not fail.
+
+
+    :param provider: The provider of the credentials.
+    :type provider: ~cloudguard.auth.CredentialProvider
+
+    """
+
+    def __init__(self, provider: CredentialProvider):
+        """Constructor for :class:`cloudguard.auth.ProviderAuth`."""
+        self.provider = provider
+        self._header: ty.Tuple[ty.Optional[APICredentials], str] = (None, "")
+
+    def _authorization(self, credentials: APICredentials) -> str:
+        """Build the ``Authorization`` header of the given credentials."""
+        cached, header = self._header
+        if cached is not credentials:
+            token = base64.b64encode(
+                f"{credentials.key}:{credentials.secret}".encode()
+            ).decode("ascii")
+            header = f"Basic {token}"
+            self._header = (credentials, header)
+        return header
+
+    def auth_flow(
+        self, request: httpx.Request
+    ) -> ty.Generator[httpx.Request, httpx.Response, None]:
+        """Authenticate a request, then send it again with the new credentials
+        if rejected because of a rotation.
+
+        """
+        credentials = self.provider.get()
+        request.headers["Authorization"] = self._authorization(credentials)
+        response = yield request
+
+        if response.status_code == httpx.codes.UNAUTHORIZED:
+            fresh = self.provider.refresh()
+            if fresh != credentials:
+                log.debug(f"Retrying {request.method} {request.url} after rotation")
+                request.headers["Authorization"] = self._authorization(fresh)
+                yield request
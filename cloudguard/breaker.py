@@ -0,0 +1,318 @@
+# cloudguard/breaker.py
+# =====================
+#
+# Copying
+# -------
+#
+# Copyright (c) 2023 cloudguard authors and contributors.
+#
+# This file is part of the *cloudguard* project.
+#
+# *cloudguard* is a free software project. You can redistribute it and/or
+# modify it following the terms of the MIT License.
+#
+# This software project is distributed *as is*, WITHOUT WARRANTY OF ANY KIND;
+# including but not limited to the WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE and NONINFRINGEMENT.
+#
+# You should have received a copy of the MIT License along with *cloudguard*.
+# If not, see <http://opensource.org/licenses/MIT>.
+#
+import time
+import typing as ty
+import logging
+import threading
+import dataclasses as dc
+
+import httpx
+
+
+log = logging.getLogger(__name__)
+
+
+#: Default number of consecutive failures opening a circuit.
+DEFAULT_THRESHOLD: int = 5
+#: Default time, in seconds, during which an open circuit rejects requests
+#: before letting a probe through.
+DEFAULT_RESET_TIMEOUT: float = 30.0
+
+#: Circuit states.
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(httpx.TransportError):
+    """Raised instead of sending a request while the circuit of its region is
+    open.
+
+    """
+
+
+@dc.dataclass
+class BreakerStats(object):
+    """Counters describing the work done by a circuit breaker."""
+
+    #: Number of requests which completed successfully.
+    successes: int = 0
+    #: Number of requests which failed.
+    failures: int = 0
+    #: Number of requests rejected while the circuit was open.
+    rejected: int = 0
+    #: Number of times the circuit opened.
+    opened: int = 0
+
+
+class CircuitBreaker(object):
+    """Stop sending requests to a failing region for a while.
+
+    The circuit opens after ``threshold`` consecutive failures: requests are
+    then rejected right away. Once ``reset_timeout`` elapsed, the circuit is
+    half-open and a single probe request is let through: the circuit closes if
+    it succeeds and opens again otherwise.
+
+
+    :param threshold: Number of consecutive failures opening the circuit.
+    :type threshold: int
+
+    :param reset_timeout: Time, in seconds, during which an open circuit
+                          rejects requests.
+    :type reset_timeout: float
+
+    """
+
+    def __init__(
+        self,
+        threshold: int = DEFAULT_THRESHOLD,
+        reset_timeout: float = DEFAULT_RESET_TIMEOUT,
+    ):
+        """Constructor for :class:`cloudguard.breaker.CircuitBreaker`."""
+        if threshold < 1:
+            raise ValueError(f"threshold must be strictly positive, got: {threshold}")
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.stats = BreakerStats()
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        # Time from which the next probe is let through when not closed.
+        self._probe_at = 0.0
+
+    @property
+    def state(self) -> str:
+        """Get the state of the circuit.
+
+
+        :return: One of ``"closed"``, ``"open"`` or ``"half_open"``.
+        :rtype: str
+
+        """
+        with self._lock:
+            if self._state == OPEN and time.monotonic() >= self._probe_at:
+                return HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """Check whether a request may be sent. A request let through while the
+        circuit is half-open is the probe.
+
+
+        :return: Whether the request may be sent.
+        :rtype: bool
+
+        """
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+
+            now = time.monotonic()
+            if now >= self._probe_at:
+                # The probe is given as long to complete before another one is
+                # let through, should it never report its outcome.
+                self._state = HALF_OPEN
+                self._probe_at = now + self.reset_timeout
+                return True
+
+            self.stats.rejected += 1
+            return False
+
+    def success(self) -> None:
+        """Report a successful request, closing the circuit.
+
+
+        :return: ``None``
+
+        """
+        with self._lock:
+            self.stats.successes += 1
+            self._failures = 0
+            if self._state != CLOSED:
+                log.info("Circuit closed after a successful probe")
+                self._state = CLOSED
+
+    def failure(self) -> None:
+        """Report a failed request, opening the circuit after too many
+        consecutive failures or when the probe failed.
+
+
+        :return: ``None``
+
+        """
+        with self._lock:
+            self.stats.failures += 1
+            self._failures += 1
+            if self._state == HALF_OPEN or (
+                self._state == CLOSED and self._failures >= self.threshold
+            ):
+                log.warning(
+                    f"Circuit opened for {self.reset_timeout}s after"
+                    f" {self._failures} consecutive failures"
+                )
+                self._state = OPEN
+                self._probe_at = time.monotonic() + self.reset_timeout
+                self.stats.opened += 1
+
+    def reset(self) -> None:
+        """Close the circuit.
+
+
+        :return: ``None``
+
+        """
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+
+
+#: Circuit breakers shared by every client of the process, by region code and
+#: settings.
+_BREAKERS: ty.Dict[ty.Tuple[str, int, float], CircuitBreaker] = {}
+#: Lock protecting the creation of the shared circuit breakers.
+_BREAKERS_LOCK = threading.Lock()
+
+
+def get_breaker(
+    key: str,
+    threshold: int = DEFAULT_THRESHOLD,
+    reset_timeout: float = DEFAULT_RESET_TIMEOUT,
+) -> CircuitBreaker:
+    """Get the circuit breaker shared by the whole process under the given key
+    and settings, creating it if needed. Clients configured with other settings
+    get their own circuit breaker, so that they never change the settings of
+    one another.
+
+
+    :param key: Key identifying the circuit breaker, usually the region code.
+    :type key: str
+
+    :param threshold: Number of consecutive failures opening the circuit.
+    :type threshold: int
+
+    :param reset_timeout: Time, in seconds, during which an open circuit
+                          rejects requests.
+    :type reset_timeout: float
+
+
+    :return: The shared circuit breaker.
+    :rtype: ~cloudguard.breaker.CircuitBreaker
+
+    """
+    with _BREAKERS_LOCK:
+        try:
+            breaker = _BREAKERS[key, threshold, reset_timeout]
+        except KeyError:
+            breaker = _BREAKERS[key, threshold, reset_timeout] = CircuitBreaker(
+                threshold, reset_timeout
+            )
+
+    return breaker
+
+
+class _BreakerTransportMixin(object):
+    """Behaviour shared by the synchronous and asynchronous circuit breaker
+    transports.
+
+    """
+
+    def __init__(
+        self,
+        transport: ty.Union[httpx.BaseTransport, httpx.AsyncBaseTransport],
+        breaker: CircuitBreaker,
+    ):
+        self.transport = transport
+        self.breaker = breaker
+
+    def _check(self, request: httpx.Request) -> None:
+        """Reject the request when the circuit is open."""
+        if not self.breaker.allow():
+            raise CircuitOpenError(
+                f"circuit open for {request.url.host}, not sending the request",
+                request=request,
+            )
+
+    def _report(self, response: httpx.Response) -> None:
+        """Report the outcome of a request from its response."""
+        if response.status_code >= 500:
+            self.breaker.failure()
+        else:
+            self.breaker.success()
+
+
+class BreakerTransport(_BreakerTransportMixin, httpx.BaseTransport):
+    """Transport wrapper failing fast while the circuit of a region is open.
+    Transport errors, including timeouts, and server errors are failures.
+
+
+    :param transport: The transport actually sending the requests.
+    :type transport: ~httpx.BaseTransport
+
+    :param breaker: The circuit breaker of the region.
+    :type breaker: ~cloudguard.breaker.CircuitBreaker
+
+    """
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        """Send a request unless the circuit is open."""
+        self._check(request)
+        try:
+            response = self.transport.handle_request(request)
+        except httpx.TransportError:
+            self.breaker.failure()
+            raise
+        self._report(response)
+        return response
+
+    def close(self) -> None:
+        """Close the underlying transport."""
+        self.transport.close()
+
+
+class AsyncBreakerTransport(_BreakerTransportMixin, httpx.AsyncBaseTransport):
+    """Asynchronous transport wrapper failing fast while the circuit of a region
+    is open. Transport errors, including timeouts, and server errors are
+    failures.
+
+
+    :param transport: The transport actually sending the requests.
+    :type transport: ~httpx.AsyncBaseTransport
+
+    :param breaker: The circuit breaker of the region.
+    :type breaker: ~cloudguard.breaker.CircuitBreaker
+
+    """
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """Send a request unless the circuit is open."""
+        self._check(request)
+        try:
+            response = await self.transport.handle_async_request(request)
+        except httpx.TransportError:
+            self.breaker.failure()
+            raise
+        self._report(response)
+        return response
+
+    async def aclose(self) -> None:
+        """Close the underlying transport."""
+        await self.transport.aclose()
@@ -0,0 +1,573 @@
+# cloudguard/cache.py
+# ===================
+#
+# Copying
+# -------
+#
+# Copyright (c) 2023 cloudguard authors and contributors.
+#
+# This file is part of the *cloudguard* project.
+#
+# *cloudguard* is a free software project. You can redistribute it and/or
+# modify it following the terms of the MIT License.
+#
+# This software project is distributed *as is*, WITHOUT WARRANTY OF ANY KIND;
+# including but not limited to the WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE and NONINFRINGEMENT.
+#
+# You should have received a copy of the MIT License along with *cloudguard*.
+# If not, see <http://opensource.org/licenses/MIT>.
+#
+import os
+import json
+import time
+import typing as ty
+import hashlib
+import logging
+import tempfile
+import threading
+import collections
+import dataclasses as dc
+
+from pathlib import Path
+
+import httpx
+
+from cloudguard.streaming import STREAM_EXTENSION
+
+
+log = logging.getLogger(__name__)
+
+
+#: Status code of a response to a conditional request whose resource did not
+#: change.
+STATUS_NOT_MODIFIED: int = 304
+#: Headers making a request conditional. Requests already conditional are not
+#: answered from the cache.
+CONDITIONAL_HEADERS: ty.Tuple[str, ...] = ("If-None-Match", "If-Modified-Since")
+
+
+@dc.dataclass(frozen=True)
+class CacheEntry(object):
+    """A cached response."""
+
+    #: Status code of the response.
+    status_code: int
+    #: Raw headers of the response.
+    headers: ty.List[ty.Tuple[str, str]]
+    #: Raw, still encoded, body of the response.
+    content: bytes
+    #: Time at which the response was stored, as a UNIX timestamp.
+    stored_at: float = dc.field(default_factory=time.time)
+
+    @property
+    def etag(self) -> ty.Optional[str]:
+        """Get the entity tag of the response."""
+        return httpx.Headers(self.headers).get("ETag")
+
+    @property
+    def last_modified(self) -> ty.Optional[str]:
+        """Get the last modification date of the response."""
+        return httpx.Headers(self.headers).get("Last-Modified")
+
+    @property
+    def size(self) -> int:
+        """Get the size of the entry's body, in bytes."""
+        return len(self.content)
+
+
+@dc.dataclass
+class CacheStats(object):
+    """Counters describing the efficiency of the cache."""
+
+    #: Number of requests for which no usable entry was cached.
+    misses: int = 0
+    #: Number of requests answered from the cache after revalidation.
+    hits: int = 0
+    #: Number of bytes which did not have to be downloaded again.
+    bytes_saved: int = 0
+    #: Number of entries removed from the cache.
+    evictions: int = 0
+    #: Lock protecting the counters when shared between threads.
+    _lock: threading.Lock = dc.field(
+        default_factory=threading.Lock, repr=False, compare=False
+    )
+
+    def add(self, **kwargs: int) -> None:
+        """Increment the given counters.
+
+
+        :return: ``None``
+
+        """
+        with self._lock:
+            for k, v in kwargs.items():
+                setattr(self, k, getattr(self, k) + v)
+
+
+class DiskStore(object):
+    """Persist cache entries as files in a directory.
+
+    Each entry is stored in its own file, made of a JSON header line followed
+    by the raw body of the response.
+
+
+    :param path: Directory holding the cache entries.
+    :type path: ~os.PathLike
+
+    :param max_size: Maximum size, in bytes, of the stored entries. It is
+                     enforced every ``prune_every`` writes.
+    :type max_size: int
+
+    :param prune_every: Number of writes between two prunings of the store.
+    :type prune_every: int
+
+    """
+
+    def __init__(
+        self,
+        path: os.PathLike,
+        max_size: ty.Optional[int] = None,
+        prune_every: int = 64,
+    ):
+        """Constructor for :class:`cloudguard.cache.DiskStore`."""
+        self.path = Path(path).expanduser()
+        self.max_size = max_size
+        self.prune_every = prune_every
+        self._writes = 0
+
+    def _file(self, key: str) -> Path:
+        """Get the path of the file holding the entry of the given key."""
+        return self.path / hashlib.sha256(key.encode()).hexdigest()
+
+    def get(self, key: str) -> ty.Optional[CacheEntry]:
+        """Read an entry from the disk.
+
+
+        :param key: Key of the entry.
+        :type key: str
+
+
+        :return: The entry or ``None`` when it is not stored or could not be
+                 read.
+        :rtype: ~cloudguard.cache.CacheEntry
+
+        """
+        try:
+            with open(self._file(key), "rb") as f:
+                header = json.loads(f.readline())
+                content = f.read()
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            log.warning(f"Could not read cache entry for {key}: {e}")
+            return None
+
+        if header.get("key") != key:
+            return None
+        return CacheEntry(
+            status_code=header["status_code"],
+            headers=[tuple(h) for h in header["headers"]],
+            content=content,
+            stored_at=header["stored_at"],
+        )
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        """Write an entry on the disk. The write is atomic so that concurrent
+        readers never see a partial entry.
+
+
+        :param key: Key of the entry.
+        :type key: str
+
+        :param entry: The entry to write.
+        :type entry: ~cloudguard.cache.CacheEntry
+
+
+        :return: ``None``
+
+        """
+        header = {
+            "key": key,
+            "status_code": entry.status_code,
+            "headers": entry.headers,
+            "stored_at": entry.stored_at,
+        }
+        try:
+            self.path.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.path, prefix=".tmp-")
+            with os.fdopen(fd, "wb") as f:
+                f.write(json.dumps(header).encode())
+                f.write(b"\n")
+                f.write(entry.content)
+            os.replace(tmp, self._file(key))
+        except OSError as e:
+            log.warning(f"Could not write cache entry for {key}: {e}")
+            return
+
+        self._writes += 1
+        if self.max_size is not None and self._writes % self.prune_every == 0:
+            self.prune(self.max_size)
+
+    def delete(self, key: str) -> None:
+        """Remove an entry from the disk.
+
+
+        :param key: Key of the entry.
+        :type key: str
+
+
+        :return: ``None``
+
+        """
+        try:
+            self._file(key).unlink()
+        except FileNotFoundError:
+            pass
+
+    def prune(self, max_size: int, ttl: ty.Optional[float] = None) -> int:
+        """Remove the expired entries then the least recently written ones until
+        the stored entries fit in the given size.
+
+
+        :param max_size: Maximum size, in bytes, of the stored entries.
+        :type max_size: int
+
+        :param ttl: Time, in seconds, after which an entry expires.
+        :type ttl: float
+
+
+        :return: The number of removed entries.
+        :rtype: int
+
+        """
+        try:
+            files = [
+                (f, f.stat()) for f in self.path.iterdir() if not f.name.startswith(".")
+            ]
+        except FileNotFoundError:
+            return 0
+
+        files.sort(key=lambda x: x[1].st_mtime)
+        now = time.time()
+        total = sum(st.st_size for _, st in files)
+        removed = 0
+        for f, st in files:
+            expired = ttl is not None and now - st.st_mtime > ttl
+            if not expired and total <= max_size:
+                continue
+            try:
+                f.unlink()
+            except FileNotFoundError:
+                pass
+            total -= st.st_size
+            removed += 1
+
+        return removed
+
+
+class ResponseCache(object):
+    """Bounded in-memory LRU cache of responses, optionally backed by a
+    :class:`~cloudguard.cache.DiskStore`.
+
+
+    :param max_entries: Maximum number of entries held in memory.
+    :type max_entries: int
+
+    :param max_size: Maximum size, in bytes, of the bodies held in memory.
+    :type max_size: int
+
+    :param ttl: Time, in seconds, after which an entry is evicted.
+    :type ttl: float
+
+    :param store: Store persisting the entries.
+    :type store: ~cloudguard.cache.DiskStore
+
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        max_size: int = 64 * 1024 * 1024,
+        ttl: ty.Optional[float] = None,
+        store: ty.Optional[DiskStore] = None,
+    ):
+        """Constructor for :class:`cloudguard.cache.ResponseCache`."""
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.ttl = ttl
+        self.store = store
+        self.stats = CacheStats()
+        self._entries: ty.OrderedDict[str, CacheEntry] = collections.OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Get the number of entries held in memory."""
+        return len(self._entries)
+
+    def _expired(self, entry: CacheEntry) -> bool:
+        """Check whether an entry outlived the time to live of the cache."""
+        return self.ttl is not None and time.time() - entry.stored_at > self.ttl
+
+    def _pop(self, key: str) -> None:
+        """Remove an entry from memory. Must be called with the lock held."""
+        if (entry := self._entries.pop(key, None)) is not None:
+            self._size -= entry.size
+            self.stats.add(evictions=1)
+
+    def get(self, key: str) -> ty.Optional[CacheEntry]:
+        """Get a cached entry, from memory first then from the store.
+
+
+        :param key: Key of the entry.
+        :type key: str
+
+
+        :return: The entry or ``None`` when there is no valid entry.
+        :rtype: ~cloudguard.cache.CacheEntry
+
+        """
+        with self._lock:
+            if (entry := self._entries.get(key)) is not None:
+                if not self._expired(entry):
+                    self._entries.move_to_end(key)
+                    return entry
+                self._pop(key)
+
+        if self.store is None or (entry := self.store.get(key)) is None:
+            return None
+        if self._expired(entry):
+            self.store.delete(key)
+            return None
+
+        self._put(key, entry)
+        return entry
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        """Store an entry, evicting the least recently used ones if needed.
+
+
+        :param key: Key of the entry.
+        :type key: str
+
+        :param entry: The entry to store.
+        :type entry: ~cloudguard.cache.CacheEntry
+
+
+        :return: ``None``
+
+        """
+        self._put(key, entry)
+        if self.store is not None:
+            self.store.set(key, entry)
+
+    def _put(self, key: str, entry: CacheEntry) -> None:
+        """Store an entry in memory only."""
+        if entry.size > self.max_size:
+            return
+
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = entry
+            self._size += entry.size
+            while len(self._entries) > self.max_entries or self._size > self.max_size:
+                self._pop(next(iter(self._entries)))
+
+    def clear(self) -> None:
+        """Remove every entry held in memory.
+
+
+        :return: ``None``
+
+        """
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+class _CacheTransportMixin(object):
+    """Behaviour shared by the synchronous and asynchronous cache transports."""
+
+    def __init__(
+        self,
+        transport: ty.Union[httpx.BaseTransport, httpx.AsyncBaseTransport],
+        cache: ResponseCache,
+        namespace: str = "",
+    ):
+        self.transport = transport
+        self.cache = cache
+        self.namespace = namespace
+
+    def _key(self, request: httpx.Request) -> ty.Optional[str]:
+        """Get the cache key of a request or ``None`` if it cannot be cached.
+
+        The key is made of the namespace, a hash of the credentials of the
+        request, so that they are neither disclosed on the disk nor used after
+        being rotated, and the URL.
+
+        """
+        if request.method != "GET" or request.extensions.get(STREAM_EXTENSION):
+            return None
+        if any(h in request.headers for h in CONDITIONAL_HEADERS):
+            return None
+        credentials = request.headers.get("Authorization", "").encode()
+        return (
+            f"{self.namespace} {hashlib.sha256(credentials).hexdigest()} {request.url}"
+        )
+
+    def _prepare(self, request: httpx.Request, entry: ty.Optional[CacheEntry]) -> None:
+        """Make the request conditional to the cached entry."""
+        if entry is None:
+            self.cache.stats.add(misses=1)
+            return
+        if (etag := entry.etag) is not None:
+            request.headers["If-None-Match"] = etag
+        if (last_modified := entry.last_modified) is not None:
+            request.headers["If-Modified-Since"] = last_modified
+
+    def _cacheable(self, response: httpx.Response) -> bool:
+        """Check whether a response can be stored in the cache."""
+        if response.status_code != 200:
+            return False
+        if "no-store" in response.headers.get("Cache-Control", ""):
+            return False
+        if not ("ETag" in response.headers or "Last-Modified" in response.headers):
+            return False
+        # Bodies of unknown size are not read in full.
+        try:
+            return int(response.headers["Content-Length"]) <= self.cache.max_size
+        except (KeyError, ValueError):
+            return False
+
+    def _from_entry(
+        self, request: httpx.Request, entry: CacheEntry, response: httpx.Response
+    ) -> httpx.Response:
+        """Build the response to a request from a cached entry."""
+        self.cache.stats.add(hits=1, bytes_saved=entry.size)
+        return httpx.Response(
+            entry.status_code,
+            headers=entry.headers,
+            content=entry.content,
+            request=request,
+            extensions=response.extensions,
+        )
+
+    def _store(
+        self,
+        key: str,
+        request: httpx.Request,
+        response: httpx.Response,
+        content: bytes,
+    ) -> httpx.Response:
+        """Store a response in the cache and rebuild it from its read body."""
+        entry = CacheEntry(
+            status_code=response.status_code,
+            headers=[
+                (k.decode("latin-1"), v.decode("latin-1"))
+                for k, v in response.headers.raw
+            ],
+            content=content,
+        )
+        self.cache.set(key, entry)
+        return httpx.Response(
+            response.status_code,
+            headers=response.headers,
+            content=content,
+            request=request,
+            extensions=response.extensions,
+        )
+
+
+class CacheTransport(_CacheTransportMixin, httpx.BaseTransport):
+    """Transport wrapper caching ``GET`` responses and revalidating them with
+    conditional requests. Requests made conditional by the caller are sent as
+    is.
+
+
+    :param transport: The transport actually sending the requests.
+    :type transport: ~httpx.BaseTransport
+
+    :param cache: The cache holding the responses.
+    :type cache: ~cloudguard.cache.ResponseCache
+
+    :param namespace: Prefix of the cache keys, isolating the entries of
+                      different regions. The entries of different credentials
+                      are isolated by the keys themselves.
+    :type namespace: str
+
+    """
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        """Send a request, answering it from the cache when possible."""
+        if (key := self._key(request)) is None:
+            return self.transport.handle_request(request)
+
+        entry = self.cache.get(key)
+        self._prepare(request, entry)
+        response = self.transport.handle_request(request)
+        if entry is not None and response.status_code == STATUS_NOT_MODIFIED:
+            response.close()
+            return self._from_entry(request, entry, response)
+        if not self._cacheable(response):
+            return response
+
+        try:
+            if isinstance(response.stream, httpx.ByteStream):
+                content = b"".join(response.stream)
+            else:
+                content = b"".join(response.iter_raw())
+        finally:
+            response.close()
+        return self._store(key, request, response, content)
+
+    def close(self) -> None:
+        """Close the underlying transport."""
+        self.transport.close()
+
+
+class AsyncCacheTransport(_CacheTransportMixin, httpx.AsyncBaseTransport):
+    """Asynchronous transport wrapper caching ``GET`` responses and revalidating
+    them with conditional requests. Requests made conditional by the caller are
+    sent as is.
+
+
+    :param transport: The transport actually sending the requests.
+    :type transport: ~httpx.AsyncBaseTransport
+
+    :param cache: The cache holding the responses.
+    :type cache: ~cloudguard.cache.ResponseCache
+
+    :param namespace: Prefix of the cache keys, isolating the entries of
+                      different regions. The entries of different credentials
+                      are isolated by the keys themselves.
+    :type namespace: str
+
+    """
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """Send a request, answering it from the cache when possible."""
+        if (key := self._key(request)) is None:
+            return await self.transport.handle_async_request(request)
+
+        entry = self.cache.get(key)
+        self._prepare(request, entry)
+        response = await self.transport.handle_async_request(request)
+        if entry is not None and response.status_code == STATUS_NOT_MODIFIED:
+            await response.aclose()
+            return self._from_entry(request, entry, response)
+        if not self._cacheable(response):
+            return response
+
+        try:
+            if isinstance(response.stream, httpx.ByteStream):
+                content = b"".join(response.stream)
+            else:
+                content = b"".join([part async for part in response.aiter_raw()])
+        finally:
+            await response.aclose()
+        return self._store(key, request, response, content)
+
+    async def aclose(self) -> None:
+        """Close the underlying transport."""
+        await self.transport.aclose()
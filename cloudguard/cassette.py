@@ -0,0 +1,581 @@
+# cloudguard/cassette.py
+# ======================
+#
+# Copying
+# -------
+#
+# Copyright (c) 2023 cloudguard authors and contributors.
+#
+# This file is part of the *cloudguard* project.
+#
+# *cloudguard* is a free software project. You can redistribute it and/or
+# modify it following the terms of the MIT License.
+#
+# This software project is distributed *as is*, WITHOUT WARRANTY OF ANY KIND;
+# including but not limited to the WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE and NONINFRINGEMENT.
+#
+# You should have received a copy of the MIT License along with *cloudguard*.
+# If not, see <http://opensource.org/licenses/MIT>.
+#
+import os
+import gzip
+import json
+import time
+import base64
+import typing as ty
+import asyncio
+import hashlib
+import logging
+import tempfile
+import threading
+import collections
+import dataclasses as dc
+
+from pathlib import Path
+
+import httpx
+
+from cloudguard.errors import CassetteMissError
+from cloudguard.credentials import APICredentials
+
+
+log = logging.getLogger(__name__)
+
+
+#: Version of the cassette file format.
+CASSETTE_VERSION: int = 1
+#: Compression level of the cassette files, trading a little size for speed.
+COMPRESS_LEVEL: int = 6
+#: Replacement of the secrets scrubbed from the recorded interactions.
+SCRUBBED: str = "<scrubbed>"
+#: Response headers describing the encoding of the body, dropped once it is
+#: decoded.
+ENCODING_HEADERS: ty.FrozenSet[str] = frozenset(
+    {"content-encoding", "content-length", "transfer-encoding"}
+)
+#: Response headers which are not recorded, as the recorded body is decoded or
+#: as they may hold secrets.
+SKIPPED_HEADERS: ty.FrozenSet[str] = ENCODING_HEADERS | {"set-cookie"}
+
+#: Latency of the replayed responses: ``"recorded"``, a fixed number of
+#: seconds, or a function of the interaction returning a number of seconds.
+Latency = ty.Union[str, float, ty.Callable[["Interaction"], float], None]
+
+
+@dc.dataclass(frozen=True)
+class Interaction(object):
+    """A recorded request and its response."""
+
+    #: Method of the request.
+    method: str
+    #: Path and query string of the request. The host is left out so that an
+    #: interaction can be replayed against any region.
+    url: str
+    #: Digest of the request body, empty when there is none.
+    body: str
+    #: Status code of the response.
+    status_code: int
+    #: Raw headers of the response.
+    headers: ty.List[ty.Tuple[str, str]]
+    #: Decoded body of the response.
+    content: bytes
+    #: Time, in seconds, the response took to arrive.
+    elapsed: float = 0.0
+
+    @property
+    def key(self) -> ty.Tuple[str, str, str]:
+        """Get the key matching the interaction to a request."""
+        return self.method, self.url, self.body
+
+    def to_dict(self) -> ty.Dict[str, ty.Any]:
+        """Convert the interaction to a JSON serialisable dictionary."""
+        data = dc.asdict(self)
+        try:
+            data["content"] = self.content.decode()
+        except UnicodeDecodeError:
+            data["content"] = base64.b64encode(self.content).decode("ascii")
+            data["base64"] = True
+        return data
+
+    @classmethod
+    def from_dict(cls, data: ty.Dict[str, ty.Any]) -> ty.Self:
+        """Build an interaction from a dictionary made by :meth:`to_dict`."""
+        data = dict(data)
+        if data.pop("base64", False):
+            data["content"] = base64.b64decode(data["content"])
+        else:
+            data["content"] = data["content"].encode()
+        data["headers"] = [tuple(h) for h in data["headers"]]
+        return cls(**data)
+
+
+def _secrets(
+    credentials: ty.Union[APICredentials, ty.Iterable[APICredentials], None],
+) -> ty.List[str]:
+    """Get the secrets of credentials, as they may appear in the requests and
+    their responses, the longest first as they may contain the shorter ones.
+
+    """
+    if isinstance(credentials, APICredentials):
+        credentials = [credentials]
+    secrets = set()
+    for c in credentials or ():
+        token = base64.b64encode(f"{c.key}:{c.secret}".encode()).decode("ascii")
+        secrets.update(s for s in (c.key, c.secret, token) if s)
+    return sorted(secrets, key=len, reverse=True)
+
+
+def _scrub(value: str, secrets: ty.Iterable[str]) -> str:
+    """Remove secrets from a string."""
+    for secret in secrets:
+        value = value.replace(secret, SCRUBBED)
+    return value
+
+
+def _request_key(
+    request: httpx.Request, secrets: ty.Iterable[str] = ()
+) -> ty.Tuple[str, str, str]:
+    """Get the key matching a request, whose body is read, to its recorded
+    interactions. The secrets are scrubbed from the URL, as they are when
+    recording.
+
+    """
+    content = request.content
+    body = hashlib.sha256(content).hexdigest() if content else ""
+    return request.method, _scrub(request.url.raw_path.decode("ascii"), secrets), body
+
+
+class Cassette(object):
+    """Recorded interactions with the CloudGuard API, stored in a compressed
+    JSON lines file.
+
+
+    :param interactions: The recorded interactions.
+    :type interactions: ~typing.Iterable[~cloudguard.cassette.Interaction]
+
+    """
+
+    def __init__(self, interactions: ty.Iterable[Interaction] = ()):
+        """Constructor for :class:`cloudguard.cassette.Cassette`."""
+        self.interactions: ty.List[Interaction] = list(interactions)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Get the number of recorded interactions."""
+        return len(self.interactions)
+
+    def add(self, interaction: Interaction) -> None:
+        """Record an interaction.
+
+
+        :param interaction: The interaction to record.
+        :type interaction: ~cloudguard.cassette.Interaction
+
+
+        :return: ``None``
+
+        """
+        with self._lock:
+            self.interactions.append(interaction)
+
+    @classmethod
+    def load(cls, path: os.PathLike) -> ty.Self:
+        """Load a cassette from a file.
+
+
+        :param path: Path to the cassette file.
+        :type path: ~os.PathLike
+
+
+        :return: The loaded cassette.
+        :rtype: ~cloudguard.cassette.Cassette
+
+
+        :raise ValueError: When the file is not a cassette of a supported
+                           version.
+
+        """
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            header = json.loads(f.readline() or "{}")
+            if header.get("version") != CASSETTE_VERSION:
+                raise ValueError(
+                    f"expected cassette version {CASSETTE_VERSION},"
+                    f" got: {header.get('version')}"
+                )
+            return cls(Interaction.from_dict(json.loads(line)) for line in f)
+
+    def save(self, path: os.PathLike) -> None:
+        """Save the cassette to a file, replacing it atomically.
+
+
+        :param path: Path to the cassette file.
+        :type path: ~os.PathLike
+
+
+        :return: ``None``
+
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            interactions = list(self.interactions)
+
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.open(
+                raw, "wt", encoding="utf-8"
+            ) as f:
+                f.write(json.dumps({"version": CASSETTE_VERSION}) + "\n")
+                for interaction in interactions:
+                    f.write(json.dumps(interaction.to_dict(), separators=(",", ":")))
+                    f.write("\n")
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+
+class _RecordTransportMixin(object):
+    """Behaviour shared by the synchronous and asynchronous recording
+    transports.
+
+    """
+
+    def __init__(
+        self,
+        transport: ty.Union[httpx.BaseTransport, httpx.AsyncBaseTransport],
+        path: ty.Optional[os.PathLike] = None,
+        credentials: ty.Union[APICredentials, ty.Iterable[APICredentials], None] = None,
+    ):
+        self.transport = transport
+        self.path = path
+        self.cassette = Cassette()
+        self._secrets = _secrets(credentials)
+
+    def _scrub(self, value: str) -> str:
+        """Remove the secrets from a string."""
+        return _scrub(value, self._secrets)
+
+    def _record(
+        self,
+        request: httpx.Request,
+        response: httpx.Response,
+        content: bytes,
+        elapsed: float,
+    ) -> httpx.Response:
+        """Record an interaction and rebuild the response from its read body."""
+        method, url, body = _request_key(request, self._secrets)
+        for secret in self._secrets:
+            content = content.replace(secret.encode(), SCRUBBED.encode())
+        self.cassette.add(
+            Interaction(
+                method=method,
+                url=url,
+                body=body,
+                status_code=response.status_code,
+                headers=[
+                    (k, self._scrub(v))
+                    for k, v in response.headers.multi_items()
+                    if k.lower() not in SKIPPED_HEADERS
+                ],
+                content=content,
+                elapsed=elapsed,
+            )
+        )
+        return httpx.Response(
+            response.status_code,
+            headers=[
+                (k, v)
+                for k, v in response.headers.multi_items()
+                if k.lower() not in ENCODING_HEADERS
+            ],
+            content=response.content,
+            request=request,
+            extensions=response.extensions,
+        )
+
+    def save(self) -> None:
+        """Save the recorded interactions to the cassette file, if any.
+
+
+        :return: ``None``
+
+        """
+        if self.path is None:
+            return
+        self.cassette.save(self.path)
+        log.debug(f"Saved {len(self.cassette)} interactions to {self.path}")
+
+
+class RecordTransport(_RecordTransportMixin, httpx.BaseTransport):
+    """Transport wrapper recording every request and its response into a
+    cassette file, saved when the transport is closed.
+
+    The recorded responses are decoded and the secrets of the given
+    credentials are scrubbed from them. Request headers, including the
+    ``Authorization`` header, are not recorded.
+
+
+    :param transport: The transport actually sending the requests.
+    :type transport: ~httpx.BaseTransport
+
+    :param path: Path to the cassette file. The interactions are only kept in
+                 :attr:`cassette` when ``None``.
+    :type path: ~os.PathLike
+
+    :param credentials: Credentials whose secrets are to be scrubbed.
+    :type credentials: ~typing.Union[~cloudguard.credentials.APICredentials, ~typing.Iterable[~cloudguard.credentials.APICredentials]]
+
+    """
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        """Send a request and record it with its response."""
+        # Read before sending, as a streamed body cannot be read afterwards.
+        request.read()
+        start = time.perf_counter()
+        response = self.transport.handle_request(request)
+        try:
+            response.read()
+        finally:
+            response.close()
+        return self._record(
+            request, response, response.content, time.perf_counter() - start
+        )
+
+    def close(self) -> None:
+        """Save the cassette and close the underlying transport."""
+        self.save()
+        self.transport.close()
+
+
+class AsyncRecordTransport(_RecordTransportMixin, httpx.AsyncBaseTransport):
+    """Asynchronous transport wrapper recording every request and its response
+    into a cassette file, saved when the transport is closed.
+
+    The recorded responses are decoded and the secrets of the given
+    credentials are scrubbed from them. Request headers, including the
+    ``Authorization`` header, are not recorded.
+
+
+    :param transport: The transport actually sending the requests.
+    :type transport: ~httpx.AsyncBaseTransport
+
+    :param path: Path to the cassette file. The interactions are only kept in
+                 :attr:`cassette` when ``None``.
+    :type path: ~os.PathLike
+
+    :param credentials: Credentials whose secrets are to be scrubbed.
+    :type credentials: ~typing.Union[~cloudguard.credentials.APICredentials, ~typing.Iterable[~cloudguard.credentials.APICredentials]]
+
+    """
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """Send a request and record it with its response."""
+        await request.aread()
+        start = time.perf_counter()
+        response = await self.transport.handle_async_request(request)
+        try:
+            await response.aread()
+        finally:
+            await response.aclose()
+        return self._record(
+            request, response, response.content, time.perf_counter() - start
+        )
+
+    async def aclose(self) -> None:
+        """Save the cassette and close the underlying transport."""
+        self.save()
+        await self.transport.aclose()
+
+
+class _ReplayTransportMixin(object):
+    """Behaviour shared by the synchronous and asynchronous replaying
+    transports.
+
+    """
+
+    def __init__(
+        self,
+        cassette: ty.Union[Cassette, os.PathLike],
+        latency: Latency = None,
+        max_concurrency: ty.Optional[int] = None,
+        repeat: bool = True,
+        credentials: ty.Union[APICredentials, ty.Iterable[APICredentials], None] = None,
+    ):
+        if not isinstance(cassette, Cassette):
+            cassette = Cassette.load(cassette)
+        if isinstance(latency, str) and latency != "recorded":
+            raise ValueError(f"expected 'recorded' latency, got: {latency}")
+        self.cassette = cassette
+        self.latency = latency
+        self.max_concurrency = max_concurrency
+        self.repeat = repeat
+        self._secrets = _secrets(credentials)
+
+        # Interactions matching each request, served in their recorded order.
+        self._lock = threading.Lock()
+        self._queues: ty.Dict[ty.Tuple, ty.Deque[Interaction]] = {}
+        for interaction in cassette.interactions:
+            self._queues.setdefault(interaction.key, collections.deque()).append(
+                interaction
+            )
+
+    def _next(self, request: httpx.Request) -> Interaction:
+        """Get the next interaction matching a request."""
+        key = _request_key(request, self._secrets)
+        with self._lock:
+            queue = self._queues.get(key)
+            if not queue:
+                raise CassetteMissError(method=request.method, url=request.url)
+            interaction = queue.popleft()
+            if self.repeat:
+                queue.append(interaction)
+        return interaction
+
+    def _delay(self, interaction: Interaction) -> float:
+        """Get the time, in seconds, to wait before serving an interaction."""
+        if self.latency is None:
+            return 0.0
+        if self.latency == "recorded":
+            return interaction.elapsed
+        if callable(self.latency):
+            return self.latency(interaction)
+        return self.latency
+
+    @staticmethod
+    def _response(request: httpx.Request, interaction: Interaction) -> httpx.Response:
+        """Build the response of an interaction."""
+        return httpx.Response(
+            interaction.status_code,
+            headers=interaction.headers,
+            content=interaction.content,
+            request=request,
+        )
+
+
+class ReplayTransport(_ReplayTransportMixin, httpx.BaseTransport):
+    """Transport answering requests with the responses of a cassette, without
+    any network access.
+
+    Requests are matched on their method, path, query string and body.
+    Responses recorded for the same request are served in order, then over
+    again when ``repeat`` is set.
+
+
+    :param cassette: The cassette or the path to its file.
+    :type cassette: ~typing.Union[~cloudguard.cassette.Cassette, ~os.PathLike]
+
+    :param latency: Latency of the responses: ``"recorded"``, a fixed number of
+                    seconds or a function of the interaction returning a number
+                    of seconds. Responses are served right away when ``None``.
+    :type latency: ~typing.Union[str, float, ~typing.Callable[[~cloudguard.cassette.Interaction], float]]
+
+    :param max_concurrency: Maximum number of requests served at once, further
+                            requests waiting for their turn. Not limited when
+                            ``None``.
+    :type max_concurrency: int
+
+    :param repeat: Whether to serve the recorded responses over again.
+    :type repeat: bool
+
+    :param credentials: Credentials whose secrets were scrubbed when recording,
+                        to be scrubbed from the requests before matching them.
+    :type credentials: ~typing.Union[~cloudguard.credentials.APICredentials, ~typing.Iterable[~cloudguard.credentials.APICredentials]]
+
+
+    :raise ~cloudguard.errors.CassetteMissError: When a request has no
+                                                 recorded response.
+
+    """
+
+    def __init__(
+        self,
+        cassette: ty.Union[Cassette, os.PathLike],
+        latency: Latency = None,
+        max_concurrency: ty.Optional[int] = None,
+        repeat: bool = True,
+        credentials: ty.Union[APICredentials, ty.Iterable[APICredentials], None] = None,
+    ):
+        """Constructor for :class:`cloudguard.cassette.ReplayTransport`."""
+        super().__init__(cassette, latency, max_concurrency, repeat, credentials)
+        self._semaphore = None
+        if max_concurrency is not None:
+            self._semaphore = threading.BoundedSemaphore(max_concurrency)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        """Answer a request with its recorded response."""
+        request.read()
+        interaction = self._next(request)
+        if self._semaphore is None:
+            if delay := self._delay(interaction):
+                time.sleep(delay)
+        else:
+            with self._semaphore:
+                if delay := self._delay(interaction):
+                    time.sleep(delay)
+        return self._response(request, interaction)
+
+
+class AsyncReplayTransport(_ReplayTransportMixin, httpx.AsyncBaseTransport):
+    """Asynchronous transport answering requests with the responses of a
+    cassette, without any network access.
+
+    Requests are matched on their method, path, query string and body.
+    Responses recorded for the same request are served in order, then over
+    again when ``repeat`` is set.
+
+
+    :param cassette: The cassette or the path to its file.
+    :type cassette: ~typing.Union[~cloudguard.cassette.Cassette, ~os.PathLike]
+
+    :param latency: Latency of the responses: ``"recorded"``, a fixed number of
+                    seconds or a function of the interaction returning a number
+                    of seconds. Responses are served right away when ``None``.
+    :type latency: ~typing.Union[str, float, ~typing.Callable[[~cloudguard.cassette.Interaction], float]]
+
+    :param max_concurrency: Maximum number of requests served at once, further
+                            requests waiting for their turn. Not limited when
+                            ``None``.
+    :type max_concurrency: int
+
+    :param repeat: Whether to serve the recorded responses over again.
+    :type repeat: bool
+
+    :param credentials: Credentials whose secrets were scrubbed when recording,
+                        to be scrubbed from the requests before matching them.
+    :type credentials: ~typing.Union[~cloudguard.credentials.APICredentials, ~typing.Iterable[~cloudguard.credentials.APICredentials]]
+
+
+    :raise ~cloudguard.errors.CassetteMissError: When a request has no
+                                                 recorded response.
+
+    """
+
+    def __init__(
+        self,
+        cassette: ty.Union[Cassette, os.PathLike],
+        latency: Latency = None,
+        max_concurrency: ty.Optional[int] = None,
+        repeat: bool = True,
+        credentials: ty.Union[APICredentials, ty.Iterable[APICredentials], None] = None,
+    ):
+        """Constructor for :class:`cloudguard.cassette.AsyncReplayTransport`."""
+        super().__init__(cassette, latency, max_concurrency, repeat, credentials)
+        # Created on first use, as it is bound to the running event loop.
+        self._semaphore: ty.Optional[asyncio.Semaphore] = None
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """Answer a request with its recorded response."""
+        await request.aread()
+        interaction = self._next(request)
+        if self.max_concurrency is None:
+            if delay := self._delay(interaction):
+                await asyncio.sleep(delay)
+        else:
+            if self._semaphore is None:
+                self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            async with self._semaphore:
+                if delay := self._delay(interaction):
+                    await asyncio.sleep(delay)
+        return self._response(request, interaction)
@@ -18,39 +18,688 @@
 # You should have received a copy of the MIT License along with *cloudguard*.
 # If not, see <http://opensource.org/licenses/MIT>.
 #
+import typing as ty
+import hashlib
+import functools
+
+from pathlib import Path
+
 import httpx
 
+import cloudguard.cache
+import cloudguard.hedge
+import cloudguard.retry
+import cloudguard.config
+import cloudguard.breaker
+import cloudguard.metrics
+import cloudguard.offload
+import cloudguard.coalesce
+import cloudguard.ratelimit
+import cloudguard.streaming
+import cloudguard.pagination
+import cloudguard.compression
+
+from cloudguard.auth import ProviderAuth, StaticProvider, CredentialProvider
+from cloudguard.cache import DiskStore, ResponseCache
+from cloudguard.hedge import HedgeStats, LatencyTracker
+from cloudguard.retry import RetryStats, RetryPolicy
 from cloudguard.config import Config
+from cloudguard.breaker import CircuitBreaker
+from cloudguard.metrics import Metrics
+from cloudguard.offload import Offloader
+from cloudguard.coalesce import CoalesceStats
+from cloudguard.compression import CompressionStats
+from cloudguard.credentials import APICredentials
 
 
-class APIClient(httpx.Client):
-    """HTTP client to communicate with the CloudGuard API.
+def _default(value: ty.Optional[ty.Any], default: ty.Any) -> ty.Any:
+    """Return ``value`` unless it is ``None``, in which case ``default`` is
+    returned.
+
+    """
+    return default if value is None else value
+
+
+def client_options(config: Config) -> ty.Dict[str, ty.Any]:
+    """Build the :mod:`httpx` client options matching a CloudGuard
+    configuration.
+
+
+    :param config: CloudGuard configuration.
+    :type config: ~cloudguard.config.Config
+
+
+    :return: The keyword arguments to provide to the :mod:`httpx` client.
+    :rtype: ~typing.Dict[str, ~typing.Any]
+
+    """
+    transport = config.transport
+    return {
+        "auth": ProviderAuth(StaticProvider(config.credentials.api)),
+        "base_url": config.region.api,
+        "headers": {
+            "Accept-Encoding": _default(
+                transport.accept_encoding, cloudguard.compression.ACCEPT_ENCODING
+            )
+        },
+        "http2": _default(transport.http2, False),
+        "limits": httpx.Limits(
+            max_connections=_default(
+                transport.max_connections,
+                cloudguard.config.DEFAULT_MAX_CONNECTIONS,
+            ),
+            max_keepalive_connections=_default(
+                transport.max_keepalive_connections,
+                cloudguard.config.DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+            ),
+            keepalive_expiry=_default(
+                transport.keepalive_expiry,
+                cloudguard.config.DEFAULT_KEEPALIVE_EXPIRY,
+            ),
+        ),
+        "timeout": httpx.Timeout(
+            connect=_default(
+                transport.connect_timeout, cloudguard.config.DEFAULT_TIMEOUT
+            ),
+            read=_default(transport.read_timeout, cloudguard.config.DEFAULT_TIMEOUT),
+            write=_default(transport.write_timeout, cloudguard.config.DEFAULT_TIMEOUT),
+            pool=_default(transport.pool_timeout, cloudguard.config.DEFAULT_TIMEOUT),
+        ),
+    }
+
+
+def retry_policy(config: Config) -> RetryPolicy:
+    """Build the retry policy matching a CloudGuard configuration.
+
+
+    :param config: CloudGuard configuration.
+    :type config: ~cloudguard.config.Config
+
+
+    :return: The retry policy to use by the clients.
+    :rtype: ~cloudguard.retry.RetryPolicy
+
+    """
+    return RetryPolicy(
+        max_retries=_default(
+            config.retry.max_retries, cloudguard.config.DEFAULT_MAX_RETRIES
+        ),
+        backoff_factor=_default(
+            config.retry.backoff_factor, cloudguard.config.DEFAULT_BACKOFF_FACTOR
+        ),
+        backoff_max=_default(
+            config.retry.backoff_max, cloudguard.config.DEFAULT_BACKOFF_MAX
+        ),
+    )
+
+
+def rate_limit_bucket(config: Config) -> cloudguard.ratelimit.TokenBucket:
+    """Get the token bucket matching a CloudGuard configuration. It is shared by
+    every client of the process, or of every process when shared, using the
+    same API key and region.
+
+
+    :param config: CloudGuard configuration.
+    :type config: ~cloudguard.config.Config
+
+
+    :return: The token bucket limiting the rate of requests.
+    :rtype: ~cloudguard.ratelimit.TokenBucket
+
+    """
+    retry = config.retry
+    api = getattr(config.credentials, "api", None)
+    key = f"{config.region.code}:{'' if api is None else api.key}"
+    backend = None
+    if retry.rate_shared:
+        # The API key is not to be disclosed by the name of the file.
+        path = Path(_default(retry.rate_path, cloudguard.config.CLOUDGUARD_RATE_PATH))
+        backend = functools.partial(
+            cloudguard.ratelimit.FileBackend,
+            path / hashlib.sha256(key.encode()).hexdigest(),
+        )
+
+    return cloudguard.ratelimit.get_bucket(
+        key, retry.rate_limit, retry.rate_burst, backend=backend
+    )
+
+
+def circuit_breaker(config: Config) -> ty.Optional[CircuitBreaker]:
+    """Get the circuit breaker matching a CloudGuard configuration. It is
+    shared by every client of the process targeting the same region.
+
+
+    :param config: CloudGuard configuration.
+    :type config: ~cloudguard.config.Config
+
+
+    :return: The circuit breaker of the region or ``None`` when disabled.
+    :rtype: ~cloudguard.breaker.CircuitBreaker
+
+    """
+    retry = config.retry
+    if retry.circuit_threshold is None:
+        return None
+
+    return cloudguard.breaker.get_breaker(
+        config.region.code,
+        retry.circuit_threshold,
+        _default(retry.circuit_reset, cloudguard.breaker.DEFAULT_RESET_TIMEOUT),
+    )
+
+
+def response_cache(config: Config) -> ty.Optional[ResponseCache]:
+    """Build the response cache matching a CloudGuard configuration.
+
+
+    :param config: CloudGuard configuration.
+    :type config: ~cloudguard.config.Config
+
+
+    :return: The response cache to use by the clients or ``None`` when caching
+             is disabled.
+    :rtype: ~cloudguard.cache.ResponseCache
+
+    """
+    cache = config.cache
+    if not cache.enabled:
+        return None
+
+    max_size = _default(cache.max_size, cloudguard.config.DEFAULT_CACHE_MAX_SIZE)
+    store = None
+    if cache.persist:
+        store = DiskStore(
+            _default(cache.path, cloudguard.config.CLOUDGUARD_CACHE_PATH),
+            max_size=max_size,
+        )
+
+    return ResponseCache(
+        max_entries=_default(
+            cache.max_entries, cloudguard.config.DEFAULT_CACHE_MAX_ENTRIES
+        ),
+        max_size=max_size,
+        ttl=cache.ttl,
+        store=store,
+    )
+
+
+class BaseAPIClient(object):
+    """Behaviour shared by the synchronous and asynchronous CloudGuard API
+    clients. Any extra keyword argument is provided to the :mod:`httpx` client
+    and takes precedence over the configuration.
+
+    A custom ``transport`` is wrapped by the retry and throttling layer, and by
+    the response cache when enabled, the same way the default one is.
+
+    Identical ``GET`` requests made concurrently, e.g. by several tasks sharing
+    the client, are sent only once when coalescing is enabled by the
+    configuration.
+
+    Slow ``GET`` requests are sent a second time, keeping whichever attempt
+    answers first, when hedging is enabled by the configuration. Requests to a
+    region failing repeatedly are rejected right away with
+    :class:`~cloudguard.breaker.CircuitOpenError` for a while when a circuit
+    threshold is configured.
+
+    Responses are compressed with the best content coding available and
+    decoded as they are received. Large request bodies are compressed when
+    enabled by the configuration.
+
+    Requests are measured when a ``metrics`` collector is provided, or when the
+    instrumentation is enabled by the configuration. Nothing is measured
+    otherwise and the instrumentation layer is left out altogether.
+
+    Each request is authenticated with the current credentials of the
+    ``credentials_provider``, which defaults to the credentials of the
+    configuration. Credentials can be rotated on a live client, keeping its
+    connections open and without disrupting the requests in flight.
 
 
     :param config: CloudGuard configuration.
     :type config: ~cloudguard.config.Config
 
+    :param metrics: Collector of the request measurements, which may be shared
+                    between clients.
+    :type metrics: ~cloudguard.metrics.Metrics
+
+    :param credentials_provider: Provider of the credentials, which may be
+                                 shared between clients.
+    :type credentials_provider: ~cloudguard.auth.CredentialProvider
+
     """
 
-    def __init__(self, config: Config):
-        """Constructor for :class:`cloudguard.client.Client`."""
-        super().__init__(
-            auth=httpx.BasicAuth(
-                config.credentials.api.key, config.credentials.api.secret
+    #: Class of the transport sending the requests.
+    transport_class: ty.ClassVar[type]
+    #: Class of the transport wrapper retrying and throttling requests.
+    retry_transport_class: ty.ClassVar[type]
+    #: Class of the transport wrapper hedging slow requests.
+    hedge_transport_class: ty.ClassVar[type]
+    #: Class of the transport wrapper failing fast while a region is failing.
+    breaker_transport_class: ty.ClassVar[type]
+    #: Class of the transport wrapper caching responses.
+    cache_transport_class: ty.ClassVar[type]
+    #: Class of the transport wrapper measuring requests.
+    metrics_transport_class: ty.ClassVar[type]
+    #: Class of the transport wrapper compressing requests and decoding
+    #: responses.
+    compression_transport_class: ty.ClassVar[type]
+    #: Class of the transport wrapper coalescing identical requests.
+    coalesce_transport_class: ty.ClassVar[type]
+
+    def __init__(
+        self,
+        config: Config,
+        metrics: ty.Optional[Metrics] = None,
+        credentials_provider: ty.Optional[CredentialProvider] = None,
+        **kwargs,
+    ):
+        """Constructor for :class:`cloudguard.client.BaseAPIClient`."""
+        options = client_options(config)
+        if credentials_provider is not None:
+            options["auth"] = ProviderAuth(credentials_provider)
+        options.update(kwargs)
+
+        transport = options.pop("transport", None) or self.transport_class(
+            http2=options["http2"], limits=options["limits"]
+        )
+
+        #: Collector of the request measurements, ``None`` when disabled.
+        self.metrics = metrics
+        if self.metrics is None and config.metrics.enabled:
+            self.metrics = Metrics()
+        if self.metrics is not None:
+            transport = self.metrics_transport_class(
+                transport, self.metrics, region=config.region.code
+            )
+
+        self._retry_transport = self.retry_transport_class(
+            transport,
+            policy=retry_policy(config),
+            bucket=rate_limit_bucket(config),
+        )
+        transport = self._retry_transport
+
+        self._hedge_transport = None
+        if config.transport.hedge:
+            tracker = LatencyTracker(
+                _default(
+                    config.transport.hedge_percentile,
+                    cloudguard.hedge.DEFAULT_PERCENTILE,
+                )
+            )
+            transport = self._hedge_transport = self.hedge_transport_class(
+                transport, tracker
+            )
+
+        #: Circuit breaker of the region, ``None`` when disabled.
+        self.circuit_breaker = circuit_breaker(config)
+        if self.circuit_breaker is not None:
+            transport = self.breaker_transport_class(transport, self.circuit_breaker)
+
+        #: Cache of the responses, ``None`` when caching is disabled.
+        self.cache = response_cache(config)
+        if self.cache is not None:
+            transport = self.cache_transport_class(
+                transport,
+                self.cache,
+                namespace=config.region.code,
+            )
+
+        # Above the cache, so that identical requests share the raw bodies.
+        self._coalesce_transport = None
+        if config.transport.coalesce:
+            transport = self._coalesce_transport = self.coalesce_transport_class(
+                transport
+            )
+
+        # Above the cache and the coalescing layer, so that cached and shared
+        # responses are kept compressed, and above the retry layer, so that
+        # request bodies are compressed once.
+        transport = self._compression_transport = self.compression_transport_class(
+            transport,
+            compress_requests=_default(config.transport.compress_requests, False),
+            min_size=_default(
+                config.transport.compress_min_size,
+                cloudguard.compression.DEFAULT_MIN_SIZE,
             ),
-            base_url=config.region.api,
         )
 
+        super().__init__(transport=transport, **options)
+
         self.config = config
 
+    @property
+    def credentials_provider(self) -> ty.Optional[CredentialProvider]:
+        """Get the provider of the credentials.
+
+
+        :return: The provider of the credentials or ``None`` when the client
+                 was given another authentication.
+        :rtype: ~cloudguard.auth.CredentialProvider
+
+        """
+        auth = self.auth
+        return auth.provider if isinstance(auth, ProviderAuth) else None
+
+    @credentials_provider.setter
+    def credentials_provider(self, provider: CredentialProvider) -> None:
+        """Replace the provider of the credentials. Requests in flight complete
+        with the previous credentials.
 
-class AsyncAPIClient(APIClient, httpx.AsyncClient):
+
+        :param provider: The new provider of the credentials.
+        :type provider: ~cloudguard.auth.CredentialProvider
+
+        """
+        self.auth = ProviderAuth(provider)
+
+    def rotate_credentials(self, credentials: APICredentials) -> None:
+        """Authenticate the next requests with new credentials, keeping the
+        connections open.
+
+
+        :param credentials: The new credentials.
+        :type credentials: ~cloudguard.credentials.APICredentials
+
+
+        :return: ``None``
+
+        """
+        provider = self.credentials_provider
+        if isinstance(provider, StaticProvider):
+            provider.set(credentials)
+        else:
+            self.credentials_provider = StaticProvider(credentials)
+
+    @property
+    def retry_stats(self) -> RetryStats:
+        """Get the counters of the retry and throttling layer.
+
+
+        :return: The retry counters.
+        :rtype: ~cloudguard.retry.RetryStats
+
+        """
+        return self._retry_transport.stats
+
+    @property
+    def hedge_stats(self) -> ty.Optional[HedgeStats]:
+        """Get the counters of the hedging layer.
+
+
+        :return: The hedging counters or ``None`` when hedging is disabled.
+        :rtype: ~cloudguard.hedge.HedgeStats
+
+        """
+        if self._hedge_transport is None:
+            return None
+        return self._hedge_transport.stats
+
+    @property
+    def compression_stats(self) -> CompressionStats:
+        """Get the counters of the compression layer.
+
+
+        :return: The compression counters, including the compression ratios
+                 and the time spent compressing and decoding.
+        :rtype: ~cloudguard.compression.CompressionStats
+
+        """
+        return self._compression_transport.stats
+
+    @property
+    def coalesce_stats(self) -> ty.Optional[CoalesceStats]:
+        """Get the counters of the coalescing layer.
+
+
+        :return: The coalescing counters or ``None`` when coalescing is
+                 disabled.
+        :rtype: ~cloudguard.coalesce.CoalesceStats
+
+        """
+        if self._coalesce_transport is None:
+            return None
+        return self._coalesce_transport.stats
+
+
+class APIClient(BaseAPIClient, httpx.Client):
+    """HTTP client to communicate with the CloudGuard API.
+
+
+    :param config: CloudGuard configuration.
+    :type config: ~cloudguard.config.Config
+
+    """
+
+    transport_class = httpx.HTTPTransport
+    retry_transport_class = cloudguard.retry.RetryTransport
+    hedge_transport_class = cloudguard.hedge.HedgeTransport
+    breaker_transport_class = cloudguard.breaker.BreakerTransport
+    cache_transport_class = cloudguard.cache.CacheTransport
+    metrics_transport_class = cloudguard.metrics.MetricsTransport
+    compression_transport_class = cloudguard.compression.CompressionTransport
+    coalesce_transport_class = cloudguard.coalesce.CoalesceTransport
+
+    def paginate(
+        self,
+        method: str,
+        url: ty.Union[httpx.URL, str],
+        paginator: cloudguard.pagination.Paginator,
+        **kwargs,
+    ) -> ty.Iterator[ty.Any]:
+        """Lazily iterate over the records of a paginated endpoint. Only one
+        page is held in memory at a time. Any extra keyword argument is
+        provided to :meth:`~httpx.Client.request`.
+
+
+        :param method: HTTP method of the request.
+        :type method: str
+
+        :param url: URL of the paginated endpoint.
+        :type url: ~typing.Union[~httpx.URL, str]
+
+        :param paginator: Description of the endpoint's pagination.
+        :type paginator: ~cloudguard.pagination.Paginator
+
+
+        :return: An iterator over the records.
+        :rtype: ~typing.Iterator[~typing.Any]
+
+
+        :raise ~httpx.HTTPStatusError: When a page could not be fetched.
+
+        """
+        for records in cloudguard.pagination.iter_pages(
+            self, method, url, paginator, **kwargs
+        ):
+            yield from records
+
+    def stream_items(
+        self,
+        method: str,
+        url: ty.Union[httpx.URL, str],
+        items_key: ty.Optional[str] = None,
+        **kwargs,
+    ) -> ty.Iterator[ty.Any]:
+        """Iterate over the items of a JSON array response as they are
+        received, without holding the whole body in memory. Any extra keyword
+        argument is provided to :meth:`~httpx.Client.stream`.
+
+
+        :param method: HTTP method of the request.
+        :type method: str
+
+        :param url: URL of the request.
+        :type url: ~typing.Union[~httpx.URL, str]
+
+        :param items_key: Key of the response holding the items. The response
+                          is expected to be the list of items when ``None``.
+        :type items_key: str
+
+
+        :return: An iterator over the items.
+        :rtype: ~typing.Iterator[~typing.Any]
+
+
+        :raise ~httpx.HTTPStatusError: When the request failed.
+
+        :raise ~json.JSONDecodeError: When the response is not of the expected
+                                      shape.
+
+        """
+        with self.stream(
+            method, url, **cloudguard.streaming.streamed(kwargs)
+        ) as response:
+            response.raise_for_status()
+            yield from cloudguard.streaming.iter_items(response, items_key)
+
+
+class AsyncAPIClient(BaseAPIClient, httpx.AsyncClient):
     """Asynchronous HTTP client to communicate with the CloudGuard API.
 
+    Large response bodies read with :meth:`~cloudguard.client.AsyncAPIClient.ajson`
+    are decoded by the workers of the ``offloader``, when provided, rather
+    than in the event loop.
+
 
     :param config: CloudGuard configuration.
     :type config: ~cloudguard.config.Config
 
+    :param offloader: Pool of workers decoding the response bodies, which may
+                      be shared between clients.
+    :type offloader: ~cloudguard.offload.Offloader
+
     """
 
-    pass
+    transport_class = httpx.AsyncHTTPTransport
+    retry_transport_class = cloudguard.retry.AsyncRetryTransport
+    hedge_transport_class = cloudguard.hedge.AsyncHedgeTransport
+    breaker_transport_class = cloudguard.breaker.AsyncBreakerTransport
+    cache_transport_class = cloudguard.cache.AsyncCacheTransport
+    metrics_transport_class = cloudguard.metrics.AsyncMetricsTransport
+    compression_transport_class = cloudguard.compression.AsyncCompressionTransport
+    coalesce_transport_class = cloudguard.coalesce.AsyncCoalesceTransport
+
+    def __init__(
+        self, config: Config, offloader: ty.Optional[Offloader] = None, **kwargs
+    ):
+        """Constructor for :class:`cloudguard.client.AsyncAPIClient`."""
+        super().__init__(config, **kwargs)
+        #: Pool of workers decoding the response bodies, ``None`` when disabled.
+        self.offloader = offloader
+
+    async def ajson(
+        self,
+        method: str,
+        url: ty.Union[httpx.URL, str],
+        transform: ty.Optional[cloudguard.offload.Transform] = None,
+        **kwargs,
+    ) -> ty.Any:
+        """Send a request, then decode its JSON response and apply a transform
+        to it, in the workers of the offloader when provided. Any extra keyword
+        argument is provided to :meth:`~httpx.AsyncClient.request`.
+
+
+        :param method: HTTP method of the request.
+        :type method: str
+
+        :param url: URL of the request.
+        :type url: ~typing.Union[~httpx.URL, str]
+
+        :param transform: Function applied to the decoded response, which must
+                          be picklable when offloaded to worker processes.
+        :type transform: ~typing.Callable[[~typing.Any], ~typing.Any]
+
+
+        :return: The decoded and transformed response.
+        :rtype: ~typing.Any
+
+
+        :raise ~httpx.HTTPStatusError: When the request failed.
+
+        """
+        response = await self.request(method, url, **kwargs)
+        response.raise_for_status()
+        if self.offloader is None:
+            payload = response.json()
+            return payload if transform is None else transform(payload)
+        return await self.offloader.json(response, transform)
+
+    async def apaginate(
+        self,
+        method: str,
+        url: ty.Union[httpx.URL, str],
+        paginator: cloudguard.pagination.Paginator,
+        **kwargs,
+    ) -> ty.AsyncIterator[ty.Any]:
+        """Lazily iterate over the records of a paginated endpoint. The next
+        page is fetched while the records of the current one are consumed. Any
+        extra keyword argument is provided to :meth:`~httpx.AsyncClient.request`.
+
+
+        :param method: HTTP method of the request.
+        :type method: str
+
+        :param url: URL of the paginated endpoint.
+        :type url: ~typing.Union[~httpx.URL, str]
+
+        :param paginator: Description of the endpoint's pagination.
+        :type paginator: ~cloudguard.pagination.Paginator
+
+
+        :return: An asynchronous iterator over the records.
+        :rtype: ~typing.AsyncIterator[~typing.Any]
+
+
+        :raise ~httpx.HTTPStatusError: When a page could not be fetched.
+
+        """
+        pages = cloudguard.pagination.aiter_pages(
+            self, method, url, paginator, **kwargs
+        )
+        try:
+            async for records in pages:
+                for record in records:
+                    yield record
+        finally:
+            await pages.aclose()
+
+    async def astream_items(
+        self,
+        method: str,
+        url: ty.Union[httpx.URL, str],
+        items_key: ty.Optional[str] = None,
+        **kwargs,
+    ) -> ty.AsyncIterator[ty.Any]:
+        """Iterate over the items of a JSON array response as they are
+        received, without holding the whole body in memory. Any extra keyword
+        argument is provided to :meth:`~httpx.AsyncClient.stream`.
+
+
+        :param method: HTTP method of the request.
+        :type method: str
+
+        :param url: URL of the request.
+        :type url: ~typing.Union[~httpx.URL, str]
+
+        :param items_key: Key of the response holding the items. The response
+                          is expected to be the list of items when ``None``.
+        :type items_key: str
+
+
+        :return: An asynchronous iterator over the items.
+        :rtype: ~typing.AsyncIterator[~typing.Any]
+
+
+        :raise ~httpx.HTTPStatusError: When the request failed.
+
+        :raise ~json.JSONDecodeError: When the response is not of the expected
+                                      shape.
+
+        """
+        async with self.stream(
+            method, url, **cloudguard.streaming.streamed(kwargs)
+        ) as response:
+            response.raise_for_status()
+            async for item in cloudguard.streaming.aiter_items(response, items_key):
+                yield item
@@ -0,0 +1,319 @@
+# cloudguard/coalesce.py
+# ======================
+#
+# Copying
+# -------
+#
+# Copyright (c) 2023 cloudguard authors and contributors.
+#
+# This file is part of the *cloudguard* project.
+#
+# *cloudguard* is a free software project. You can redistribute it and/or
+# modify it following the terms of the MIT License.
+#
+# This software project is distributed *as is*, WITHOUT WARRANTY OF ANY KIND;
+# including but not limited to the WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE and NONINFRINGEMENT.
+#
+# You should have received a copy of the MIT License along with *cloudguard*.
+# If not, see <http://opensource.org/licenses/MIT>.
+#
+import typing as ty
+import asyncio
+import logging
+import threading
+import dataclasses as dc
+
+import httpx
+
+from cloudguard.cache import CONDITIONAL_HEADERS
+from cloudguard.streaming import STREAM_EXTENSION
+
+
+log = logging.getLogger(__name__)
+
+
+#: Default maximum size, in bytes, of the response bodies read in full to be
+#: shared between identical requests.
+DEFAULT_MAX_SIZE: int = 4 * 1024 * 1024
+
+#: Request headers selecting the representation of the response, which must
+#: match for requests to be coalesced.
+VARY_HEADERS: ty.Tuple[str, ...] = ("Accept", "Accept-Encoding")
+
+#: Type definition of a request key: its method, URL, credentials and the
+#: values of :data:`VARY_HEADERS`.
+Key = ty.Tuple[ty.Optional[str], ...]
+
+
+@dc.dataclass(frozen=True)
+class SharedResponse(object):
+    """A response read in full, from which the response of each coalesced
+    request is rebuilt.
+
+    """
+
+    #: Status code of the response.
+    status_code: int
+    #: Headers of the response.
+    headers: httpx.Headers
+    #: Raw body of the response, as received on the wire.
+    content: bytes
+    #: Extensions of the response.
+    extensions: ty.Dict[str, ty.Any]
+
+
+@dc.dataclass
+class CoalesceStats(object):
+    """Counters describing the work done by the coalescing layer."""
+
+    #: Number of requests actually sent.
+    requests: int = 0
+    #: Number of requests answered by a request already in flight.
+    coalesced: int = 0
+    #: Lock protecting the counters when shared between threads.
+    _lock: threading.Lock = dc.field(
+        default_factory=threading.Lock, repr=False, compare=False
+    )
+
+    def add(self, **kwargs: int) -> None:
+        """Increment the given counters.
+
+
+        :return: ``None``
+
+        """
+        with self._lock:
+            for k, v in kwargs.items():
+                setattr(self, k, getattr(self, k) + v)
+
+
+class _Call(object):
+    """A request in flight, awaited by the threads sending the same request."""
+
+    __slots__ = ("done", "result", "error", "shared")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: ty.Optional[SharedResponse] = None
+        self.error: ty.Optional[Exception] = None
+        # Whether the response can be shared with the awaiting threads.
+        self.shared = True
+
+
+class _CoalesceTransportMixin(object):
+    """Behaviour shared by the synchronous and asynchronous coalescing
+    transports.
+
+    """
+
+    def __init__(
+        self,
+        transport: ty.Union[httpx.BaseTransport, httpx.AsyncBaseTransport],
+        max_size: int = DEFAULT_MAX_SIZE,
+    ):
+        self.transport = transport
+        self.max_size = max_size
+        self.stats = CoalesceStats()
+
+    def _key(self, request: httpx.Request) -> ty.Optional[Key]:
+        """Get the key identifying identical requests or ``None`` if the
+        request cannot be coalesced.
+
+        """
+        if request.method != "GET" or request.extensions.get(STREAM_EXTENSION):
+            return None
+        # The caller expects the answer to its own conditions.
+        if any(h in request.headers for h in CONDITIONAL_HEADERS):
+            return None
+        return (
+            request.method,
+            str(request.url),
+            request.headers.get("Authorization"),
+            *(request.headers.get(h) for h in VARY_HEADERS),
+        )
+
+    def _shareable(self, response: httpx.Response) -> bool:
+        """Check whether a response is small enough to be read in full and
+        shared. Bodies of unknown size are not.
+
+        """
+        try:
+            return int(response.headers["Content-Length"]) <= self.max_size
+        except (KeyError, ValueError):
+            return False
+
+    def _response(
+        self, request: httpx.Request, shared: SharedResponse
+    ) -> httpx.Response:
+        """Build the response to a request from a shared response."""
+        return httpx.Response(
+            shared.status_code,
+            headers=shared.headers,
+            stream=httpx.ByteStream(shared.content),
+            request=request,
+            extensions=shared.extensions,
+        )
+
+
+class CoalesceTransport(_CoalesceTransportMixin, httpx.BaseTransport):
+    """Transport wrapper sending identical ``GET`` requests made concurrently
+    from several threads only once. Requests are identical when they share
+    their URL, credentials and :data:`VARY_HEADERS`; conditional requests are
+    never coalesced. The response is read in full and each request gets its
+    own copy of it, unless it is larger than ``max_size`` bytes or of unknown
+    size: the other requests are then sent on their own. Requests marked with
+    :data:`~cloudguard.streaming.STREAM_EXTENSION` are never coalesced.
+
+
+    :param transport: The transport actually sending the requests.
+    :type transport: ~httpx.BaseTransport
+
+    :param max_size: Maximum size, in bytes, of the shared response bodies.
+    :type max_size: int
+
+    """
+
+    def __init__(
+        self, transport: httpx.BaseTransport, max_size: int = DEFAULT_MAX_SIZE
+    ):
+        """Constructor for :class:`cloudguard.coalesce.CoalesceTransport`."""
+        super().__init__(transport, max_size)
+        self._calls: ty.Dict[Key, _Call] = {}
+        self._lock = threading.Lock()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        """Send a request, or wait for an identical one already in flight."""
+        if (key := self._key(request)) is None:
+            return self.transport.handle_request(request)
+
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                if call is None:
+                    call = self._calls[key] = _Call()
+                    break
+
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            if not call.shared:
+                # The response cannot be shared, send the request alone.
+                self.stats.add(requests=1)
+                return self.transport.handle_request(request)
+            if call.result is not None:
+                self.stats.add(coalesced=1)
+                return self._response(request, call.result)
+            # The request in flight was interrupted, send it again.
+
+        self.stats.add(requests=1)
+        try:
+            response = self.transport.handle_request(request)
+            call.shared = self._shareable(response)
+            if not call.shared:
+                return response
+            try:
+                content = b"".join(response.stream)
+            finally:
+                response.close()
+            call.result = SharedResponse(
+                response.status_code, response.headers, content, response.extensions
+            )
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return self._response(request, call.result)
+
+    def close(self) -> None:
+        """Close the underlying transport."""
+        self.transport.close()
+
+
+class AsyncCoalesceTransport(_CoalesceTransportMixin, httpx.AsyncBaseTransport):
+    """Asynchronous transport wrapper sending identical ``GET`` requests made
+    concurrently from several tasks only once. Requests are identical when they
+    share their URL, credentials and :data:`VARY_HEADERS`; conditional
+    requests are never coalesced. The response is read in full and each
+    request gets its own copy of it, unless it is larger than ``max_size``
+    bytes or of unknown size: the other requests are then sent on their own.
+    Requests marked with :data:`~cloudguard.streaming.STREAM_EXTENSION` are
+    never coalesced.
+
+
+    :param transport: The transport actually sending the requests.
+    :type transport: ~httpx.AsyncBaseTransport
+
+    :param max_size: Maximum size, in bytes, of the shared response bodies.
+    :type max_size: int
+
+    """
+
+    def __init__(
+        self, transport: httpx.AsyncBaseTransport, max_size: int = DEFAULT_MAX_SIZE
+    ):
+        """Constructor for :class:`cloudguard.coalesce.AsyncCoalesceTransport`."""
+        super().__init__(transport, max_size)
+        self._calls: ty.Dict[Key, asyncio.Future] = {}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """Send a request, or wait for an identical one already in flight."""
+        if (key := self._key(request)) is None:
+            return await self.transport.handle_async_request(request)
+
+        while (future := self._calls.get(key)) is not None:
+            try:
+                shared = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The request in flight was cancelled, send it again.
+            else:
+                if shared is None:
+                    # The response cannot be shared, send the request alone.
+                    self.stats.add(requests=1)
+                    return await self.transport.handle_async_request(request)
+                self.stats.add(coalesced=1)
+                return self._response(request, shared)
+
+        future = self._calls[key] = asyncio.get_running_loop().create_future()
+        self.stats.add(requests=1)
+        try:
+            response = await self.transport.handle_async_request(request)
+            if self._shareable(response):
+                try:
+                    content = b"".join([part async for part in response.stream])
+                finally:
+                    await response.aclose()
+                shared = SharedResponse(
+                    response.status_code,
+                    response.headers,
+                    content,
+                    response.extensions,
+                )
+            else:
+                shared = None
+        except Exception as e:
+            future.set_exception(e)
+            # Do not warn about the error when no other task awaited it.
+            future.exception()
+            raise
+        except BaseException:
+            future.cancel()
+            raise
+        else:
+            future.set_result(shared)
+        finally:
+            del self._calls[key]
+
+        if shared is None:
+            return response
+        return self._response(request, shared)
+
+    async def aclose(self) -> None:
+        """Close the underlying transport."""
+        await self.transport.aclose()
@@ -0,0 +1,471 @@
+# cloudguard/compression.py
+# =========================
+#
+# Copying
+# -------
+#
+# Copyright (c) 2023 cloudguard authors and contributors.
+#
+# This file is part of the *cloudguard* project.
+#
+# *cloudguard* is a free software project. You can redistribute it and/or
+# modify it following the terms of the MIT License.
+#
+# This software project is distributed *as is*, WITHOUT WARRANTY OF ANY KIND;
+# including but not limited to the WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE and NONINFRINGEMENT.
+#
+# You should have received a copy of the MIT License along with *cloudguard*.
+# If not, see <http://opensource.org/licenses/MIT>.
+#
+import gzip
+import time
+import zlib
+import typing as ty
+import logging
+import threading
+import dataclasses as dc
+
+import httpx
+
+
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    from compression import zstd
+except ImportError:
+    try:
+        from backports import zstd
+    except ImportError:
+        zstd = None
+
+
+log = logging.getLogger(__name__)
+
+
+#: Default minimum size, in bytes, of the request bodies to compress.
+DEFAULT_MIN_SIZE: int = 4096
+#: Compression level of the request bodies, trading a little ratio for speed.
+COMPRESS_LEVEL: int = 6
+#: Methods whose request bodies may be compressed.
+COMPRESSED_METHODS: ty.FrozenSet[str] = frozenset({"POST", "PUT", "PATCH"})
+
+
+class _Decoder(ty.Protocol):
+    """Incremental decompressor of a content coding."""
+
+    def decompress(self, data: bytes) -> bytes:
+        ...
+
+    def flush(self) -> bytes:
+        ...
+
+
+class _ZlibDecoder(object):
+    """Decompress ``gzip`` and ``deflate`` contents. Some servers send
+    ``deflate`` contents without the zlib header.
+
+    """
+
+    def __init__(self):
+        # Detect the gzip or zlib header of the content.
+        self._obj = zlib.decompressobj(zlib.MAX_WBITS | 32)
+        # Start of the content, until the header is checked.
+        self._head: ty.Optional[bytes] = b""
+
+    def decompress(self, data: bytes) -> bytes:
+        if self._head is None:
+            return self._obj.decompress(data)
+
+        self._head += data
+        try:
+            output = self._obj.decompress(data)
+        except zlib.error:
+            # Neither a gzip nor a zlib header: a raw deflate content.
+            self._obj = zlib.decompressobj(-zlib.MAX_WBITS)
+            output = self._obj.decompress(self._head)
+        if len(self._head) >= 2:
+            self._head = None
+        return output
+
+    def flush(self) -> bytes:
+        return self._obj.flush()
+
+
+class _BrotliDecoder(object):
+    """Decompress ``br`` contents."""
+
+    def __init__(self):
+        obj = brotli.Decompressor()
+        # The brotli and brotlicffi packages name the method differently.
+        self._process = getattr(obj, "process", None) or obj.decompress
+
+    def decompress(self, data: bytes) -> bytes:
+        return self._process(data)
+
+    def flush(self) -> bytes:
+        return b""
+
+
+class _ZstdDecoder(object):
+    """Decompress ``zstd`` contents, which may span several frames, with the
+    ``zstandard`` package or else the standard library's ``compression.zstd``
+    module (or its ``backports.zstd`` backport).
+
+    """
+
+    def __init__(self):
+        self._obj = self._frame()
+
+    @staticmethod
+    def _frame() -> ty.Any:
+        """Create the decompressor of a frame."""
+        if zstandard is not None:
+            return zstandard.ZstdDecompressor().decompressobj()
+        return zstd.ZstdDecompressor()
+
+    def decompress(self, data: bytes) -> bytes:
+        if self._obj.eof:
+            self._obj = self._frame()
+        output = [self._obj.decompress(data)]
+        while self._obj.eof and (unused := self._obj.unused_data):
+            self._obj = self._frame()
+            output.append(self._obj.decompress(unused))
+        return b"".join(output)
+
+    def flush(self) -> bytes:
+        return b""
+
+
+#: Decoders of the content codings, by preference order.
+DECODERS: ty.Dict[str, ty.Callable[[], _Decoder]] = {}
+if zstandard is not None or zstd is not None:
+    DECODERS["zstd"] = _ZstdDecoder
+if brotli is not None:
+    DECODERS["br"] = _BrotliDecoder
+DECODERS["gzip"] = _ZlibDecoder
+DECODERS["deflate"] = _ZlibDecoder
+
+#: Value of the ``Accept-Encoding`` header listing every supported content
+#: coding, the best ones first.
+ACCEPT_ENCODING: str = ", ".join(DECODERS)
+
+
+@dc.dataclass
+class CompressionStats(object):
+    """Counters describing the work done by the compression layer."""
+
+    #: Number of compressed responses decoded.
+    responses: int = 0
+    #: Number of bytes of the responses as received.
+    received_bytes: int = 0
+    #: Number of bytes of the responses once decoded.
+    decoded_bytes: int = 0
+    #: Time, in seconds, spent decoding the responses.
+    decode_seconds: float = 0.0
+    #: Number of request bodies compressed.
+    requests: int = 0
+    #: Number of bytes of the request bodies before compression.
+    request_bytes: int = 0
+    #: Number of bytes of the request bodies as sent.
+    sent_bytes: int = 0
+    #: Time, in seconds, spent compressing the request bodies.
+    encode_seconds: float = 0.0
+    #: Lock protecting the counters when shared between threads.
+    _lock: threading.Lock = dc.field(
+        default_factory=threading.Lock, repr=False, compare=False
+    )
+
+    def add(self, **kwargs: ty.Union[int, float]) -> None:
+        """Increment the given counters.
+
+
+        :return: ``None``
+
+        """
+        with self._lock:
+            for k, v in kwargs.items():
+                setattr(self, k, getattr(self, k) + v)
+
+    @property
+    def response_ratio(self) -> float:
+        """Get the compression ratio of the decoded responses.
+
+
+        :return: The decoded size divided by the received size, ``1.0`` when
+                 no response was decoded.
+        :rtype: float
+
+        """
+        return self.decoded_bytes / self.received_bytes if self.received_bytes else 1.0
+
+    @property
+    def request_ratio(self) -> float:
+        """Get the compression ratio of the compressed request bodies.
+
+
+        :return: The original size divided by the sent size, ``1.0`` when no
+                 request body was compressed.
+        :rtype: float
+
+        """
+        return self.request_bytes / self.sent_bytes if self.sent_bytes else 1.0
+
+
+class _DecodingStreamMixin(object):
+    """Behaviour shared by the synchronous and asynchronous decoding streams."""
+
+    def __init__(
+        self,
+        stream: ty.Union[httpx.SyncByteStream, httpx.AsyncByteStream],
+        decoders: ty.List[_Decoder],
+        stats: CompressionStats,
+    ):
+        self.stream = stream
+        self.decoders = decoders
+        self.stats = stats
+        self._received = self._decoded = 0
+        self._seconds = 0.0
+        self._reported = False
+
+    def _decode(self, chunk: bytes, flush: bool = False) -> bytes:
+        """Decode a chunk of the content."""
+        start = time.perf_counter()
+        self._received += len(chunk)
+        for decoder in self.decoders:
+            if chunk:
+                chunk = decoder.decompress(chunk)
+            if flush:
+                chunk += decoder.flush()
+        self._seconds += time.perf_counter() - start
+        self._decoded += len(chunk)
+        return chunk
+
+    def _report(self) -> None:
+        """Add the counters of the response to the statistics, once."""
+        if self._reported:
+            return
+        self._reported = True
+        self.stats.add(
+            responses=1,
+            received_bytes=self._received,
+            decoded_bytes=self._decoded,
+            decode_seconds=self._seconds,
+        )
+
+
+class _DecodingStream(_DecodingStreamMixin, httpx.SyncByteStream):
+    """Stream decoding the content of a response as it is received."""
+
+    def __iter__(self) -> ty.Iterator[bytes]:
+        for chunk in self.stream:
+            if chunk := self._decode(chunk):
+                yield chunk
+        if chunk := self._decode(b"", flush=True):
+            yield chunk
+        self._report()
+
+    def close(self) -> None:
+        self._report()
+        self.stream.close()
+
+
+class _AsyncDecodingStream(_DecodingStreamMixin, httpx.AsyncByteStream):
+    """Asynchronous stream decoding the content of a response as it is
+    received.
+
+    """
+
+    async def __aiter__(self) -> ty.AsyncIterator[bytes]:
+        async for chunk in self.stream:
+            if chunk := self._decode(chunk):
+                yield chunk
+        if chunk := self._decode(b"", flush=True):
+            yield chunk
+        self._report()
+
+    async def aclose(self) -> None:
+        self._report()
+        await self.stream.aclose()
+
+
+class _CompressionTransportMixin(object):
+    """Behaviour shared by the synchronous and asynchronous compression
+    transports.
+
+    """
+
+    def __init__(
+        self,
+        transport: ty.Union[httpx.BaseTransport, httpx.AsyncBaseTransport],
+        compress_requests: bool = False,
+        min_size: int = DEFAULT_MIN_SIZE,
+    ):
+        self.transport = transport
+        self.compress_requests = compress_requests
+        self.min_size = min_size
+        self.stats = CompressionStats()
+
+    def _compressible(self, request: httpx.Request) -> bool:
+        """Check whether the body of a request may be compressed."""
+        return (
+            self.compress_requests
+            and request.method in COMPRESSED_METHODS
+            and "Content-Encoding" not in request.headers
+        )
+
+    def _prepare(self, request: httpx.Request) -> httpx.Request:
+        """Compress the body of a request when large enough."""
+        if not self._compressible(request):
+            return request
+        try:
+            content = request.content
+        except httpx.RequestNotRead:
+            # A streamed body is sent as is.
+            return request
+        if len(content) < self.min_size:
+            return request
+
+        start = time.perf_counter()
+        compressed = gzip.compress(content, compresslevel=COMPRESS_LEVEL, mtime=0)
+        self.stats.add(
+            requests=1,
+            request_bytes=len(content),
+            sent_bytes=len(compressed),
+            encode_seconds=time.perf_counter() - start,
+        )
+        # The request is left untouched, should it be sent again.
+        headers = request.headers.copy()
+        headers["Content-Encoding"] = "gzip"
+        headers["Content-Length"] = str(len(compressed))
+        headers.pop("Transfer-Encoding", None)
+        return httpx.Request(
+            request.method,
+            request.url,
+            headers=headers,
+            content=compressed,
+            extensions=request.extensions,
+        )
+
+    def _decoders(self, response: httpx.Response) -> ty.Optional[ty.List[_Decoder]]:
+        """Get the decoders of a response's content, in the order to apply
+        them, or ``None`` when the content is not to be decoded here.
+
+        """
+        codings = [
+            c.strip().lower()
+            for c in response.headers.get("Content-Encoding", "").split(",")
+            if c.strip() and c.strip().lower() != "identity"
+        ]
+        if not codings or any(c not in DECODERS for c in codings):
+            return None
+        return [DECODERS[c]() for c in reversed(codings)]
+
+    def _response(
+        self,
+        request: httpx.Request,
+        response: httpx.Response,
+        stream: ty.Union[httpx.SyncByteStream, httpx.AsyncByteStream],
+    ) -> httpx.Response:
+        """Build the response with its decoding stream."""
+        headers = response.headers.copy()
+        del headers["Content-Encoding"]
+        headers.pop("Content-Length", None)
+        return httpx.Response(
+            response.status_code,
+            headers=headers,
+            stream=stream,
+            request=request,
+            extensions=response.extensions,
+        )
+
+
+class CompressionTransport(_CompressionTransportMixin, httpx.BaseTransport):
+    """Transport wrapper decoding the compressed responses as they are
+    received, measuring the compression ratio and the time spent. The content
+    codings are negotiated with :data:`ACCEPT_ENCODING`.
+
+    ``zstd`` is supported when the ``zstandard`` package or the
+    ``compression.zstd`` module (Python 3.14, or ``backports.zstd``) is
+    available, ``br`` when the ``brotli`` (or ``brotlicffi``) package is
+    installed, ``gzip`` and ``deflate`` always.
+    Request bodies of at least ``min_size`` bytes are compressed with ``gzip``
+    when ``compress_requests`` is set; streamed bodies are sent as is.
+
+
+    :param transport: The transport actually sending the requests.
+    :type transport: ~httpx.BaseTransport
+
+    :param compress_requests: Whether to compress large request bodies.
+    :type compress_requests: bool
+
+    :param min_size: Minimum size, in bytes, of the request bodies to
+                     compress.
+    :type min_size: int
+
+    """
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        """Send a request and decode its response as it is received."""
+        response = self.transport.handle_request(self._prepare(request))
+        if (decoders := self._decoders(response)) is None:
+            return response
+        return self._response(
+            request, response, _DecodingStream(response.stream, decoders, self.stats)
+        )
+
+    def close(self) -> None:
+        """Close the underlying transport."""
+        self.transport.close()
+
+
+class AsyncCompressionTransport(_CompressionTransportMixin, httpx.AsyncBaseTransport):
+    """Asynchronous transport wrapper decoding the compressed responses as they
+    are received, measuring the compression ratio and the time spent. The
+    content codings are negotiated with :data:`ACCEPT_ENCODING`.
+
+    ``zstd`` is supported when the ``zstandard`` package or the
+    ``compression.zstd`` module (Python 3.14, or ``backports.zstd``) is
+    available, ``br`` when the ``brotli`` (or ``brotlicffi``) package is
+    installed, ``gzip`` and ``deflate`` always.
+    Request bodies of at least ``min_size`` bytes are compressed with ``gzip``
+    when ``compress_requests`` is set; streamed bodies are sent as is.
+
+
+    :param transport: The transport actually sending the requests.
+    :type transport: ~httpx.AsyncBaseTransport
+
+    :param compress_requests: Whether to compress large request bodies.
+    :type compress_requests: bool
+
+    :param min_size: Minimum size, in bytes, of the request bodies to
+                     compress.
+    :type min_size: int
+
+    """
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """Send a request and decode its response as it is received."""
+        response = await self.transport.handle_async_request(self._prepare(request))
+        if (decoders := self._decoders(response)) is None:
+            return response
+        return self._response(
+            request,
+            response,
+            _AsyncDecodingStream(response.stream, decoders, self.stats),
+        )
+
+    async def aclose(self) -> None:
+        """Close the underlying transport."""
+        await self.transport.aclose()
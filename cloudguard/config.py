@@ -21,6 +21,7 @@
 import os
 import typing as ty
 import logging
+import threading
 import dataclasses as dc
 import configparser
 
@@ -51,6 +52,93 @@ ENV_CLOUDGUARD_CONFIG: str = "CLOUDGUARD_CONFIG"
 ENV_CLOUDGUARD_CREDENTIALS: str = "CLOUDGUARD_CREDENTIALS"
 #: Name of the environment variable providing the CloudGuard region.
 ENV_CLOUDGUARD_REGION: str = "CLOUDGUARD_REGION"
+#: Name of the environment variable enabling HTTP/2.
+ENV_CLOUDGUARD_HTTP2: str = "CLOUDGUARD_HTTP2"
+#: Name of the environment variable providing the maximum number of concurrent
+#: connections.
+ENV_CLOUDGUARD_MAX_CONNECTIONS: str = "CLOUDGUARD_MAX_CONNECTIONS"
+#: Name of the environment variable providing the maximum number of idle
+#: connections kept alive in the pool.
+ENV_CLOUDGUARD_MAX_KEEPALIVE_CONNECTIONS: str = "CLOUDGUARD_MAX_KEEPALIVE_CONNECTIONS"
+#: Name of the environment variable providing the time, in seconds, after which
+#: an idle connection is closed.
+ENV_CLOUDGUARD_KEEPALIVE_EXPIRY: str = "CLOUDGUARD_KEEPALIVE_EXPIRY"
+#: Name of the environment variable providing the connection timeout.
+ENV_CLOUDGUARD_CONNECT_TIMEOUT: str = "CLOUDGUARD_CONNECT_TIMEOUT"
+#: Name of the environment variable providing the read timeout.
+ENV_CLOUDGUARD_READ_TIMEOUT: str = "CLOUDGUARD_READ_TIMEOUT"
+#: Name of the environment variable providing the write timeout.
+ENV_CLOUDGUARD_WRITE_TIMEOUT: str = "CLOUDGUARD_WRITE_TIMEOUT"
+#: Name of the environment variable providing the timeout to acquire a
+#: connection from the pool.
+ENV_CLOUDGUARD_POOL_TIMEOUT: str = "CLOUDGUARD_POOL_TIMEOUT"
+#: Name of the environment variable enabling the coalescing of identical
+#: concurrent requests.
+ENV_CLOUDGUARD_COALESCE: str = "CLOUDGUARD_COALESCE"
+#: Name of the environment variable providing the content codings accepted for
+#: the responses.
+ENV_CLOUDGUARD_ACCEPT_ENCODING: str = "CLOUDGUARD_ACCEPT_ENCODING"
+#: Name of the environment variable enabling the compression of large request
+#: bodies.
+ENV_CLOUDGUARD_COMPRESS_REQUESTS: str = "CLOUDGUARD_COMPRESS_REQUESTS"
+#: Name of the environment variable providing the minimum size of the request
+#: bodies to compress.
+ENV_CLOUDGUARD_COMPRESS_MIN_SIZE: str = "CLOUDGUARD_COMPRESS_MIN_SIZE"
+#: Name of the environment variable enabling the selection of the fastest
+#: endpoint of the region when a session starts.
+ENV_CLOUDGUARD_PROBE_ENDPOINTS: str = "CLOUDGUARD_PROBE_ENDPOINTS"
+#: Name of the environment variable enabling the hedging of slow ``GET``
+#: requests.
+ENV_CLOUDGUARD_HEDGE: str = "CLOUDGUARD_HEDGE"
+#: Name of the environment variable providing the latency percentile after
+#: which a request is hedged.
+ENV_CLOUDGUARD_HEDGE_PERCENTILE: str = "CLOUDGUARD_HEDGE_PERCENTILE"
+#: Name of the environment variable providing the maximum number of retries.
+ENV_CLOUDGUARD_MAX_RETRIES: str = "CLOUDGUARD_MAX_RETRIES"
+#: Name of the environment variable providing the base delay of the retry
+#: backoff.
+ENV_CLOUDGUARD_BACKOFF_FACTOR: str = "CLOUDGUARD_BACKOFF_FACTOR"
+#: Name of the environment variable providing the maximum delay between two
+#: retries.
+ENV_CLOUDGUARD_BACKOFF_MAX: str = "CLOUDGUARD_BACKOFF_MAX"
+#: Name of the environment variable providing the client-side rate limit.
+ENV_CLOUDGUARD_RATE_LIMIT: str = "CLOUDGUARD_RATE_LIMIT"
+#: Name of the environment variable providing the client-side rate limit burst.
+ENV_CLOUDGUARD_RATE_BURST: str = "CLOUDGUARD_RATE_BURST"
+#: Name of the environment variable enabling the sharing of the rate limit
+#: between the processes of the host.
+ENV_CLOUDGUARD_RATE_SHARED: str = "CLOUDGUARD_RATE_SHARED"
+#: Name of the environment variable providing the path to the directory holding
+#: the shared rate limit state.
+ENV_CLOUDGUARD_RATE_DIR: str = "CLOUDGUARD_RATE_DIR"
+#: Name of the environment variable providing the number of consecutive
+#: failures opening the circuit of a region.
+ENV_CLOUDGUARD_CIRCUIT_THRESHOLD: str = "CLOUDGUARD_CIRCUIT_THRESHOLD"
+#: Name of the environment variable providing the time during which an open
+#: circuit rejects requests.
+ENV_CLOUDGUARD_CIRCUIT_RESET: str = "CLOUDGUARD_CIRCUIT_RESET"
+#: Name of the environment variable enabling the response cache.
+ENV_CLOUDGUARD_CACHE: str = "CLOUDGUARD_CACHE"
+#: Name of the environment variable providing the maximum number of responses
+#: held in memory by the cache.
+ENV_CLOUDGUARD_CACHE_MAX_ENTRIES: str = "CLOUDGUARD_CACHE_MAX_ENTRIES"
+#: Name of the environment variable providing the maximum size of the cache.
+ENV_CLOUDGUARD_CACHE_MAX_SIZE: str = "CLOUDGUARD_CACHE_MAX_SIZE"
+#: Name of the environment variable providing the time to live of the cached
+#: responses.
+ENV_CLOUDGUARD_CACHE_TTL: str = "CLOUDGUARD_CACHE_TTL"
+#: Name of the environment variable enabling the persistence of the cache.
+ENV_CLOUDGUARD_CACHE_PERSIST: str = "CLOUDGUARD_CACHE_PERSIST"
+#: Name of the environment variable providing the path to the cache directory.
+ENV_CLOUDGUARD_CACHE_DIR: str = "CLOUDGUARD_CACHE_DIR"
+#: Name of the environment variable providing the path to the directory holding
+#: the synchronised snapshots.
+ENV_CLOUDGUARD_SYNC_DIR: str = "CLOUDGUARD_SYNC_DIR"
+#: Name of the environment variable providing the identifier of the tenant
+#: whose collections are synchronised.
+ENV_CLOUDGUARD_SYNC_TENANT: str = "CLOUDGUARD_SYNC_TENANT"
+#: Name of the environment variable enabling the request instrumentation.
+ENV_CLOUDGUARD_METRICS: str = "CLOUDGUARD_METRICS"
 
 #: Name of the directory holding CloudGuard's configuration.
 CLOUDGUARD_CONFIG_DIR_NAME: str = "cloudguard"
@@ -60,6 +148,35 @@ CLOUDGUARD_CONFIG_PATH: Path = (
 )
 #: Path to the credentials file.
 CLOUDGUARD_CREDENTIALS_PATH: Path = CLOUDGUARD_CONFIG_PATH.with_name("credentials")
+#: Path to the directory holding the persisted response cache.
+CLOUDGUARD_CACHE_PATH: Path = xdg.xdg_cache_home() / CLOUDGUARD_CONFIG_DIR_NAME / "http"
+#: Path to the directory holding the rate limit state shared between processes.
+CLOUDGUARD_RATE_PATH: Path = (
+    (xdg.xdg_runtime_dir() or xdg.xdg_cache_home())
+    / CLOUDGUARD_CONFIG_DIR_NAME
+    / "ratelimit"
+)
+#: Path to the directory holding the synchronised snapshots.
+CLOUDGUARD_SYNC_PATH: Path = xdg.xdg_data_home() / CLOUDGUARD_CONFIG_DIR_NAME / "sync"
+
+#: Default maximum number of concurrent connections.
+DEFAULT_MAX_CONNECTIONS: int = 100
+#: Default maximum number of idle connections kept alive in the pool.
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS: int = 20
+#: Default time, in seconds, after which an idle connection is closed.
+DEFAULT_KEEPALIVE_EXPIRY: float = 5.0
+#: Default timeout, in seconds, for each phase of a request.
+DEFAULT_TIMEOUT: float = 5.0
+#: Default maximum number of retries of a failed request.
+DEFAULT_MAX_RETRIES: int = 3
+#: Default base delay, in seconds, of the retry backoff.
+DEFAULT_BACKOFF_FACTOR: float = 0.5
+#: Default maximum delay, in seconds, between two retries.
+DEFAULT_BACKOFF_MAX: float = 30.0
+#: Default maximum number of responses held in memory by the cache.
+DEFAULT_CACHE_MAX_ENTRIES: int = 1024
+#: Default maximum size, in bytes, of the cached responses.
+DEFAULT_CACHE_MAX_SIZE: int = 64 * 1024 * 1024
 
 
 class Credentials(Namespace):
@@ -148,6 +265,388 @@ class Credentials(Namespace):
         return self
 
 
+def parse_bool(value: ty.Union[bool, str]) -> bool:
+    """Convert a configuration value to a boolean. The accepted strings are the
+    same as the ones from :class:`~configparser.ConfigParser`.
+
+
+    :param value: The value to convert.
+    :type value: ~typing.Union[bool, str]
+
+
+    :return: The boolean matching the given value.
+    :rtype: bool
+
+
+    :raise ValueError: When the value is not a known boolean string.
+
+    """
+    if isinstance(value, bool):
+        return value
+    try:
+        return configparser.RawConfigParser.BOOLEAN_STATES[value.lower()]
+    except KeyError:
+        raise ValueError(f"not a boolean: {value}") from None
+
+
+def parse_list(value: ty.Union[ty.Iterable[str], str]) -> ty.Tuple[str, ...]:
+    """Convert a configuration value to a tuple of strings. Strings are split
+    on commas and whitespaces.
+
+
+    :param value: The value to convert.
+    :type value: ~typing.Union[~typing.Iterable[str], str]
+
+
+    :return: The strings of the given value.
+    :rtype: ~typing.Tuple[str, ...]
+
+    """
+    if isinstance(value, str):
+        value = value.replace(",", " ").split()
+    return tuple(value)
+
+
+def parse_region(
+    code: str, values: ty.Mapping[str, str]
+) -> cloudguard.region.CloudGuardRegion:
+    """Build a region from a ``[region.<code>]`` section of the configuration
+    file. A section matching a known region extends it, e.g. with additional
+    endpoints, and a section for a new code defines a custom region.
+
+
+    :param code: Code of the region.
+    :type code: str
+
+    :param values: Options of the section: ``name``, ``api``, ``aliases`` and
+                   ``endpoints``.
+    :type values: ~typing.Mapping[str, str]
+
+
+    :return: The region.
+    :rtype: ~cloudguard.region.CloudGuardRegion
+
+
+    :raise ValueError: When a custom region has no API URL.
+
+    """
+    try:
+        base = cloudguard.region.get(code)
+    except ValueError:
+        if not values.get("api"):
+            raise ValueError(f"expected an API URL for region {code}, got: none")
+        base = cloudguard.region.CloudGuardRegion(
+            name=values.get("name") or code, code=code, api=values["api"]
+        )
+
+    # A file loaded again extends the region it registered the first time.
+    aliases = base.aliases + parse_list(values.get("aliases", ""))
+    endpoints = base.endpoints + parse_list(values.get("endpoints", ""))
+    return dc.replace(
+        base,
+        name=values.get("name") or base.name,
+        api=values.get("api") or base.api,
+        aliases=tuple(dict.fromkeys(aliases)),
+        endpoints=tuple(dict.fromkeys(endpoints)),
+    )
+
+
+@dc.dataclass
+class ConfigSection(object):
+    """Base class for a section of the CloudGuard configuration.
+
+    Each field can declare in its metadata the environment variable from which
+    it is loaded (``env``) and a callable converting raw string values
+    (``convert``). A field set to ``None`` is considered as not configured.
+
+    """
+
+    #: Name of the section in the configuration file.
+    section_name: ty.ClassVar[str] = ""
+
+    @classmethod
+    def load_from_env(cls) -> ty.Self:
+        """Load the configuration section from the environment variables.
+
+
+        :return: A new configuration section based on the defined environment.
+        :rtype: ~cloudguard.config.ConfigSection
+
+
+        :raise ValueError: When an environment variable holds an invalid value.
+
+        """
+        self = cls()
+        self.update(
+            {
+                field.name: os.environ.get(field.metadata["env"])
+                for field in dc.fields(self)
+                if "env" in field.metadata
+            }
+        )
+
+        return self
+
+    def update(self, other: ty.Union["ConfigSection", ty.Mapping[str, ty.Any]]) -> None:
+        """Update the section from another section or any mapping. ``None``
+        values are ignored and string values are converted to the field's type.
+
+
+        :param other: The object from which to update the current section.
+        :type other: ~typing.Union[~cloudguard.config.ConfigSection, ~typing.Mapping[str, ty.Any]]
+
+
+        :return: ``None``
+
+
+        :raise ValueError: When a value cannot be converted to the field's type.
+
+        """
+        for field in dc.fields(self):
+            try:
+                value = other[field.name]
+            except (KeyError, TypeError):
+                try:
+                    value = getattr(other, field.name)
+                except AttributeError:
+                    continue
+            if value is None:
+                continue
+
+            if isinstance(value, str) and (convert := field.metadata.get("convert")):
+                try:
+                    value = convert(value.strip())
+                except ValueError:
+                    raise ValueError(
+                        f"invalid value for `{self.section_name}.{field.name}`:"
+                        f" {value!r}"
+                    ) from None
+            setattr(self, field.name, value)
+
+
+@dc.dataclass
+class TransportConfig(ConfigSection):
+    """Configuration of the connection pool and of the HTTP transport used by
+    the CloudGuard clients. Unset values fall back to the ``DEFAULT_*``
+    constants of this module.
+
+    """
+
+    section_name: ty.ClassVar[str] = "transport"
+
+    #: Whether to negotiate HTTP/2 with the CloudGuard API. Requires the
+    #: ``h2`` package.
+    http2: ty.Optional[bool] = dc.field(
+        default=None, metadata={"env": ENV_CLOUDGUARD_HTTP2, "convert": parse_bool}
+    )
+    #: Maximum number of concurrent connections.
+    max_connections: ty.Optional[int] = dc.field(
+        default=None,
+        metadata={"env": ENV_CLOUDGUARD_MAX_CONNECTIONS, "convert": int},
+    )
+    #: Maximum number of idle connections kept alive in the pool.
+    max_keepalive_connections: ty.Optional[int] = dc.field(
+        default=None,
+        metadata={"env": ENV_CLOUDGUARD_MAX_KEEPALIVE_CONNECTIONS, "convert": int},
+    )
+    #: Time, in seconds, after which an idle connection is closed.
+    keepalive_expiry: ty.Optional[float] = dc.field(
+        default=None,
+        metadata={"env": ENV_CLOUDGUARD_KEEPALIVE_EXPIRY, "convert": float},
+    )
+    #: Timeout, in seconds, to establish a connection.
+    connect_timeout: ty.Optional[float] = dc.field(
+        default=None,
+        metadata={"env": ENV_CLOUDGUARD_CONNECT_TIMEOUT, "convert": float},
+    )
+    #: Timeout, in seconds, to receive a chunk of data.
+    read_timeout: ty.Optional[float] = dc.field(
+        default=None,
+        metadata={"env": ENV_CLOUDGUARD_READ_TIMEOUT, "convert": float},
+    )
+    #: Timeout, in seconds, to send a chunk of data.
+    write_timeout: ty.Optional[float] = dc.field(
+        default=None,
+        metadata={"env": ENV_CLOUDGUARD_WRITE_TIMEOUT, "convert": float},
+    )
+    #: Timeout, in seconds, to acquire a connection from the pool.
+    pool_timeout: ty.Optional[float] = dc.field(
+        default=None,
+        metadata={"env": ENV_CLOUDGUARD_POOL_TIMEOUT, "convert": float},
+    )
+    #: Whether to send identical concurrent ``GET`` requests only once.
+    coalesce: ty.Optional[bool] = dc.field(
+        default=None, metadata={"env": ENV_CLOUDGUARD_COALESCE, "convert": parse_bool}
+    )
+    #: Value of the ``Accept-Encoding`` header of the requests. Defaults to
+    #: every supported content coding, see
+    #: :data:`~cloudguard.compression.ACCEPT_ENCODING`.
+    accept_encoding: ty.Optional[str] = dc.field(
+        default=None, metadata={"env": ENV_CLOUDGUARD_ACCEPT_ENCODING}
+    )
+    #: Whether to compress large request bodies with ``gzip``, e.g. for bulk
+    #: uploads. The API must accept compressed request bodies.
+    compress_requests: ty.Optional[bool] = dc.field(
+        default=None,
+        metadata={"env": ENV_CLOUDGUARD_COMPRESS_REQUESTS, "convert": parse_bool},
+    )
+    #: Minimum size, in bytes, of the request bodies to compress. Defaults to
+    #: :data:`~cloudguard.compression.DEFAULT_MIN_SIZE`.
+    compress_min_size: ty.Optional[int] = dc.field(
+        default=None,
+        metadata={"env": ENV_CLOUDGUARD_COMPRESS_MIN_SIZE, "convert": int},
+    )
+    #: Whether to probe the endpoints of the region when a session starts and
+    #: send the requests to the fastest healthy one.
+    probe_endpoints: ty.Optional[bool] = dc.field(
+        default=None,
+        metadata={"env": ENV_CLOUDGUARD_PROBE_ENDPOINTS, "convert": parse_bool},
+    )
+    #: Whether to send a second attempt of ``GET`` requests which take longer
+    #: than most recent requests, keeping the first response received.
+    hedge: ty.Optional[bool] = dc.field(
+        default=None, metadata={"env": ENV_CLOUDGUARD_HEDGE, "convert": parse_bool}
+    )
+    #: Latency percentile of the recent requests after which a request is
+    #: hedged. Defaults to :data:`~cloudguard.hedge.DEFAULT_PERCENTILE`.
+    hedge_percentile: ty.Optional[float] = dc.field(
+        default=None,
+        metadata={"env": ENV_CLOUDGUARD_HEDGE_PERCENTILE, "convert": float},
+    )
+
+
+@dc.dataclass
+class RetryConfig(ConfigSection):
+    """Configuration of the retry and throttling layer of the CloudGuard
+    clients. Unset values fall back to the ``DEFAULT_*`` constants of this
+    module.
+
+    """
+
+    section_name: ty.ClassVar[str] = "retry"
+
+    #: Maximum number of times a failed request is sent again.
+    max_retries: ty.Optional[int] = dc.field(
+        default=None, metadata={"env": ENV_CLOUDGUARD_MAX_RETRIES, "convert": int}
+    )
+    #: Base delay, in seconds, of the exponential backoff.
+    backoff_factor: ty.Optional[float] = dc.field(
+        default=None,
+        metadata={"env": ENV_CLOUDGUARD_BACKOFF_FACTOR, "convert": float},
+    )
+    #: Maximum delay, in seconds, between two attempts.
+    backoff_max: ty.Optional[float] = dc.field(
+        default=None, metadata={"env": ENV_CLOUDGUARD_BACKOFF_MAX, "convert": float}
+    )
+    #: Maximum number of requests per second sent to a region. Not limited
+    #: when unset.
+    rate_limit: ty.Optional[float] = dc.field(
+        default=None, metadata={"env": ENV_CLOUDGUARD_RATE_LIMIT, "convert": float}
+    )
+    #: Number of requests which can be sent at once before the rate limit
+    #: applies. Defaults to the rate limit.
+    rate_burst: ty.Optional[int] = dc.field(
+        default=None, metadata={"env": ENV_CLOUDGUARD_RATE_BURST, "convert": int}
+    )
+    #: Whether the rate limit is shared by every process of the host using the
+    #: same API key and region, rather than applying to each process alone.
+    rate_shared: ty.Optional[bool] = dc.field(
+        default=None,
+        metadata={"env": ENV_CLOUDGUARD_RATE_SHARED, "convert": parse_bool},
+    )
+    #: Directory holding the shared rate limit state. Defaults to
+    #: :data:`~cloudguard.config.CLOUDGUARD_RATE_PATH`.
+    rate_path: ty.Optional[Path] = dc.field(
+        default=None, metadata={"env": ENV_CLOUDGUARD_RATE_DIR, "convert": Path}
+    )
+    #: Number of consecutive failures after which requests to a region are
+    #: rejected right away for a while. No circuit breaker when unset.
+    circuit_threshold: ty.Optional[int] = dc.field(
+        default=None,
+        metadata={"env": ENV_CLOUDGUARD_CIRCUIT_THRESHOLD, "convert": int},
+    )
+    #: Time, in seconds, during which an open circuit rejects requests before
+    #: letting a probe through. Defaults to
+    #: :data:`~cloudguard.breaker.DEFAULT_RESET_TIMEOUT`.
+    circuit_reset: ty.Optional[float] = dc.field(
+        default=None, metadata={"env": ENV_CLOUDGUARD_CIRCUIT_RESET, "convert": float}
+    )
+
+
+@dc.dataclass
+class CacheConfig(ConfigSection):
+    """Configuration of the response cache of the CloudGuard clients. Unset
+    values fall back to the ``DEFAULT_*`` constants of this module.
+
+    """
+
+    section_name: ty.ClassVar[str] = "cache"
+
+    #: Whether to cache and revalidate the ``GET`` responses.
+    enabled: ty.Optional[bool] = dc.field(
+        default=None, metadata={"env": ENV_CLOUDGUARD_CACHE, "convert": parse_bool}
+    )
+    #: Maximum number of responses held in memory.
+    max_entries: ty.Optional[int] = dc.field(
+        default=None,
+        metadata={"env": ENV_CLOUDGUARD_CACHE_MAX_ENTRIES, "convert": int},
+    )
+    #: Maximum size, in bytes, of the cached responses, both in memory and on
+    #: disk.
+    max_size: ty.Optional[int] = dc.field(
+        default=None, metadata={"env": ENV_CLOUDGUARD_CACHE_MAX_SIZE, "convert": int}
+    )
+    #: Time, in seconds, after which a cached response is evicted. Responses
+    #: are kept until evicted by size when unset.
+    ttl: ty.Optional[float] = dc.field(
+        default=None, metadata={"env": ENV_CLOUDGUARD_CACHE_TTL, "convert": float}
+    )
+    #: Whether to persist the cached responses on disk.
+    persist: ty.Optional[bool] = dc.field(
+        default=None,
+        metadata={"env": ENV_CLOUDGUARD_CACHE_PERSIST, "convert": parse_bool},
+    )
+    #: Directory holding the persisted responses. Defaults to
+    #: :data:`~cloudguard.config.CLOUDGUARD_CACHE_PATH`.
+    path: ty.Optional[Path] = dc.field(
+        default=None, metadata={"env": ENV_CLOUDGUARD_CACHE_DIR, "convert": Path}
+    )
+
+
+@dc.dataclass
+class SyncConfig(ConfigSection):
+    """Configuration of the incremental synchronisation of the CloudGuard
+    collections.
+
+    """
+
+    section_name: ty.ClassVar[str] = "sync"
+
+    #: Directory holding the synchronised snapshots. Defaults to
+    #: :data:`~cloudguard.config.CLOUDGUARD_SYNC_PATH`.
+    path: ty.Optional[Path] = dc.field(
+        default=None, metadata={"env": ENV_CLOUDGUARD_SYNC_DIR, "convert": Path}
+    )
+    #: Stable identifier of the tenant, e.g. its CloudGuard account number,
+    #: under which the snapshots are kept. Defaults to the API key, in which
+    #: case rotating the credentials starts new snapshots.
+    tenant: ty.Optional[str] = dc.field(
+        default=None, metadata={"env": ENV_CLOUDGUARD_SYNC_TENANT}
+    )
+
+
+@dc.dataclass
+class MetricsConfig(ConfigSection):
+    """Configuration of the instrumentation of the CloudGuard clients."""
+
+    section_name: ty.ClassVar[str] = "metrics"
+
+    #: Whether to measure the requests sent by the clients.
+    enabled: ty.Optional[bool] = dc.field(
+        default=None, metadata={"env": ENV_CLOUDGUARD_METRICS, "convert": parse_bool}
+    )
+
+
 @dc.dataclass(init=False, repr=False)
 class Config(object):
     """Configuration of the CloudGuard client.
@@ -160,6 +659,21 @@ class Config(object):
     :param region: The region to use when instantiating the client.
     :type region: ~typing.Union[str, ~cloudguard.region.CloudGuardRegion]
 
+    :param transport: Configuration of the HTTP transport.
+    :type transport: ~cloudguard.config.TransportConfig
+
+    :param retry: Configuration of the retry and throttling layer.
+    :type retry: ~cloudguard.config.RetryConfig
+
+    :param cache: Configuration of the response cache.
+    :type cache: ~cloudguard.config.CacheConfig
+
+    :param sync: Configuration of the incremental synchronisation.
+    :type sync: ~cloudguard.config.SyncConfig
+
+    :param metrics: Configuration of the request instrumentation.
+    :type metrics: ~cloudguard.config.MetricsConfig
+
     """
 
     __region: ty.Optional[cloudguard.region.CloudGuardRegion] = dc.field(
@@ -168,9 +682,23 @@ class Config(object):
     #: Store holding the different authentication credentials required to
     #: interact with CloudGuard.
     credentials: Credentials = dc.field(default_factory=Credentials)
+    #: Configuration of the connection pool and of the HTTP transport.
+    transport: TransportConfig = dc.field(default_factory=TransportConfig)
+    #: Configuration of the retry and throttling layer.
+    retry: RetryConfig = dc.field(default_factory=RetryConfig)
+    #: Configuration of the response cache.
+    cache: CacheConfig = dc.field(default_factory=CacheConfig)
+    #: Configuration of the incremental synchronisation.
+    sync: SyncConfig = dc.field(default_factory=SyncConfig)
+    #: Configuration of the request instrumentation.
+    metrics: MetricsConfig = dc.field(default_factory=MetricsConfig)
 
     def __init__(self, **kwargs):
         """Constructor for :class:`cloudguard.config.Config`."""
+        for field in dc.fields(self):
+            if field.default_factory is not dc.MISSING:
+                setattr(self, field.name, field.default_factory())
+
         allowed = {x.metadata.get("name") or x.name for x in dc.fields(self)}
         for k, v in kwargs.items():
             if k not in allowed:
@@ -197,10 +725,19 @@ class Config(object):
         )
 
     @classmethod
-    def load(cls) -> ty.Self:
+    def load(cls, cached: bool = True) -> ty.Self:
         """Load a configuration from the default file locations or the
         environment variables.
 
+        The loaded configuration is memoized for the whole process. The files
+        are only parsed again when their path, modification time or size, or
+        one of the ``CLOUDGUARD_*`` environment variables changed. Each call
+        returns a copy which can be freely modified.
+
+
+        :param cached: Whether to use the memoized configuration.
+        :type cached: bool
+
 
         :return: A new :class:`~cloudguard.config.Config` class based on the
                  existing environment.
@@ -211,6 +748,27 @@ class Config(object):
             When the configuration file could not be read as a valid
             configuration.
 
+        """
+        if not cached:
+            return cls._load()
+
+        signature = _load_signature()
+        with _LOAD_CACHE_LOCK:
+            try:
+                cached_signature, config = _LOAD_CACHE[cls]
+            except KeyError:
+                cached_signature = config = None
+            if cached_signature != signature:
+                config = cls._load()
+                _LOAD_CACHE[cls] = (signature, config)
+
+        return config.copy()
+
+    @classmethod
+    def _load(cls) -> ty.Self:
+        """Load a configuration from the default file locations or the
+        environment variables, bypassing the memoized configuration.
+
         """
         self = cls.load_from_file()
         self.update(cls.load_from_env())
@@ -231,6 +789,8 @@ class Config(object):
         self = cls()
         if (region := os.environ.get(ENV_CLOUDGUARD_REGION)) is not None:
             self.region = region
+        for section in self.sections():
+            section.update(section.load_from_env())
 
         return self
 
@@ -264,8 +824,15 @@ class Config(object):
         except TypeError:
             pass
 
+        for name, values in raw.items():
+            prefix, _, code = name.partition(".")
+            if prefix == "region" and code:
+                cloudguard.region.register(parse_region(code, values), replace=True)
+
         self = cls()
         self.update(raw.get("default") or {})
+        for section in self.sections():
+            section.update(raw.get(section.section_name) or {})
 
         return self
 
@@ -292,26 +859,54 @@ class Config(object):
         :raise TypeError: When the provided region is none of the accepted
                           types.
 
-        :raise ValueError: When the provided region is not one of the known
-                           regions.
+        :raise ValueError: When the provided region is not one of the regions
+                           of :data:`~cloudguard.region.registry`.
 
         """
         if value is None or isinstance(value, cloudguard.region.CloudGuardRegion):
             self.__region = value
         elif isinstance(value, str):
-            try:
-                self.__region = getattr(cloudguard.region, value)
-            except AttributeError:
-                raise ValueError(f"unknown region: {value}") from None
+            self.__region = cloudguard.region.get(value)
         else:
             raise TypeError(
                 f"expected `{str!r}` or `{cloudguard.region.CloudGuardRegion!r}`"
                 f" got: {type(value)}"
             )
 
+    def copy(self) -> ty.Self:
+        """Copy the configuration. The copy can be modified without affecting
+        the original configuration.
+
+
+        :return: A copy of the configuration.
+        :rtype: ~cloudguard.config.Config
+
+        """
+        other = self.__class__()
+        other.region = self.region
+        other.credentials.update(self.credentials)
+        for field in dc.fields(self):
+            if isinstance(value := getattr(self, field.name, None), ConfigSection):
+                setattr(other, field.name, dc.replace(value))
+
+        return other
+
+    def sections(self) -> ty.Iterator[ConfigSection]:
+        """Iterate over the sections of the configuration.
+
+
+        :return: An iterator over the configuration sections.
+        :rtype: ~typing.Iterator[~cloudguard.config.ConfigSection]
+
+        """
+        for field in dc.fields(self):
+            if isinstance(value := getattr(self, field.name, None), ConfigSection):
+                yield value
+
     def update(self, other: ty.Union["Config", ty.Mapping[str, ty.Any]]) -> None:
         """Update the configuration from another configuration object or any
-        config-like object. ``None`` values are ignored.
+        config-like object. ``None`` values are ignored and configuration
+        sections are merged rather than replaced.
 
 
         :param other: The object from which to update the current configuration.
@@ -330,10 +925,68 @@ class Config(object):
                     value = getattr(other, name)
                 except AttributeError:
                     continue
-            if value is not None:
+            if value is None:
+                continue
+
+            if isinstance(current := getattr(self, name, None), ConfigSection):
+                current.update(value)
+            else:
                 setattr(self, name, value)
 
 
+#: Configurations memoized by :meth:`~cloudguard.config.Config.load`, by class,
+#: along with the signature of the environment they were loaded from.
+_LOAD_CACHE: ty.Dict[type, ty.Tuple[ty.Tuple, Config]] = {}
+#: Lock protecting the memoized configurations.
+_LOAD_CACHE_LOCK = threading.RLock()
+#: Names of the environment variables read when loading a configuration.
+_LOAD_ENV_NAMES: ty.Tuple[str, ...] = tuple(
+    v for k, v in sorted(globals().items()) if k.startswith("ENV_CLOUDGUARD_")
+)
+
+
+def _file_signature(name: os.PathLike) -> ty.Tuple:
+    """Get a value changing whenever the given file is modified, replaced or
+    removed.
+
+    """
+    path = os.fspath(Path(name).expanduser())
+    try:
+        st = os.stat(path)
+    except OSError:
+        return (path,)
+    return path, st.st_ino, st.st_mtime_ns, st.st_size
+
+
+def _load_signature() -> ty.Tuple:
+    """Get a value changing whenever the configuration loaded by
+    :meth:`~cloudguard.config.Config.load` may change.
+
+    """
+    return (
+        tuple(os.environ.get(name) for name in _LOAD_ENV_NAMES),
+        _file_signature(
+            os.environ.get(ENV_CLOUDGUARD_CONFIG) or CLOUDGUARD_CONFIG_PATH
+        ),
+        _file_signature(
+            os.environ.get(ENV_CLOUDGUARD_CREDENTIALS) or CLOUDGUARD_CREDENTIALS_PATH
+        ),
+    )
+
+
+def invalidate() -> None:
+    """Forget the configurations memoized by
+    :meth:`~cloudguard.config.Config.load`, forcing the next call to read the
+    files and the environment again.
+
+
+    :return: ``None``
+
+    """
+    with _LOAD_CACHE_LOCK:
+        _LOAD_CACHE.clear()
+
+
 def parse_raw_config(name: os.PathLike) -> ty.Dict[str, ty.Dict[str, str]]:
     """Read a configuration file using :class:`~configparser.ConfigParser`. And
     return a dictionary from the parsed configuration.
@@ -37,3 +37,9 @@ class ConfigParseError(CloudGuardIOError):
     """The configuration file could not be parsed."""
 
     fmt = "Unable to parse configuration file: {path}"
+
+
+class CassetteMissError(CloudGuardError, LookupError):
+    """No recorded response matches a replayed request."""
+
+    fmt = "No recorded response for: {method} {url}"
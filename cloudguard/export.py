@@ -0,0 +1,614 @@
+# cloudguard/export.py
+# ====================
+#
+# Copying
+# -------
+#
+# Copyright (c) 2023 cloudguard authors and contributors.
+#
+# This file is part of the *cloudguard* project.
+#
+# *cloudguard* is a free software project. You can redistribute it and/or
+# modify it following the terms of the MIT License.
+#
+# This software project is distributed *as is*, WITHOUT WARRANTY OF ANY KIND;
+# including but not limited to the WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE and NONINFRINGEMENT.
+#
+# You should have received a copy of the MIT License along with *cloudguard*.
+# If not, see <http://opensource.org/licenses/MIT>.
+#
+import os
+import csv
+import gzip
+import json
+import types
+import typing as ty
+import logging
+import tempfile
+import dataclasses as dc
+import concurrent.futures
+
+from pathlib import Path
+
+import httpx
+
+from cloudguard.client import APIClient
+from cloudguard.streaming import JSONArrayDecoder, streamed
+from cloudguard.pagination import Paginator
+
+
+if ty.TYPE_CHECKING:
+    import pyarrow
+
+
+log = logging.getLogger(__name__)
+
+
+#: Default number of pages between two checkpoints of an export.
+DEFAULT_CHECKPOINT_EVERY: int = 10
+#: Default number of exports run at once by :func:`~cloudguard.export.export_all`.
+DEFAULT_MAX_WORKERS: int = 4
+
+#: Type definition of the position of a writer, from which it can resume.
+Position = ty.Any
+
+
+class Writer(object):
+    """Write exported records to a file.
+
+    Writers can resume from the position returned by
+    :meth:`~cloudguard.export.Writer.checkpoint`: everything written after it
+    is discarded.
+
+
+    :param path: Path to the output.
+    :type path: ~os.PathLike
+
+    :param position: Position from which to resume. The output is overwritten
+                     when ``None``.
+    :type position: ~typing.Any
+
+    """
+
+    def __init__(self, path: os.PathLike, position: ty.Optional[Position] = None):
+        """Constructor for :class:`cloudguard.export.Writer`."""
+        self.path = Path(path).expanduser()
+
+    def __enter__(self) -> "Writer":
+        """Enter the writer's context."""
+        return self
+
+    def __exit__(self, *args) -> None:
+        """Close the writer."""
+        self.close()
+
+    def write(self, record: ty.Mapping[str, ty.Any]) -> None:
+        """Write a record.
+
+
+        :param record: The record to write.
+        :type record: ~typing.Mapping[str, ~typing.Any]
+
+
+        :return: ``None``
+
+        """
+        raise NotImplementedError
+
+    def checkpoint(self) -> Position:
+        """Make the records written so far durable.
+
+
+        :return: The position from which to resume writing.
+        :rtype: ~typing.Any
+
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Make the written records durable and close the output.
+
+
+        :return: ``None``
+
+        """
+        raise NotImplementedError
+
+
+class _FileWriter(Writer):
+    """Writer of a single file, optionally compressed with gzip.
+
+    A compressed file is made of one gzip member per checkpoint, so that it can
+    be truncated at any checkpoint and still be read as a whole.
+
+    """
+
+    def __init__(
+        self,
+        path: os.PathLike,
+        position: ty.Optional[int] = None,
+        compress: bool = False,
+    ):
+        super().__init__(path, position)
+        self.compress = compress
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if position is None:
+            self._file = open(self.path, "wb")
+        else:
+            self._file = open(self.path, "r+b")
+            self._file.truncate(position)
+            self._file.seek(position)
+        self._stream: ty.Optional[ty.BinaryIO] = None
+
+    def _write(self, data: str) -> None:
+        """Write text to the file."""
+        if self._stream is None:
+            self._stream = (
+                gzip.GzipFile(fileobj=self._file, mode="wb")
+                if self.compress
+                else self._file
+            )
+        self._stream.write(data.encode())
+
+    def _flush(self) -> None:
+        """End the current gzip member and flush the file."""
+        if self._stream is not None and self._stream is not self._file:
+            self._stream.close()
+        self._stream = None
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def checkpoint(self) -> int:
+        """Make the records written so far durable."""
+        self._flush()
+        return self._file.tell()
+
+    def close(self) -> None:
+        """Make the written records durable and close the file."""
+        if not self._file.closed:
+            self._flush()
+            self._file.close()
+
+
+class NDJSONWriter(_FileWriter):
+    """Write records as newline delimited JSON, compressed with gzip by
+    default.
+
+
+    :param path: Path to the output file.
+    :type path: ~os.PathLike
+
+    :param position: Position from which to resume. The file is overwritten
+                     when ``None``.
+    :type position: int
+
+    :param compress: Whether to compress the file with gzip.
+    :type compress: bool
+
+    """
+
+    def __init__(
+        self,
+        path: os.PathLike,
+        position: ty.Optional[int] = None,
+        compress: bool = True,
+    ):
+        """Constructor for :class:`cloudguard.export.NDJSONWriter`."""
+        super().__init__(path, position, compress=compress)
+
+    def write(self, record: ty.Mapping[str, ty.Any]) -> None:
+        """Write a record on its own line."""
+        self._write(json.dumps(record, separators=(",", ":")) + "\n")
+
+
+class CSVWriter(_FileWriter):
+    """Write records as CSV. The columns are the keys of the first record unless
+    provided, other keys being ignored. Nested values are written as JSON.
+
+
+    :param path: Path to the output file.
+    :type path: ~os.PathLike
+
+    :param position: Position from which to resume. The file is overwritten
+                     when ``None``.
+    :type position: ~typing.Dict[str, ~typing.Any]
+
+    :param columns: The columns of the file.
+    :type columns: ~typing.Sequence[str]
+
+    :param compress: Whether to compress the file with gzip.
+    :type compress: bool
+
+    """
+
+    def __init__(
+        self,
+        path: os.PathLike,
+        position: ty.Optional[ty.Dict[str, ty.Any]] = None,
+        columns: ty.Optional[ty.Sequence[str]] = None,
+        compress: bool = False,
+    ):
+        """Constructor for :class:`cloudguard.export.CSVWriter`."""
+        super().__init__(
+            path, None if position is None else position["offset"], compress=compress
+        )
+        self.columns = list(columns or (position or {}).get("columns") or []) or None
+        self._header = position is None
+        self._writer = csv.writer(types.SimpleNamespace(write=self._write))
+
+    def write(self, record: ty.Mapping[str, ty.Any]) -> None:
+        """Write a record as a row, preceded by the header if it is the first
+        one.
+
+        """
+        if self.columns is None:
+            self.columns = list(record)
+        if self._header:
+            self._writer.writerow(self.columns)
+            self._header = False
+
+        self._writer.writerow(
+            [
+                json.dumps(v) if isinstance(v := record.get(k), (dict, list)) else v
+                for k in self.columns
+            ]
+        )
+
+    def checkpoint(self) -> ty.Dict[str, ty.Any]:
+        """Make the records written so far durable."""
+        return {"offset": super().checkpoint(), "columns": self.columns}
+
+
+class ParquetWriter(Writer):
+    """Write records as a Parquet dataset: a directory of part files, one per
+    checkpoint. Nested values are written as JSON. Requires the ``pyarrow``
+    package.
+
+    Every part is written with the same schema. When not provided, it is
+    inferred from the first part, with the columns holding only nulls typed as
+    strings, and read back from the first part when resuming. Fields of the
+    records missing from the schema are dropped.
+
+
+    :param path: Path to the output directory.
+    :type path: ~os.PathLike
+
+    :param position: Number of parts to keep when resuming. The directory is
+                     emptied when ``None``.
+    :type position: int
+
+    :param rows_per_part: Number of rows above which a part is written without
+                          waiting for a checkpoint.
+    :type rows_per_part: int
+
+    :param schema: Schema of the parts.
+    :type schema: ~pyarrow.Schema
+
+
+    :raise ImportError: When ``pyarrow`` is not installed.
+
+    """
+
+    def __init__(
+        self,
+        path: os.PathLike,
+        position: ty.Optional[int] = None,
+        rows_per_part: int = 100_000,
+        schema: ty.Optional["pyarrow.Schema"] = None,
+    ):
+        """Constructor for :class:`cloudguard.export.ParquetWriter`."""
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError(
+                "the pyarrow package is required to export to Parquet"
+            ) from None
+        self._pyarrow = pyarrow
+
+        super().__init__(path, position)
+        self.rows_per_part = rows_per_part
+        self.parts = position or 0
+        self._rows: ty.List[ty.Dict[str, ty.Any]] = []
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        for part in self.path.glob("part-*.parquet"):
+            if int(part.stem.split("-")[1]) >= self.parts:
+                part.unlink()
+
+        self.schema = schema
+        if self.schema is None and self.parts:
+            self.schema = pyarrow.parquet.read_schema(self._part(0))
+
+    def _part(self, index: int) -> Path:
+        """Get the path of a part file."""
+        return self.path / f"part-{index:06d}.parquet"
+
+    def write(self, record: ty.Mapping[str, ty.Any]) -> None:
+        """Buffer a record until the next part is written."""
+        self._rows.append(
+            {
+                k: json.dumps(v) if isinstance(v, (dict, list)) else v
+                for k, v in record.items()
+            }
+        )
+        if len(self._rows) >= self.rows_per_part:
+            self._write_part()
+
+    def _write_part(self) -> None:
+        """Write the buffered records as a new part."""
+        if not self._rows:
+            return
+        pyarrow = self._pyarrow
+        if self.schema is None:
+            table = pyarrow.Table.from_pylist(self._rows)
+            # A column holding only nulls has no type of its own.
+            self.schema = pyarrow.schema(
+                [
+                    f.with_type(pyarrow.string())
+                    if pyarrow.types.is_null(f.type)
+                    else f
+                    for f in table.schema
+                ]
+            )
+            table = table.cast(self.schema)
+        else:
+            table = pyarrow.Table.from_pylist(self._rows, schema=self.schema)
+        self._rows = []
+
+        fd, tmp = tempfile.mkstemp(dir=self.path, prefix=".tmp-")
+        os.close(fd)
+        self._pyarrow.parquet.write_table(table, tmp)
+        os.replace(tmp, self._part(self.parts))
+        self.parts += 1
+
+    def checkpoint(self) -> int:
+        """Write the buffered records as a new part."""
+        self._write_part()
+        return self.parts
+
+    def close(self) -> None:
+        """Write the buffered records as a new part."""
+        self._write_part()
+
+
+#: Writers of the export formats, by name.
+WRITERS: ty.Dict[str, ty.Callable[..., Writer]] = {
+    "ndjson": NDJSONWriter,
+    "csv": CSVWriter,
+    "parquet": ParquetWriter,
+}
+
+
+@dc.dataclass(frozen=True)
+class ExportJob(object):
+    """Describe the export of the records of a paginated endpoint to a file."""
+
+    #: Client fetching the records, e.g. for a given account or region.
+    client: APIClient
+    #: HTTP method of the request listing the records.
+    method: str
+    #: URL of the endpoint listing the records.
+    url: ty.Union[httpx.URL, str]
+    #: Description of the endpoint's pagination.
+    paginator: Paginator
+    #: Path to the output.
+    path: os.PathLike
+    #: Name of the output format, one of :data:`~cloudguard.export.WRITERS`.
+    format: str = "ndjson"
+    #: Extra arguments of every request listing the records.
+    options: ty.Mapping[str, ty.Any] = dc.field(default_factory=dict)
+    #: Extra arguments of the writer.
+    writer_options: ty.Mapping[str, ty.Any] = dc.field(default_factory=dict)
+
+    @property
+    def checkpoint_path(self) -> Path:
+        """Get the path to the checkpoint of the export.
+
+
+        :return: The path to the checkpoint.
+        :rtype: ~pathlib.Path
+
+        """
+        path = Path(self.path).expanduser()
+        return path.with_name(f"{path.name}.checkpoint")
+
+
+@dc.dataclass(frozen=True)
+class ExportResult(object):
+    """Outcome of an export."""
+
+    #: The export job.
+    job: ExportJob
+    #: Total number of records exported, including before resuming.
+    records: int = 0
+    #: Total number of pages exported, including before resuming.
+    pages: int = 0
+    #: Whether the export was resumed from a checkpoint.
+    resumed: bool = False
+    #: Exception raised by the export, if it failed.
+    error: ty.Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        """Check whether the export succeeded."""
+        return self.error is None
+
+
+def _dump_request(request: ty.Dict[str, ty.Any]) -> ty.Dict[str, ty.Any]:
+    """Convert the pagination arguments of a request to JSON."""
+    dump = {}
+    if (params := request.get("params")) is not None:
+        dump["params"] = str(httpx.QueryParams(params))
+    if (body := request.get("json")) is not None:
+        dump["json"] = body
+    return dump
+
+
+def _load_request(
+    options: ty.Mapping[str, ty.Any], dump: ty.Dict[str, ty.Any]
+) -> ty.Dict[str, ty.Any]:
+    """Rebuild the arguments of a request from their JSON form."""
+    request = dict(options)
+    if "params" in dump:
+        request["params"] = httpx.QueryParams(dump["params"])
+    if "json" in dump:
+        request["json"] = dump["json"]
+    return request
+
+
+def _save_checkpoint(path: Path, checkpoint: ty.Dict[str, ty.Any]) -> None:
+    """Atomically write the checkpoint of an export."""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    with os.fdopen(fd, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp, path)
+
+
+def _load_checkpoint(path: Path) -> ty.Optional[ty.Dict[str, ty.Any]]:
+    """Read the checkpoint of an export, if any."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        log.warning(f"Ignoring unreadable checkpoint at {path}: {e}")
+        return None
+
+
+def export(
+    job: ExportJob,
+    resume: bool = True,
+    checkpoint_every: int = DEFAULT_CHECKPOINT_EVERY,
+) -> ExportResult:
+    """Export the records of a paginated endpoint to a file.
+
+    Each page is streamed and its records written as they are decoded, so that
+    memory does not grow with the size of the export. A checkpoint is saved
+    every ``checkpoint_every`` pages. An interrupted export resumes from its
+    last checkpoint, the records written after it being discarded.
+
+
+    :param job: The export to run.
+    :type job: ~cloudguard.export.ExportJob
+
+    :param resume: Whether to resume from the last checkpoint, if any.
+    :type resume: bool
+
+    :param checkpoint_every: Number of pages between two checkpoints.
+    :type checkpoint_every: int
+
+
+    :return: The outcome of the export.
+    :rtype: ~cloudguard.export.ExportResult
+
+
+    :raise ValueError: When the format is unknown.
+
+    :raise ~httpx.HTTPStatusError: When a page could not be fetched.
+
+    """
+    try:
+        writer_class = WRITERS[job.format]
+    except KeyError:
+        raise ValueError(
+            f"expected one of {', '.join(WRITERS)} as format, got: {job.format}"
+        ) from None
+
+    checkpoint = _load_checkpoint(job.checkpoint_path) if resume else None
+    if checkpoint is None:
+        pages = records = 0
+        request = job.paginator.first(dict(job.options))
+        writer = writer_class(job.path, **job.writer_options)
+    else:
+        pages, records = checkpoint["pages"], checkpoint["records"]
+        request = _load_request(job.options, checkpoint["request"])
+        writer = writer_class(job.path, checkpoint["position"], **job.writer_options)
+        log.info(f"Resuming export to {job.path} after {pages} pages")
+
+    with writer:
+        while request is not None:
+            decoder = JSONArrayDecoder(job.paginator.items_key)
+            count, last = 0, None
+            with job.client.stream(
+                job.method, job.url, **streamed(request)
+            ) as response:
+                response.raise_for_status()
+                for chunk in response.iter_bytes():
+                    for last in decoder.feed(chunk):
+                        writer.write(last)
+                        count += 1
+                for last in decoder.close():
+                    writer.write(last)
+                    count += 1
+
+            # Only the number of records and the last one are kept in memory.
+            request = job.paginator.next(
+                request, decoder.metadata, [None] * (count - 1) + [last][:count]
+            )
+            pages += 1
+            records += count
+
+            if request is not None and pages % checkpoint_every == 0:
+                _save_checkpoint(
+                    job.checkpoint_path,
+                    {
+                        "pages": pages,
+                        "records": records,
+                        "position": writer.checkpoint(),
+                        "request": _dump_request(request),
+                    },
+                )
+
+    try:
+        job.checkpoint_path.unlink()
+    except FileNotFoundError:
+        pass
+
+    log.debug(f"Exported {records} records in {pages} pages to {job.path}")
+    return ExportResult(
+        job, records=records, pages=pages, resumed=checkpoint is not None
+    )
+
+
+def export_all(
+    jobs: ty.Iterable[ExportJob],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    resume: bool = True,
+    checkpoint_every: int = DEFAULT_CHECKPOINT_EVERY,
+) -> ty.List[ExportResult]:
+    """Run several exports at once, e.g. one per region or account, each to its
+    own file. A failed export does not stop the others; it is reported in its
+    result instead.
+
+
+    :param jobs: The exports to run.
+    :type jobs: ~typing.Iterable[~cloudguard.export.ExportJob]
+
+    :param max_workers: Maximum number of exports run at once.
+    :type max_workers: int
+
+    :param resume: Whether to resume the exports from their last checkpoint.
+    :type resume: bool
+
+    :param checkpoint_every: Number of pages between two checkpoints.
+    :type checkpoint_every: int
+
+
+    :return: The outcome of each export, in the order of the jobs.
+    :rtype: ~typing.List[~cloudguard.export.ExportResult]
+
+    """
+
+    def run(job: ExportJob) -> ExportResult:
+        try:
+            return export(job, resume=resume, checkpoint_every=checkpoint_every)
+        except Exception as e:
+            log.warning(f"Export to {job.path} failed: {e!r}")
+            return ExportResult(job, error=e)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+        return list(executor.map(run, jobs))
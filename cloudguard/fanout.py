@@ -0,0 +1,244 @@
+# cloudguard/fanout.py
+# ====================
+#
+# Copying
+# -------
+#
+# Copyright (c) 2023 cloudguard authors and contributors.
+#
+# This file is part of the *cloudguard* project.
+#
+# *cloudguard* is a free software project. You can redistribute it and/or
+# modify it following the terms of the MIT License.
+#
+# This software project is distributed *as is*, WITHOUT WARRANTY OF ANY KIND;
+# including but not limited to the WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE and NONINFRINGEMENT.
+#
+# You should have received a copy of the MIT License along with *cloudguard*.
+# If not, see <http://opensource.org/licenses/MIT>.
+#
+import typing as ty
+import asyncio
+import logging
+import dataclasses as dc
+
+import httpx
+
+import cloudguard.typing as cgty
+
+from cloudguard.client import AsyncAPIClient
+from cloudguard.config import Config
+from cloudguard.region import CloudGuardRegion
+from cloudguard.credentials import APICredentials
+
+
+log = logging.getLogger(__name__)
+
+
+#: Default maximum number of requests run at once across all the targets.
+DEFAULT_MAX_CONCURRENCY: int = 10
+
+T = ty.TypeVar("T")
+
+
+@dc.dataclass(frozen=True)
+class Target(object):
+    """A CloudGuard tenant in a given region, to which requests are fanned
+    out.
+
+    """
+
+    #: Credentials used to authenticate against the tenant.
+    credentials: APICredentials
+    #: Region hosting the tenant.
+    region: CloudGuardRegion
+
+    def __post_init__(self):
+        """Resolve the region when given by its name."""
+        object.__setattr__(self, "region", Config(region=self.region).region)
+
+
+@dc.dataclass(frozen=True)
+class FanOutResult(ty.Generic[T]):
+    """Outcome of a fanned out call for one target."""
+
+    #: The target against which the call was made.
+    target: Target
+    #: Value returned by the call, if it succeeded.
+    result: ty.Optional[T] = None
+    #: Exception raised by the call, if it failed.
+    error: ty.Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        """Check whether the call succeeded."""
+        return self.error is None
+
+
+class FanOut(object):
+    """Run the same call against many CloudGuard tenants and regions at once.
+
+    One pooled :class:`~cloudguard.client.AsyncAPIClient` is opened per target
+    when entering the asynchronous context and closed when leaving it. A single
+    concurrency limit applies to all the calls made through the object. A
+    target given several times is only called once.
+
+
+    :param targets: The targets to which calls are fanned out, as
+                    :class:`~cloudguard.fanout.Target` objects or
+                    ``(credentials, region)`` pairs.
+    :type targets: ~typing.Iterable[~typing.Union[~cloudguard.fanout.Target, ~typing.Tuple[~cloudguard.credentials.APICredentials, ~cloudguard.typing.CloudGuardRegion]]]
+
+    :param config: Configuration from which the configuration of each target
+                   is derived. Loaded from the environment when not provided.
+    :type config: ~cloudguard.config.Config
+
+    :param max_concurrency: Maximum number of calls run at once.
+    :type max_concurrency: int
+
+    Any extra keyword argument is provided to the constructor of each client.
+
+    """
+
+    def __init__(
+        self,
+        targets: ty.Iterable[
+            ty.Union[Target, ty.Tuple[APICredentials, cgty.CloudGuardRegion]]
+        ],
+        config: ty.Optional[Config] = None,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        **kwargs,
+    ):
+        """Constructor for :class:`cloudguard.fanout.FanOut`."""
+        if max_concurrency < 1:
+            raise ValueError(
+                f"max_concurrency must be strictly positive, got: {max_concurrency}"
+            )
+
+        self.targets = list(
+            dict.fromkeys(t if isinstance(t, Target) else Target(*t) for t in targets)
+        )
+        self.config = config if config is not None else Config.load()
+        self.max_concurrency = max_concurrency
+        self.client_options = kwargs
+        self.clients: ty.Dict[Target, AsyncAPIClient] = {}
+        self._semaphore: ty.Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self) -> "FanOut":
+        """Open a client for each target."""
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        try:
+            for target in self.targets:
+                client = AsyncAPIClient(
+                    self.target_config(target), **self.client_options
+                )
+                self.clients[target] = await client.__aenter__()
+        except BaseException:
+            await self.aclose()
+            raise
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        """Close the client of each target."""
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Close the client of each target.
+
+
+        :return: ``None``
+
+        """
+        clients, self.clients = self.clients, {}
+        for client in clients.values():
+            await client.aclose()
+
+    def target_config(self, target: Target) -> Config:
+        """Build the configuration of a target from the base configuration.
+
+
+        :param target: The target for which to build the configuration.
+        :type target: ~cloudguard.fanout.Target
+
+
+        :return: The configuration of the target.
+        :rtype: ~cloudguard.config.Config
+
+        """
+        config = self.config.copy()
+        config.credentials.api = target.credentials
+        config.region = target.region
+
+        return config
+
+    async def run(
+        self, fn: ty.Callable[[AsyncAPIClient], ty.Awaitable[T]]
+    ) -> ty.AsyncIterator[FanOutResult[T]]:
+        """Call a coroutine function with the client of each target and yield
+        the results as soon as they are available. A failure against one target
+        does not stop the others; it is reported in the result instead.
+
+
+        :param fn: The coroutine function to call with each client.
+        :type fn: ~typing.Callable[[~cloudguard.client.AsyncAPIClient], ~typing.Awaitable]
+
+
+        :return: An asynchronous iterator over the results, in completion
+                 order.
+        :rtype: ~typing.AsyncIterator[~cloudguard.fanout.FanOutResult]
+
+
+        :raise RuntimeError: When the fan-out context was not entered.
+
+        """
+        if self._semaphore is None:
+            raise RuntimeError(
+                f"{self.__class__.__name__} must be used as an asynchronous"
+                " context manager"
+            )
+
+        async def call(target: Target, client: AsyncAPIClient) -> FanOutResult[T]:
+            async with self._semaphore:
+                try:
+                    return FanOutResult(target, result=await fn(client))
+                except Exception as e:
+                    log.debug(f"Call against {target} failed: {e!r}")
+                    return FanOutResult(target, error=e)
+
+        tasks = [
+            asyncio.ensure_future(call(target, client))
+            for target, client in self.clients.items()
+        ]
+        try:
+            for future in asyncio.as_completed(tasks):
+                yield await future
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def request(
+        self, method: str, url: ty.Union[httpx.URL, str], **kwargs
+    ) -> ty.AsyncIterator[FanOutResult[httpx.Response]]:
+        """Send the same request to every target and yield the responses as
+        soon as they are available. Any extra keyword argument is provided to
+        :meth:`~httpx.AsyncClient.request`.
+
+
+        :param method: HTTP method of the request.
+        :type method: str
+
+        :param url: URL of the request.
+        :type url: ~typing.Union[~httpx.URL, str]
+
+
+        :return: An asynchronous iterator over the responses, in completion
+                 order.
+        :rtype: ~typing.AsyncIterator[~cloudguard.fanout.FanOutResult]
+
+        """
+
+        async def send(client: AsyncAPIClient) -> httpx.Response:
+            return await client.request(method, url, **kwargs)
+
+        return self.run(send)
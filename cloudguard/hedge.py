@@ -0,0 +1,371 @@
+# cloudguard/hedge.py
+# ===================
+#
+# Copying
+# -------
+#
+# Copyright (c) 2023 cloudguard authors and contributors.
+#
+# This file is part of the *cloudguard* project.
+#
+# *cloudguard* is a free software project. You can redistribute it and/or
+# modify it following the terms of the MIT License.
+#
+# This software project is distributed *as is*, WITHOUT WARRANTY OF ANY KIND;
+# including but not limited to the WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE and NONINFRINGEMENT.
+#
+# You should have received a copy of the MIT License along with *cloudguard*.
+# If not, see <http://opensource.org/licenses/MIT>.
+#
+import time
+import typing as ty
+import asyncio
+import logging
+import threading
+import collections
+import dataclasses as dc
+import concurrent.futures
+
+import httpx
+
+
+log = logging.getLogger(__name__)
+
+
+#: Default latency percentile after which a request is hedged.
+DEFAULT_PERCENTILE: float = 95.0
+#: Default number of recent latencies from which the percentile is computed.
+DEFAULT_WINDOW: int = 200
+#: Default number of latencies to observe before hedging requests.
+DEFAULT_MIN_SAMPLES: int = 20
+#: Default minimum delay, in seconds, before a request is hedged.
+DEFAULT_MIN_DELAY: float = 0.01
+#: Default maximum ratio of hedged requests, bounding the extra load sent to a
+#: region which slows down as a whole.
+DEFAULT_MAX_RATIO: float = 0.1
+#: Default maximum number of threads sending the attempts of the synchronous
+#: transport.
+DEFAULT_MAX_WORKERS: int = 64
+
+#: Methods whose requests are idempotent and may be hedged.
+HEDGED_METHODS: ty.FrozenSet[str] = frozenset({"GET", "HEAD"})
+
+
+@dc.dataclass
+class HedgeStats(object):
+    """Counters describing the work done by the hedging layer."""
+
+    #: Number of requests which could be hedged.
+    requests: int = 0
+    #: Number of requests for which a second attempt was sent.
+    hedged: int = 0
+    #: Number of hedged requests answered by the second attempt first.
+    wins: int = 0
+    #: Lock protecting the counters when shared between threads.
+    _lock: threading.Lock = dc.field(
+        default_factory=threading.Lock, repr=False, compare=False
+    )
+
+    def add(self, **kwargs: int) -> None:
+        """Increment the given counters.
+
+
+        :return: ``None``
+
+        """
+        with self._lock:
+            for k, v in kwargs.items():
+                setattr(self, k, getattr(self, k) + v)
+
+
+class LatencyTracker(object):
+    """Track the latency of recent requests to derive the delay after which a
+    request is hedged.
+
+
+    :param percentile: Latency percentile after which a request is hedged.
+    :type percentile: float
+
+    :param window: Number of recent latencies from which the percentile is
+                   computed.
+    :type window: int
+
+    :param min_samples: Number of latencies to observe before hedging
+                        requests.
+    :type min_samples: int
+
+    :param min_delay: Minimum delay, in seconds, before a request is hedged.
+    :type min_delay: float
+
+    """
+
+    def __init__(
+        self,
+        percentile: float = DEFAULT_PERCENTILE,
+        window: int = DEFAULT_WINDOW,
+        min_samples: int = DEFAULT_MIN_SAMPLES,
+        min_delay: float = DEFAULT_MIN_DELAY,
+    ):
+        """Constructor for :class:`cloudguard.hedge.LatencyTracker`."""
+        if not 0 < percentile < 100:
+            raise ValueError(
+                f"expected percentile between 0 and 100, got: {percentile}"
+            )
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+
+        self._lock = threading.Lock()
+        self._samples: ty.Deque[float] = collections.deque(maxlen=window)
+        self._delay: ty.Optional[float] = None
+        # Number of samples observed since the delay was computed.
+        self._stale = 0
+
+    def observe(self, seconds: float) -> None:
+        """Record the latency of a request.
+
+
+        :param seconds: The latency, in seconds.
+        :type seconds: float
+
+
+        :return: ``None``
+
+        """
+        with self._lock:
+            self._samples.append(seconds)
+            self._stale += 1
+
+    def delay(self) -> ty.Optional[float]:
+        """Get the delay after which a request is hedged.
+
+
+        :return: The delay, in seconds, or ``None`` until enough latencies were
+                 observed.
+        :rtype: float
+
+        """
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            # The percentile is only computed again every few samples.
+            if self._delay is None or self._stale >= self.min_samples // 2:
+                samples = sorted(self._samples)
+                index = min(len(samples) - 1, int(len(samples) * self.percentile / 100))
+                self._delay = max(self.min_delay, samples[index])
+                self._stale = 0
+            return self._delay
+
+
+def _clone(request: httpx.Request) -> httpx.Request:
+    """Copy a request without a body, to send it a second time."""
+    return httpx.Request(
+        request.method,
+        request.url,
+        headers=request.headers,
+        extensions=dict(request.extensions),
+    )
+
+
+class _HedgeTransportMixin(object):
+    """Behaviour shared by the synchronous and asynchronous hedging
+    transports.
+
+    """
+
+    def __init__(
+        self,
+        transport: ty.Union[httpx.BaseTransport, httpx.AsyncBaseTransport],
+        tracker: ty.Optional[LatencyTracker] = None,
+        max_ratio: float = DEFAULT_MAX_RATIO,
+    ):
+        self.transport = transport
+        self.tracker = tracker or LatencyTracker()
+        self.max_ratio = max_ratio
+        self.stats = HedgeStats()
+
+    def _delay(self, request: httpx.Request) -> ty.Optional[float]:
+        """Get the delay after which to hedge a request or ``None`` if it is not
+        to be hedged.
+
+        """
+        if request.method not in HEDGED_METHODS:
+            return None
+        self.stats.add(requests=1)
+        return self.tracker.delay()
+
+    def _may_hedge(self) -> bool:
+        """Check whether the budget of hedged requests allows another one."""
+        stats = self.stats
+        return stats.hedged < stats.requests * self.max_ratio + 1
+
+
+class HedgeTransport(_HedgeTransportMixin, httpx.BaseTransport):
+    """Transport wrapper sending a second attempt of an idempotent request once
+    it has been pending longer than a latency percentile of the recent
+    requests, then keeping whichever attempt answers first.
+
+    A request is sent from the calling thread unless a second attempt may be
+    sent, i.e. once enough latencies are known and while the budget of hedged
+    requests allows it. As an attempt in flight cannot be interrupted, the
+    attempts of such a request are then sent from a pool of threads, so that
+    the first answer can be returned.
+
+
+    :param transport: The transport actually sending the requests.
+    :type transport: ~httpx.BaseTransport
+
+    :param tracker: Tracker of the latency of the requests.
+    :type tracker: ~cloudguard.hedge.LatencyTracker
+
+    :param max_ratio: Maximum ratio of hedged requests.
+    :type max_ratio: float
+
+    :param max_workers: Maximum number of threads sending the attempts.
+    :type max_workers: int
+
+    """
+
+    def __init__(
+        self,
+        transport: httpx.BaseTransport,
+        tracker: ty.Optional[LatencyTracker] = None,
+        max_ratio: float = DEFAULT_MAX_RATIO,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+    ):
+        """Constructor for :class:`cloudguard.hedge.HedgeTransport`."""
+        super().__init__(transport, tracker, max_ratio)
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers, thread_name_prefix="cloudguard-hedge"
+        )
+
+    def _send(self, request: httpx.Request) -> httpx.Response:
+        """Send an attempt and record its latency."""
+        start = time.monotonic()
+        response = self.transport.handle_request(request)
+        self.tracker.observe(time.monotonic() - start)
+        return response
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        """Send a request, hedging it when it takes too long."""
+        if (delay := self._delay(request)) is None:
+            if request.method in HEDGED_METHODS:
+                return self._send(request)
+            return self.transport.handle_request(request)
+        if not self._may_hedge():
+            return self._send(request)
+
+        second = _clone(request)
+        primary = self._executor.submit(self._send, request)
+        done, _ = concurrent.futures.wait([primary], timeout=delay)
+        if done or not self._may_hedge():
+            return primary.result()
+
+        self.stats.add(hedged=1)
+        hedge = self._executor.submit(self._send, second)
+        done, pending = concurrent.futures.wait(
+            (primary, hedge), return_when=concurrent.futures.FIRST_COMPLETED
+        )
+        winner = next((f for f in done if f.exception() is None), None)
+        if winner is None and pending:
+            # The first attempt failed, the other one is awaited.
+            winner = pending.pop()
+        if winner is None or winner.exception() is not None:
+            raise primary.exception() or hedge.exception()
+
+        for future in (primary, hedge):
+            if future is not winner:
+                future.add_done_callback(_close_response)
+        if winner is hedge:
+            self.stats.add(wins=1)
+        return winner.result()
+
+    def close(self) -> None:
+        """Close the underlying transport."""
+        self._executor.shutdown(wait=False)
+        self.transport.close()
+
+
+def _close_response(future: concurrent.futures.Future) -> None:
+    """Close the response of an attempt which lost the race."""
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+def _aclose_response(task: asyncio.Future) -> None:
+    """Close the response of an attempt which lost the race."""
+    if not task.cancelled() and task.exception() is None:
+        asyncio.ensure_future(task.result().aclose())
+
+
+class AsyncHedgeTransport(_HedgeTransportMixin, httpx.AsyncBaseTransport):
+    """Asynchronous transport wrapper sending a second attempt of an idempotent
+    request once it has been pending longer than a latency percentile of the
+    recent requests, then keeping whichever attempt answers first. The other
+    attempt is cancelled.
+
+
+    :param transport: The transport actually sending the requests.
+    :type transport: ~httpx.AsyncBaseTransport
+
+    :param tracker: Tracker of the latency of the requests.
+    :type tracker: ~cloudguard.hedge.LatencyTracker
+
+    :param max_ratio: Maximum ratio of hedged requests.
+    :type max_ratio: float
+
+    """
+
+    async def _send(self, request: httpx.Request) -> httpx.Response:
+        """Send an attempt and record its latency."""
+        start = time.monotonic()
+        response = await self.transport.handle_async_request(request)
+        self.tracker.observe(time.monotonic() - start)
+        return response
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """Send a request, hedging it when it takes too long."""
+        if (delay := self._delay(request)) is None:
+            if request.method in HEDGED_METHODS:
+                return await self._send(request)
+            return await self.transport.handle_async_request(request)
+        if not self._may_hedge():
+            return await self._send(request)
+
+        second = _clone(request)
+        primary = asyncio.ensure_future(self._send(request))
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done or not self._may_hedge():
+                response = await primary
+                tasks.remove(primary)
+                return response
+
+            self.stats.add(hedged=1)
+            hedge = asyncio.ensure_future(self._send(second))
+            tasks.append(hedge)
+            done, pending = await asyncio.wait(
+                tasks, return_when=asyncio.FIRST_COMPLETED
+            )
+            winner = next((t for t in done if t.exception() is None), None)
+            if winner is None and pending:
+                # The first attempt failed, the other one is awaited.
+                winner = pending.pop()
+                await asyncio.wait([winner])
+            if winner is None or winner.exception() is not None:
+                raise primary.exception() or hedge.exception()
+
+            tasks.remove(winner)
+            if winner is hedge:
+                self.stats.add(wins=1)
+            return winner.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+                task.add_done_callback(_aclose_response)
+
+    async def aclose(self) -> None:
+        """Close the underlying transport."""
+        await self.transport.aclose()
@@ -0,0 +1,615 @@
+# cloudguard/metrics.py
+# =====================
+#
+# Copying
+# -------
+#
+# Copyright (c) 2023 cloudguard authors and contributors.
+#
+# This file is part of the *cloudguard* project.
+#
+# *cloudguard* is a free software project. You can redistribute it and/or
+# modify it following the terms of the MIT License.
+#
+# This software project is distributed *as is*, WITHOUT WARRANTY OF ANY KIND;
+# including but not limited to the WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE and NONINFRINGEMENT.
+#
+# You should have received a copy of the MIT License along with *cloudguard*.
+# If not, see <http://opensource.org/licenses/MIT>.
+#
+import re
+import time
+import bisect
+import typing as ty
+import logging
+import threading
+import collections
+import dataclasses as dc
+
+import httpx
+
+
+log = logging.getLogger(__name__)
+
+
+#: Default upper bounds, in seconds, of the buckets of the time histograms.
+DEFAULT_BUCKETS: ty.Tuple[float, ...] = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+#: Path segments identifying a resource rather than an endpoint: numbers, UUIDs
+#: and long hexadecimal strings.
+_ID_SEGMENT = re.compile(
+    r"^(?:\d+|[0-9a-fA-F]{16,}"
+    r"|[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12})$"
+)
+#: Request extension marking a request which already went through the
+#: instrumentation layer, i.e. which is being retried.
+_SEEN_EXTENSION = "cloudguard.metrics"
+#: Suffixes of the :mod:`httpcore` trace events sent once a connection was
+#: taken from the pool.
+_POOL_ACQUIRED_EVENTS = ("connect_tcp.started", "send_request_headers.started")
+
+
+def endpoint_name(request: httpx.Request) -> str:
+    """Name the endpoint targeted by a request. Path segments identifying a
+    resource are replaced by ``{id}`` so that the requests to the same endpoint
+    are grouped together, e.g. ``GET /v2/CloudAccounts/{id}``.
+
+
+    :param request: The request for which to name the endpoint.
+    :type request: ~httpx.Request
+
+
+    :return: The name of the endpoint.
+    :rtype: str
+
+    """
+    path = "/".join(
+        "{id}" if _ID_SEGMENT.match(s) else s for s in request.url.path.split("/")
+    )
+    return f"{request.method} {path}"
+
+
+@dc.dataclass(frozen=True)
+class RequestEvent(object):
+    """Measurements of a single request sent over the network. Each attempt of
+    a retried request is a distinct event.
+
+    """
+
+    #: HTTP method of the request.
+    method: str
+    #: Name of the endpoint, as returned by
+    #: :func:`~cloudguard.metrics.endpoint_name`.
+    endpoint: str
+    #: Code of the region the request was sent to.
+    region: str
+    #: Status code of the response, ``None`` when the request failed.
+    status_code: ty.Optional[int]
+    #: Time, in seconds, from sending the request to closing the response.
+    elapsed: float
+    #: Time, in seconds, spent waiting for a connection from the pool. ``None``
+    #: when the transport does not report it.
+    pool_wait: ty.Optional[float]
+    #: Size, in bytes, of the request body.
+    bytes_sent: int
+    #: Size, in bytes, of the response body as received on the wire.
+    bytes_received: int
+    #: Whether the request is a retry of a previous attempt.
+    retry: bool = False
+    #: Name of the exception raised while sending the request, if any.
+    error: ty.Optional[str] = None
+
+
+#: Type definition of a sink: a callable receiving every request event.
+Sink = ty.Callable[[RequestEvent], None]
+
+
+class Histogram(object):
+    """Cumulative histogram of observed values.
+
+
+    :param buckets: The sorted upper bounds of the buckets.
+    :type buckets: ~typing.Sequence[float]
+
+    """
+
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets: ty.Sequence[float] = DEFAULT_BUCKETS):
+        """Constructor for :class:`cloudguard.metrics.Histogram`."""
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """Add a value to the histogram.
+
+
+        :param value: The observed value.
+        :type value: float
+
+
+        :return: ``None``
+
+        """
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def asdict(self) -> ty.Dict[str, ty.Any]:
+        """Get a snapshot of the histogram. Bucket counts are cumulative and
+        keyed by their upper bound, the last one being ``"+Inf"``.
+
+
+        :return: A dictionary of the histogram.
+        :rtype: ~typing.Dict[str, ~typing.Any]
+
+        """
+        buckets, total = {}, 0
+        for bound, count in zip((*map(str, self.buckets), "+Inf"), self.counts):
+            total += count
+            buckets[bound] = total
+
+        return {"buckets": buckets, "count": self.count, "sum": self.sum}
+
+
+class EndpointStats(object):
+    """Aggregated measurements of the requests to an endpoint in a region.
+
+
+    :param buckets: The upper bounds of the buckets of the time histograms.
+    :type buckets: ~typing.Sequence[float]
+
+    """
+
+    __slots__ = (
+        "requests",
+        "retries",
+        "errors",
+        "statuses",
+        "bytes_sent",
+        "bytes_received",
+        "latency",
+        "pool_wait",
+    )
+
+    def __init__(self, buckets: ty.Sequence[float] = DEFAULT_BUCKETS):
+        """Constructor for :class:`cloudguard.metrics.EndpointStats`."""
+        self.requests = 0
+        self.retries = 0
+        self.errors = 0
+        self.statuses: ty.Counter[int] = collections.Counter()
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.latency = Histogram(buckets)
+        self.pool_wait = Histogram(buckets)
+
+    def add(self, event: RequestEvent) -> None:
+        """Account for a request event.
+
+
+        :param event: The event to account for.
+        :type event: ~cloudguard.metrics.RequestEvent
+
+
+        :return: ``None``
+
+        """
+        self.requests += 1
+        self.retries += event.retry
+        if event.error is not None:
+            self.errors += 1
+        if event.status_code is not None:
+            self.statuses[event.status_code] += 1
+        self.bytes_sent += event.bytes_sent
+        self.bytes_received += event.bytes_received
+        self.latency.observe(event.elapsed)
+        if event.pool_wait is not None:
+            self.pool_wait.observe(event.pool_wait)
+
+    def asdict(self) -> ty.Dict[str, ty.Any]:
+        """Get a snapshot of the measurements.
+
+
+        :return: A dictionary of the measurements.
+        :rtype: ~typing.Dict[str, ~typing.Any]
+
+        """
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "errors": self.errors,
+            "statuses": dict(self.statuses),
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "latency": self.latency.asdict(),
+            "pool_wait": self.pool_wait.asdict(),
+        }
+
+
+class Metrics(object):
+    """Collect measurements of the requests sent by the CloudGuard clients,
+    aggregated by endpoint and region. Each event is also forwarded to the
+    registered sinks, e.g. to feed Prometheus or OpenTelemetry instruments.
+
+    A sink is a callable receiving each :class:`~cloudguard.metrics.RequestEvent`.
+    It is called from the thread, or the event loop, which sent the request and
+    must therefore be fast and thread-safe. Exceptions raised by a sink are
+    logged and ignored.
+
+
+    :param buckets: The upper bounds, in seconds, of the buckets of the time
+                    histograms.
+    :type buckets: ~typing.Sequence[float]
+
+    :param sinks: The callables to which the events are forwarded.
+    :type sinks: ~typing.Iterable[~typing.Callable[[~cloudguard.metrics.RequestEvent], None]]
+
+    """
+
+    def __init__(
+        self,
+        buckets: ty.Sequence[float] = DEFAULT_BUCKETS,
+        sinks: ty.Iterable[Sink] = (),
+    ):
+        """Constructor for :class:`cloudguard.metrics.Metrics`."""
+        if list(buckets) != sorted(buckets):
+            raise ValueError(f"expected sorted buckets, got: {buckets}")
+
+        self.buckets = tuple(buckets)
+        self.sinks: ty.List[Sink] = list(sinks)
+        self._endpoints: ty.Dict[ty.Tuple[str, str], EndpointStats] = {}
+        self._lock = threading.Lock()
+
+    def add_sink(self, sink: Sink) -> None:
+        """Register a sink to which the events are forwarded.
+
+
+        :param sink: The callable receiving the events.
+        :type sink: ~typing.Callable[[~cloudguard.metrics.RequestEvent], None]
+
+
+        :return: ``None``
+
+        """
+        self.sinks.append(sink)
+
+    def remove_sink(self, sink: Sink) -> None:
+        """Unregister a sink.
+
+
+        :param sink: The callable to unregister.
+        :type sink: ~typing.Callable[[~cloudguard.metrics.RequestEvent], None]
+
+
+        :return: ``None``
+
+
+        :raise ValueError: When the sink was not registered.
+
+        """
+        self.sinks.remove(sink)
+
+    def record(self, event: RequestEvent) -> None:
+        """Account for a request event and forward it to the sinks.
+
+
+        :param event: The event to record.
+        :type event: ~cloudguard.metrics.RequestEvent
+
+
+        :return: ``None``
+
+        """
+        key = (event.endpoint, event.region)
+        with self._lock:
+            try:
+                stats = self._endpoints[key]
+            except KeyError:
+                stats = self._endpoints[key] = EndpointStats(self.buckets)
+            stats.add(event)
+
+        for sink in self.sinks:
+            try:
+                sink(event)
+            except Exception as e:
+                log.warning(f"Metrics sink {sink!r} failed: {e!r}")
+
+    def reset(self) -> None:
+        """Discard the aggregated measurements.
+
+
+        :return: ``None``
+
+        """
+        with self._lock:
+            self._endpoints.clear()
+
+    def snapshot(self) -> ty.Dict[str, ty.Any]:
+        """Get a snapshot of the aggregated measurements.
+
+
+        :return: A dictionary holding the measurements of each endpoint and
+                 region under ``"endpoints"``, and their sum under ``"total"``.
+        :rtype: ~typing.Dict[str, ~typing.Any]
+
+        """
+        with self._lock:
+            endpoints = [
+                {"endpoint": endpoint, "region": region, **stats.asdict()}
+                for (endpoint, region), stats in sorted(self._endpoints.items())
+            ]
+
+        total = {
+            k: sum(e[k] for e in endpoints)
+            for k in ("requests", "retries", "errors", "bytes_sent", "bytes_received")
+        }
+        statuses = collections.Counter()
+        for e in endpoints:
+            statuses.update(e["statuses"])
+        total["statuses"] = dict(statuses)
+
+        return {"endpoints": endpoints, "total": total}
+
+
+class _Measure(object):
+    """Measurements of a request in flight."""
+
+    __slots__ = ("start", "pool_wait", "bytes_received", "recorded")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.pool_wait: ty.Optional[float] = None
+        self.bytes_received = 0
+        self.recorded = False
+
+    def on_trace(self, name: str) -> None:
+        """Time the wait for a connection from an :mod:`httpcore` trace event."""
+        if self.pool_wait is None and name.endswith(_POOL_ACQUIRED_EVENTS):
+            self.pool_wait = time.perf_counter() - self.start
+
+
+def _restore_trace(request: httpx.Request, trace: ty.Optional[ty.Callable]) -> None:
+    """Give back the trace callback of a request its original value."""
+    if trace is None:
+        request.extensions.pop("trace", None)
+    else:
+        request.extensions["trace"] = trace
+
+
+class _MetricsTransportMixin(object):
+    """Behaviour shared by the synchronous and asynchronous instrumented
+    transports.
+
+    """
+
+    def __init__(
+        self,
+        transport: ty.Union[httpx.BaseTransport, httpx.AsyncBaseTransport],
+        metrics: Metrics,
+        region: str,
+        endpoint: ty.Callable[[httpx.Request], str] = endpoint_name,
+    ):
+        self.transport = transport
+        self.metrics = metrics
+        self.region = region
+        self.endpoint = endpoint
+
+    def _begin(self, request: httpx.Request) -> ty.Tuple[_Measure, bool]:
+        """Start measuring a request."""
+        retry = request.extensions.get(_SEEN_EXTENSION, False)
+        request.extensions[_SEEN_EXTENSION] = True
+        return _Measure(), retry
+
+    def _record(
+        self,
+        request: httpx.Request,
+        measure: _Measure,
+        retry: bool,
+        status_code: ty.Optional[int] = None,
+        error: ty.Optional[BaseException] = None,
+    ) -> None:
+        """Record the event of a finished request."""
+        if measure.recorded:
+            return
+        measure.recorded = True
+        self.metrics.record(
+            RequestEvent(
+                method=request.method,
+                endpoint=self.endpoint(request),
+                region=self.region,
+                status_code=status_code,
+                elapsed=time.perf_counter() - measure.start,
+                pool_wait=measure.pool_wait,
+                bytes_sent=int(request.headers.get("Content-Length") or 0),
+                bytes_received=measure.bytes_received,
+                retry=retry,
+                error=None if error is None else error.__class__.__name__,
+            )
+        )
+
+
+class _MeteredStream(httpx.SyncByteStream):
+    """Response stream counting the received bytes and recording the event of
+    the request once closed.
+
+    """
+
+    def __init__(
+        self,
+        stream: httpx.SyncByteStream,
+        close: ty.Callable[[ty.Optional[BaseException]], None],
+        measure: _Measure,
+    ):
+        self.stream = stream
+        self.measure = measure
+        self._close = close
+        self._error: ty.Optional[BaseException] = None
+
+    def __iter__(self) -> ty.Iterator[bytes]:
+        try:
+            for chunk in self.stream:
+                self.measure.bytes_received += len(chunk)
+                yield chunk
+        except Exception as e:
+            self._error = e
+            raise
+
+    def close(self) -> None:
+        try:
+            self.stream.close()
+        finally:
+            self._close(self._error)
+
+
+class _AsyncMeteredStream(httpx.AsyncByteStream):
+    """Asynchronous response stream counting the received bytes and recording
+    the event of the request once closed.
+
+    """
+
+    def __init__(
+        self,
+        stream: httpx.AsyncByteStream,
+        close: ty.Callable[[ty.Optional[BaseException]], None],
+        measure: _Measure,
+    ):
+        self.stream = stream
+        self.measure = measure
+        self._close = close
+        self._error: ty.Optional[BaseException] = None
+
+    async def __aiter__(self) -> ty.AsyncIterator[bytes]:
+        try:
+            async for chunk in self.stream:
+                self.measure.bytes_received += len(chunk)
+                yield chunk
+        except Exception as e:
+            self._error = e
+            raise
+
+    async def aclose(self) -> None:
+        try:
+            await self.stream.aclose()
+        finally:
+            self._close(self._error)
+
+
+class MetricsTransport(_MetricsTransportMixin, httpx.BaseTransport):
+    """Transport wrapper measuring each request sent over the network. An event
+    is recorded once the response is closed.
+
+
+    :param transport: The transport actually sending the requests.
+    :type transport: ~httpx.BaseTransport
+
+    :param metrics: The collector of the measurements.
+    :type metrics: ~cloudguard.metrics.Metrics
+
+    :param region: Code of the region the requests are sent to.
+    :type region: str
+
+    :param endpoint: Callable naming the endpoint of a request.
+    :type endpoint: ~typing.Callable[[~httpx.Request], str]
+
+    """
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        """Send a request, measuring it."""
+        measure, retry = self._begin(request)
+        trace = request.extensions.get("trace")
+
+        def on_trace(name: str, info: ty.Dict[str, ty.Any]) -> None:
+            measure.on_trace(name)
+            if trace is not None:
+                trace(name, info)
+
+        request.extensions["trace"] = on_trace
+        try:
+            response = self.transport.handle_request(request)
+        except Exception as e:
+            self._record(request, measure, retry, error=e)
+            raise
+        finally:
+            _restore_trace(request, trace)
+
+        def close(error: ty.Optional[BaseException]) -> None:
+            self._record(request, measure, retry, response.status_code, error)
+
+        return httpx.Response(
+            response.status_code,
+            headers=response.headers,
+            stream=_MeteredStream(response.stream, close, measure),
+            extensions=response.extensions,
+        )
+
+    def close(self) -> None:
+        """Close the underlying transport."""
+        self.transport.close()
+
+
+class AsyncMetricsTransport(_MetricsTransportMixin, httpx.AsyncBaseTransport):
+    """Asynchronous transport wrapper measuring each request sent over the
+    network. An event is recorded once the response is closed.
+
+
+    :param transport: The transport actually sending the requests.
+    :type transport: ~httpx.AsyncBaseTransport
+
+    :param metrics: The collector of the measurements.
+    :type metrics: ~cloudguard.metrics.Metrics
+
+    :param region: Code of the region the requests are sent to.
+    :type region: str
+
+    :param endpoint: Callable naming the endpoint of a request.
+    :type endpoint: ~typing.Callable[[~httpx.Request], str]
+
+    """
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """Send a request, measuring it."""
+        measure, retry = self._begin(request)
+        trace = request.extensions.get("trace")
+
+        async def on_trace(name: str, info: ty.Dict[str, ty.Any]) -> None:
+            measure.on_trace(name)
+            if trace is not None:
+                await trace(name, info)
+
+        request.extensions["trace"] = on_trace
+        try:
+            response = await self.transport.handle_async_request(request)
+        except Exception as e:
+            self._record(request, measure, retry, error=e)
+            raise
+        finally:
+            _restore_trace(request, trace)
+
+        def close(error: ty.Optional[BaseException]) -> None:
+            self._record(request, measure, retry, response.status_code, error)
+
+        return httpx.Response(
+            response.status_code,
+            headers=response.headers,
+            stream=_AsyncMeteredStream(response.stream, close, measure),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self) -> None:
+        """Close the underlying transport."""
+        await self.transport.aclose()
@@ -0,0 +1,239 @@
+# cloudguard/models.py
+# ====================
+#
+# Copying
+# -------
+#
+# Copyright (c) 2023 cloudguard authors and contributors.
+#
+# This file is part of the *cloudguard* project.
+#
+# *cloudguard* is a free software project. You can redistribute it and/or
+# modify it following the terms of the MIT License.
+#
+# This software project is distributed *as is*, WITHOUT WARRANTY OF ANY KIND;
+# including but not limited to the WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE and NONINFRINGEMENT.
+#
+# You should have received a copy of the MIT License along with *cloudguard*.
+# If not, see <http://opensource.org/licenses/MIT>.
+#
+import sys
+import typing as ty
+import dataclasses as dc
+
+
+T = ty.TypeVar("T", bound="Model")
+
+
+def _camel(name: str) -> str:
+    """Convert a snake case name to camel case."""
+    head, *tail = name.split("_")
+    return head + "".join(part.title() for part in tail)
+
+
+class Model(object):
+    """Base of the compact models of the CloudGuard resources.
+
+    Models are frozen dataclasses storing their fields in ``__slots__`` rather
+    than in a dictionary. Each field is read from the JSON key of the same name
+    in camel case, unless overridden in ``_keys``. The strings of the fields
+    listed in ``_interned``, which are shared by many resources, are interned
+    so that a single copy is held in memory. Keys of the JSON objects which are
+    not fields are dropped.
+
+    """
+
+    __slots__ = ()
+
+    #: JSON keys of the fields, by field name, when not the camel case name of
+    #: the field.
+    _keys: ty.ClassVar[ty.Dict[str, str]] = {}
+    #: Fields whose strings are interned.
+    _interned: ty.ClassVar[ty.FrozenSet[str]] = frozenset()
+    #: Index of the field and whether to intern it, by JSON key.
+    _lookup: ty.ClassVar[ty.Dict[str, ty.Tuple[int, bool]]] = {}
+    #: Setters of the fields, in the order of the slots. They bypass the
+    #: frozen dataclass checks when building a model from a JSON object.
+    _setters: ty.ClassVar[ty.Tuple[ty.Callable[[ty.Any, ty.Any], None], ...]] = ()
+
+    def __init_subclass__(cls, **kwargs):
+        """Index the fields of a model."""
+        super().__init_subclass__(**kwargs)
+        # The dataclass decorator replaces the class by a slotted one, which is
+        # the one indexed.
+        if "__slots__" not in cls.__dict__:
+            return
+
+        unknown = (set(cls._keys) | cls._interned) - set(cls.__slots__)
+        if unknown:
+            raise TypeError(f"{cls.__name__} has no field: {', '.join(unknown)}")
+
+        cls._lookup = {
+            cls._keys.get(name, _camel(name)): (i, name in cls._interned)
+            for i, name in enumerate(cls.__slots__)
+        }
+        cls._setters = tuple(getattr(cls, name).__set__ for name in cls.__slots__)
+
+    @classmethod
+    def from_dict(cls: ty.Type[T], data: ty.Mapping[str, ty.Any]) -> T:
+        """Build a model from a decoded JSON object.
+
+
+        :param data: The decoded JSON object.
+        :type data: ~typing.Mapping[str, ~typing.Any]
+
+
+        :return: The model.
+        :rtype: ~cloudguard.models.Model
+
+        """
+        lookup = cls._lookup
+        values = [None] * len(cls._setters)
+        for key, value in data.items():
+            if (entry := lookup.get(key)) is None:
+                continue
+            index, intern = entry
+            if intern and value.__class__ is str:
+                value = sys.intern(value)
+            values[index] = value
+
+        self = object.__new__(cls)
+        for setter, value in zip(cls._setters, values):
+            setter(self, value)
+        return self
+
+    @classmethod
+    def from_list(
+        cls: ty.Type[T], data: ty.Iterable[ty.Mapping[str, ty.Any]]
+    ) -> ty.List[T]:
+        """Build models from decoded JSON objects.
+
+
+        :param data: The decoded JSON objects.
+        :type data: ~typing.Iterable[~typing.Mapping[str, ~typing.Any]]
+
+
+        :return: The models.
+        :rtype: ~typing.List[~cloudguard.models.Model]
+
+        """
+        from_dict = cls.from_dict
+        return [from_dict(x) for x in data]
+
+    def to_dict(self) -> ty.Dict[str, ty.Any]:
+        """Convert the model back to a JSON object. Unset fields are left out.
+
+
+        :return: The JSON object.
+        :rtype: ~typing.Dict[str, ~typing.Any]
+
+        """
+        return {
+            key: value
+            for key, (index, _) in self._lookup.items()
+            if (value := getattr(self, self.__slots__[index])) is not None
+        }
+
+
+@dc.dataclass(slots=True, frozen=True)
+class Finding(Model):
+    """A compliance finding, as returned by the findings search."""
+
+    _interned: ty.ClassVar[ty.FrozenSet[str]] = frozenset(
+        {
+            "cloud_account_id",
+            "cloud_account_type",
+            "cloud_account_external_id",
+            "bundle_name",
+            "rule_id",
+            "rule_name",
+            "severity",
+            "region",
+            "entity_type",
+            "description",
+            "remediation",
+            "status",
+            "category",
+            "origin",
+            "action",
+        }
+    )
+
+    id: ty.Optional[str] = None
+    finding_key: ty.Optional[str] = None
+    created_time: ty.Optional[str] = None
+    updated_time: ty.Optional[str] = None
+    last_seen_time: ty.Optional[str] = None
+    cloud_account_id: ty.Optional[str] = None
+    cloud_account_type: ty.Optional[str] = None
+    cloud_account_external_id: ty.Optional[str] = None
+    bundle_id: ty.Optional[int] = None
+    bundle_name: ty.Optional[str] = None
+    rule_id: ty.Optional[str] = None
+    rule_name: ty.Optional[str] = None
+    severity: ty.Optional[str] = None
+    region: ty.Optional[str] = None
+    entity_type: ty.Optional[str] = None
+    entity_name: ty.Optional[str] = None
+    entity_external_id: ty.Optional[str] = None
+    entity_dome9_id: ty.Optional[str] = None
+    description: ty.Optional[str] = None
+    remediation: ty.Optional[str] = None
+    acknowledged: ty.Optional[bool] = None
+    is_excluded: ty.Optional[bool] = None
+    status: ty.Optional[str] = None
+    category: ty.Optional[str] = None
+    origin: ty.Optional[str] = None
+    action: ty.Optional[str] = None
+    labels: ty.Optional[ty.List[str]] = None
+
+
+@dc.dataclass(slots=True, frozen=True)
+class ProtectedAsset(Model):
+    """An asset protected by CloudGuard."""
+
+    _interned: ty.ClassVar[ty.FrozenSet[str]] = frozenset(
+        {
+            "type",
+            "region",
+            "cloud_account_id",
+            "external_cloud_account_id",
+            "platform",
+            "network",
+        }
+    )
+
+    id: ty.Optional[str] = None
+    entity_id: ty.Optional[str] = None
+    name: ty.Optional[str] = None
+    type: ty.Optional[str] = None
+    region: ty.Optional[str] = None
+    cloud_account_id: ty.Optional[str] = None
+    external_cloud_account_id: ty.Optional[str] = None
+    platform: ty.Optional[str] = None
+    network: ty.Optional[str] = None
+    tags: ty.Optional[ty.List[ty.Dict[str, str]]] = None
+
+
+@dc.dataclass(slots=True, frozen=True)
+class CloudAccount(Model):
+    """A cloud account onboarded to CloudGuard."""
+
+    _interned: ty.ClassVar[ty.FrozenSet[str]] = frozenset(
+        {
+            "vendor",
+            "organizational_unit_id",
+            "organizational_unit_path",
+            "organizational_unit_name",
+        }
+    )
+
+    id: ty.Optional[str] = None
+    vendor: ty.Optional[str] = None
+    name: ty.Optional[str] = None
+    external_account_number: ty.Optional[str] = None
+    creation_date: ty.Optional[str] = None
+    organizational_unit_id: ty.Optional[str] = None
+    organizational_unit_path: ty.Optional[str] = None
+    organizational_unit_name: ty.Optional[str] = None
@@ -0,0 +1,226 @@
+# cloudguard/offload.py
+# =====================
+#
+# Copying
+# -------
+#
+# Copyright (c) 2023 cloudguard authors and contributors.
+#
+# This file is part of the *cloudguard* project.
+#
+# *cloudguard* is a free software project. You can redistribute it and/or
+# modify it following the terms of the MIT License.
+#
+# This software project is distributed *as is*, WITHOUT WARRANTY OF ANY KIND;
+# including but not limited to the WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE and NONINFRINGEMENT.
+#
+# You should have received a copy of the MIT License along with *cloudguard*.
+# If not, see <http://opensource.org/licenses/MIT>.
+#
+import json
+import typing as ty
+import asyncio
+import logging
+import functools
+import concurrent.futures
+
+import httpx
+
+
+log = logging.getLogger(__name__)
+
+
+#: Default size, in bytes, below which a body is decoded in the event loop.
+DEFAULT_MIN_SIZE: int = 64 * 1024
+#: Default size, in bytes, from which a body is handed to worker processes
+#: through shared memory rather than through their pipe.
+DEFAULT_SHARED_MEMORY_SIZE: int = 1024 * 1024
+
+#: Type definition of a transform applied to a decoded body.
+Transform = ty.Callable[[ty.Any], ty.Any]
+
+
+def _decode(content: bytes, transform: ty.Optional[Transform] = None) -> ty.Any:
+    """Decode a JSON body and apply a transform to it."""
+    payload = json.loads(content)
+    return payload if transform is None else transform(payload)
+
+
+def _decode_shared(
+    name: str, size: int, transform: ty.Optional[Transform] = None
+) -> ty.Any:
+    """Decode a JSON body held in shared memory and apply a transform to it."""
+    from multiprocessing import shared_memory
+
+    try:
+        memory = shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Segments cannot be left untracked before Python 3.13.
+        memory = shared_memory.SharedMemory(name=name)
+    try:
+        content = bytes(memory.buf[:size])
+    finally:
+        memory.close()
+    return _decode(content, transform)
+
+
+def _release(memory) -> None:
+    """Close and remove a shared memory segment."""
+    memory.close()
+    memory.unlink()
+
+
+class Offloader(object):
+    """Hand the decoding of large response bodies, and the transforms applied
+    to them, to a pool of workers so that the event loop stays responsive.
+
+    With a process pool, the work is spread over several cores. The bodies are
+    sent to the workers as bytes, through shared memory when large, rather
+    than as decoded objects. Transforms must then be picklable, e.g. functions
+    defined at module level, and should reduce the decoded body as their
+    result is sent back to the event loop.
+
+
+    :param executor: Pool of workers to which the work is handed. A pool is
+                     created and owned by the offloader when not provided.
+    :type executor: ~concurrent.futures.Executor
+
+    :param processes: Whether the pool created by the offloader is a process
+                      pool rather than a thread pool.
+    :type processes: bool
+
+    :param max_workers: Number of workers of the pool created by the
+                        offloader.
+    :type max_workers: int
+
+    :param min_size: Size, in bytes, below which a body is decoded in the
+                     event loop, its decoding costing less than handing it to a
+                     worker.
+    :type min_size: int
+
+    :param shared_memory_size: Size, in bytes, from which a body is handed to
+                               worker processes through shared memory.
+    :type shared_memory_size: int
+
+    """
+
+    def __init__(
+        self,
+        executor: ty.Optional[concurrent.futures.Executor] = None,
+        processes: bool = True,
+        max_workers: ty.Optional[int] = None,
+        min_size: int = DEFAULT_MIN_SIZE,
+        shared_memory_size: int = DEFAULT_SHARED_MEMORY_SIZE,
+    ):
+        """Constructor for :class:`cloudguard.offload.Offloader`."""
+        self._owned = executor is None
+        if executor is None:
+            executor = (
+                concurrent.futures.ProcessPoolExecutor(max_workers)
+                if processes
+                else concurrent.futures.ThreadPoolExecutor(max_workers)
+            )
+        self.executor = executor
+        self.min_size = min_size
+        self.shared_memory_size = shared_memory_size
+
+    def __enter__(self) -> "Offloader":
+        """Enter the offloader's context."""
+        return self
+
+    def __exit__(self, *args) -> None:
+        """Shut the pool of workers down, if owned."""
+        self.close()
+
+    async def run(self, fn: ty.Callable[..., ty.Any], *args, **kwargs) -> ty.Any:
+        """Call a function in the pool of workers.
+
+
+        :param fn: The function to call.
+        :type fn: ~typing.Callable
+
+
+        :return: The value returned by the function.
+        :rtype: ~typing.Any
+
+        """
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, functools.partial(fn, *args, **kwargs)
+        )
+
+    async def decode(
+        self, content: bytes, transform: ty.Optional[Transform] = None
+    ) -> ty.Any:
+        """Decode a JSON body and apply a transform to it.
+
+
+        :param content: The JSON body.
+        :type content: bytes
+
+        :param transform: Function applied to the decoded body.
+        :type transform: ~typing.Callable[[~typing.Any], ~typing.Any]
+
+
+        :return: The decoded and transformed body.
+        :rtype: ~typing.Any
+
+
+        :raise ~json.JSONDecodeError: When the body is not valid JSON.
+
+        """
+        if len(content) < self.min_size:
+            return _decode(content, transform)
+        if (
+            not isinstance(self.executor, concurrent.futures.ProcessPoolExecutor)
+            or len(content) < self.shared_memory_size
+        ):
+            return await self.run(_decode, content, transform)
+
+        from multiprocessing import shared_memory
+
+        memory = shared_memory.SharedMemory(create=True, size=len(content))
+        try:
+            memory.buf[: len(content)] = content
+            future = self.executor.submit(
+                _decode_shared, memory.name, len(content), transform
+            )
+        except BaseException:
+            _release(memory)
+            raise
+        # The segment is only released once the worker is done with it, as the
+        # caller may be cancelled before the worker attached to it.
+        future.add_done_callback(lambda _: _release(memory))
+        return await asyncio.wrap_future(future)
+
+    async def json(
+        self, response: httpx.Response, transform: ty.Optional[Transform] = None
+    ) -> ty.Any:
+        """Read the body of a response, decode it and apply a transform to it.
+
+
+        :param response: The response.
+        :type response: ~httpx.Response
+
+        :param transform: Function applied to the decoded body.
+        :type transform: ~typing.Callable[[~typing.Any], ~typing.Any]
+
+
+        :return: The decoded and transformed body.
+        :rtype: ~typing.Any
+
+
+        :raise ~json.JSONDecodeError: When the body is not valid JSON.
+
+        """
+        return await self.decode(await response.aread(), transform)
+
+    def close(self) -> None:
+        """Shut the pool of workers down, if owned by the offloader.
+
+
+        :return: ``None``
+
+        """
+        if self._owned:
+            self.executor.shutdown()
@@ -0,0 +1,313 @@
+# cloudguard/pagination.py
+# ========================
+#
+# Copying
+# -------
+#
+# Copyright (c) 2023 cloudguard authors and contributors.
+#
+# This file is part of the *cloudguard* project.
+#
+# *cloudguard* is a free software project. You can redistribute it and/or
+# modify it following the terms of the MIT License.
+#
+# This software project is distributed *as is*, WITHOUT WARRANTY OF ANY KIND;
+# including but not limited to the WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE and NONINFRINGEMENT.
+#
+# You should have received a copy of the MIT License along with *cloudguard*.
+# If not, see <http://opensource.org/licenses/MIT>.
+#
+import typing as ty
+import asyncio
+
+import httpx
+
+
+#: Type definition of the keyword arguments of a request.
+RequestKwargs = ty.Dict[str, ty.Any]
+
+
+class Paginator(object):
+    """Describe how a paginated endpoint of the CloudGuard API exposes its
+    pages.
+
+
+    :param items_key: Key of the response holding the page's records. The
+                      response is expected to be the list of records when
+                      ``None``.
+    :type items_key: str
+
+    """
+
+    def __init__(self, items_key: ty.Optional[str] = None):
+        """Constructor for :class:`cloudguard.pagination.Paginator`."""
+        self.items_key = items_key
+
+    def first(self, kwargs: RequestKwargs) -> RequestKwargs:
+        """Get the request arguments to fetch the first page.
+
+
+        :param kwargs: The request arguments provided by the caller.
+        :type kwargs: ~typing.Dict[str, ~typing.Any]
+
+
+        :return: The request arguments of the first page.
+        :rtype: ~typing.Dict[str, ~typing.Any]
+
+        """
+        return kwargs
+
+    def records(self, payload: ty.Any) -> ty.List[ty.Any]:
+        """Extract the records from a page.
+
+
+        :param payload: The decoded page.
+        :type payload: ~typing.Any
+
+
+        :return: The records of the page.
+        :rtype: ~typing.List[~typing.Any]
+
+        """
+        if self.items_key is None:
+            return payload or []
+        return (payload or {}).get(self.items_key) or []
+
+    def next(
+        self, kwargs: RequestKwargs, payload: ty.Any, records: ty.List[ty.Any]
+    ) -> ty.Optional[RequestKwargs]:
+        """Get the request arguments to fetch the page following the given one.
+
+
+        :param kwargs: The request arguments of the current page.
+        :type kwargs: ~typing.Dict[str, ~typing.Any]
+
+        :param payload: The decoded current page.
+        :type payload: ~typing.Any
+
+        :param records: The records of the current page.
+        :type records: ~typing.List[~typing.Any]
+
+
+        :return: The request arguments of the next page or ``None`` when the
+                 current page is the last one.
+        :rtype: ~typing.Dict[str, ~typing.Any]
+
+        """
+        return None
+
+
+class CursorPaginator(Paginator):
+    """Paginator of the search endpoints which return an opaque cursor to
+    provide in the body of the next request.
+
+
+    :param items_key: Key of the response holding the page's records.
+    :type items_key: str
+
+    :param cursor_key: Key of the response holding the cursor.
+    :type cursor_key: str
+
+    :param cursor_param: Key of the request body receiving the cursor.
+    :type cursor_param: str
+
+    :param page_size: Number of records requested per page.
+    :type page_size: int
+
+    """
+
+    def __init__(
+        self,
+        items_key: ty.Optional[str] = None,
+        cursor_key: str = "searchAfter",
+        cursor_param: str = "searchAfter",
+        page_size: ty.Optional[int] = None,
+    ):
+        """Constructor for :class:`cloudguard.pagination.CursorPaginator`."""
+        super().__init__(items_key)
+        self.cursor_key = cursor_key
+        self.cursor_param = cursor_param
+        self.page_size = page_size
+
+    def first(self, kwargs: RequestKwargs) -> RequestKwargs:
+        """Get the request arguments to fetch the first page."""
+        kwargs = dict(kwargs)
+        if self.page_size is not None:
+            kwargs["json"] = {**(kwargs.get("json") or {}), "pageSize": self.page_size}
+        return kwargs
+
+    def next(
+        self, kwargs: RequestKwargs, payload: ty.Any, records: ty.List[ty.Any]
+    ) -> ty.Optional[RequestKwargs]:
+        """Get the request arguments to fetch the page following the given one."""
+        cursor = (payload or {}).get(self.cursor_key)
+        if not records or not cursor:
+            return None
+
+        kwargs = dict(kwargs)
+        kwargs["json"] = {**(kwargs.get("json") or {}), self.cursor_param: cursor}
+        return kwargs
+
+
+class PagePaginator(Paginator):
+    """Paginator of the endpoints using a page number and a page size as query
+    parameters.
+
+
+    :param items_key: Key of the response holding the page's records.
+    :type items_key: str
+
+    :param page_size: Number of records requested per page.
+    :type page_size: int
+
+    :param page_param: Name of the query parameter holding the page number.
+    :type page_param: str
+
+    :param size_param: Name of the query parameter holding the page size.
+    :type size_param: str
+
+    :param first_page: Number of the first page.
+    :type first_page: int
+
+    """
+
+    def __init__(
+        self,
+        items_key: ty.Optional[str] = None,
+        page_size: int = 100,
+        page_param: str = "pageNumber",
+        size_param: str = "pageSize",
+        first_page: int = 1,
+    ):
+        """Constructor for :class:`cloudguard.pagination.PagePaginator`."""
+        super().__init__(items_key)
+        self.page_size = page_size
+        self.page_param = page_param
+        self.size_param = size_param
+        self.first_page = first_page
+
+    def first(self, kwargs: RequestKwargs) -> RequestKwargs:
+        """Get the request arguments to fetch the first page."""
+        kwargs = dict(kwargs)
+        kwargs["params"] = httpx.QueryParams(kwargs.get("params")).merge(
+            {self.page_param: self.first_page, self.size_param: self.page_size}
+        )
+        return kwargs
+
+    def next(
+        self, kwargs: RequestKwargs, payload: ty.Any, records: ty.List[ty.Any]
+    ) -> ty.Optional[RequestKwargs]:
+        """Get the request arguments to fetch the page following the given one."""
+        if len(records) < self.page_size:
+            return None
+
+        params = kwargs["params"]
+        kwargs = dict(kwargs)
+        kwargs["params"] = params.set(self.page_param, int(params[self.page_param]) + 1)
+        return kwargs
+
+
+def iter_pages(
+    client: httpx.Client,
+    method: str,
+    url: ty.Union[httpx.URL, str],
+    paginator: Paginator,
+    **kwargs,
+) -> ty.Iterator[ty.List[ty.Any]]:
+    """Iterate over the records of each page of a paginated endpoint. A page is
+    only requested once the previous one has been consumed.
+
+
+    :param client: The client sending the requests.
+    :type client: ~httpx.Client
+
+    :param method: HTTP method of the request.
+    :type method: str
+
+    :param url: URL of the paginated endpoint.
+    :type url: ~typing.Union[~httpx.URL, str]
+
+    :param paginator: Description of the endpoint's pagination.
+    :type paginator: ~cloudguard.pagination.Paginator
+
+
+    :return: An iterator over the records of each page.
+    :rtype: ~typing.Iterator[~typing.List[~typing.Any]]
+
+
+    :raise ~httpx.HTTPStatusError: When a page could not be fetched.
+
+    """
+    request = paginator.first(kwargs)
+    while request is not None:
+        response = client.request(method, url, **request)
+        response.raise_for_status()
+        payload = response.json()
+        del response
+
+        records = paginator.records(payload)
+        request = paginator.next(request, payload, records)
+        del payload
+
+        yield records
+
+
+async def aiter_pages(
+    client: httpx.AsyncClient,
+    method: str,
+    url: ty.Union[httpx.URL, str],
+    paginator: Paginator,
+    **kwargs,
+) -> ty.AsyncIterator[ty.List[ty.Any]]:
+    """Asynchronously iterate over the records of each page of a paginated
+    endpoint. The next page is fetched while the current one is consumed, so at
+    most two pages are held in memory.
+
+
+    :param client: The client sending the requests.
+    :type client: ~httpx.AsyncClient
+
+    :param method: HTTP method of the request.
+    :type method: str
+
+    :param url: URL of the paginated endpoint.
+    :type url: ~typing.Union[~httpx.URL, str]
+
+    :param paginator: Description of the endpoint's pagination.
+    :type paginator: ~cloudguard.pagination.Paginator
+
+
+    :return: An asynchronous iterator over the records of each page.
+    :rtype: ~typing.AsyncIterator[~typing.List[~typing.Any]]
+
+
+    :raise ~httpx.HTTPStatusError: When a page could not be fetched.
+
+    """
+
+    async def fetch(request: RequestKwargs) -> ty.Any:
+        response = await client.request(method, url, **request)
+        response.raise_for_status()
+        return response.json()
+
+    request = paginator.first(kwargs)
+    task = asyncio.ensure_future(fetch(request))
+    try:
+        while task is not None:
+            payload = await task
+            records = paginator.records(payload)
+            request = paginator.next(request, payload, records)
+            del payload
+
+            task = None if request is None else asyncio.ensure_future(fetch(request))
+            yield records
+    finally:
+        if task is not None:
+            # Wait for the prefetch to be cancelled and retrieve its outcome, so
+            # that its failure is not logged as never retrieved. Unlike awaiting
+            # the task, this lets the cancellation of the caller through.
+            task.cancel()
+            await asyncio.wait([task])
+            if not task.cancelled():
+                task.exception()
@@ -0,0 +1,257 @@
+# cloudguard/pipeline.py
+# ======================
+#
+# Copying
+# -------
+#
+# Copyright (c) 2023 cloudguard authors and contributors.
+#
+# This file is part of the *cloudguard* project.
+#
+# *cloudguard* is a free software project. You can redistribute it and/or
+# modify it following the terms of the MIT License.
+#
+# This software project is distributed *as is*, WITHOUT WARRANTY OF ANY KIND;
+# including but not limited to the WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE and NONINFRINGEMENT.
+#
+# You should have received a copy of the MIT License along with *cloudguard*.
+# If not, see <http://opensource.org/licenses/MIT>.
+#
+import typing as ty
+import asyncio
+import logging
+import dataclasses as dc
+
+
+log = logging.getLogger(__name__)
+
+
+#: Default number of items held by the queue in front of each stage.
+DEFAULT_BUFFER_SIZE: int = 100
+
+T = ty.TypeVar("T")
+
+#: Marker of the end of the items of a queue.
+_DONE = object()
+
+
+@dc.dataclass(frozen=True)
+class Stage(object):
+    """A step of a :class:`~cloudguard.pipeline.Pipeline`, applying a coroutine
+    function to each item with a bounded concurrency.
+
+    """
+
+    #: Coroutine function receiving the value produced by the previous stage,
+    #: or the item itself for the first stage.
+    fn: ty.Callable[[ty.Any], ty.Awaitable[ty.Any]]
+    #: Maximum number of items processed at once by the stage.
+    concurrency: int = 1
+    #: Name of the stage, reported with the errors it raised.
+    name: ty.Optional[str] = None
+
+    def __post_init__(self):
+        """Validate the concurrency and name the stage after its function."""
+        if self.concurrency < 1:
+            raise ValueError(
+                f"concurrency must be strictly positive, got: {self.concurrency}"
+            )
+        if self.name is None:
+            object.__setattr__(
+                self, "name", getattr(self.fn, "__name__", repr(self.fn))
+            )
+
+
+@dc.dataclass(frozen=True)
+class PipelineResult(ty.Generic[T]):
+    """Outcome of a pipeline for one item."""
+
+    #: Position of the item among the items fed to the pipeline.
+    index: int
+    #: The item fed to the pipeline.
+    item: ty.Any
+    #: Value returned by the last stage, if every stage succeeded.
+    result: ty.Optional[T] = None
+    #: Exception raised by the failed stage, if any.
+    error: ty.Optional[BaseException] = None
+    #: Name of the failed stage, if any.
+    stage: ty.Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        """Check whether every stage succeeded."""
+        return self.error is None
+
+
+class _Crash(object):
+    """Report of a pipeline task which stopped unexpectedly."""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class Pipeline(object):
+    """Run items through successive stages connected by bounded queues, e.g.
+    fetching the details of each listed entity then writing them out.
+
+    Each stage processes several items at once, up to its own concurrency. A
+    stage waits when the queue of the next one is full, and the items are only
+    taken from the source as long as the number of items in flight is bounded,
+    so that the source slows down when the stages or the consumer of the
+    results lag behind. An item for which a stage fails skips the following
+    stages and is reported in its result, without affecting the other items.
+
+
+    :param stages: The stages, as :class:`~cloudguard.pipeline.Stage` objects
+                   or coroutine functions run one item at a time.
+    :type stages: ~typing.Iterable[~typing.Union[~cloudguard.pipeline.Stage, ~typing.Callable[[~typing.Any], ~typing.Awaitable]]]
+
+    :param buffer_size: Number of items held by the queue in front of each
+                        stage.
+    :type buffer_size: int
+
+    :param ordered: Whether the results are yielded in the order of the items
+                    rather than in completion order.
+    :type ordered: bool
+
+    """
+
+    def __init__(
+        self,
+        stages: ty.Iterable[
+            ty.Union[Stage, ty.Callable[[ty.Any], ty.Awaitable[ty.Any]]]
+        ],
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+        ordered: bool = False,
+    ):
+        """Constructor for :class:`cloudguard.pipeline.Pipeline`."""
+        if buffer_size < 1:
+            raise ValueError(
+                f"buffer_size must be strictly positive, got: {buffer_size}"
+            )
+
+        self.stages = [s if isinstance(s, Stage) else Stage(s) for s in stages]
+        if not self.stages:
+            raise ValueError("expected at least one stage, got: none")
+        self.buffer_size = buffer_size
+        self.ordered = ordered
+
+    @property
+    def max_pending(self) -> int:
+        """Get the maximum number of items in flight, from the moment they are
+        taken from the source until their result is consumed.
+
+
+        :return: The maximum number of items in flight.
+        :rtype: int
+
+        """
+        return sum(self.buffer_size + s.concurrency for s in self.stages)
+
+    async def run(
+        self, items: ty.Union[ty.Iterable[ty.Any], ty.AsyncIterable[ty.Any]]
+    ) -> ty.AsyncIterator[PipelineResult]:
+        """Run items through the stages and yield their results.
+
+
+        :param items: The items to process, e.g. the records of a paginated
+                      endpoint.
+        :type items: ~typing.Union[~typing.Iterable, ~typing.AsyncIterable]
+
+
+        :return: An asynchronous iterator over the results, in completion order
+                 or in the order of the items when ordered.
+        :rtype: ~typing.AsyncIterator[~cloudguard.pipeline.PipelineResult]
+
+
+        :raise Exception: Any exception raised while iterating over the items,
+                          once the results of the items already taken have
+                          been yielded.
+
+        """
+        queues = [asyncio.Queue(self.buffer_size) for _ in self.stages]
+        # Bounded by the window of items in flight.
+        output: asyncio.Queue = asyncio.Queue()
+        window = asyncio.Semaphore(self.max_pending)
+        source_errors: ty.List[Exception] = []
+
+        async def feed() -> None:
+            index = 0
+            try:
+                if hasattr(items, "__aiter__"):
+                    async for item in items:
+                        await window.acquire()
+                        await queues[0].put((index, item, item))
+                        index += 1
+                else:
+                    for item in items:
+                        await window.acquire()
+                        await queues[0].put((index, item, item))
+                        index += 1
+            except Exception as e:
+                log.debug(f"Pipeline source failed after {index} items: {e!r}")
+                source_errors.append(e)
+            for _ in range(self.stages[0].concurrency):
+                await queues[0].put(_DONE)
+
+        async def work(position: int, stage: Stage) -> None:
+            last = position == len(self.stages) - 1
+            while (entry := await queues[position].get()) is not _DONE:
+                index, item, value = entry
+                try:
+                    value = await stage.fn(value)
+                except Exception as e:
+                    log.debug(f"Stage {stage.name} failed on item {index}: {e!r}")
+                    await output.put(
+                        PipelineResult(index, item, error=e, stage=stage.name)
+                    )
+                    continue
+
+                if last:
+                    await output.put(PipelineResult(index, item, result=value))
+                else:
+                    await queues[position + 1].put((index, item, value))
+
+        async def run_stage(position: int, stage: Stage) -> None:
+            await asyncio.gather(
+                *(work(position, stage) for _ in range(stage.concurrency))
+            )
+            if position == len(self.stages) - 1:
+                await output.put(_DONE)
+            else:
+                for _ in range(self.stages[position + 1].concurrency):
+                    await queues[position + 1].put(_DONE)
+
+        def check(task: asyncio.Task) -> None:
+            if not task.cancelled() and task.exception() is not None:
+                output.put_nowait(_Crash(task.exception()))
+
+        tasks = [asyncio.ensure_future(feed())] + [
+            asyncio.ensure_future(run_stage(i, s)) for i, s in enumerate(self.stages)
+        ]
+        for task in tasks:
+            task.add_done_callback(check)
+
+        try:
+            pending: ty.Dict[int, PipelineResult] = {}
+            position = 0
+            while (result := await output.get()) is not _DONE:
+                if isinstance(result, _Crash):
+                    raise result.error
+                if not self.ordered:
+                    window.release()
+                    yield result
+                    continue
+
+                pending[result.index] = result
+                while position in pending:
+                    window.release()
+                    yield pending.pop(position)
+                    position += 1
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        if source_errors:
+            raise source_errors[0]
@@ -0,0 +1,359 @@
+# cloudguard/ratelimit.py
+# =======================
+#
+# Copying
+# -------
+#
+# Copyright (c) 2023 cloudguard authors and contributors.
+#
+# This file is part of the *cloudguard* project.
+#
+# *cloudguard* is a free software project. You can redistribute it and/or
+# modify it following the terms of the MIT License.
+#
+# This software project is distributed *as is*, WITHOUT WARRANTY OF ANY KIND;
+# including but not limited to the WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE and NONINFRINGEMENT.
+#
+# You should have received a copy of the MIT License along with *cloudguard*.
+# If not, see <http://opensource.org/licenses/MIT>.
+#
+import os
+import math
+import time
+import struct
+import typing as ty
+import asyncio
+import threading
+import contextlib
+import dataclasses as dc
+
+from pathlib import Path
+
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+@dc.dataclass
+class BucketState(object):
+    """State of a token bucket, which may be shared between processes."""
+
+    #: Number of tokens in the bucket, infinite until first refilled.
+    tokens: float = math.inf
+    #: Monotonic time of the last refill.
+    updated: float = 0.0
+    #: Monotonic time until which the bucket is paused.
+    paused_until: float = 0.0
+
+
+class BucketBackend(object):
+    """Storage of the state of a token bucket, updated atomically."""
+
+    def transaction(self) -> ty.ContextManager[BucketState]:
+        """Lock the state of the bucket, then save the changes made to it.
+
+
+        :return: A context manager providing the state of the bucket.
+        :rtype: ~typing.ContextManager[~cloudguard.ratelimit.BucketState]
+
+        """
+        raise NotImplementedError
+
+
+class LocalBackend(BucketBackend):
+    """Storage of the state of a token bucket shared by the threads and the
+    asynchronous tasks of the process.
+
+    """
+
+    def __init__(self):
+        """Constructor for :class:`cloudguard.ratelimit.LocalBackend`."""
+        self._lock = threading.Lock()
+        self._state = BucketState()
+
+    @contextlib.contextmanager
+    def transaction(self) -> ty.Iterator[BucketState]:
+        """Lock the state of the bucket."""
+        with self._lock:
+            yield self._state
+
+
+class FileBackend(BucketBackend):
+    """Storage of the state of a token bucket in a file, shared by every process
+    of the host using the same file. Updates are serialised with an exclusive
+    lock on the file.
+
+    Monotonic times are used, which are comparable between processes of the
+    same host. A state saved before the host was restarted is discarded.
+
+
+    :param path: Path to the file holding the state.
+    :type path: ~os.PathLike
+
+
+    :raise RuntimeError: When file locks are not supported by the platform.
+
+    """
+
+    #: Layout of the state in the file.
+    _FORMAT = struct.Struct("=3d")
+
+    def __init__(self, path: os.PathLike):
+        """Constructor for :class:`cloudguard.ratelimit.FileBackend`."""
+        if fcntl is None:
+            raise RuntimeError("file locks are not supported on this platform")
+        self.path = Path(path).expanduser()
+        self._lock = threading.Lock()
+        self._fd: ty.Optional[int] = None
+        self._pid: ty.Optional[int] = None
+
+    def __repr__(self) -> str:
+        """Formal representation of the backend."""
+        return f"{self.__class__.__name__}({str(self.path)!r})"
+
+    def _open(self) -> int:
+        """Open the file, once per process as locks are held by open files."""
+        if self._fd is None or self._pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            self._pid = os.getpid()
+        return self._fd
+
+    @contextlib.contextmanager
+    def transaction(self) -> ty.Iterator[BucketState]:
+        """Lock the file and read the state of the bucket, then save it."""
+        with self._lock:
+            fd = self._open()
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                data = os.pread(fd, self._FORMAT.size, 0)
+                state = BucketState()
+                if len(data) == self._FORMAT.size:
+                    state = BucketState(*self._FORMAT.unpack(data))
+                    if state.updated > time.monotonic():
+                        state = BucketState()
+
+                yield state
+                os.pwrite(
+                    fd,
+                    self._FORMAT.pack(state.tokens, state.updated, state.paused_until),
+                    0,
+                )
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def close(self) -> None:
+        """Close the file.
+
+
+        :return: ``None``
+
+        """
+        with self._lock:
+            if self._fd is not None and self._pid == os.getpid():
+                os.close(self._fd)
+            self._fd = None
+
+
+class TokenBucket(object):
+    """Client-side token bucket limiting the rate of requests sent to the
+    CloudGuard API.
+
+    Tokens are reserved rather than waited for while holding the lock, so the
+    same bucket can be shared by threads and by asynchronous tasks. The state
+    of the bucket may also be shared by several processes through a
+    :class:`~cloudguard.ratelimit.FileBackend`, so that they stay under a
+    common rate limit.
+
+
+    :param rate: Number of tokens added to the bucket per second. ``None``
+                 disables the rate limit, only keeping the ability to pause
+                 the bucket.
+    :type rate: float
+
+    :param burst: Maximum number of tokens the bucket can hold. Defaults to
+                  the rate, with a minimum of one token.
+    :type burst: int
+
+    :param backend: Storage of the state of the bucket. Defaults to a state
+                    held by the process.
+    :type backend: ~cloudguard.ratelimit.BucketBackend
+
+    """
+
+    def __init__(
+        self,
+        rate: ty.Optional[float] = None,
+        burst: ty.Optional[int] = None,
+        backend: ty.Optional[BucketBackend] = None,
+    ):
+        """Constructor for :class:`cloudguard.ratelimit.TokenBucket`."""
+        self._lock = threading.Lock()
+        self.backend = backend or LocalBackend()
+        self.configure(rate, burst)
+
+    def configure(
+        self, rate: ty.Optional[float] = None, burst: ty.Optional[int] = None
+    ) -> None:
+        """Change the rate and the capacity of the bucket.
+
+
+        :param rate: Number of tokens added to the bucket per second.
+        :type rate: float
+
+        :param burst: Maximum number of tokens the bucket can hold.
+        :type burst: int
+
+
+        :return: ``None``
+
+
+        :raise ValueError: When the rate or the burst is not strictly positive.
+
+        """
+        if rate is not None and rate <= 0:
+            raise ValueError(f"rate must be strictly positive, got: {rate}")
+        if burst is not None and burst <= 0:
+            raise ValueError(f"burst must be strictly positive, got: {burst}")
+
+        with self._lock:
+            self.rate = rate
+            self.capacity = burst or max(1, int(rate or 1))
+
+    def _refill(self, state: BucketState, now: float) -> None:
+        """Add the tokens generated since the last update. Must be called
+        within a transaction of the backend.
+
+        """
+        if self.rate is not None:
+            state.tokens = min(
+                self.capacity, state.tokens + (now - state.updated) * self.rate
+            )
+        state.updated = now
+
+    def reserve(self, tokens: int = 1) -> float:
+        """Reserve tokens from the bucket.
+
+
+        :param tokens: Number of tokens to reserve.
+        :type tokens: int
+
+
+        :return: The time, in seconds, to wait before the reservation is
+                 honoured.
+        :rtype: float
+
+        """
+        with self.backend.transaction() as state:
+            now = time.monotonic()
+            delay = max(0.0, state.paused_until - now)
+            if self.rate is None:
+                return delay
+
+            self._refill(state, now)
+            state.tokens -= tokens
+            if state.tokens < 0:
+                delay = max(delay, -state.tokens / self.rate)
+
+            return delay
+
+    def pause(self, seconds: float) -> None:
+        """Stop handing out tokens for the given amount of time. This is used
+        when the server asks to slow down.
+
+
+        :param seconds: The time, in seconds, during which the bucket is paused.
+        :type seconds: float
+
+
+        :return: ``None``
+
+        """
+        with self.backend.transaction() as state:
+            state.paused_until = max(state.paused_until, time.monotonic() + seconds)
+
+    def acquire(self, tokens: int = 1) -> float:
+        """Take tokens from the bucket, blocking until they are available.
+
+
+        :param tokens: Number of tokens to take.
+        :type tokens: int
+
+
+        :return: The time, in seconds, spent waiting.
+        :rtype: float
+
+        """
+        if delay := self.reserve(tokens):
+            time.sleep(delay)
+        return delay
+
+    async def aacquire(self, tokens: int = 1) -> float:
+        """Take tokens from the bucket, waiting asynchronously until they are
+        available.
+
+
+        :param tokens: Number of tokens to take.
+        :type tokens: int
+
+
+        :return: The time, in seconds, spent waiting.
+        :rtype: float
+
+        """
+        if delay := self.reserve(tokens):
+            await asyncio.sleep(delay)
+        return delay
+
+
+#: Token buckets shared by every client of the process, by key.
+_BUCKETS: ty.Dict[str, TokenBucket] = {}
+#: Lock protecting the creation of the shared token buckets.
+_BUCKETS_LOCK = threading.Lock()
+
+
+def get_bucket(
+    key: str,
+    rate: ty.Optional[float] = None,
+    burst: ty.Optional[int] = None,
+    backend: ty.Optional[ty.Callable[[], BucketBackend]] = None,
+) -> TokenBucket:
+    """Get the token bucket shared by the whole process under the given key,
+    creating it if needed. The bucket is reconfigured when the requested rate
+    or burst changed.
+
+
+    :param key: Key identifying the bucket, usually the region code and API
+                key.
+    :type key: str
+
+    :param rate: Number of tokens added to the bucket per second.
+    :type rate: float
+
+    :param burst: Maximum number of tokens the bucket can hold.
+    :type burst: int
+
+    :param backend: Factory of the storage of the state of the bucket, called
+                    when the bucket is created.
+    :type backend: ~typing.Callable[[], ~cloudguard.ratelimit.BucketBackend]
+
+
+    :return: The shared token bucket.
+    :rtype: ~cloudguard.ratelimit.TokenBucket
+
+    """
+    with _BUCKETS_LOCK:
+        try:
+            bucket = _BUCKETS[key]
+        except KeyError:
+            bucket = _BUCKETS[key] = TokenBucket(
+                rate, burst, backend=None if backend is None else backend()
+            )
+        else:
+            if bucket.rate != rate or (burst and bucket.capacity != burst):
+                bucket.configure(rate, burst)
+
+    return bucket
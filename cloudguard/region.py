@@ -18,9 +18,55 @@
 # You should have received a copy of the MIT License along with *cloudguard*.
 # If not, see <http://opensource.org/licenses/MIT>.
 #
+import re
+import time
+import typing as ty
+import logging
+import threading
 import dataclasses as dc
+import concurrent.futures
 
-from httpx import URL
+
+if ty.TYPE_CHECKING:
+    import httpx
+
+
+log = logging.getLogger(__name__)
+
+
+#: Default timeout, in seconds, of the requests probing the endpoints of a
+#: region.
+DEFAULT_PROBE_TIMEOUT: float = 2.0
+
+
+class _LazyURL(object):
+    """Descriptor keeping a URL as provided in a private attribute and parsing
+    it with :mod:`httpx` on first access, so that defining regions does not
+    require :mod:`httpx`.
+
+    """
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self._raw = f"_{name}"
+        self._url = f"_{name}_url"
+
+    def __get__(self, instance: ty.Any, owner: ty.Optional[type] = None) -> ty.Any:
+        if instance is None:
+            # No default value for the dataclass field.
+            raise AttributeError(self._raw[1:])
+        try:
+            return instance.__dict__[self._url]
+        except KeyError:
+            pass
+
+        import httpx
+
+        url = instance.__dict__[self._url] = httpx.URL(instance.__dict__[self._raw])
+        return url
+
+    def __set__(self, instance: ty.Any, value: ty.Union[str, "httpx.URL"]) -> None:
+        instance.__dict__[self._raw] = str(value)
+        instance.__dict__.pop(self._url, None)
 
 
 @dc.dataclass(frozen=True)
@@ -31,50 +77,303 @@ class CloudGuardRegion(object):
     name: str
     #: Code assigned to the CloudGuard region.
     code: str
-    #: URL to access the CloudGuard API.
-    api: URL
+    #: URL to access the CloudGuard API. It may be given as a string, kept in
+    #: ``_api`` and only parsed on first access.
+    api: "httpx.URL" = _LazyURL()
+    #: Other names under which the region can be looked up.
+    aliases: ty.Tuple[str, ...] = ()
+    #: URLs of endpoints equivalent to :attr:`api`, e.g. a local API gateway
+    #: or proxy, among which the fastest one can be selected by :func:`probe`.
+    endpoints: ty.Tuple[str, ...] = ()
+
+    @property
+    def candidates(self) -> ty.Tuple[str, ...]:
+        """Get the URLs of every endpoint serving the region.
+
+
+        :return: The URL of the API followed by the equivalent endpoints.
+        :rtype: ~typing.Tuple[str, ...]
+
+        """
+        return tuple(dict.fromkeys((self._api, *map(str, self.endpoints))))
+
+
+def _normalise(key: str) -> str:
+    """Normalise a region key so that lookups ignore case, spaces, hyphens and
+    underscores.
+
+    """
+    return re.sub(r"[\s_-]+", "", key).casefold()
+
+
+class RegionRegistry(object):
+    """Registry of the known CloudGuard regions, indexed by code, name and
+    alias.
+
+    Keys are looked up regardless of case, spaces, hyphens and underscores so
+    that ``"United States"``, ``"UnitedStates"`` and ``"united-states"`` all
+    designate the same region.
+
+
+    :param regions: The regions to register.
+    :type regions: ~typing.Iterable[~cloudguard.region.CloudGuardRegion]
+
+    """
+
+    def __init__(self, regions: ty.Iterable[CloudGuardRegion] = ()):
+        """Constructor for :class:`cloudguard.region.RegionRegistry`."""
+        self._lock = threading.Lock()
+        self._regions: ty.Dict[str, CloudGuardRegion] = {}
+        # Normalised keys to region codes.
+        self._index: ty.Dict[str, str] = {}
+        for region in regions:
+            self.register(region)
+
+    def __contains__(self, key: object) -> bool:
+        """Check whether a region is registered under the given key."""
+        return isinstance(key, str) and _normalise(key) in self._index
+
+    def __iter__(self) -> ty.Iterator[CloudGuardRegion]:
+        """Iterate over the registered regions."""
+        return iter(list(self._regions.values()))
+
+    def __len__(self) -> int:
+        """Get the number of registered regions."""
+        return len(self._regions)
+
+    def register(self, region: CloudGuardRegion, replace: bool = False) -> None:
+        """Register a region under its code, name and aliases.
+
+
+        :param region: The region to register.
+        :type region: ~cloudguard.region.CloudGuardRegion
+
+        :param replace: Whether to replace the region already registered with
+                        the same code.
+        :type replace: bool
+
+
+        :return: ``None``
+
+
+        :raise ValueError: When a key of the region is already used by another
+                           region.
+
+        """
+        keys = {_normalise(k) for k in (region.code, region.name, *region.aliases)}
+        with self._lock:
+            if region.code in self._regions and not replace:
+                raise ValueError(f"region already registered: {region.code}")
+            for key in keys:
+                if self._index.get(key, region.code) != region.code:
+                    raise ValueError(
+                        f"expected a unique region key, got: {key}"
+                        f" (already used by {self._index[key]})"
+                    )
+
+            self._index = {k: v for k, v in self._index.items() if v != region.code}
+            self._index.update(dict.fromkeys(keys, region.code))
+            self._regions[region.code] = region
+
+    def get(self, key: str) -> CloudGuardRegion:
+        """Look a region up by its code, name or alias.
+
+
+        :param key: The code, name or alias of the region.
+        :type key: str
+
+
+        :return: The matching region.
+        :rtype: ~cloudguard.region.CloudGuardRegion
+
+
+        :raise ValueError: When no region is registered under the key.
+
+        """
+        try:
+            return self._regions[self._index[_normalise(key)]]
+        except KeyError:
+            raise ValueError(f"unknown region: {key}") from None
+
+
+def probe(
+    region: CloudGuardRegion,
+    timeout: float = DEFAULT_PROBE_TIMEOUT,
+    transport: ty.Optional["httpx.BaseTransport"] = None,
+) -> CloudGuardRegion:
+    """Select the endpoint of a region answering the fastest.
+
+    Every candidate endpoint is sent a ``HEAD`` request concurrently. An
+    endpoint is healthy when it answers before the timeout without a server
+    error; an authentication error still means the endpoint is reachable.
+
+
+    :param region: The region whose endpoints to probe.
+    :type region: ~cloudguard.region.CloudGuardRegion
+
+    :param timeout: Timeout, in seconds, of each probe.
+    :type timeout: float
+
+    :param transport: Transport sending the probes.
+    :type transport: ~httpx.BaseTransport
+
+
+    :return: The region with its fastest healthy endpoint as API URL, or the
+             region unchanged when it has a single endpoint or none is
+             healthy.
+    :rtype: ~cloudguard.region.CloudGuardRegion
+
+    """
+    candidates = region.candidates
+    if len(candidates) < 2:
+        return region
+
+    import httpx
+
+    def measure(url: str) -> ty.Optional[float]:
+        start = time.perf_counter()
+        try:
+            with httpx.Client(timeout=timeout, transport=transport) as client:
+                response = client.head(url)
+        except httpx.HTTPError as e:
+            log.debug(f"Endpoint {url} of region {region.code} failed: {e!r}")
+            return None
+        if response.is_server_error:
+            return None
+        return time.perf_counter() - start
+
+    with concurrent.futures.ThreadPoolExecutor(len(candidates)) as executor:
+        latencies = list(executor.map(measure, candidates))
+    return _select(region, candidates, latencies)
+
+
+async def aprobe(
+    region: CloudGuardRegion,
+    timeout: float = DEFAULT_PROBE_TIMEOUT,
+    transport: ty.Optional["httpx.AsyncBaseTransport"] = None,
+) -> CloudGuardRegion:
+    """Select the endpoint of a region answering the fastest, without blocking
+    the event loop. See :func:`cloudguard.region.probe`.
+
+
+    :param region: The region whose endpoints to probe.
+    :type region: ~cloudguard.region.CloudGuardRegion
+
+    :param timeout: Timeout, in seconds, of each probe.
+    :type timeout: float
+
+    :param transport: Transport sending the probes.
+    :type transport: ~httpx.AsyncBaseTransport
+
+
+    :return: The region with its fastest healthy endpoint as API URL, or the
+             region unchanged when it has a single endpoint or none is
+             healthy.
+    :rtype: ~cloudguard.region.CloudGuardRegion
+
+    """
+    candidates = region.candidates
+    if len(candidates) < 2:
+        return region
+
+    import asyncio
+
+    import httpx
+
+    async def measure(client: httpx.AsyncClient, url: str) -> ty.Optional[float]:
+        start = time.perf_counter()
+        try:
+            response = await client.head(url)
+        except httpx.HTTPError as e:
+            log.debug(f"Endpoint {url} of region {region.code} failed: {e!r}")
+            return None
+        if response.is_server_error:
+            return None
+        return time.perf_counter() - start
+
+    async with httpx.AsyncClient(timeout=timeout, transport=transport) as client:
+        latencies = await asyncio.gather(*(measure(client, u) for u in candidates))
+    return _select(region, candidates, latencies)
+
+
+def _select(
+    region: CloudGuardRegion,
+    candidates: ty.Sequence[str],
+    latencies: ty.Sequence[ty.Optional[float]],
+) -> CloudGuardRegion:
+    """Select the fastest healthy endpoint of a probed region.
+
+
+    :param region: The probed region.
+    :type region: ~cloudguard.region.CloudGuardRegion
+
+    :param candidates: The probed endpoints.
+    :type candidates: ~typing.Sequence[str]
+
+    :param latencies: The latency, in seconds, of each endpoint or ``None``
+                      when it is not healthy.
+    :type latencies: ~typing.Sequence[~typing.Optional[float]]
+
+
+    :return: The region with its fastest healthy endpoint as API URL, or the
+             region unchanged when none is healthy.
+    :rtype: ~cloudguard.region.CloudGuardRegion
+
+    """
+    healthy = [(s, url) for s, url in zip(latencies, candidates) if s is not None]
+    if not healthy:
+        log.warning(
+            f"No healthy endpoint for region {region.code}, keeping {region._api}"
+        )
+        return region
+
+    seconds, url = min(healthy)
+    log.info(
+        f"Selected endpoint {url} of region {region.code} ({seconds * 1000:.1f}ms)"
+    )
+    return dc.replace(region, api=url)
 
 
 #: CloudGuard region, Australia (``ap2``).
 Australia = CloudGuardRegion(
     name="Australia",
     code="ap2",
-    api=URL("https://api.ap2.dome9.com/"),
+    api="https://api.ap2.dome9.com/",
 )
 
 #: CloudGuard region, Canada (``cace1``).
 Canada = CloudGuardRegion(
     name="Canada",
     code="cace1",
-    api=URL("https://api.cace1.dome9.com/"),
+    api="https://api.cace1.dome9.com/",
 )
 
 #: CloudGuard region, India (``ap3``).
 India = CloudGuardRegion(
     name="India",
     code="ap3",
-    api=URL("https://api.ap3.dome9.com/"),
+    api="https://api.ap3.dome9.com/",
 )
 
 #: CloudGuard region, Ireland (``eu1``).
 Ireland = CloudGuardRegion(
     name="Ireland",
     code="eu1",
-    api=URL("https://api.eu1.dome9.com/"),
+    api="https://api.eu1.dome9.com/",
 )
 
 #: CloudGuard region, Singapore (``ap1``).
 Singapore = CloudGuardRegion(
     name="Singapore",
     code="ap1",
-    api=URL("https://api.ap1.dome9.com/"),
+    api="https://api.ap1.dome9.com/",
 )
 
 #: CloudGuard region, United States (``us``).
 UnitedStates = CloudGuardRegion(
     name="United States",
     code="us",
-    api=URL("https://api.dome9.com/"),
+    api="https://api.dome9.com/",
 )
 
 #: Alias to the Singapore CloudGuard region.
@@ -89,3 +388,11 @@ cace1 = Canada
 eu1 = Ireland
 #: Alias to the United States CloudGuard region.
 us = UnitedStates
+
+
+#: Registry of the known CloudGuard regions.
+registry = RegionRegistry((Australia, Canada, India, Ireland, Singapore, UnitedStates))
+#: Alias for :meth:`cloudguard.region.RegionRegistry.get` of the registry.
+get = registry.get
+#: Alias for :meth:`cloudguard.region.RegionRegistry.register` of the registry.
+register = registry.register
@@ -0,0 +1,354 @@
+# cloudguard/retry.py
+# ===================
+#
+# Copying
+# -------
+#
+# Copyright (c) 2023 cloudguard authors and contributors.
+#
+# This file is part of the *cloudguard* project.
+#
+# *cloudguard* is a free software project. You can redistribute it and/or
+# modify it following the terms of the MIT License.
+#
+# This software project is distributed *as is*, WITHOUT WARRANTY OF ANY KIND;
+# including but not limited to the WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE and NONINFRINGEMENT.
+#
+# You should have received a copy of the MIT License along with *cloudguard*.
+# If not, see <http://opensource.org/licenses/MIT>.
+#
+import time
+import random
+import typing as ty
+import asyncio
+import logging
+import threading
+import dataclasses as dc
+import email.utils
+
+import httpx
+
+from cloudguard.ratelimit import TokenBucket
+
+
+log = logging.getLogger(__name__)
+
+
+#: HTTP methods which can safely be sent more than once.
+IDEMPOTENT_METHODS: ty.FrozenSet[str] = frozenset(
+    {"DELETE", "GET", "HEAD", "OPTIONS", "PUT", "TRACE"}
+)
+#: Status code returned by the CloudGuard API when throttling.
+STATUS_TOO_MANY_REQUESTS: int = 429
+#: Server error status codes worth retrying for idempotent requests.
+RETRY_STATUS_CODES: ty.FrozenSet[int] = frozenset({500, 502, 503, 504})
+
+#: Transport errors raised before the request reached the server.
+_CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout)
+#: Transport errors raised while the request may have been processed.
+_TRANSFER_ERRORS = (httpx.ReadError, httpx.ReadTimeout, httpx.RemoteProtocolError)
+
+
+@dc.dataclass
+class RetryStats(object):
+    """Counters describing the work done by the retry layer."""
+
+    #: Number of requests handled, retries excluded.
+    requests: int = 0
+    #: Number of requests sent again after a failure.
+    retries: int = 0
+    #: Number of responses telling the client to slow down.
+    throttled: int = 0
+    #: Time, in seconds, spent waiting as requested by ``Retry-After``.
+    throttle_time: float = 0.0
+    #: Time, in seconds, spent waiting between retries.
+    backoff_time: float = 0.0
+    #: Time, in seconds, spent waiting for the client-side rate limit.
+    ratelimit_time: float = 0.0
+    #: Lock protecting the counters when shared between threads.
+    _lock: threading.Lock = dc.field(
+        default_factory=threading.Lock, repr=False, compare=False
+    )
+
+    def add(self, **kwargs: ty.Union[int, float]) -> None:
+        """Increment the given counters.
+
+
+        :return: ``None``
+
+        """
+        with self._lock:
+            for k, v in kwargs.items():
+                setattr(self, k, getattr(self, k) + v)
+
+    def asdict(self) -> ty.Dict[str, ty.Union[int, float]]:
+        """Get a snapshot of the counters.
+
+
+        :return: A dictionary of the counters.
+        :rtype: ~typing.Dict[str, ~typing.Union[int, float]]
+
+        """
+        with self._lock:
+            return {
+                f.name: getattr(self, f.name)
+                for f in dc.fields(self)
+                if not f.name.startswith("_")
+            }
+
+
+def parse_retry_after(value: ty.Optional[str]) -> ty.Optional[float]:
+    """Parse the value of a ``Retry-After`` header.
+
+
+    :param value: The header's value, either a number of seconds or an HTTP
+                  date.
+    :type value: str
+
+
+    :return: The number of seconds to wait or ``None`` when the value could not
+             be parsed.
+    :rtype: float
+
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, date.timestamp() - time.time())
+
+
+class RetryPolicy(object):
+    """Decide whether and when a request is to be sent again.
+
+    A response asking with ``Retry-After`` to wait longer than ``backoff_max``
+    is not retried but returned, rather than holding every request sharing the
+    token bucket for that long.
+
+
+    :param max_retries: Maximum number of times a request is sent again.
+    :type max_retries: int
+
+    :param backoff_factor: Base delay, in seconds, of the exponential backoff.
+    :type backoff_factor: float
+
+    :param backoff_max: Maximum delay, in seconds, between two attempts.
+    :type backoff_max: float
+
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        backoff_max: float = 30.0,
+    ):
+        """Constructor for :class:`cloudguard.retry.RetryPolicy`."""
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+
+    def backoff(self, attempt: int) -> float:
+        """Compute the delay before the next attempt using an exponential
+        backoff with full jitter.
+
+
+        :param attempt: Number of the attempt which failed, starting at ``0``.
+        :type attempt: int
+
+
+        :return: The delay, in seconds.
+        :rtype: float
+
+        """
+        return random.uniform(
+            0, min(self.backoff_max, self.backoff_factor * (2**attempt))
+        )
+
+    def should_retry_response(
+        self, request: httpx.Request, response: httpx.Response
+    ) -> bool:
+        """Check whether the request is to be sent again given its response."""
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        if retry_after is not None and retry_after > self.backoff_max:
+            return False
+        if response.status_code == STATUS_TOO_MANY_REQUESTS:
+            return True
+        return (
+            response.status_code in RETRY_STATUS_CODES
+            and request.method in IDEMPOTENT_METHODS
+        )
+
+    def should_retry_error(self, request: httpx.Request, exc: Exception) -> bool:
+        """Check whether the request is to be sent again given the error raised
+        while sending it.
+
+        """
+        if isinstance(exc, _CONNECT_ERRORS):
+            return True
+        return (
+            isinstance(exc, _TRANSFER_ERRORS) and request.method in IDEMPOTENT_METHODS
+        )
+
+    def delay(self, attempt: int, response: ty.Optional[httpx.Response]) -> float:
+        """Compute the delay before the next attempt, honouring the
+        ``Retry-After`` header when the server provided one, up to
+        ``backoff_max``.
+
+        """
+        if response is not None:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                return min(retry_after, self.backoff_max)
+        return self.backoff(attempt)
+
+
+class _RetryTransportMixin(object):
+    """Behaviour shared by the synchronous and asynchronous retry transports."""
+
+    def __init__(
+        self,
+        transport: ty.Union[httpx.BaseTransport, httpx.AsyncBaseTransport],
+        policy: ty.Optional[RetryPolicy] = None,
+        bucket: ty.Optional[TokenBucket] = None,
+    ):
+        self.transport = transport
+        self.policy = policy or RetryPolicy()
+        self.bucket = bucket or TokenBucket()
+        self.stats = RetryStats()
+
+    def _max_retries(self, request: httpx.Request) -> int:
+        """Get the maximum number of times a request may be sent again. A
+        streamed body is not read into memory to be replayed, so the request is
+        only sent once.
+
+        """
+        try:
+            request.content
+        except httpx.RequestNotRead:
+            return 0
+        return self.policy.max_retries
+
+    def _next_delay(
+        self,
+        request: httpx.Request,
+        attempt: int,
+        response: ty.Optional[httpx.Response] = None,
+    ) -> float:
+        """Compute the delay before the next attempt and update the counters."""
+        delay = self.policy.delay(attempt, response)
+        if response is not None and response.status_code == STATUS_TOO_MANY_REQUESTS:
+            # Hold every request sharing the bucket, not only this one, to avoid
+            # a retry storm.
+            self.bucket.pause(delay)
+            self.stats.add(retries=1, throttled=1, throttle_time=delay)
+        else:
+            self.stats.add(retries=1, backoff_time=delay)
+
+        log.debug(
+            f"Retrying {request.method} {request.url} in {delay:.3f}s"
+            f" (attempt {attempt + 1}/{self.policy.max_retries})"
+        )
+        return delay
+
+
+class RetryTransport(_RetryTransportMixin, httpx.BaseTransport):
+    """Transport wrapper throttling requests and retrying them on rate limiting,
+    server and connection errors. Requests with a streamed body are sent once,
+    as the body would have to be held in memory to be sent again.
+
+
+    :param transport: The transport actually sending the requests.
+    :type transport: ~httpx.BaseTransport
+
+    :param policy: The retry policy.
+    :type policy: ~cloudguard.retry.RetryPolicy
+
+    :param bucket: The token bucket limiting the rate of requests.
+    :type bucket: ~cloudguard.ratelimit.TokenBucket
+
+    """
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        """Send a request, retrying it when required."""
+        self.stats.add(requests=1)
+        max_retries = self._max_retries(request)
+
+        attempt = 0
+        while True:
+            self.stats.add(ratelimit_time=self.bucket.acquire())
+            try:
+                response = self.transport.handle_request(request)
+            except httpx.TransportError as e:
+                if attempt >= max_retries or not self.policy.should_retry_error(
+                    request, e
+                ):
+                    raise
+                time.sleep(self._next_delay(request, attempt))
+            else:
+                if attempt >= max_retries or not self.policy.should_retry_response(
+                    request, response
+                ):
+                    return response
+                response.close()
+                time.sleep(self._next_delay(request, attempt, response))
+            attempt += 1
+
+    def close(self) -> None:
+        """Close the underlying transport."""
+        self.transport.close()
+
+
+class AsyncRetryTransport(_RetryTransportMixin, httpx.AsyncBaseTransport):
+    """Asynchronous transport wrapper throttling requests and retrying them on
+    rate limiting, server and connection errors. Requests with a streamed body
+    are sent once, as the body would have to be held in memory to be sent
+    again.
+
+
+    :param transport: The transport actually sending the requests.
+    :type transport: ~httpx.AsyncBaseTransport
+
+    :param policy: The retry policy.
+    :type policy: ~cloudguard.retry.RetryPolicy
+
+    :param bucket: The token bucket limiting the rate of requests.
+    :type bucket: ~cloudguard.ratelimit.TokenBucket
+
+    """
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """Send a request, retrying it when required."""
+        self.stats.add(requests=1)
+        max_retries = self._max_retries(request)
+
+        attempt = 0
+        while True:
+            self.stats.add(ratelimit_time=await self.bucket.aacquire())
+            try:
+                response = await self.transport.handle_async_request(request)
+            except httpx.TransportError as e:
+                if attempt >= max_retries or not self.policy.should_retry_error(
+                    request, e
+                ):
+                    raise
+                await asyncio.sleep(self._next_delay(request, attempt))
+            else:
+                if attempt >= max_retries or not self.policy.should_retry_response(
+                    request, response
+                ):
+                    return response
+                await response.aclose()
+                await asyncio.sleep(self._next_delay(request, attempt, response))
+            attempt += 1
+
+    async def aclose(self) -> None:
+        """Close the underlying transport."""
+        await self.transport.aclose()
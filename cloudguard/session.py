@@ -18,30 +18,441 @@
 # You should have received a copy of the MIT License along with *cloudguard*.
 # If not, see <http://opensource.org/licenses/MIT>.
 #
+import atexit
 import typing as ty
+import asyncio
+import logging
+import weakref
+import threading
+import collections
+import concurrent.futures
+
+import httpx
 
 import cloudguard.client
+import cloudguard.fanout
+import cloudguard.region
 import cloudguard.typing as cgty
 
+from cloudguard.auth import StaticProvider, CredentialProvider
 from cloudguard.config import Config
 from cloudguard.region import CloudGuardRegion
+from cloudguard.credentials import APICredentials
+
+
+log = logging.getLogger(__name__)
+
+
+#: Default maximum number of threads used by :meth:`Session.map`.
+DEFAULT_MAX_WORKERS: int = 10
+
+T = ty.TypeVar("T")
+R = ty.TypeVar("R")
+
+#: Sessions whose clients are to be closed at interpreter shutdown.
+_SESSIONS: "weakref.WeakSet[Session]" = weakref.WeakSet()
+#: Tasks closing asynchronous clients, referenced until they complete.
+_CLOSING: ty.Set["asyncio.Future"] = set()
 
 
 class Session(object):
     """The session consolidates in a single place everything required to
     communicate with the CloudGuard API.
 
+    The session owns long-lived clients which are lazily created on first use
+    and reused by every context entry, so that their connection pools stay
+    warm. The synchronous and asynchronous clients use separate pools. They are
+    closed by :meth:`close` or, at the latest, at interpreter shutdown.
+
+    An asynchronous client is bound to the event loop it was created in. It is
+    replaced when used from another event loop, and the replaced client is
+    closed in its own event loop when it is still open. It is also closed when
+    its event loop shuts down its asynchronous generators, as done by
+    :func:`asyncio.run`. :meth:`aclose` closes the clients gracefully from
+    within the event loop.
+
+    A synchronous session is thread-safe: its client is created once under a
+    lock and its connection pool is shared by every thread using the session.
+    :meth:`map` runs many calls across a bounded pool of threads sharing the
+    session's client.
+
+    Credentials can be rotated, or their provider replaced, while the clients
+    are in use: their connection pools are kept and the requests in flight
+    complete with the previous credentials. Changing the region or the
+    configuration closes the clients instead, so that the next requests are
+    sent with the new settings.
+
+    When endpoint probing is enabled by the configuration, the endpoints of the
+    region are probed before the first client is created and the requests are
+    sent to the fastest healthy one. An asynchronous session probes them when
+    entering its context or warming up, so as not to block the event loop.
+
     """
 
     def __init__(self, *args, **kwargs):
         """Constructor for :class:`cloudguard.session.Session`."""
-        self.client: ty.Optional[cgty.APIClient] = None
-        self.config = Config.load()
+        self._config = Config.load()
+        self._sync_client: ty.Optional[cloudguard.client.APIClient] = None
+        self._async_client: ty.Optional[cloudguard.client.AsyncAPIClient] = None
+        self._async_client_loop: ty.Optional[asyncio.AbstractEventLoop] = None
+        self._async_client_guard: ty.Optional[ty.AsyncGenerator] = None
+        # Regions the clients were built for, to detect a region changed
+        # directly on the configuration.
+        self._sync_client_region: ty.Optional[CloudGuardRegion] = None
+        self._async_client_region: ty.Optional[CloudGuardRegion] = None
+        self._credentials_provider: ty.Optional[CredentialProvider] = None
+        self._probed = False
+        self._lock = threading.Lock()
+
+        _SESSIONS.add(self)
 
     def __enter__(self) -> cloudguard.client.APIClient:
         """Initiate the client's context."""
-        self.client = cloudguard.client.APIClient(self.config).__enter__()
-        return self.client
+        return self.sync_client
+
+    def __exit__(self, *args) -> None:
+        """Leave the client's context. The client is kept open to be reused."""
+        pass
+
+    @property
+    def config(self) -> Config:
+        """Get the configuration of the session.
+
+
+        :return: The configuration.
+        :rtype: ~cloudguard.config.Config
+
+        """
+        return self._config
+
+    @config.setter
+    def config(self, config: Config) -> None:
+        """Replace the configuration of the session, closing the clients built
+        from the previous one.
+
+
+        :param config: The new configuration.
+        :type config: ~cloudguard.config.Config
+
+        """
+        with self._lock:
+            self._config = config
+            self._probed = False
+            clients = self._detach_clients()
+        _close_clients(clients)
+
+    @property
+    def client(self) -> cgty.APIClient:
+        """Get the client matching the kind of session, creating it if needed.
+
+
+        :return: The session's client.
+        :rtype: ~cloudguard.client.APIClient
+
+        """
+        return self.sync_client
+
+    def _detach_clients(self) -> ty.List[ty.Tuple[ty.Any, ty.Any]]:
+        """Forget the clients of the session, to be called holding the lock.
+
+
+        :return: The clients to close, with the event loop of the asynchronous
+                 one.
+        :rtype: ~typing.List[~typing.Tuple]
+
+        """
+        clients = [
+            (self._sync_client, None),
+            (self._async_client, self._async_client_loop),
+        ]
+        self._sync_client = self._async_client = self._async_client_loop = None
+        return [(c, loop) for c, loop in clients if c is not None]
+
+    @property
+    def sync_client(self) -> cloudguard.client.APIClient:
+        """Get the session's synchronous client, creating it if needed.
+
+
+        :return: The synchronous client.
+        :rtype: ~cloudguard.client.APIClient
+
+        """
+        client = self._sync_client
+        if (
+            client is None
+            or client.is_closed
+            or self._sync_client_region is not self._config.region
+        ):
+            self._probe()
+            stale = []
+            with self._lock:
+                client = self._sync_client
+                if (
+                    client is None
+                    or client.is_closed
+                    or self._sync_client_region is not self._config.region
+                ):
+                    if client is not None:
+                        stale.append((client, None))
+                    client = self._sync_client = cloudguard.client.APIClient(
+                        self._config,
+                        credentials_provider=self._credentials_provider,
+                    )
+                    self._sync_client_region = self._config.region
+            _close_clients(stale)
+        return client
+
+    @property
+    def async_client(self) -> cloudguard.client.AsyncAPIClient:
+        """Get the session's asynchronous client, creating it if needed. As its
+        connections are bound to an event loop, a new client is created when
+        used from another event loop.
+
+
+        :return: The asynchronous client.
+        :rtype: ~cloudguard.client.AsyncAPIClient
+
+        """
+        loop = asyncio.get_running_loop()
+        stale = []
+        with self._lock:
+            client = self._async_client
+            if (
+                client is None
+                or client.is_closed
+                or self._async_client_loop is not loop
+                or self._async_client_region is not self._config.region
+            ):
+                if client is not None:
+                    stale.append((client, self._async_client_loop))
+                client = self._async_client = cloudguard.client.AsyncAPIClient(
+                    self._config, credentials_provider=self._credentials_provider
+                )
+                self._async_client_loop = loop
+                self._async_client_guard = _guard(client)
+                self._async_client_region = self._config.region
+        _close_clients(stale)
+        return client
+
+    def _should_probe(self) -> bool:
+        """Tell whether the endpoints of the region are still to be probed."""
+        return (
+            not self._probed
+            and self._config.transport.probe_endpoints
+            and self._config.region is not None
+        )
+
+    def _probe(self) -> None:
+        """Select the fastest endpoint of the region once, when enabled."""
+        if self._should_probe():
+            self.probe_endpoints()
+
+    async def _aprobe(self) -> None:
+        """Select the fastest endpoint of the region once, when enabled."""
+        if self._should_probe():
+            await self.aprobe_endpoints()
+
+    def _probed_region(
+        self, region: CloudGuardRegion, probed: CloudGuardRegion
+    ) -> CloudGuardRegion:
+        """Use the endpoint selected by a probe, unless the region was changed
+        while probing.
+
+
+        :param region: The probed region.
+        :type region: ~cloudguard.region.CloudGuardRegion
+
+        :param probed: The region with the selected endpoint.
+        :type probed: ~cloudguard.region.CloudGuardRegion
+
+
+        :return: The region of the session.
+        :rtype: ~cloudguard.region.CloudGuardRegion
+
+        """
+        with self._lock:
+            if self._config.region is region:
+                self._config.region = probed
+                self._probed = True
+            return self._config.region
+
+    def _region_to_probe(self) -> CloudGuardRegion:
+        """Get the region to probe.
+
+
+        :raise ValueError: When the session has no region.
+
+        """
+        if (region := self._config.region) is None:
+            raise ValueError("expected a region to probe, got: None")
+        return region
+
+    def probe_endpoints(self) -> CloudGuardRegion:
+        """Probe the endpoints of the region and send the requests of the
+        session to the fastest healthy one.
+
+
+        :return: The region with the selected endpoint.
+        :rtype: ~cloudguard.region.CloudGuardRegion
+
+
+        :raise ValueError: When the session has no region.
+
+        """
+        region = self._region_to_probe()
+        return self._probed_region(region, cloudguard.region.probe(region))
+
+    async def aprobe_endpoints(self) -> CloudGuardRegion:
+        """Probe the endpoints of the region without blocking the event loop and
+        send the requests of the session to the fastest healthy one.
+
+
+        :return: The region with the selected endpoint.
+        :rtype: ~cloudguard.region.CloudGuardRegion
+
+
+        :raise ValueError: When the session has no region.
+
+        """
+        region = self._region_to_probe()
+        return self._probed_region(region, await cloudguard.region.aprobe(region))
+
+    @property
+    def credentials_provider(self) -> ty.Optional[CredentialProvider]:
+        """Get the provider of the credentials used by the session's clients.
+
+
+        :return: The provider of the credentials or ``None`` when the clients
+                 use the credentials of the configuration.
+        :rtype: ~cloudguard.auth.CredentialProvider
+
+        """
+        return self._credentials_provider
+
+    @credentials_provider.setter
+    def credentials_provider(self, provider: CredentialProvider) -> None:
+        """Replace the provider of the credentials used by the session's
+        clients, including the ones already created.
+
+
+        :param provider: The new provider of the credentials.
+        :type provider: ~cloudguard.auth.CredentialProvider
+
+        """
+        with self._lock:
+            self._credentials_provider = provider
+            clients = (self._sync_client, self._async_client)
+        for client in clients:
+            if client is not None:
+                client.credentials_provider = provider
+
+    def rotate_credentials(self, credentials: APICredentials) -> None:
+        """Authenticate the next requests of the session with new credentials,
+        keeping the connections open.
+
+
+        :param credentials: The new credentials.
+        :type credentials: ~cloudguard.credentials.APICredentials
+
+
+        :return: ``None``
+
+        """
+        self.config.credentials.api = credentials
+        self.credentials_provider = StaticProvider(credentials)
+
+    def close(self) -> None:
+        """Close the session's clients. The asynchronous client is closed in
+        its event loop, in the background when the loop is running, see
+        :meth:`~cloudguard.session.Session.aclose` to wait for it.
+
+
+        :return: ``None``
+
+        """
+        with self._lock:
+            clients = self._detach_clients()
+        _close_clients(clients)
+
+    async def aclose(self) -> None:
+        """Close both the synchronous and the asynchronous clients of the
+        session.
+
+
+        :return: ``None``
+
+        """
+        with self._lock:
+            clients = self._detach_clients()
+        current = asyncio.get_running_loop()
+        for client, loop in clients:
+            if loop is current:
+                await client.aclose()
+            else:
+                _close_clients([(client, loop)])
+
+    def warm_up(self, connections: int = 1) -> None:
+        """Open connections to the CloudGuard API ahead of time, so that the
+        first requests do not pay for the TLS handshakes. Failures are ignored.
+
+
+        :param connections: Number of connections to open.
+        :type connections: int
+
+
+        :return: ``None``
+
+        """
+        if connections < 1:
+            return
+        for _ in self.map(lambda c, _: _warm_up(c), range(connections), connections):
+            pass
+
+    def map(
+        self,
+        fn: ty.Callable[[cloudguard.client.APIClient, T], R],
+        items: ty.Iterable[T],
+        max_workers: int = DEFAULT_MAX_WORKERS,
+    ) -> ty.Iterator[R]:
+        """Call a function with the session's synchronous client and each of
+        the given items, across a bounded pool of threads. The results are
+        yielded in the order of the items.
+
+        At most twice ``max_workers`` calls are pending at any time, so that
+        the items can be lazily produced and the results lazily consumed.
+
+
+        :param fn: The function to call with the client and each item.
+        :type fn: ~typing.Callable[[~cloudguard.client.APIClient, ~typing.Any], ~typing.Any]
+
+        :param items: The items to process.
+        :type items: ~typing.Iterable
+
+        :param max_workers: Maximum number of threads.
+        :type max_workers: int
+
+
+        :return: An iterator over the results.
+        :rtype: ~typing.Iterator
+
+
+        :raise Exception: Any exception raised by ``fn``, when its result is
+                          reached.
+
+        """
+        client = self.sync_client
+        pending: ty.Deque[concurrent.futures.Future] = collections.deque()
+        with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+            try:
+                for item in items:
+                    if len(pending) >= 2 * max_workers:
+                        yield pending.popleft().result()
+                    pending.append(executor.submit(fn, client, item))
+                while pending:
+                    yield pending.popleft().result()
+            finally:
+                for future in pending:
+                    future.cancel()
 
     @property
     def region(self) -> ty.Optional[CloudGuardRegion]:
@@ -70,7 +481,11 @@ class Session(object):
                            regions.
 
         """
-        self.config.region = value
+        with self._lock:
+            self._config.region = value
+            self._probed = False
+            clients = self._detach_clients()
+        _close_clients(clients)
 
 
 class AsyncSession(Session):
@@ -80,5 +495,167 @@ class AsyncSession(Session):
 
     async def __aenter__(self) -> cloudguard.client.AsyncAPIClient:
         """Initiate the asynchronous client's context."""
-        self.client = await cloudguard.client.AsyncAPIClient(self.config).__aenter__()
-        return self.client
+        await self._aprobe()
+        return self.async_client
+
+    async def __aexit__(self, *args) -> None:
+        """Leave the asynchronous client's context. The client is kept open to
+        be reused.
+
+        """
+        pass
+
+    @property
+    def client(self) -> cgty.APIClient:
+        """Get the client matching the kind of session, creating it if needed.
+
+
+        :return: The session's client.
+        :rtype: ~cloudguard.client.AsyncAPIClient
+
+        """
+        return self.async_client
+
+    async def warm_up(self, connections: int = 1) -> None:
+        """Open connections to the CloudGuard API ahead of time, so that the
+        first requests do not pay for the TLS handshakes. Failures are ignored.
+
+
+        :param connections: Number of connections to open.
+        :type connections: int
+
+
+        :return: ``None``
+
+        """
+        await self._aprobe()
+        client = self.async_client
+        await asyncio.gather(*(_async_warm_up(client) for _ in range(connections)))
+
+    def fan_out(
+        self,
+        targets: ty.Iterable[
+            ty.Union[
+                cloudguard.fanout.Target,
+                ty.Tuple[APICredentials, cgty.CloudGuardRegion],
+            ]
+        ],
+        max_concurrency: int = cloudguard.fanout.DEFAULT_MAX_CONCURRENCY,
+    ) -> cloudguard.fanout.FanOut:
+        """Prepare to run the same calls against many CloudGuard tenants and
+        regions, deriving their configuration from the session's one.
+
+
+        :param targets: The targets to which calls are fanned out, as
+                        :class:`~cloudguard.fanout.Target` objects or
+                        ``(credentials, region)`` pairs.
+        :type targets: ~typing.Iterable[~typing.Union[~cloudguard.fanout.Target, ~typing.Tuple[~cloudguard.credentials.APICredentials, ~cloudguard.typing.CloudGuardRegion]]]
+
+        :param max_concurrency: Maximum number of calls run at once.
+        :type max_concurrency: int
+
+
+        :return: The fan-out executor, to be used as an asynchronous context
+                 manager.
+        :rtype: ~cloudguard.fanout.FanOut
+
+        """
+        return cloudguard.fanout.FanOut(
+            targets, config=self.config, max_concurrency=max_concurrency
+        )
+
+
+def _close_clients(clients: ty.Iterable[ty.Tuple[ty.Any, ty.Any]]) -> None:
+    """Close the clients of a session. An asynchronous client is closed in the
+    event loop it is bound to, in the background when the loop is running.
+
+    """
+    for client, loop in clients:
+        if loop is None:
+            client.close()
+        elif not client.is_closed:
+            _close_async_client(client, loop)
+
+
+def _close_async_client(
+    client: cloudguard.client.AsyncAPIClient, loop: asyncio.AbstractEventLoop
+) -> None:
+    """Close an asynchronous client in the event loop it is bound to."""
+    try:
+        current = asyncio.get_running_loop()
+    except RuntimeError:
+        current = None
+
+    if loop is current:
+        task = loop.create_task(client.aclose())
+        _CLOSING.add(task)
+        task.add_done_callback(_CLOSING.discard)
+    elif loop.is_running():
+        asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+    elif not loop.is_closed() and current is None:
+        loop.run_until_complete(client.aclose())
+    else:
+        log.debug(f"Could not close {client!r}: its event loop is closed")
+
+
+async def _close_on_shutdown(
+    client: cloudguard.client.AsyncAPIClient,
+) -> ty.AsyncGenerator[None, None]:
+    """Asynchronous generator closing a client when finalised by its event
+    loop.
+
+    """
+    try:
+        yield
+    finally:
+        if not client.is_closed:
+            await client.aclose()
+
+
+def _guard(client: cloudguard.client.AsyncAPIClient) -> ty.AsyncGenerator:
+    """Register a client with the running event loop, to be closed when the
+    loop shuts down its asynchronous generators.
+
+
+    :param client: The client to close.
+    :type client: ~cloudguard.client.AsyncAPIClient
+
+
+    :return: The generator to keep a reference to as long as the client.
+    :rtype: ~typing.AsyncGenerator
+
+    """
+    guard = _close_on_shutdown(client)
+    # The first step registers the generator with the running event loop and
+    # completes right away, as it does not await anything.
+    try:
+        guard.asend(None).send(None)
+    except StopIteration:
+        pass
+    return guard
+
+
+def _warm_up(client: cloudguard.client.APIClient) -> None:
+    """Send a lightweight request to open a connection."""
+    try:
+        client.head("/")
+    except httpx.HTTPError as e:
+        log.debug(f"Could not warm up a connection to {client.base_url}: {e!r}")
+
+
+async def _async_warm_up(client: cloudguard.client.AsyncAPIClient) -> None:
+    """Send a lightweight request to open a connection."""
+    try:
+        await client.head("/")
+    except httpx.HTTPError as e:
+        log.debug(f"Could not warm up a connection to {client.base_url}: {e!r}")
+
+
+@atexit.register
+def _close_sessions() -> None:
+    """Close the clients of the remaining sessions at interpreter shutdown."""
+    for session in list(_SESSIONS):
+        try:
+            session.close()
+        except Exception as e:
+            log.debug(f"Could not close session {session!r}: {e!r}")
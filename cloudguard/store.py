@@ -0,0 +1,424 @@
+# cloudguard/store.py
+# ===================
+#
+# Copying
+# -------
+#
+# Copyright (c) 2023 cloudguard authors and contributors.
+#
+# This file is part of the *cloudguard* project.
+#
+# *cloudguard* is a free software project. You can redistribute it and/or
+# modify it following the terms of the MIT License.
+#
+# This software project is distributed *as is*, WITHOUT WARRANTY OF ANY KIND;
+# including but not limited to the WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE and NONINFRINGEMENT.
+#
+# You should have received a copy of the MIT License along with *cloudguard*.
+# If not, see <http://opensource.org/licenses/MIT>.
+#
+import os
+import json
+import typing as ty
+import logging
+import sqlite3
+import itertools
+
+from pathlib import Path
+
+
+log = logging.getLogger(__name__)
+
+
+#: Indexed columns of the store and the keys of the records they are read
+#: from, the first key present in a record being used.
+DEFAULT_FIELDS: ty.Dict[str, ty.Tuple[str, ...]] = {
+    "account": ("cloudAccountId", "accountId"),
+    "region": ("region",),
+    "severity": ("severity",),
+    "rule_id": ("ruleId",),
+    "entity_type": ("entityType", "type"),
+}
+#: Number of records inserted per statement.
+DEFAULT_BATCH_SIZE: int = 1000
+#: Columns of the store which are not indexed fields, and cannot be used as
+#: field names.
+RESERVED_COLUMNS: ty.FrozenSet[str] = frozenset({"collection", "id", "data"})
+
+#: Type definition of a single filter value.
+Scalar = ty.Union[str, int, float, bool]
+#: Type definition of a filter value: a single value or any of several values.
+FilterValue = ty.Union[Scalar, ty.Iterable[Scalar], None]
+
+
+def _quote(name: str) -> str:
+    """Quote an identifier, so that it is not read as an SQL keyword."""
+    return '"{}"'.format(name.replace('"', '""'))
+
+
+class RecordStore(object):
+    """Local store of CloudGuard records, such as findings or assets, backed by
+    SQLite and indexed on the fields reports filter by.
+
+    Records are grouped by collection and identified within a collection by
+    their ``id_key``. Inserting a record with an existing identifier replaces
+    it. A store is not meant to be shared between threads.
+
+    Reopening a database with other fields migrates it: the new fields are
+    filled from the stored records and the indexes of the removed ones are
+    dropped.
+
+
+    :param path: Path to the database file. The database is held in memory
+                 when ``":memory:"``.
+    :type path: ~typing.Union[~os.PathLike, str]
+
+    :param fields: Indexed columns and the keys of the records they are read
+                   from.
+    :type fields: ~typing.Mapping[str, ~typing.Sequence[str]]
+
+
+    :raise ValueError: When a field name is not an identifier, is one of
+                       :data:`RESERVED_COLUMNS` or is given twice.
+
+    """
+
+    def __init__(
+        self,
+        path: ty.Union[os.PathLike, str] = ":memory:",
+        fields: ty.Mapping[str, ty.Sequence[str]] = DEFAULT_FIELDS,
+    ):
+        """Constructor for :class:`cloudguard.store.RecordStore`."""
+        seen = set()
+        for name in fields:
+            if not name.isidentifier():
+                raise ValueError(f"expected identifier as field name, got: {name!r}")
+            # Column names are case insensitive.
+            if name.lower() in RESERVED_COLUMNS or name.lower() in seen:
+                raise ValueError(f"expected unique field name, got: {name!r}")
+            seen.add(name.lower())
+        self.fields = {k: tuple(v) for k, v in fields.items()}
+
+        if str(path) != ":memory:":
+            path = Path(path).expanduser()
+            path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.connection = sqlite3.connect(str(path))
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        self._create()
+
+    def __enter__(self) -> "RecordStore":
+        """Enter the store's context."""
+        return self
+
+    def __exit__(self, *args) -> None:
+        """Close the store."""
+        self.close()
+
+    def _create(self) -> None:
+        """Create the table and the indexes of the store, migrating the fields
+        of an existing one.
+
+        """
+        columns = "".join(f", {_quote(name)} TEXT" for name in self.fields)
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS records ("
+                f"collection TEXT NOT NULL, id TEXT NOT NULL{columns},"
+                " data TEXT NOT NULL, PRIMARY KEY (collection, id)"
+                ") WITHOUT ROWID"
+            )
+            self._migrate()
+            for name in self.fields:
+                self.connection.execute(
+                    f"CREATE INDEX IF NOT EXISTS {_quote(f'records_{name}')}"
+                    f" ON records (collection, {_quote(name)})"
+                )
+
+    def _migrate(self) -> None:
+        """Add the columns of the new fields to an existing table, filling them
+        from the stored records, and drop the ones of the removed fields.
+
+        """
+        existing = {
+            name.lower(): name
+            for _, name, *_ in self.connection.execute("PRAGMA table_info(records)")
+        }
+        added = [k for k in self.fields if k.lower() not in existing]
+        fields = {k.lower() for k in self.fields}
+        removed = [v for k, v in existing.items() if k not in RESERVED_COLUMNS | fields]
+        if not (added or removed):
+            return
+
+        log.info(
+            f"Migrating store {self.path}: adding fields {added},"
+            f" removing fields {removed}"
+        )
+        for name in removed:
+            self.connection.execute(f"DROP INDEX IF EXISTS {_quote(f'records_{name}')}")
+            try:
+                self.connection.execute(
+                    f"ALTER TABLE records DROP COLUMN {_quote(name)}"
+                )
+            except sqlite3.OperationalError as e:
+                # Not supported before SQLite 3.35, the column is left unused.
+                log.debug(f"Could not drop column {name} of {self.path}: {e}")
+
+        if not added:
+            return
+        for name in added:
+            self.connection.execute(
+                f"ALTER TABLE records ADD COLUMN {_quote(name)} TEXT"
+            )
+        statement = (
+            f"UPDATE records SET {', '.join(f'{_quote(k)} = ?' for k in added)}"
+            " WHERE collection = ? AND id = ?"
+        )
+        rows = self.connection.execute("SELECT collection, id, data FROM records")
+        updates = (
+            (*self._values(json.loads(data), added), collection, id)
+            for collection, id, data in rows.fetchall()
+        )
+        self.connection.executemany(statement, updates)
+
+    def _values(
+        self, record: ty.Mapping[str, ty.Any], fields: ty.Iterable[str]
+    ) -> ty.List[ty.Optional[str]]:
+        """Read the values of the given fields from a record."""
+        values = []
+        for name in fields:
+            keys = self.fields[name]
+            value = next((record[k] for k in keys if record.get(k) is not None), None)
+            values.append(None if value is None else str(value))
+        return values
+
+    def _row(
+        self, collection: str, id_key: str, record: ty.Mapping[str, ty.Any]
+    ) -> ty.Tuple[ty.Optional[str], ...]:
+        """Build the row of a record."""
+        return (
+            collection,
+            str(record[id_key]),
+            *self._values(record, self.fields),
+            json.dumps(record, separators=(",", ":")),
+        )
+
+    def insert(
+        self,
+        collection: str,
+        records: ty.Iterable[ty.Mapping[str, ty.Any]],
+        id_key: str = "id",
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> int:
+        """Insert records in a single transaction, replacing the records of the
+        collection which share their identifier. Records are consumed lazily, by
+        batches.
+
+
+        :param collection: The collection the records belong to.
+        :type collection: str
+
+        :param records: The records to insert, e.g. the records of a
+                        :class:`~cloudguard.sync.Snapshot` or of a paginated
+                        endpoint.
+        :type records: ~typing.Iterable[~typing.Mapping[str, ~typing.Any]]
+
+        :param id_key: Key of the records holding their identifier.
+        :type id_key: str
+
+        :param batch_size: Number of records inserted per statement.
+        :type batch_size: int
+
+
+        :return: The number of inserted records.
+        :rtype: int
+
+
+        :raise KeyError: When a record has no identifier.
+
+        """
+        statement = (
+            f"INSERT OR REPLACE INTO records"
+            f" (collection, id, {', '.join(map(_quote, self.fields))}, data)"
+            f" VALUES ({', '.join('?' * (len(self.fields) + 3))})"
+        )
+
+        count = 0
+        rows = (self._row(collection, id_key, r) for r in records)
+        with self.connection:
+            while batch := list(itertools.islice(rows, batch_size)):
+                self.connection.executemany(statement, batch)
+                count += len(batch)
+
+        log.debug(f"Inserted {count} records in {collection}")
+        return count
+
+    def delete(self, collection: str, **filters: FilterValue) -> int:
+        """Delete the records of a collection matching the given filters.
+
+
+        :param collection: The collection from which to delete records.
+        :type collection: str
+
+
+        :return: The number of deleted records.
+        :rtype: int
+
+
+        :raise ValueError: When filtering on a field which is not indexed.
+
+        """
+        where, args = self._where(collection, filters)
+        with self.connection:
+            return self.connection.execute(
+                f"DELETE FROM records WHERE {where}", args
+            ).rowcount
+
+    def _where(
+        self, collection: str, filters: ty.Mapping[str, FilterValue]
+    ) -> ty.Tuple[str, ty.List[str]]:
+        """Build the ``WHERE`` clause matching the given filters. Values are
+        compared as text, as they are stored.
+
+        """
+        clauses, args = ["collection = ?"], [collection]
+        for name, value in filters.items():
+            if name not in self.fields:
+                raise ValueError(
+                    f"expected one of {', '.join(self.fields)} as filter, got: {name}"
+                )
+            if value is None:
+                continue
+            if isinstance(value, (str, bytes)) or not isinstance(value, ty.Iterable):
+                clauses.append(f"{_quote(name)} = ?")
+                args.append(str(value))
+            else:
+                values = [str(v) for v in value]
+                clauses.append(f"{_quote(name)} IN ({', '.join('?' * len(values))})")
+                args.extend(values)
+        return " AND ".join(clauses), args
+
+    def query(
+        self,
+        collection: str,
+        limit: ty.Optional[int] = None,
+        **filters: FilterValue,
+    ) -> ty.Iterator[ty.Dict[str, ty.Any]]:
+        """Iterate over the records of a collection matching the given filters.
+        Each filter is given by the name of an indexed field, e.g.
+        ``severity="High"`` or ``region=["us_east_1", "eu_west_1"]``.
+
+
+        :param collection: The collection to query.
+        :type collection: str
+
+        :param limit: Maximum number of records returned.
+        :type limit: int
+
+
+        :return: An iterator over the matching records.
+        :rtype: ~typing.Iterator[~typing.Dict[str, ~typing.Any]]
+
+
+        :raise ValueError: When filtering on a field which is not indexed.
+
+        """
+        where, args = self._where(collection, filters)
+        sql = f"SELECT data FROM records WHERE {where}"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+
+        for (data,) in self.connection.execute(sql, args):
+            yield json.loads(data)
+
+    def get(self, collection: str, id: str) -> ty.Optional[ty.Dict[str, ty.Any]]:
+        """Get a record of a collection by its identifier.
+
+
+        :param collection: The collection holding the record.
+        :type collection: str
+
+        :param id: The identifier of the record.
+        :type id: str
+
+
+        :return: The record or ``None`` when not stored.
+        :rtype: ~typing.Dict[str, ~typing.Any]
+
+        """
+        row = self.connection.execute(
+            "SELECT data FROM records WHERE collection = ? AND id = ?",
+            (collection, str(id)),
+        ).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def count(
+        self,
+        collection: str,
+        group_by: ty.Optional[str] = None,
+        **filters: FilterValue,
+    ) -> ty.Union[int, ty.Dict[ty.Optional[str], int]]:
+        """Count the records of a collection matching the given filters,
+        optionally grouped by an indexed field.
+
+
+        :param collection: The collection to query.
+        :type collection: str
+
+        :param group_by: Name of the indexed field by which to group the
+                         records.
+        :type group_by: str
+
+
+        :return: The number of matching records, or the number of matching
+                 records by value of the ``group_by`` field.
+        :rtype: ~typing.Union[int, ~typing.Dict[str, int]]
+
+
+        :raise ValueError: When filtering or grouping on a field which is not
+                           indexed.
+
+        """
+        where, args = self._where(collection, filters)
+        if group_by is None:
+            return self.connection.execute(
+                f"SELECT COUNT(*) FROM records WHERE {where}", args
+            ).fetchone()[0]
+
+        if group_by not in self.fields:
+            raise ValueError(
+                f"expected one of {', '.join(self.fields)} to group by, got: {group_by}"
+            )
+        return dict(
+            self.connection.execute(
+                f"SELECT {_quote(group_by)}, COUNT(*) FROM records WHERE {where}"
+                f" GROUP BY {_quote(group_by)}",
+                args,
+            )
+        )
+
+    def collections(self) -> ty.List[str]:
+        """List the collections held by the store.
+
+
+        :return: The names of the collections.
+        :rtype: ~typing.List[str]
+
+        """
+        return [
+            name
+            for (name,) in self.connection.execute(
+                "SELECT DISTINCT collection FROM records ORDER BY collection"
+            )
+        ]
+
+    def close(self) -> None:
+        """Close the connection to the database.
+
+
+        :return: ``None``
+
+        """
+        self.connection.close()
@@ -0,0 +1,292 @@
+# cloudguard/streaming.py
+# =======================
+#
+# Copying
+# -------
+#
+# Copyright (c) 2023 cloudguard authors and contributors.
+#
+# This file is part of the *cloudguard* project.
+#
+# *cloudguard* is a free software project. You can redistribute it and/or
+# modify it following the terms of the MIT License.
+#
+# This software project is distributed *as is*, WITHOUT WARRANTY OF ANY KIND;
+# including but not limited to the WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE and NONINFRINGEMENT.
+#
+# You should have received a copy of the MIT License along with *cloudguard*.
+# If not, see <http://opensource.org/licenses/MIT>.
+#
+import re
+import json
+import codecs
+import typing as ty
+
+import httpx
+
+
+#: Request extension marking a request whose response is read as a stream.
+#: The caching and coalescing layers send such requests as is rather than
+#: reading their whole response.
+STREAM_EXTENSION: str = "cloudguard.stream"
+
+#: Pattern matching the whitespaces allowed between JSON tokens.
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+#: Characters which may continue a number.
+_NUMBER_CHARS = frozenset("0123456789+-.eE")
+
+#: Parser states.
+_START = "start"
+_KEY_OR_END = "key_or_end"
+_KEY = "key"
+_COLON = "colon"
+_VALUE = "value"
+_OBJECT_NEXT = "object_next"
+_ITEM_OR_END = "item_or_end"
+_ITEM = "item"
+_ARRAY_NEXT = "array_next"
+_DONE = "done"
+
+#: Marker of a value which cannot be decoded before more data is received.
+_INCOMPLETE = object()
+
+
+class JSONArrayDecoder(object):
+    """Incrementally decode the items of a JSON array, either the whole
+    document or the value of a key of the top-level object, as the document is
+    received. Only one item is held in memory at a time, in addition to the
+    data not yet decoded.
+
+    The other values of the top-level object are decoded into
+    :attr:`~cloudguard.streaming.JSONArrayDecoder.metadata`.
+
+
+    :param items_key: Key of the top-level object holding the array. The
+                      document is expected to be the array when ``None``.
+    :type items_key: str
+
+    """
+
+    def __init__(self, items_key: ty.Optional[str] = None):
+        """Constructor for :class:`cloudguard.streaming.JSONArrayDecoder`."""
+        self.items_key = items_key
+        #: Values of the top-level object other than the array.
+        self.metadata: ty.Dict[str, ty.Any] = {}
+
+        self._decoder = json.JSONDecoder()
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._pos = 0
+        self._state = _START
+        self._key: ty.Optional[str] = None
+        # Size the buffer must reach before trying again to decode a value
+        # which was incomplete, so that a large value is not decoded over and
+        # over as its chunks are received.
+        self._retry_at = 0
+
+    def feed(self, data: bytes) -> ty.List[ty.Any]:
+        """Decode the next part of the document.
+
+
+        :param data: The next bytes of the document.
+        :type data: bytes
+
+
+        :return: The items completed by the data.
+        :rtype: ~typing.List[~typing.Any]
+
+
+        :raise ~json.JSONDecodeError: When the document is not valid JSON or
+                                      not of the expected shape.
+
+        """
+        self._buffer += self._text.decode(data)
+        return list(self._parse(final=False))
+
+    def close(self) -> ty.List[ty.Any]:
+        """Signal the end of the document.
+
+
+        :return: The last items of the document.
+        :rtype: ~typing.List[~typing.Any]
+
+
+        :raise ~json.JSONDecodeError: When the document is truncated, not valid
+                                      JSON or not of the expected shape.
+
+        """
+        self._buffer += self._text.decode(b"", final=True)
+        items = list(self._parse(final=True))
+        if self._state != _DONE:
+            raise json.JSONDecodeError(
+                "Unexpected end of document", self._buffer, len(self._buffer)
+            )
+        return items
+
+    def _error(self, expected: str) -> json.JSONDecodeError:
+        """Build the error raised on unexpected data."""
+        return json.JSONDecodeError(f"Expecting {expected}", self._buffer, self._pos)
+
+    def _value(self, final: bool) -> ty.Any:
+        """Decode the value at the current position."""
+        if not final and len(self._buffer) < self._retry_at:
+            return _INCOMPLETE
+        try:
+            value, end = self._decoder.raw_decode(self._buffer, self._pos)
+        except json.JSONDecodeError:
+            if final:
+                raise
+            self._retry_at = 2 * len(self._buffer) - self._pos
+            return _INCOMPLETE
+        # A number at the end of the data may still be missing digits, or be
+        # followed by its fraction or exponent.
+        if not final and (
+            end == len(self._buffer) or self._buffer[end] in _NUMBER_CHARS
+        ):
+            return _INCOMPLETE
+
+        self._pos = end
+        self._retry_at = 0
+        return value
+
+    def _parse(self, final: bool) -> ty.Iterator[ty.Any]:
+        """Decode as much of the buffered document as possible."""
+        try:
+            while True:
+                self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+                if self._pos >= len(self._buffer):
+                    return
+                char = self._buffer[self._pos]
+
+                if self._state == _START:
+                    expected = "[" if self.items_key is None else "{"
+                    if char != expected:
+                        raise self._error(f"'{expected}'")
+                    self._pos += 1
+                    self._state = _ITEM_OR_END if expected == "[" else _KEY_OR_END
+                elif self._state == _KEY_OR_END and char == "}":
+                    self._pos += 1
+                    self._state = _DONE
+                elif self._state in (_KEY_OR_END, _KEY):
+                    if char != '"':
+                        raise self._error("property name enclosed in double quotes")
+                    if (key := self._value(final)) is _INCOMPLETE:
+                        return
+                    self._key = key
+                    self._state = _COLON
+                elif self._state == _COLON:
+                    if char != ":":
+                        raise self._error("':' delimiter")
+                    self._pos += 1
+                    self._state = _VALUE
+                elif self._state == _VALUE and self._key == self.items_key:
+                    if char != "[":
+                        raise self._error(f"array under {self.items_key!r}")
+                    self._pos += 1
+                    self._state = _ITEM_OR_END
+                elif self._state == _VALUE:
+                    if (value := self._value(final)) is _INCOMPLETE:
+                        return
+                    self.metadata[self._key] = value
+                    self._state = _OBJECT_NEXT
+                elif self._state == _OBJECT_NEXT:
+                    if char not in ",}":
+                        raise self._error("',' delimiter")
+                    self._pos += 1
+                    self._state = _KEY if char == "," else _DONE
+                elif self._state in (_ITEM_OR_END, _ARRAY_NEXT) and char == "]":
+                    self._pos += 1
+                    self._state = _DONE if self.items_key is None else _OBJECT_NEXT
+                elif self._state == _ARRAY_NEXT:
+                    if char != ",":
+                        raise self._error("',' delimiter")
+                    self._pos += 1
+                    self._state = _ITEM
+                elif self._state in (_ITEM_OR_END, _ITEM):
+                    if (item := self._value(final)) is _INCOMPLETE:
+                        return
+                    self._state = _ARRAY_NEXT
+                    yield item
+                else:
+                    raise self._error("end of document")
+        finally:
+            self._buffer = self._buffer[self._pos :]
+            self._retry_at = max(0, self._retry_at - self._pos)
+            self._pos = 0
+
+
+def streamed(options: ty.Dict[str, ty.Any]) -> ty.Dict[str, ty.Any]:
+    """Mark the options of a request as those of a request whose response is
+    read as a stream, see :data:`STREAM_EXTENSION`.
+
+
+    :param options: Keyword arguments of the request.
+    :type options: ~typing.Dict[str, ~typing.Any]
+
+
+    :return: A copy of the options with the extension set.
+    :rtype: ~typing.Dict[str, ~typing.Any]
+
+    """
+    extensions = {**(options.get("extensions") or {}), STREAM_EXTENSION: True}
+    return {**options, "extensions": extensions}
+
+
+def iter_items(
+    response: httpx.Response, items_key: ty.Optional[str] = None
+) -> ty.Iterator[ty.Any]:
+    """Iterate over the items of a JSON array as the body of a streamed
+    response is received.
+
+
+    :param response: The streamed response.
+    :type response: ~httpx.Response
+
+    :param items_key: Key of the top-level object holding the array. The body
+                      is expected to be the array when ``None``.
+    :type items_key: str
+
+
+    :return: An iterator over the items.
+    :rtype: ~typing.Iterator[~typing.Any]
+
+
+    :raise ~json.JSONDecodeError: When the body is not of the expected shape.
+
+    """
+    decoder = JSONArrayDecoder(items_key)
+    for chunk in response.iter_bytes():
+        yield from decoder.feed(chunk)
+    yield from decoder.close()
+
+
+async def aiter_items(
+    response: httpx.Response, items_key: ty.Optional[str] = None
+) -> ty.AsyncIterator[ty.Any]:
+    """Asynchronously iterate over the items of a JSON array as the body of a
+    streamed response is received.
+
+
+    :param response: The streamed response.
+    :type response: ~httpx.Response
+
+    :param items_key: Key of the top-level object holding the array. The body
+                      is expected to be the array when ``None``.
+    :type items_key: str
+
+
+    :return: An asynchronous iterator over the items.
+    :rtype: ~typing.AsyncIterator[~typing.Any]
+
+
+    :raise ~json.JSONDecodeError: When the body is not of the expected shape.
+
+    """
+    decoder = JSONArrayDecoder(items_key)
+    async for chunk in response.aiter_bytes():
+        for item in decoder.feed(chunk):
+            yield item
+    for item in decoder.close():
+        yield item
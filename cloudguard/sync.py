@@ -0,0 +1,668 @@
+# cloudguard/sync.py
+# ==================
+#
+# Copying
+# -------
+#
+# Copyright (c) 2023 cloudguard authors and contributors.
+#
+# This file is part of the *cloudguard* project.
+#
+# *cloudguard* is a free software project. You can redistribute it and/or
+# modify it following the terms of the MIT License.
+#
+# This software project is distributed *as is*, WITHOUT WARRANTY OF ANY KIND;
+# including but not limited to the WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE and NONINFRINGEMENT.
+#
+# You should have received a copy of the MIT License along with *cloudguard*.
+# If not, see <http://opensource.org/licenses/MIT>.
+#
+import os
+import re
+import json
+import typing as ty
+import hashlib
+import logging
+import datetime
+import tempfile
+import contextlib
+import dataclasses as dc
+
+from pathlib import Path
+
+import httpx
+
+import cloudguard.config
+
+from cloudguard.client import APIClient, AsyncAPIClient
+from cloudguard.pagination import Paginator
+
+
+log = logging.getLogger(__name__)
+
+
+#: Type definition of a watermark: the greatest value of the update key of the
+#: synchronised records, e.g. an ISO 8601 timestamp. Timestamps are compared in
+#: time, see :func:`parse_watermark`.
+Watermark = ty.Any
+#: Type definition of a filter: it receives the watermark and returns the extra
+#: request arguments selecting the records changed at or after it. The window
+#: is inclusive so that records sharing the watermark's value and not seen yet
+#: are fetched; the records already seen are skipped.
+Filter = ty.Callable[[Watermark], ty.Dict[str, ty.Any]]
+
+#: Name of the file holding the state of a snapshot.
+_STATE_FILE = "state.json"
+#: ISO 8601 timestamp, with optional time, fraction of seconds and offset.
+_ISO_8601 = re.compile(
+    r"(?P<date>\d{4}-\d{2}-\d{2})"
+    r"(?:[T ](?P<time>\d{2}:\d{2}(?::\d{2})?)(?:[.,](?P<fraction>\d+))?)?"
+    r"(?:(?P<utc>Z)|(?P<offset>[+-]\d{2}):?(?P<minutes>\d{2}))?"
+)
+
+
+def since_param(name: str) -> Filter:
+    """Build a filter providing the watermark as a query parameter.
+
+
+    :param name: Name of the query parameter.
+    :type name: str
+
+
+    :return: The filter.
+    :rtype: ~typing.Callable[[~typing.Any], ~typing.Dict[str, ~typing.Any]]
+
+    """
+    return lambda watermark: {"params": {name: watermark}}
+
+
+def since_field(name: str) -> Filter:
+    """Build a filter providing the watermark as a field of the request body.
+
+
+    :param name: Name of the field.
+    :type name: str
+
+
+    :return: The filter.
+    :rtype: ~typing.Callable[[~typing.Any], ~typing.Dict[str, ~typing.Any]]
+
+    """
+    return lambda watermark: {"json": {name: watermark}}
+
+
+def parse_watermark(value: Watermark) -> Watermark:
+    """Parse an ISO 8601 timestamp so that watermarks are compared in time
+    rather than as strings, whatever their offset or precision. Timestamps
+    without offset are taken as UTC.
+
+
+    :param value: The watermark.
+    :type value: ~typing.Any
+
+
+    :return: The timestamp as an aware :class:`~datetime.datetime`, or the
+             value as is when it is not an ISO 8601 timestamp.
+    :rtype: ~typing.Any
+
+    """
+    if not isinstance(value, str) or (m := _ISO_8601.fullmatch(value)) is None:
+        return value
+
+    text = f"{m['date']}T{m['time'] or '00:00'}"
+    if m["fraction"]:
+        # Only microseconds are supported, e.g. not the 7 digits of .NET.
+        text += f".{m['fraction'][:6]:0<6}"
+    if m["offset"]:
+        text += f"{m['offset']}:{m['minutes']}"
+    try:
+        parsed = datetime.datetime.fromisoformat(text)
+    except ValueError:
+        return value
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed
+
+
+def _compare(a: Watermark, b: Watermark) -> int:
+    """Compare two watermarks once parsed, falling back to their raw values
+    when they cannot be compared, e.g. when only one is a timestamp.
+
+
+    :param a: The first watermark.
+    :type a: ~typing.Any
+
+    :param b: The second watermark.
+    :type b: ~typing.Any
+
+
+    :return: A negative number, zero or a positive number when the first
+             watermark is respectively before, at or after the second one.
+    :rtype: int
+
+    """
+    pa, pb = parse_watermark(a), parse_watermark(b)
+    try:
+        return (pa > pb) - (pa < pb)
+    except TypeError:
+        return (a > b) - (a < b)
+
+
+@dc.dataclass(frozen=True)
+class Collection(object):
+    """Describe a collection of records of the CloudGuard API which can be
+    synchronised incrementally.
+
+    """
+
+    #: Name of the collection, unique for a tenant and a region.
+    name: str
+    #: HTTP method of the request listing the records.
+    method: str
+    #: URL of the endpoint listing the records.
+    url: ty.Union[httpx.URL, str]
+    #: Description of the endpoint's pagination.
+    paginator: Paginator
+    #: Key of the records holding the time of their last change.
+    updated_key: str
+    #: Build the request arguments selecting the records changed at or after a
+    #: watermark.
+    since: Filter
+    #: Key of the records holding their identifier.
+    id_key: str = "id"
+    #: Extra arguments of every request listing the records.
+    options: ty.Mapping[str, ty.Any] = dc.field(default_factory=dict)
+
+    def request(self, watermark: ty.Optional[Watermark]) -> ty.Dict[str, ty.Any]:
+        """Get the arguments of the request listing the records changed at or
+        after the given watermark.
+
+
+        :param watermark: The watermark, all the records are listed when
+                          ``None``.
+        :type watermark: ~typing.Any
+
+
+        :return: The request arguments.
+        :rtype: ~typing.Dict[str, ~typing.Any]
+
+        """
+        kwargs = dict(self.options)
+        if watermark is None:
+            return kwargs
+
+        for k, v in self.since(watermark).items():
+            if k == "params":
+                kwargs[k] = httpx.QueryParams(kwargs.get(k)).merge(v)
+            elif isinstance(v, dict) and isinstance(kwargs.get(k), dict):
+                kwargs[k] = {**kwargs[k], **v}
+            else:
+                kwargs[k] = v
+        return kwargs
+
+
+@dc.dataclass(frozen=True)
+class SyncResult(object):
+    """Outcome of the synchronisation of a collection."""
+
+    #: Name of the synchronised collection.
+    collection: str
+    #: Number of records fetched.
+    fetched: int
+    #: Whether all the records were fetched, replacing the snapshot.
+    full: bool
+    #: Watermark before the synchronisation.
+    since: ty.Optional[Watermark]
+    #: Watermark after the synchronisation.
+    watermark: ty.Optional[Watermark]
+
+
+class SnapshotUpdate(object):
+    """Records being written to a snapshot. They are only visible once the
+    update is committed.
+
+    """
+
+    def __init__(self, file: ty.TextIO, snapshot: "Snapshot", replace: bool = False):
+        """Constructor for :class:`cloudguard.sync.SnapshotUpdate`."""
+        self.file = file
+        self.snapshot = snapshot
+        self.count = 0
+        self.watermark: ty.Optional[Watermark] = None
+        #: Identifiers of the records changed at the watermark already written.
+        self.seen: ty.Set[ty.Any] = set()
+        if not replace:
+            self.watermark, self.seen = snapshot.watermark, set(snapshot.seen)
+        # Watermark and records seen at it before the update, which are skipped
+        # even once the watermark advanced.
+        self._since, self._since_seen = self.watermark, frozenset(self.seen)
+        # Versions written by the update, by record identifier.
+        self._written: ty.Dict[ty.Any, ty.Any] = {}
+
+    def add(self, record: ty.Mapping[str, ty.Any]) -> None:
+        """Write a new version of a record and advance the watermark. Versions
+        already written, e.g. fetched again at the watermark, are skipped.
+
+
+        :param record: The record to write.
+        :type record: ~typing.Mapping[str, ~typing.Any]
+
+
+        :return: ``None``
+
+
+        :raise ValueError: When the record has no identifier.
+
+        """
+        if self.snapshot.id_key not in record:
+            raise ValueError(
+                f"expected record with key `{self.snapshot.id_key}` got: {record!r}"
+            )
+
+        key = record[self.snapshot.id_key]
+        updated = record.get(self.snapshot.updated_key)
+        if (
+            updated is not None
+            and self._since is not None
+            and key in self._since_seen
+            and _compare(updated, self._since) == 0
+        ):
+            return
+        if key in self._written and self._written[key] == updated:
+            return
+
+        self.file.write(json.dumps(record, separators=(",", ":")))
+        self.file.write("\n")
+        self.count += 1
+        self._written[key] = updated
+
+        if updated is None:
+            return
+        order = 1 if self.watermark is None else _compare(updated, self.watermark)
+        if order > 0:
+            self.watermark, self.seen = updated, {key}
+        elif order == 0:
+            self.seen.add(key)
+
+
+class Snapshot(object):
+    """Local copy of a collection, kept up to date by merging the records
+    changed since the last synchronisation.
+
+    The snapshot is made of a base file and of delta files, each holding one
+    JSON record per line. A merge only writes the changed records to a new
+    delta file. The base and the deltas are compacted into a new base once the
+    deltas hold more than ``compact_ratio`` times the records of the base, so
+    the cost of a merge stays proportional to the number of changes.
+
+    The state of the snapshot, including its watermark, is written last and
+    atomically: an interrupted update leaves the previous snapshot untouched.
+
+
+    :param path: Directory holding the snapshot.
+    :type path: ~os.PathLike
+
+    :param id_key: Key of the records holding their identifier.
+    :type id_key: str
+
+    :param updated_key: Key of the records holding the time of their last
+                        change.
+    :type updated_key: str
+
+    :param compact_ratio: Ratio of the records of the deltas to the records of
+                          the base above which the snapshot is compacted.
+    :type compact_ratio: float
+
+    """
+
+    def __init__(
+        self,
+        path: os.PathLike,
+        id_key: str = "id",
+        updated_key: str = "lastModified",
+        compact_ratio: float = 0.5,
+    ):
+        """Constructor for :class:`cloudguard.sync.Snapshot`."""
+        self.path = Path(path).expanduser()
+        self.id_key = id_key
+        self.updated_key = updated_key
+        self.compact_ratio = compact_ratio
+        self._state = self._read_state()
+
+    def _read_state(self) -> ty.Dict[str, ty.Any]:
+        """Read the state of the snapshot from the disk."""
+        try:
+            with open(self.path / _STATE_FILE) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            log.warning(f"Could not read snapshot state at {self.path}: {e}")
+        return {
+            "generation": 0,
+            "watermark": None,
+            "seen": [],
+            "files": [],
+            "sizes": [],
+        }
+
+    def _write_state(self, state: ty.Dict[str, ty.Any]) -> None:
+        """Atomically write the state of the snapshot on the disk."""
+        fd, tmp = tempfile.mkstemp(dir=self.path, prefix=".tmp-")
+        with os.fdopen(fd, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, self.path / _STATE_FILE)
+        self._state = state
+
+    @property
+    def watermark(self) -> ty.Optional[Watermark]:
+        """Get the watermark of the snapshot.
+
+
+        :return: The greatest value of the update key of the records, ``None``
+                 when the snapshot was never synchronised.
+        :rtype: ~typing.Any
+
+        """
+        return self._state["watermark"]
+
+    @property
+    def seen(self) -> ty.List[ty.Any]:
+        """Get the identifiers of the records changed at the watermark, which
+        are skipped when fetched again.
+
+
+        :return: The identifiers of the records.
+        :rtype: ~typing.List[~typing.Any]
+
+        """
+        return self._state.get("seen", [])
+
+    def __iter__(self) -> ty.Iterator[ty.Dict[str, ty.Any]]:
+        """Iterate over the latest version of each record of the snapshot."""
+        return iter(self.records().values())
+
+    def records(self) -> ty.Dict[ty.Any, ty.Dict[str, ty.Any]]:
+        """Read the latest version of each record of the snapshot.
+
+
+        :return: The records, by identifier.
+        :rtype: ~typing.Dict[~typing.Any, ~typing.Dict[str, ~typing.Any]]
+
+        """
+        records = {}
+        for name in self._state["files"]:
+            with open(self.path / name) as f:
+                for line in f:
+                    record = json.loads(line)
+                    records[record[self.id_key]] = record
+        return records
+
+    @contextlib.contextmanager
+    def update(self, replace: bool = False) -> ty.Iterator[SnapshotUpdate]:
+        """Write records to the snapshot. The update is committed when leaving
+        the context without error, and discarded otherwise.
+
+
+        :param replace: Whether the written records replace all the records of
+                        the snapshot rather than being merged into them.
+        :type replace: bool
+
+
+        :return: A context manager providing the update.
+        :rtype: ~typing.ContextManager[~cloudguard.sync.SnapshotUpdate]
+
+        """
+        self.path.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "w") as f:
+                update = SnapshotUpdate(f, self, replace)
+                yield update
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        if not replace and not update.count:
+            os.unlink(tmp)
+            return
+
+        generation = self._state["generation"] + 1
+        name = f"{'base' if replace else 'delta'}-{generation:08d}.ndjson"
+        os.replace(tmp, self.path / name)
+
+        state = dict(
+            self._state,
+            generation=generation,
+            watermark=update.watermark,
+            seen=list(update.seen),
+        )
+        if replace:
+            obsolete = state["files"]
+            state["files"], state["sizes"] = [name], [update.count]
+        else:
+            obsolete = []
+            state["files"] = [*state["files"], name]
+            state["sizes"] = [*state["sizes"], update.count]
+        self._write_state(state)
+        self._remove(obsolete)
+
+        if sum(state["sizes"][1:]) > self.compact_ratio * max(state["sizes"][0], 1):
+            self.compact()
+
+    def compact(self) -> None:
+        """Merge the deltas into a new base.
+
+
+        :return: ``None``
+
+        """
+        if len(self._state["files"]) < 2:
+            return
+
+        records = self.records()
+        watermark, seen = self.watermark, set(self.seen)
+        with self.update(replace=True) as update:
+            for record in records.values():
+                update.add(record)
+            update.watermark, update.seen = watermark, seen
+        log.debug(f"Compacted snapshot at {self.path} to {len(records)} records")
+
+    def _remove(self, names: ty.Iterable[str]) -> None:
+        """Remove files of the snapshot which are no longer used."""
+        for name in names:
+            try:
+                (self.path / name).unlink()
+            except OSError as e:
+                log.warning(f"Could not remove {name} from {self.path}: {e}")
+
+
+class _SyncMixin(object):
+    """Behaviour shared by the synchronous and asynchronous synchronisation
+    engines.
+
+    """
+
+    def __init__(
+        self,
+        client: ty.Union[APIClient, AsyncAPIClient],
+        path: ty.Optional[os.PathLike] = None,
+        tenant: ty.Optional[str] = None,
+    ):
+        self.client = client
+        if path is None:
+            path = client.config.sync.path or cloudguard.config.CLOUDGUARD_SYNC_PATH
+        self.path = Path(path).expanduser()
+        self.tenant = tenant if tenant is not None else client.config.sync.tenant
+        if self.tenant is None:
+            log.warning(
+                "No tenant set to synchronise, snapshots are kept by API key"
+                " and started over when the credentials are rotated"
+            )
+
+    def _tenant(self) -> str:
+        """Get the identifier of the tenant under which snapshots are kept,
+        falling back to the API key currently used by the client.
+
+        """
+        if self.tenant is not None:
+            return self.tenant
+        if (provider := self.client.credentials_provider) is not None:
+            return provider.get().key
+        return self.client.config.credentials.api.key
+
+    def snapshot(self, collection: Collection) -> Snapshot:
+        """Get the snapshot of a collection for the tenant and the region of
+        the client.
+
+
+        :param collection: The synchronised collection.
+        :type collection: ~cloudguard.sync.Collection
+
+
+        :return: The snapshot of the collection.
+        :rtype: ~cloudguard.sync.Snapshot
+
+        """
+        region = self.client.config.region
+        key = f"{self._tenant()}:{region.code}:{collection.name}"
+        return Snapshot(
+            self.path / hashlib.sha256(key.encode()).hexdigest(),
+            id_key=collection.id_key,
+            updated_key=collection.updated_key,
+        )
+
+    def _result(
+        self,
+        collection: Collection,
+        since: ty.Optional[Watermark],
+        update: SnapshotUpdate,
+    ) -> SyncResult:
+        """Build the outcome of a synchronisation."""
+        log.debug(
+            f"Synchronised {update.count} records of {collection.name}"
+            f" since {since!r}"
+        )
+        return SyncResult(
+            collection=collection.name,
+            fetched=update.count,
+            full=since is None,
+            since=since,
+            watermark=update.watermark,
+        )
+
+
+class SyncEngine(_SyncMixin):
+    """Keep local snapshots of CloudGuard collections up to date, fetching
+    only the records changed since the previous synchronisation. There is one
+    snapshot per tenant, region and collection.
+
+    Records deleted from CloudGuard are only removed from a snapshot by a full
+    synchronisation.
+
+
+    :param client: The client fetching the records.
+    :type client: ~cloudguard.client.APIClient
+
+    :param path: Directory holding the snapshots. Defaults to the one of the
+                 client's configuration.
+    :type path: ~os.PathLike
+
+    :param tenant: Stable identifier of the tenant, e.g. its CloudGuard
+                   account number, under which the snapshots are kept.
+                   Defaults to the one of the client's configuration, or else
+                   to the API key in use.
+    :type tenant: str
+
+    """
+
+    def sync(self, collection: Collection, full: bool = False) -> SyncResult:
+        """Fetch the records changed since the last synchronisation and merge
+        them into the snapshot of the collection. The watermark is only
+        advanced once all the records were fetched.
+
+
+        :param collection: The collection to synchronise.
+        :type collection: ~cloudguard.sync.Collection
+
+        :param full: Whether to fetch all the records and replace the snapshot.
+        :type full: bool
+
+
+        :return: The outcome of the synchronisation.
+        :rtype: ~cloudguard.sync.SyncResult
+
+
+        :raise ~httpx.HTTPStatusError: When a page could not be fetched.
+
+        """
+        snapshot = self.snapshot(collection)
+        since = None if full else snapshot.watermark
+        with snapshot.update(replace=since is None) as update:
+            for record in self.client.paginate(
+                collection.method,
+                collection.url,
+                collection.paginator,
+                **collection.request(since),
+            ):
+                update.add(record)
+
+        return self._result(collection, since, update)
+
+
+class AsyncSyncEngine(_SyncMixin):
+    """Keep local snapshots of CloudGuard collections up to date using an
+    asynchronous client, fetching only the records changed since the previous
+    synchronisation. There is one snapshot per tenant, region and collection.
+
+    Records deleted from CloudGuard are only removed from a snapshot by a full
+    synchronisation.
+
+
+    :param client: The client fetching the records.
+    :type client: ~cloudguard.client.AsyncAPIClient
+
+    :param path: Directory holding the snapshots. Defaults to the one of the
+                 client's configuration.
+    :type path: ~os.PathLike
+
+    :param tenant: Stable identifier of the tenant, e.g. its CloudGuard
+                   account number, under which the snapshots are kept.
+                   Defaults to the one of the client's configuration, or else
+                   to the API key in use.
+    :type tenant: str
+
+    """
+
+    async def sync(self, collection: Collection, full: bool = False) -> SyncResult:
+        """Fetch the records changed since the last synchronisation and merge
+        them into the snapshot of the collection. The watermark is only
+        advanced once all the records were fetched.
+
+
+        :param collection: The collection to synchronise.
+        :type collection: ~cloudguard.sync.Collection
+
+        :param full: Whether to fetch all the records and replace the snapshot.
+        :type full: bool
+
+
+        :return: The outcome of the synchronisation.
+        :rtype: ~cloudguard.sync.SyncResult
+
+
+        :raise ~httpx.HTTPStatusError: When a page could not be fetched.
+
+        """
+        snapshot = self.snapshot(collection)
+        since = None if full else snapshot.watermark
+        with snapshot.update(replace=since is None) as update:
+            async for record in self.client.apaginate(
+                collection.method,
+                collection.url,
+                collection.paginator,
+                **collection.request(since),
+            ):
+                update.add(record)
+
+        return self._result(collection, since, update)
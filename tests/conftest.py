@@ -0,0 +1,89 @@
+# tests/conftest.py
+# =================
+#
+# Copying
+# -------
+#
+# Copyright (c) 2023 cloudguard authors and contributors.
+#
+# This file is part of the *cloudguard* project.
+#
+# *cloudguard* is a free software project. You can redistribute it and/or
+# modify it following the terms of the MIT License.
+#
+# This software project is distributed *as is*, WITHOUT WARRANTY OF ANY KIND;
+# including but not limited to the WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE and NONINFRINGEMENT.
+#
+# You should have received a copy of the MIT License along with *cloudguard*.
+# If not, see <http://opensource.org/licenses/MIT>.
+#
+import os
+import typing as ty
+
+import httpx
+import pytest
+
+from cloudguard.client import APIClient, AsyncAPIClient
+from cloudguard.config import Config
+from cloudguard.credentials import APICredentials
+
+
+#: Type definition of a function answering the requests sent to a mock API.
+Handler = ty.Callable[[httpx.Request], httpx.Response]
+
+
+@pytest.fixture(autouse=True)
+def environment(monkeypatch: pytest.MonkeyPatch, tmp_path: os.PathLike) -> None:
+    """Isolate the tests from the configuration of the host."""
+    for name in list(os.environ):
+        if name.startswith("CLOUDGUARD_"):
+            monkeypatch.delenv(name)
+    monkeypatch.setenv("CLOUDGUARD_CONFIG", str(tmp_path / "config"))
+    monkeypatch.setenv("CLOUDGUARD_CREDENTIALS", str(tmp_path / "credentials"))
+
+
+@pytest.fixture
+def config() -> Config:
+    """Configuration of a client of the Ireland region, without retries."""
+    config = Config(region="eu1")
+    config.credentials.api = APICredentials("key", "secret")
+    config.retry.max_retries = 0
+    return config
+
+
+@pytest.fixture
+def make_client(
+    config: Config,
+) -> ty.Iterator[ty.Callable[[Handler], APIClient]]:
+    """Build clients answered by a mock API."""
+    clients = []
+
+    def make(handler: Handler, config: Config = config) -> APIClient:
+        client = APIClient(config, transport=httpx.MockTransport(handler))
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        client.close()
+
+
+@pytest.fixture
+def mock_transport(monkeypatch: pytest.MonkeyPatch) -> ty.List[httpx.Request]:
+    """Answer every request of the clients created by sessions with an empty
+    JSON object, recording the requests.
+
+    """
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json={})
+
+    def transport(**kwargs) -> httpx.MockTransport:
+        return httpx.MockTransport(handler)
+
+    monkeypatch.setattr(APIClient, "transport_class", staticmethod(transport))
+    monkeypatch.setattr(AsyncAPIClient, "transport_class", staticmethod(transport))
+    return requests
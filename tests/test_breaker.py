@@ -0,0 +1,63 @@
+# tests/test_breaker.py
+# =====================
+#
+# Copying
+# -------
+#
+# Copyright (c) 2023 cloudguard authors and contributors.
+#
+# This file is part of the *cloudguard* project.
+#
+# *cloudguard* is a free software project. You can redistribute it and/or
+# modify it following the terms of the MIT License.
+#
+# This software project is distributed *as is*, WITHOUT WARRANTY OF ANY KIND;
+# including but not limited to the WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE and NONINFRINGEMENT.
+#
+# You should have received a copy of the MIT License along with *cloudguard*.
+# If not, see <http://opensource.org/licenses/MIT>.
+#
+import pytest
+
+from cloudguard import breaker
+from cloudguard.breaker import CircuitBreaker, get_breaker
+
+
+@pytest.fixture(autouse=True)
+def breakers(monkeypatch):
+    """Start every test without any shared circuit breaker."""
+    monkeypatch.setattr(breaker, "_BREAKERS", {})
+
+
+def test_circuit():
+    """The circuit opens after too many failures and closes after a probe."""
+    circuit = CircuitBreaker(threshold=2, reset_timeout=0)
+    circuit.failure()
+    assert circuit.allow()
+    circuit.failure()
+    assert circuit.stats.opened == 1
+    assert circuit.state == breaker.HALF_OPEN
+
+    assert circuit.allow()
+    circuit.success()
+    assert circuit.state == breaker.CLOSED
+
+
+def test_shared_breaker():
+    """Clients with the same settings share the circuit breaker of a region."""
+    assert get_breaker("eu1", 3, 10) is get_breaker("eu1", 3, 10)
+    assert get_breaker("eu1", 3, 10) is not get_breaker("us", 3, 10)
+
+
+def test_settings_kept():
+    """A client with other settings does not change those of a shared circuit
+    breaker.
+
+    """
+    first = get_breaker("eu1", 3, 10)
+    second = get_breaker("eu1", 1, 60)
+
+    assert second is not first
+    assert (first.threshold, first.reset_timeout) == (3, 10)
+    assert (second.threshold, second.reset_timeout) == (1, 60)
@@ -0,0 +1,156 @@
+# tests/test_cache.py
+# ===================
+#
+# Copying
+# -------
+#
+# Copyright (c) 2023 cloudguard authors and contributors.
+#
+# This file is part of the *cloudguard* project.
+#
+# *cloudguard* is a free software project. You can redistribute it and/or
+# modify it following the terms of the MIT License.
+#
+# This software project is distributed *as is*, WITHOUT WARRANTY OF ANY KIND;
+# including but not limited to the WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE and NONINFRINGEMENT.
+#
+# You should have received a copy of the MIT License along with *cloudguard*.
+# If not, see <http://opensource.org/licenses/MIT>.
+#
+import typing as ty
+
+import httpx
+
+from cloudguard.cache import DiskStore, ResponseCache, CacheTransport
+from cloudguard.streaming import streamed
+
+
+class Resource(object):
+    """A resource of a mock API served with an entity tag."""
+
+    def __init__(self, content: bytes = b'{"id": 1}'):
+        self.content = content
+        self.version = 1
+        self.requests: ty.List[httpx.Request] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        etag = f'"{self.version}"'
+        if request.headers.get("If-None-Match") == etag:
+            return httpx.Response(304, headers={"ETag": etag})
+        return httpx.Response(200, headers={"ETag": etag}, content=self.content)
+
+
+def make_client(
+    handler: ty.Callable[[httpx.Request], httpx.Response],
+    cache: ty.Optional[ResponseCache] = None,
+) -> httpx.Client:
+    """Build a client caching the responses of a mock API."""
+    cache = cache if cache is not None else ResponseCache()
+    return httpx.Client(
+        base_url="https://test",
+        transport=CacheTransport(httpx.MockTransport(handler), cache, "eu1"),
+    )
+
+
+def test_revalidation():
+    """A cached response is revalidated and served when it did not change."""
+    resource = Resource()
+    client = make_client(resource)
+
+    first = client.get("/")
+    second = client.get("/")
+
+    assert first.content == second.content == resource.content
+    assert second.status_code == 200
+    assert "If-None-Match" not in resource.requests[0].headers
+    assert resource.requests[1].headers["If-None-Match"] == '"1"'
+
+    stats = client._transport.cache.stats
+    assert (stats.misses, stats.hits) == (1, 1)
+    assert stats.bytes_saved == len(resource.content)
+
+
+def test_revalidation_changed():
+    """A cached response is replaced when the resource changed."""
+    resource = Resource()
+    client = make_client(resource)
+    client.get("/")
+
+    resource.version, resource.content = 2, b'{"id": 2}'
+    changed = client.get("/")
+    cached = client.get("/")
+
+    assert changed.content == cached.content == b'{"id": 2}'
+    assert resource.requests[2].headers["If-None-Match"] == '"2"'
+
+
+def test_conditional_request_passed_through():
+    """Requests made conditional by the caller get the server's answer."""
+    resource = Resource()
+    client = make_client(resource)
+    client.get("/")
+
+    response = client.get("/", headers={"If-None-Match": '"1"'})
+
+    assert response.status_code == 304
+    assert client._transport.cache.stats.hits == 0
+
+
+def test_credentials_isolated():
+    """Requests sent with different credentials do not share entries."""
+    resource = Resource()
+    client = make_client(resource)
+
+    client.get("/", auth=("alice", "secret"))
+    client.get("/", auth=("bob", "secret"))
+
+    assert "If-None-Match" not in resource.requests[1].headers
+    assert len(client._transport.cache) == 2
+
+
+def test_streamed_request_not_cached():
+    """Streamed requests are neither answered from nor stored in the cache."""
+    resource = Resource()
+    client = make_client(resource)
+
+    for _ in range(2):
+        with client.stream("GET", "/", **streamed({})) as response:
+            response.read()
+
+    assert "If-None-Match" not in resource.requests[1].headers
+    assert len(client._transport.cache) == 0
+
+
+def test_unknown_length_not_cached():
+    """Responses whose size is unknown are not read in full to be cached."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(
+            200, headers={"ETag": '"1"'}, stream=httpx.ByteStream(b"{}")
+        )
+
+    client = make_client(handler)
+
+    assert client.get("/").content == b"{}"
+    assert len(client._transport.cache) == 0
+
+
+def test_disk_store(tmp_path):
+    """Entries persisted on the disk do not disclose the credentials."""
+    resource = Resource()
+    cache = ResponseCache(store=DiskStore(tmp_path))
+    make_client(resource, cache).get("/", auth=("alice", "secret"))
+
+    # A new cache, e.g. of another process, revalidates the stored entry.
+    client = make_client(resource, ResponseCache(store=DiskStore(tmp_path)))
+    response = client.get("/", auth=("alice", "secret"))
+
+    assert response.content == resource.content
+    assert resource.requests[1].headers["If-None-Match"] == '"1"'
+    authorization = resource.requests[0].headers["Authorization"].encode()
+    files = [f for f in tmp_path.rglob("*") if f.is_file()]
+    assert files
+    for file in files:
+        assert authorization not in file.read_bytes()
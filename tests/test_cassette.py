@@ -0,0 +1,111 @@
+# tests/test_cassette.py
+# ======================
+#
+# Copying
+# -------
+#
+# Copyright (c) 2023 cloudguard authors and contributors.
+#
+# This file is part of the *cloudguard* project.
+#
+# *cloudguard* is a free software project. You can redistribute it and/or
+# modify it following the terms of the MIT License.
+#
+# This software project is distributed *as is*, WITHOUT WARRANTY OF ANY KIND;
+# including but not limited to the WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE and NONINFRINGEMENT.
+#
+# You should have received a copy of the MIT License along with *cloudguard*.
+# If not, see <http://opensource.org/licenses/MIT>.
+#
+import typing as ty
+import asyncio
+
+import httpx
+import pytest
+
+from cloudguard.errors import CassetteMissError
+from cloudguard.cassette import (
+    SCRUBBED,
+    RecordTransport,
+    ReplayTransport,
+    AsyncRecordTransport,
+    AsyncReplayTransport,
+)
+from cloudguard.credentials import APICredentials
+
+
+#: Credentials scrubbed from the recorded interactions.
+CREDENTIALS = APICredentials("key", "secret")
+
+
+class EchoTransport(httpx.BaseTransport):
+    """Transport echoing the body of the requests, consuming their stream as a
+    network transport does.
+
+    """
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=b"".join(request.stream))
+
+
+def body() -> ty.Iterator[bytes]:
+    """Stream a request body."""
+    yield b"streamed"
+
+
+def test_record_replay():
+    """A recorded interaction is replayed."""
+    record = RecordTransport(EchoTransport())
+    with httpx.Client(base_url="https://test", transport=record) as client:
+        assert client.post("/items?page=2", content=b"body").content == b"body"
+
+    replay = ReplayTransport(record.cassette)
+    with httpx.Client(base_url="https://other", transport=replay) as client:
+        assert client.post("/items?page=2", content=b"body").content == b"body"
+        with pytest.raises(CassetteMissError):
+            client.post("/items?page=2", content=b"other")
+
+
+def test_record_streamed_body():
+    """A request with a streamed body is recorded and replayed."""
+    record = RecordTransport(EchoTransport())
+    with httpx.Client(base_url="https://test", transport=record) as client:
+        assert client.post("/items", content=body()).content == b"streamed"
+
+    replay = ReplayTransport(record.cassette)
+    with httpx.Client(base_url="https://test", transport=replay) as client:
+        assert client.post("/items", content=body()).content == b"streamed"
+
+
+def test_replay_scrubbed_url():
+    """A request holding secrets in its URL matches its scrubbed recording."""
+    record = RecordTransport(EchoTransport(), credentials=CREDENTIALS)
+    with httpx.Client(base_url="https://test", transport=record) as client:
+        client.get("/items", params={"apiKey": "key"})
+    assert record.cassette.interactions[0].url == f"/items?apiKey={SCRUBBED}"
+
+    replay = ReplayTransport(record.cassette, credentials=CREDENTIALS)
+    with httpx.Client(base_url="https://test", transport=replay) as client:
+        assert client.get("/items", params={"apiKey": "key"}).status_code == 200
+
+
+def test_async_replay_scrubbed_url():
+    """An asynchronous request holding secrets in its URL matches its scrubbed
+    recording.
+
+    """
+
+    async def main():
+        record = AsyncRecordTransport(
+            httpx.MockTransport(lambda r: httpx.Response(200)),
+            credentials=CREDENTIALS,
+        )
+        async with httpx.AsyncClient(base_url="https://test", transport=record) as c:
+            await c.get("/items", params={"apiKey": "key"})
+
+        replay = AsyncReplayTransport(record.cassette, credentials=CREDENTIALS)
+        async with httpx.AsyncClient(base_url="https://test", transport=replay) as c:
+            return await c.get("/items", params={"apiKey": "key"})
+
+    assert asyncio.run(main()).status_code == 200
@@ -0,0 +1,233 @@
+# tests/test_coalesce.py
+# ======================
+#
+# Copying
+# -------
+#
+# Copyright (c) 2023 cloudguard authors and contributors.
+#
+# This file is part of the *cloudguard* project.
+#
+# *cloudguard* is a free software project. You can redistribute it and/or
+# modify it following the terms of the MIT License.
+#
+# This software project is distributed *as is*, WITHOUT WARRANTY OF ANY KIND;
+# including but not limited to the WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE and NONINFRINGEMENT.
+#
+# You should have received a copy of the MIT License along with *cloudguard*.
+# If not, see <http://opensource.org/licenses/MIT>.
+#
+import time
+import typing as ty
+import asyncio
+import threading
+
+import httpx
+import pytest
+
+from cloudguard.coalesce import CoalesceTransport, AsyncCoalesceTransport
+from cloudguard.streaming import streamed
+
+
+#: Number of identical requests sent at once.
+CONCURRENCY: int = 8
+
+
+def get_concurrently(client: httpx.Client, **kwargs) -> ty.List[httpx.Response]:
+    """Send identical requests from several threads at once."""
+    barrier = threading.Barrier(CONCURRENCY)
+    responses = []
+
+    def get():
+        barrier.wait()
+        responses.append(client.get("/", **kwargs))
+
+    threads = [threading.Thread(target=get) for _ in range(CONCURRENCY)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return responses
+
+
+def make_client(
+    respond: ty.Callable[[httpx.Request], httpx.Response],
+    max_size: ty.Optional[int] = None,
+) -> ty.Tuple[httpx.Client, ty.List[httpx.Request]]:
+    """Build a client coalescing the requests sent to a slow mock API."""
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        time.sleep(0.3)
+        return respond(request)
+
+    options = {} if max_size is None else {"max_size": max_size}
+    transport = CoalesceTransport(httpx.MockTransport(handler), **options)
+    return httpx.Client(base_url="https://test", transport=transport), requests
+
+
+def test_coalesced():
+    """Identical requests made concurrently are sent once."""
+    client, requests = make_client(lambda request: httpx.Response(200, json={"id": 1}))
+
+    responses = get_concurrently(client)
+
+    assert len(requests) == 1
+    assert [r.json() for r in responses] == [{"id": 1}] * CONCURRENCY
+    assert client._transport.stats.coalesced == CONCURRENCY - 1
+
+
+def test_credentials_not_coalesced():
+    """Requests sent with different credentials are not coalesced."""
+    client, requests = make_client(lambda request: httpx.Response(200, json={}))
+
+    with client:
+        barrier = threading.Barrier(2)
+
+        def get(user: str):
+            barrier.wait()
+            client.get("/", auth=(user, "secret"))
+
+        threads = [threading.Thread(target=get, args=(u,)) for u in "ab"]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    assert len(requests) == 2
+
+
+def get_in_turn(
+    client: httpx.Client, headers: ty.List[ty.Optional[ty.Dict[str, str]]]
+) -> ty.List[httpx.Response]:
+    """Send requests with the given headers from several threads, each one
+    while the previous ones are still in flight.
+
+    """
+    responses = [None] * len(headers)
+
+    def get(i: int):
+        responses[i] = client.get("/", headers=headers[i])
+
+    threads = [threading.Thread(target=get, args=(i,)) for i in range(len(headers))]
+    for t in threads:
+        t.start()
+        time.sleep(0.05)
+    for t in threads:
+        t.join()
+    return responses
+
+
+@pytest.mark.parametrize(
+    "conditional",
+    [
+        {"If-None-Match": '"1"'},
+        {"If-Modified-Since": "Sun, 01 Jan 2023 00:00:00 GMT"},
+    ],
+)
+def test_conditional_not_coalesced(conditional: ty.Dict[str, str]):
+    """Conditional requests are sent on their own, and get their own answer."""
+
+    def respond(request: httpx.Request) -> httpx.Response:
+        if any(h in request.headers for h in conditional):
+            return httpx.Response(304, headers={"Content-Length": "0"})
+        return httpx.Response(200, json={})
+
+    client, requests = make_client(respond)
+
+    responses = get_in_turn(client, [None, conditional])
+
+    assert len(requests) == 2
+    assert [r.status_code for r in responses] == [200, 304]
+
+
+def test_accept_not_coalesced():
+    """Requests asking for different representations are not coalesced."""
+    client, requests = make_client(
+        lambda request: httpx.Response(200, content=request.headers["Accept"].encode())
+    )
+
+    responses = get_in_turn(client, [{"Accept": "text/csv"}, {"Accept": "text/tsv"}])
+
+    assert len(requests) == 2
+    assert [r.text for r in responses] == ["text/csv", "text/tsv"]
+
+
+def test_unknown_length_not_shared():
+    """Responses of unknown size are not read in full to be shared."""
+    client, requests = make_client(
+        lambda request: httpx.Response(200, stream=httpx.ByteStream(b"{}"))
+    )
+
+    responses = get_concurrently(client)
+
+    assert 1 < len(requests) <= CONCURRENCY
+    assert [r.content for r in responses] == [b"{}"] * CONCURRENCY
+    assert client._transport.stats.coalesced == 0
+
+
+def test_large_response_not_shared():
+    """Responses larger than the maximum size are not shared."""
+    client, requests = make_client(
+        lambda request: httpx.Response(200, content=b"x" * 16), max_size=8
+    )
+
+    responses = get_concurrently(client)
+
+    assert 1 < len(requests) <= CONCURRENCY
+    assert [r.content for r in responses] == [b"x" * 16] * CONCURRENCY
+
+
+def test_streamed_request_not_coalesced():
+    """Streamed requests are sent on their own."""
+    client, requests = make_client(lambda request: httpx.Response(200, json={}))
+
+    get_concurrently(client, **streamed({}))
+
+    assert len(requests) == CONCURRENCY
+
+
+def test_async_coalesced():
+    """Identical requests made concurrently from tasks are sent once."""
+    requests = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        await asyncio.sleep(0.1)
+        return httpx.Response(200, json={"id": 1})
+
+    async def main() -> ty.List[httpx.Response]:
+        transport = AsyncCoalesceTransport(httpx.MockTransport(handler))
+        async with httpx.AsyncClient(
+            base_url="https://test", transport=transport
+        ) as client:
+            return await asyncio.gather(*(client.get("/") for _ in range(CONCURRENCY)))
+
+    responses = asyncio.run(main())
+
+    assert len(requests) == 1
+    assert [r.json() for r in responses] == [{"id": 1}] * CONCURRENCY
+
+
+def test_async_unknown_length_not_shared():
+    """Responses of unknown size are not shared between tasks."""
+    requests = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        await asyncio.sleep(0.1)
+        return httpx.Response(200, stream=httpx.ByteStream(b"{}"))
+
+    async def main() -> ty.List[httpx.Response]:
+        transport = AsyncCoalesceTransport(httpx.MockTransport(handler))
+        async with httpx.AsyncClient(
+            base_url="https://test", transport=transport
+        ) as client:
+            return await asyncio.gather(*(client.get("/") for _ in range(CONCURRENCY)))
+
+    responses = asyncio.run(main())
+
+    assert len(requests) == CONCURRENCY
+    assert [r.content for r in responses] == [b"{}"] * CONCURRENCY
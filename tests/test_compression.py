@@ -0,0 +1,146 @@
+# tests/test_compression.py
+# =========================
+#
+# Copying
+# -------
+#
+# Copyright (c) 2023 cloudguard authors and contributors.
+#
+# This file is part of the *cloudguard* project.
+#
+# *cloudguard* is a free software project. You can redistribute it and/or
+# modify it following the terms of the MIT License.
+#
+# This software project is distributed *as is*, WITHOUT WARRANTY OF ANY KIND;
+# including but not limited to the WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE and NONINFRINGEMENT.
+#
+# You should have received a copy of the MIT License along with *cloudguard*.
+# If not, see <http://opensource.org/licenses/MIT>.
+#
+import gzip
+import json
+import zlib
+import typing as ty
+
+import httpx
+import pytest
+
+from cloudguard.compression import DECODERS, CompressionTransport
+
+
+def feed(coding: str, content: bytes, chunk_size: int = 5) -> bytes:
+    """Decompress a content in chunks with the decoder of a content coding."""
+    decoder = DECODERS[coding]()
+    output = [
+        decoder.decompress(content[i : i + chunk_size])
+        for i in range(0, len(content), chunk_size)
+    ]
+    output.append(decoder.flush())
+    return b"".join(output)
+
+
+#: Content compressed in the tests.
+CONTENT: bytes = json.dumps([{"id": i} for i in range(1000)]).encode()
+
+
+def test_gzip():
+    """``gzip`` contents are decompressed incrementally."""
+    assert feed("gzip", gzip.compress(CONTENT)) == CONTENT
+
+
+@pytest.mark.parametrize("wbits", [zlib.MAX_WBITS, -zlib.MAX_WBITS])
+@pytest.mark.parametrize("chunk_size", [1, 5])
+def test_deflate(wbits: int, chunk_size: int):
+    """``deflate`` contents are decompressed with or without their zlib
+    header.
+
+    """
+    compressor = zlib.compressobj(wbits=wbits)
+    content = compressor.compress(CONTENT) + compressor.flush()
+
+    assert feed("deflate", content, chunk_size) == CONTENT
+
+
+@pytest.mark.skipif("zstd" not in DECODERS, reason="zstd is not available")
+def test_zstd_frames():
+    """``zstd`` contents made of several frames are decompressed in full."""
+    try:
+        import zstandard
+
+        compress = zstandard.ZstdCompressor().compress
+    except ImportError:
+        try:
+            from compression import zstd
+        except ImportError:
+            from backports import zstd
+        compress = zstd.compress
+
+    half = len(CONTENT) // 2
+    content = compress(CONTENT[:half]) + compress(CONTENT[half:])
+
+    assert feed("zstd", content) == CONTENT
+    assert feed("zstd", content, len(content)) == CONTENT
+
+
+def make_client(
+    handler: ty.Callable[[httpx.Request], httpx.Response], **kwargs
+) -> httpx.Client:
+    """Build a client compressing the requests sent to a mock API."""
+    transport = CompressionTransport(httpx.MockTransport(handler), **kwargs)
+    return httpx.Client(base_url="https://test", transport=transport)
+
+
+def test_response_decoded():
+    """Compressed responses are decoded and measured."""
+    client = make_client(
+        lambda request: httpx.Response(
+            200, headers={"Content-Encoding": "gzip"}, content=gzip.compress(CONTENT)
+        )
+    )
+
+    response = client.get("/")
+
+    assert response.content == CONTENT
+    assert "Content-Encoding" not in response.headers
+    stats = client._transport.stats
+    assert stats.responses == 1
+    assert stats.decoded_bytes == len(CONTENT)
+    assert stats.response_ratio > 1
+
+
+def test_request_compressed():
+    """Large request bodies are compressed, small ones are not."""
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(204)
+
+    client = make_client(handler, compress_requests=True, min_size=1024)
+
+    client.post("/", content=CONTENT)
+    client.post("/", content=b"{}")
+
+    assert requests[0].headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(requests[0].content) == CONTENT
+    assert int(requests[0].headers["Content-Length"]) == len(requests[0].content)
+    assert "Content-Encoding" not in requests[1].headers
+    assert requests[1].content == b"{}"
+
+
+def test_streamed_request_not_compressed():
+    """Streamed request bodies are sent as is."""
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        request.read()
+        return httpx.Response(204)
+
+    client = make_client(handler, compress_requests=True, min_size=1)
+
+    client.post("/", content=iter([CONTENT[:10], CONTENT[10:]]))
+
+    assert "Content-Encoding" not in requests[0].headers
+    assert requests[0].content == CONTENT
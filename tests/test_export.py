@@ -0,0 +1,165 @@
+# tests/test_export.py
+# ====================
+#
+# Copying
+# -------
+#
+# Copyright (c) 2023 cloudguard authors and contributors.
+#
+# This file is part of the *cloudguard* project.
+#
+# *cloudguard* is a free software project. You can redistribute it and/or
+# modify it following the terms of the MIT License.
+#
+# This software project is distributed *as is*, WITHOUT WARRANTY OF ANY KIND;
+# including but not limited to the WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE and NONINFRINGEMENT.
+#
+# You should have received a copy of the MIT License along with *cloudguard*.
+# If not, see <http://opensource.org/licenses/MIT>.
+#
+import gzip
+import json
+import typing as ty
+
+import httpx
+import pytest
+
+from cloudguard.export import ExportJob, export, export_all
+from cloudguard.pagination import PagePaginator
+
+
+class Server(object):
+    """A mock API listing records by pages, truncating a page once."""
+
+    def __init__(self, records: ty.List[ty.Dict[str, ty.Any]], fail: int = 0):
+        self.records = records
+        self.fail = fail
+        self.pages: ty.List[int] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        page, size = int(request.url.params["pageNumber"]), 3
+        self.pages.append(page)
+        body = json.dumps(
+            {"items": self.records[(page - 1) * size : page * size]}
+        ).encode()
+        if page == self.fail:
+            self.fail = 0
+            # Interrupted in the middle of the page.
+            return httpx.Response(200, content=body[: len(body) // 2])
+        return httpx.Response(200, content=body)
+
+
+def read(path) -> ty.List[ty.Dict[str, ty.Any]]:
+    """Read the records of a compressed NDJSON export."""
+    with gzip.open(path, "rt") as f:
+        return [json.loads(line) for line in f]
+
+
+def make_job(client, path, format: str = "ndjson") -> ExportJob:
+    """Describe the export of the records of the mock API."""
+    return ExportJob(
+        client=client,
+        method="GET",
+        url="/records",
+        paginator=PagePaginator(items_key="items", page_size=3),
+        path=path,
+        format=format,
+    )
+
+
+def test_export(make_client, tmp_path):
+    """Every record is written to the output."""
+    server = Server([{"id": i} for i in range(10)])
+    job = make_job(make_client(server), tmp_path / "records.ndjson.gz")
+
+    result = export(job)
+
+    assert (result.records, result.pages, result.resumed) == (10, 4, False)
+    assert read(job.path) == server.records
+    assert not job.checkpoint_path.exists()
+
+
+def test_export_resume(make_client, tmp_path):
+    """An interrupted export resumes from its last checkpoint without
+    duplicating the records written after it.
+
+    """
+    server = Server([{"id": i} for i in range(10)], fail=3)
+    job = make_job(make_client(server), tmp_path / "records.ndjson.gz")
+
+    with pytest.raises(json.JSONDecodeError):
+        export(job, checkpoint_every=1)
+    assert job.checkpoint_path.exists()
+
+    server.pages.clear()
+    result = export(job, checkpoint_every=1)
+
+    assert (result.records, result.pages, result.resumed) == (10, 4, True)
+    assert server.pages == [3, 4]
+    assert read(job.path) == server.records
+    assert not job.checkpoint_path.exists()
+
+
+def test_export_no_resume(make_client, tmp_path):
+    """An export not resumed starts over."""
+    server = Server([{"id": i} for i in range(10)], fail=3)
+    job = make_job(make_client(server), tmp_path / "records.ndjson.gz")
+    with pytest.raises(json.JSONDecodeError):
+        export(job, checkpoint_every=1)
+
+    result = export(job, resume=False, checkpoint_every=1)
+
+    assert (result.records, result.resumed) == (10, False)
+    assert read(job.path) == server.records
+
+
+def test_export_all(make_client, tmp_path):
+    """A failed export is reported without stopping the others."""
+    ok = make_job(make_client(Server([{"id": 1}])), tmp_path / "ok.ndjson")
+    failed = make_job(
+        make_client(lambda request: httpx.Response(500)), tmp_path / "ko.ndjson"
+    )
+
+    results = export_all([ok, failed])
+
+    assert [r.job for r in results] == [ok, failed]
+    assert results[0].ok and results[0].records == 1
+    assert isinstance(results[1].error, httpx.HTTPStatusError)
+
+
+def test_export_unknown_format(make_client, tmp_path):
+    """Unknown output formats are rejected."""
+    job = make_job(make_client(Server([])), tmp_path / "records", format="xml")
+
+    with pytest.raises(ValueError, match="expected one of"):
+        export(job)
+
+
+def test_export_parquet_resume(make_client, tmp_path):
+    """Every part of a resumed Parquet export has the same schema, even when
+    a column only holds nulls in the first part.
+
+    """
+    pyarrow = pytest.importorskip("pyarrow")
+    pytest.importorskip("pyarrow.parquet")
+
+    records = [
+        {"id": i, "name": None if i < 3 else f"record {i}", "tags": [i]}
+        for i in range(10)
+    ]
+    server = Server(records, fail=3)
+    job = make_job(make_client(server), tmp_path / "records", format="parquet")
+
+    with pytest.raises(json.JSONDecodeError):
+        export(job, checkpoint_every=1)
+    result = export(job, checkpoint_every=1)
+
+    assert (result.records, result.resumed) == (10, True)
+    parts = sorted(job.path.glob("part-*.parquet"))
+    schemas = {pyarrow.parquet.read_schema(p) for p in parts}
+    assert len(parts) == 4 and len(schemas) == 1
+    table = pyarrow.parquet.read_table(job.path)
+    assert table.column("id").to_pylist() == list(range(10))
+    assert table.column("name").to_pylist() == [r["name"] for r in records]
+    assert table.column("tags").to_pylist() == [json.dumps([i]) for i in range(10)]
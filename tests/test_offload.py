@@ -0,0 +1,115 @@
+# tests/test_offload.py
+# =====================
+#
+# Copying
+# -------
+#
+# Copyright (c) 2023 cloudguard authors and contributors.
+#
+# This file is part of the *cloudguard* project.
+#
+# *cloudguard* is a free software project. You can redistribute it and/or
+# modify it following the terms of the MIT License.
+#
+# This software project is distributed *as is*, WITHOUT WARRANTY OF ANY KIND;
+# including but not limited to the WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE and NONINFRINGEMENT.
+#
+# You should have received a copy of the MIT License along with *cloudguard*.
+# If not, see <http://opensource.org/licenses/MIT>.
+#
+import json
+import typing as ty
+import asyncio
+import threading
+import multiprocessing
+import concurrent.futures
+
+import pytest
+
+from cloudguard.offload import Offloader
+
+
+#: A body large enough to be handed to the workers through shared memory.
+CONTENT: bytes = json.dumps(list(range(1000))).encode()
+
+
+def total(payload: ty.List[int]) -> int:
+    """Reduce a decoded body."""
+    return sum(payload)
+
+
+class DelayedExecutor(concurrent.futures.ProcessPoolExecutor):
+    """Process pool whose work is run by threads once released, so that the
+    callers may be cancelled before the workers start.
+
+    """
+
+    def __init__(self):
+        super().__init__(max_workers=1)
+        self.released = threading.Event()
+        self.futures: ty.List[concurrent.futures.Future] = []
+        self._threads = concurrent.futures.ThreadPoolExecutor(1)
+
+    def submit(self, fn, *args, **kwargs) -> concurrent.futures.Future:
+        def run():
+            self.released.wait()
+            return fn(*args, **kwargs)
+
+        future = self._threads.submit(run)
+        self.futures.append(future)
+        return future
+
+    def shutdown(self, *args, **kwargs) -> None:
+        self.released.set()
+        self._threads.shutdown()
+        super().shutdown(*args, **kwargs)
+
+
+@pytest.mark.parametrize(
+    "executor",
+    [
+        concurrent.futures.ThreadPoolExecutor,
+        # Not forking the threads of the test runner.
+        lambda: concurrent.futures.ProcessPoolExecutor(
+            mp_context=multiprocessing.get_context("spawn")
+        ),
+    ],
+    ids=["threads", "processes"],
+)
+def test_decode(executor: ty.Callable[[], concurrent.futures.Executor]):
+    """Large bodies are decoded and transformed by the workers."""
+    executor = executor()
+
+    async def main():
+        offloader = Offloader(executor, min_size=0, shared_memory_size=0)
+        return await offloader.decode(CONTENT, total), await offloader.decode(b"[1]")
+
+    try:
+        assert asyncio.run(main()) == (sum(range(1000)), [1])
+    finally:
+        executor.shutdown()
+
+
+def test_decode_cancelled():
+    """The shared memory of a body outlives a cancelled caller until the worker
+    is done with it.
+
+    """
+    executor = DelayedExecutor()
+
+    async def main():
+        offloader = Offloader(executor, min_size=0, shared_memory_size=0)
+        task = asyncio.ensure_future(offloader.decode(CONTENT, total))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    try:
+        asyncio.run(main())
+        executor.released.set()
+        (future,) = executor.futures
+        assert future.result(timeout=5) == sum(range(1000))
+    finally:
+        executor.shutdown()
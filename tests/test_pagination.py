@@ -0,0 +1,103 @@
+# tests/test_pagination.py
+# ========================
+#
+# Copying
+# -------
+#
+# Copyright (c) 2023 cloudguard authors and contributors.
+#
+# This file is part of the *cloudguard* project.
+#
+# *cloudguard* is a free software project. You can redistribute it and/or
+# modify it following the terms of the MIT License.
+#
+# This software project is distributed *as is*, WITHOUT WARRANTY OF ANY KIND;
+# including but not limited to the WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE and NONINFRINGEMENT.
+#
+# You should have received a copy of the MIT License along with *cloudguard*.
+# If not, see <http://opensource.org/licenses/MIT>.
+#
+import gc
+import typing as ty
+import asyncio
+
+import httpx
+
+from cloudguard.pagination import PagePaginator, aiter_pages
+
+
+def make_client(handler) -> httpx.AsyncClient:
+    """Build an asynchronous client answered by a mock API."""
+    return httpx.AsyncClient(
+        base_url="https://test", transport=httpx.MockTransport(handler)
+    )
+
+
+def test_aiter_pages():
+    """Records are iterated page by page."""
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        page = int(request.url.params["pageNumber"])
+        return httpx.Response(200, json=[page] * (2 if page < 3 else 1))
+
+    async def main():
+        async with make_client(handler) as client:
+            return [
+                p
+                async for p in aiter_pages(
+                    client, "GET", "/", PagePaginator(page_size=2)
+                )
+            ]
+
+    assert asyncio.run(main()) == [[1, 1], [2, 2], [3]]
+
+
+def test_prefetch_cancelled():
+    """The prefetch of the next page is cancelled once the iteration stops."""
+    cancelled = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.params["pageNumber"] == "1":
+            return httpx.Response(200, json=[1, 2])
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(request)
+            raise
+
+    async def main():
+        async with make_client(handler) as client:
+            pages = aiter_pages(client, "GET", "/", PagePaginator(page_size=2))
+            assert await anext(pages) == [1, 2]
+            await asyncio.sleep(0.01)
+            await pages.aclose()
+            return len(cancelled)
+
+    assert asyncio.run(main()) == 1
+
+
+def test_prefetch_error_retrieved():
+    """The failure of the prefetch of a page which is never consumed is not
+    reported as never retrieved.
+
+    """
+    errors: ty.List[ty.Dict[str, ty.Any]] = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.params["pageNumber"] == "1":
+            return httpx.Response(200, json=[1, 2])
+        raise httpx.ConnectError("unreachable", request=request)
+
+    async def main():
+        asyncio.get_running_loop().set_exception_handler(lambda _, c: errors.append(c))
+        async with make_client(handler) as client:
+            pages = aiter_pages(client, "GET", "/", PagePaginator(page_size=2))
+            assert await anext(pages) == [1, 2]
+            await asyncio.sleep(0.01)
+            await pages.aclose()
+            del pages
+        gc.collect()
+
+    asyncio.run(main())
+    assert errors == []
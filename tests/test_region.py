@@ -0,0 +1,99 @@
+# tests/test_region.py
+# ====================
+#
+# Copying
+# -------
+#
+# Copyright (c) 2023 cloudguard authors and contributors.
+#
+# This file is part of the *cloudguard* project.
+#
+# *cloudguard* is a free software project. You can redistribute it and/or
+# modify it following the terms of the MIT License.
+#
+# This software project is distributed *as is*, WITHOUT WARRANTY OF ANY KIND;
+# including but not limited to the WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE and NONINFRINGEMENT.
+#
+# You should have received a copy of the MIT License along with *cloudguard*.
+# If not, see <http://opensource.org/licenses/MIT>.
+#
+import time
+import asyncio
+
+import httpx
+import pytest
+
+import cloudguard.region
+
+from cloudguard.region import CloudGuardRegion
+
+
+#: Region served by a slow API and two equivalent endpoints.
+region = CloudGuardRegion(
+    name="Test",
+    code="test",
+    api="https://slow.test/",
+    endpoints=("https://fast.test/", "https://broken.test/"),
+)
+
+
+def handler(request: httpx.Request) -> httpx.Response:
+    """Answer the probes of the endpoints of the region."""
+    if request.url.host == "broken.test":
+        return httpx.Response(503)
+    if request.url.host == "slow.test":
+        time.sleep(0.2)
+    return httpx.Response(401)
+
+
+async def async_handler(request: httpx.Request) -> httpx.Response:
+    """Answer the probes of the endpoints of the region without blocking."""
+    if request.url.host == "slow.test":
+        await asyncio.sleep(0.2)
+        return httpx.Response(401)
+    return handler(request)
+
+
+def test_api_parsed_lazily():
+    """The URL of the API is given as a string and parsed on access."""
+    assert isinstance(region.api, httpx.URL)
+    assert region.api.host == "slow.test"
+    assert region.candidates == (
+        "https://slow.test/",
+        "https://fast.test/",
+        "https://broken.test/",
+    )
+
+
+def test_probe():
+    """The fastest healthy endpoint is selected."""
+    probed = cloudguard.region.probe(region, transport=httpx.MockTransport(handler))
+
+    assert probed.api == httpx.URL("https://fast.test/")
+    assert probed.code == region.code
+
+
+def test_aprobe():
+    """The endpoints are probed concurrently from the event loop."""
+    transport = httpx.MockTransport(async_handler)
+
+    probed = asyncio.run(cloudguard.region.aprobe(region, transport=transport))
+
+    assert probed.api == httpx.URL("https://fast.test/")
+
+
+def test_probe_none_healthy():
+    """The region is kept as is when no endpoint is healthy."""
+    transport = httpx.MockTransport(lambda request: httpx.Response(500))
+
+    assert cloudguard.region.probe(region, transport=transport) is region
+
+
+def test_probe_single_endpoint():
+    """A region with a single endpoint is not probed."""
+    transport = httpx.MockTransport(pytest.fail)
+
+    assert cloudguard.region.probe(cloudguard.region.us, transport=transport) is (
+        cloudguard.region.us
+    )
@@ -0,0 +1,211 @@
+# tests/test_retry.py
+# ===================
+#
+# Copying
+# -------
+#
+# Copyright (c) 2023 cloudguard authors and contributors.
+#
+# This file is part of the *cloudguard* project.
+#
+# *cloudguard* is a free software project. You can redistribute it and/or
+# modify it following the terms of the MIT License.
+#
+# This software project is distributed *as is*, WITHOUT WARRANTY OF ANY KIND;
+# including but not limited to the WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE and NONINFRINGEMENT.
+#
+# You should have received a copy of the MIT License along with *cloudguard*.
+# If not, see <http://opensource.org/licenses/MIT>.
+#
+import time
+import typing as ty
+import asyncio
+import email.utils
+
+import httpx
+import pytest
+
+from cloudguard.retry import (
+    RetryPolicy,
+    RetryTransport,
+    AsyncRetryTransport,
+    parse_retry_after,
+)
+
+
+def make_transport(
+    responses: ty.List[httpx.Response], policy: RetryPolicy
+) -> ty.Tuple[RetryTransport, ty.List[httpx.Request]]:
+    """Build a retry transport answering the given responses in turn."""
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return responses[min(len(requests), len(responses)) - 1]
+
+    return RetryTransport(httpx.MockTransport(handler), policy), requests
+
+
+def test_server_error_retried():
+    """Idempotent requests failing with a server error are sent again."""
+    transport, requests = make_transport(
+        [httpx.Response(503), httpx.Response(200)],
+        RetryPolicy(backoff_factor=0),
+    )
+
+    response = transport.handle_request(httpx.Request("GET", "https://test/"))
+
+    assert response.status_code == 200
+    assert len(requests) == 2
+    assert transport.stats.retries == 1
+
+
+def test_server_error_not_retried_when_not_idempotent():
+    """Requests which are not idempotent are not sent twice."""
+    transport, requests = make_transport(
+        [httpx.Response(503), httpx.Response(200)],
+        RetryPolicy(backoff_factor=0),
+    )
+
+    response = transport.handle_request(httpx.Request("POST", "https://test/"))
+
+    assert response.status_code == 503
+    assert len(requests) == 1
+
+
+class StreamTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """Transport failing every request with a server error, recording whether
+    their body was read before reaching it.
+
+    """
+
+    def __init__(self):
+        self.requests: ty.List[ty.Tuple[bool, bytes]] = []
+
+    def _read(self, request: httpx.Request) -> bool:
+        try:
+            request.content
+        except httpx.RequestNotRead:
+            return False
+        return True
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        read = self._read(request)
+        self.requests.append((read, request.read()))
+        return httpx.Response(503)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        read = self._read(request)
+        self.requests.append((read, await request.aread()))
+        return httpx.Response(503)
+
+
+def test_streamed_body_not_retried():
+    """Streamed request bodies are neither read into memory nor sent again."""
+    stream = StreamTransport()
+    transport = RetryTransport(stream, RetryPolicy(backoff_factor=0))
+    request = httpx.Request("PUT", "https://test/", content=iter([b"a", b"b"]))
+
+    assert transport.handle_request(request).status_code == 503
+    assert stream.requests == [(False, b"ab")]
+
+
+def test_async_streamed_body_not_retried():
+    """Streamed request bodies are sent once by the asynchronous transport."""
+    stream = StreamTransport()
+
+    async def body() -> ty.AsyncIterator[bytes]:
+        yield b"a"
+        yield b"b"
+
+    async def main() -> httpx.Response:
+        transport = AsyncRetryTransport(stream, RetryPolicy(backoff_factor=0))
+        request = httpx.Request("PUT", "https://test/", content=body())
+        return await transport.handle_async_request(request)
+
+    assert asyncio.run(main()).status_code == 503
+    assert stream.requests == [(False, b"ab")]
+
+
+def test_in_memory_body_retried():
+    """Request bodies held in memory are sent again."""
+    stream = StreamTransport()
+    transport = RetryTransport(stream, RetryPolicy(max_retries=2, backoff_factor=0))
+    request = httpx.Request("PUT", "https://test/", content=b"ab")
+
+    assert transport.handle_request(request).status_code == 503
+    assert stream.requests == [(True, b"ab")] * 3
+
+
+def test_retries_exhausted():
+    """The last response is returned once every retry failed."""
+    transport, requests = make_transport(
+        [httpx.Response(503)], RetryPolicy(max_retries=2, backoff_factor=0)
+    )
+
+    response = transport.handle_request(httpx.Request("GET", "https://test/"))
+
+    assert response.status_code == 503
+    assert len(requests) == 3
+
+
+def test_retry_after_honoured():
+    """A ``Retry-After`` within the maximum delay is waited for."""
+    transport, requests = make_transport(
+        [httpx.Response(429, headers={"Retry-After": "0.2"}), httpx.Response(200)],
+        RetryPolicy(backoff_max=1.0),
+    )
+
+    start = time.monotonic()
+    response = transport.handle_request(httpx.Request("POST", "https://test/"))
+
+    assert response.status_code == 200
+    assert len(requests) == 2
+    assert time.monotonic() - start >= 0.2
+    assert transport.stats.throttled == 1
+
+
+def test_retry_after_above_backoff_max_returned():
+    """A ``Retry-After`` longer than the maximum delay is not waited for."""
+    transport, requests = make_transport(
+        [httpx.Response(429, headers={"Retry-After": "3600"}), httpx.Response(200)],
+        RetryPolicy(backoff_max=1.0),
+    )
+
+    start = time.monotonic()
+    response = transport.handle_request(httpx.Request("GET", "https://test/"))
+
+    assert response.status_code == 429
+    assert len(requests) == 1
+    assert time.monotonic() - start < 1.0
+    # The bucket shared by the other requests is not held either.
+    assert transport.bucket.acquire() < 1.0
+
+
+@pytest.mark.parametrize("retry_after", ["0.5", "30", "3600"])
+def test_delay_capped(retry_after: str):
+    """The delay before the next attempt never exceeds the maximum delay."""
+    policy = RetryPolicy(backoff_max=1.0)
+    response = httpx.Response(429, headers={"Retry-After": retry_after})
+
+    assert policy.delay(0, response) == min(float(retry_after), 1.0)
+
+
+@pytest.mark.parametrize("attempt", range(10))
+def test_backoff_capped(attempt: int):
+    """The exponential backoff never exceeds the maximum delay."""
+    policy = RetryPolicy(backoff_factor=0.5, backoff_max=2.0)
+
+    assert 0 <= policy.backoff(attempt) <= min(2.0, 0.5 * 2**attempt)
+
+
+def test_parse_retry_after():
+    """``Retry-After`` is parsed from a number of seconds or an HTTP date."""
+    date = email.utils.formatdate(time.time() + 60, usegmt=True)
+
+    assert parse_retry_after("12") == 12.0
+    assert parse_retry_after("-1") == 0.0
+    assert 55 < parse_retry_after(date) <= 60
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
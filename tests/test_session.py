@@ -0,0 +1,335 @@
+# tests/test_session.py
+# =====================
+#
+# Copying
+# -------
+#
+# Copyright (c) 2023 cloudguard authors and contributors.
+#
+# This file is part of the *cloudguard* project.
+#
+# *cloudguard* is a free software project. You can redistribute it and/or
+# modify it following the terms of the MIT License.
+#
+# This software project is distributed *as is*, WITHOUT WARRANTY OF ANY KIND;
+# including but not limited to the WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE and NONINFRINGEMENT.
+#
+# You should have received a copy of the MIT License along with *cloudguard*.
+# If not, see <http://opensource.org/licenses/MIT>.
+#
+import sys
+import typing as ty
+import asyncio
+import threading
+
+import httpx
+import pytest
+
+import cloudguard
+import cloudguard.region
+
+from cloudguard.client import APIClient
+from cloudguard.config import Config
+from cloudguard.session import Session, AsyncSession
+
+
+T = ty.TypeVar("T")
+
+#: Number of threads racing in the tests.
+THREADS: int = 32
+
+
+@pytest.fixture
+def session(mock_transport, config: Config) -> Session:
+    """Synchronous session answered by a mock API."""
+    session = Session()
+    session.config = config
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def async_session(mock_transport, config: Config) -> AsyncSession:
+    """Asynchronous session answered by a mock API."""
+    session = AsyncSession()
+    session.config = config
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def contention() -> None:
+    """Switch between threads as often as possible to expose races."""
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+@pytest.fixture
+def echo(monkeypatch: pytest.MonkeyPatch) -> ty.List[APIClient]:
+    """Answer the requests of the clients created by sessions with the item
+    they requested, recording the clients created.
+
+    """
+    clients = []
+    lock = threading.Lock()
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"item": int(request.url.params["item"])})
+
+    def transport(**kwargs) -> httpx.MockTransport:
+        with lock:
+            clients.append(kwargs)
+        return httpx.MockTransport(handler)
+
+    monkeypatch.setattr(APIClient, "transport_class", staticmethod(transport))
+    return clients
+
+
+def race(fn: ty.Callable[[], T]) -> ty.List[T]:
+    """Call a function from many threads released at once."""
+    barrier = threading.Barrier(THREADS)
+    results, errors = [], []
+
+    def run():
+        barrier.wait()
+        try:
+            results.append(fn())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(THREADS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    return results
+
+
+def test_sync_client_shared_by_threads(
+    session: Session, echo: ty.List[APIClient], contention
+):
+    """Threads racing for the client of a session all get the same one, which
+    is created once.
+
+    """
+    clients = race(lambda: session.sync_client)
+
+    assert len(clients) == THREADS
+    assert len({id(c) for c in clients}) == 1
+    assert len(echo) == 1
+
+
+def test_default_session_shared_by_threads(
+    monkeypatch: pytest.MonkeyPatch, echo: ty.List[APIClient], contention
+):
+    """Threads racing for the default session set up a single session and a
+    single client.
+
+    """
+    monkeypatch.setenv("CLOUDGUARD_API_KEY", "key")
+    monkeypatch.setenv("CLOUDGUARD_API_SECRET", "secret")
+    monkeypatch.setenv("CLOUDGUARD_REGION", "us")
+    monkeypatch.setattr(cloudguard, "_DEFAULT_SESSION", None)
+
+    sessions = race(cloudguard.default_session)
+    try:
+        clients = race(lambda: cloudguard.default_session().client)
+    finally:
+        cloudguard.default_session().close()
+
+    assert len({id(s) for s in sessions}) == 1
+    assert len({id(c) for c in clients}) == 1
+    assert len(echo) == 1
+
+
+def test_map(session: Session, echo: ty.List[APIClient], contention):
+    """Requests sent through the session's client from many threads are
+    neither lost nor mixed up.
+
+    """
+    count = 2_000
+    results = list(
+        session.map(
+            lambda client, i: client.get("/", params={"item": i}).json()["item"],
+            range(count),
+            max_workers=THREADS,
+        )
+    )
+
+    assert results == list(range(count))
+    assert len(echo) == 1
+    assert session.sync_client.retry_stats.requests == count
+
+
+def test_map_error(session: Session, echo: ty.List[APIClient]):
+    """An error raised by a call is raised by the iteration."""
+
+    def call(client: APIClient, i: int) -> int:
+        if i == 5:
+            raise ValueError(i)
+        return i
+
+    with pytest.raises(ValueError):
+        list(session.map(call, range(10), max_workers=4))
+
+
+def test_region_switch_rebuilds_client(session: Session):
+    """Changing the region closes the client built for the previous one."""
+    previous = session.sync_client
+    assert previous.base_url == cloudguard.region.Ireland.api
+
+    session.region = "us"
+    client = session.sync_client
+
+    assert client is not previous
+    assert previous.is_closed
+    assert client.base_url == cloudguard.region.UnitedStates.api
+
+
+def test_config_region_change_rebuilds_client(session: Session):
+    """Changing the region on the configuration is detected as well."""
+    previous = session.sync_client
+
+    session.config.region = "us"
+    client = session.sync_client
+
+    assert client is not previous
+    assert previous.is_closed
+    assert client.base_url == cloudguard.region.UnitedStates.api
+
+
+def test_config_change_rebuilds_client(session: Session, config: Config):
+    """Replacing the configuration closes the clients built from it."""
+    previous = session.sync_client
+
+    session.config = config.copy()
+
+    assert previous.is_closed
+    assert session.sync_client is not previous
+
+
+def test_close(session: Session):
+    """Closing a session closes its client, a new one being built on use."""
+    previous = session.sync_client
+
+    session.close()
+
+    assert previous.is_closed
+    assert not session.sync_client.is_closed
+
+
+def test_async_client_closed_with_its_loop(async_session: AsyncSession):
+    """The asynchronous client is closed when its event loop shuts down."""
+
+    async def use():
+        async with async_session as client:
+            await client.get("/")
+            return client
+
+    client = asyncio.run(use())
+
+    assert client.is_closed
+    assert asyncio.run(use()) is not client
+
+
+def test_async_client_replaced_on_region_switch(async_session: AsyncSession):
+    """Changing the region from the event loop closes the previous client."""
+
+    async def switch():
+        previous = async_session.async_client
+        async_session.region = "us"
+        client = async_session.async_client
+        # The previous client is closed by a task of the loop.
+        await asyncio.sleep(0)
+        return previous, client
+
+    previous, client = asyncio.run(switch())
+
+    assert client is not previous
+    assert previous.is_closed
+    assert client.base_url == cloudguard.region.UnitedStates.api
+
+
+def test_aclose(async_session: AsyncSession):
+    """Closing an asynchronous session awaits the closing of its client."""
+
+    async def use():
+        client = async_session.async_client
+        await async_session.aclose()
+        return client
+
+    assert asyncio.run(use()).is_closed
+
+
+def test_close_async_client_of_idle_loop(async_session: AsyncSession):
+    """Closing a session from synchronous code closes an asynchronous client
+    in its event loop.
+
+    """
+    loop = asyncio.new_event_loop()
+    try:
+
+        async def get():
+            return async_session.async_client
+
+        client = loop.run_until_complete(get())
+        async_session.close()
+
+        assert client.is_closed
+    finally:
+        loop.close()
+
+
+def test_probe_endpoints_without_region(session: Session):
+    """Probing the endpoints requires a region."""
+    session.config = Config()
+
+    with pytest.raises(ValueError, match="expected a region"):
+        session.probe_endpoints()
+
+
+@pytest.fixture
+def warm_ups(monkeypatch: pytest.MonkeyPatch) -> ty.List[int]:
+    """Record the warm-ups of the asynchronous sessions, starting without a
+    default session.
+
+    """
+    warm_ups = []
+
+    async def warm_up(self, connections: int = 1) -> None:
+        warm_ups.append(connections)
+
+    monkeypatch.setattr(AsyncSession, "warm_up", warm_up)
+    monkeypatch.setattr(cloudguard, "_DEFAULT_SESSION", None)
+    monkeypatch.setattr(cloudguard, "_DEFAULT_SESSION_WARM_UP", None)
+    return warm_ups
+
+
+def test_async_warm_up(warm_ups: ty.List[int]):
+    """An asynchronous default session is warmed up in a background task."""
+
+    async def setup():
+        cloudguard.setup_default_session(force_async=True, warm_up=2)
+        await cloudguard._DEFAULT_SESSION_WARM_UP
+
+    asyncio.run(setup())
+
+    assert isinstance(cloudguard._DEFAULT_SESSION, AsyncSession)
+    assert warm_ups == [2]
+
+
+def test_async_warm_up_without_loop(warm_ups: ty.List[int]):
+    """Warming up an asynchronous default session requires a running event
+    loop, the default session being left unchanged otherwise.
+
+    """
+    with pytest.raises(RuntimeError, match="expected a running event loop"):
+        cloudguard.setup_default_session(force_async=True, warm_up=2)
+
+    assert cloudguard._DEFAULT_SESSION is None
+    assert warm_ups == []
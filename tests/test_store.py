@@ -0,0 +1,95 @@
+# tests/test_store.py
+# ===================
+#
+# Copying
+# -------
+#
+# Copyright (c) 2023 cloudguard authors and contributors.
+#
+# This file is part of the *cloudguard* project.
+#
+# *cloudguard* is a free software project. You can redistribute it and/or
+# modify it following the terms of the MIT License.
+#
+# This software project is distributed *as is*, WITHOUT WARRANTY OF ANY KIND;
+# including but not limited to the WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE and NONINFRINGEMENT.
+#
+# You should have received a copy of the MIT License along with *cloudguard*.
+# If not, see <http://opensource.org/licenses/MIT>.
+#
+import pytest
+
+from cloudguard.store import RecordStore
+
+
+#: Records of a mock collection.
+RECORDS = [
+    {"id": 1, "severity": "High", "order": 1, "accountId": "a"},
+    {"id": 2, "severity": "Low", "order": 2, "accountId": "a"},
+    {"id": 3, "severity": "High", "order": 2, "accountId": "b"},
+]
+
+
+def test_query():
+    """Records are queried and counted by their indexed fields."""
+    with RecordStore() as store:
+        assert store.insert("findings", RECORDS) == 3
+
+        assert [r["id"] for r in store.query("findings", severity="High")] == [1, 3]
+        assert store.count("findings", account=["a", "c"]) == 2
+        assert store.count("findings", group_by="severity") == {"High": 2, "Low": 1}
+        assert store.get("findings", 2) == RECORDS[1]
+        assert store.collections() == ["findings"]
+
+
+def test_keyword_field():
+    """A field may be named after an SQL keyword."""
+    with RecordStore(fields={"order": ("order",)}) as store:
+        store.insert("findings", RECORDS)
+
+        assert store.count("findings", group_by="order") == {"1": 1, "2": 2}
+        assert store.delete("findings", order="2") == 2
+
+
+@pytest.mark.parametrize("name", ["id", "Data", "collection", "not-a-name"])
+def test_invalid_field(name: str):
+    """Field names clashing with the columns of the store are rejected."""
+    with pytest.raises(ValueError):
+        RecordStore(fields={name: (name,)})
+
+
+def test_duplicate_field():
+    """Field names differing only by case are rejected."""
+    with pytest.raises(ValueError):
+        RecordStore(fields={"order": ("order",), "Order": ("order",)})
+
+
+def test_scalar_filter():
+    """Filter values which are not strings match the stored values."""
+    with RecordStore(fields={"order": ("order",)}) as store:
+        store.insert("findings", RECORDS)
+
+        assert [r["id"] for r in store.query("findings", order=2)] == [2, 3]
+        assert store.count("findings", order=[1, 2.5]) == 1
+
+
+def test_migration(tmp_path):
+    """Reopening a database with other fields migrates its schema."""
+    path = tmp_path / "records.db"
+    with RecordStore(path, fields={"severity": ("severity",)}) as store:
+        store.insert("findings", RECORDS)
+
+    with RecordStore(path, fields={"order": ("order",)}) as store:
+        assert store.count("findings", order=2) == 2
+        store.insert("findings", [{"id": 4, "order": 2}])
+        assert store.count("findings", order=2) == 3
+        with pytest.raises(ValueError):
+            store.count("findings", severity="High")
+
+    with RecordStore(path, fields={"severity": ("severity",)}) as store:
+        assert store.count("findings", group_by="severity") == {
+            "High": 2,
+            "Low": 1,
+            None: 1,
+        }
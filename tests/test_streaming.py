@@ -0,0 +1,108 @@
+# tests/test_streaming.py
+# =======================
+#
+# Copying
+# -------
+#
+# Copyright (c) 2023 cloudguard authors and contributors.
+#
+# This file is part of the *cloudguard* project.
+#
+# *cloudguard* is a free software project. You can redistribute it and/or
+# modify it following the terms of the MIT License.
+#
+# This software project is distributed *as is*, WITHOUT WARRANTY OF ANY KIND;
+# including but not limited to the WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE and NONINFRINGEMENT.
+#
+# You should have received a copy of the MIT License along with *cloudguard*.
+# If not, see <http://opensource.org/licenses/MIT>.
+#
+import gzip
+import json
+import typing as ty
+
+import httpx
+import pytest
+
+from cloudguard.streaming import JSONArrayDecoder
+
+
+def decode(
+    document: bytes, items_key: ty.Optional[str] = None, chunk_size: int = 1
+) -> ty.Tuple[ty.List[ty.Any], JSONArrayDecoder]:
+    """Decode a document fed to a decoder in chunks of the given size."""
+    decoder = JSONArrayDecoder(items_key)
+    items = []
+    for i in range(0, len(document), chunk_size):
+        items.extend(decoder.feed(document[i : i + chunk_size]))
+    items.extend(decoder.close())
+    return items, decoder
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 1024])
+def test_decode_array(chunk_size: int):
+    """The items of an array are decoded whatever the chunks received."""
+    items = [{"id": i, "name": "é" * i, "tags": [i, None]} for i in range(10)]
+    document = json.dumps(items, ensure_ascii=False).encode()
+
+    assert decode(document, chunk_size=chunk_size)[0] == items
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 1024])
+def test_decode_items_key(chunk_size: int):
+    """The items are decoded from a key of an object, the other values being
+    kept as metadata.
+
+    """
+    document = json.dumps(
+        {"total": 2, "items": [{"id": 1}, {"id": 2}], "cursor": "abc"}
+    ).encode()
+
+    items, decoder = decode(document, "items", chunk_size)
+
+    assert items == [{"id": 1}, {"id": 2}]
+    assert decoder.metadata == {"total": 2, "cursor": "abc"}
+
+
+def test_decode_items_yielded_early():
+    """Items are available as soon as they are received."""
+    decoder = JSONArrayDecoder()
+
+    assert decoder.feed(b'[{"id": 1}, {"id"') == [{"id": 1}]
+    assert decoder.feed(b": 2}]") == [{"id": 2}]
+    assert decoder.close() == []
+
+
+@pytest.mark.parametrize(
+    "document, items_key",
+    [(b'[{"id": 1}', None), (b'{"id": 1}', None), (b'{"items": 1}', "items")],
+)
+def test_decode_invalid(document: bytes, items_key: ty.Optional[str]):
+    """Truncated documents and documents of another shape are rejected."""
+    with pytest.raises(json.JSONDecodeError):
+        decode(document, items_key)
+
+
+def test_stream_items(make_client):
+    """The items of a response are iterated over as they are received."""
+    items = [{"id": i} for i in range(100)]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        body = gzip.compress(json.dumps({"items": items}).encode())
+        chunks = [body[i : i + 16] for i in range(0, len(body), 16)]
+        return httpx.Response(
+            200, headers={"Content-Encoding": "gzip"}, content=iter(chunks)
+        )
+
+    client = make_client(handler)
+
+    assert list(client.stream_items("GET", "/", items_key="items")) == items
+
+
+def test_stream_items_error(make_client):
+    """An error response is raised before decoding."""
+    client = make_client(lambda request: httpx.Response(404, json={}))
+
+    with pytest.raises(httpx.HTTPStatusError):
+        list(client.stream_items("GET", "/"))
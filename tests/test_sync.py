@@ -0,0 +1,270 @@
+# tests/test_sync.py
+# ==================
+#
+# Copying
+# -------
+#
+# Copyright (c) 2023 cloudguard authors and contributors.
+#
+# This file is part of the *cloudguard* project.
+#
+# *cloudguard* is a free software project. You can redistribute it and/or
+# modify it following the terms of the MIT License.
+#
+# This software project is distributed *as is*, WITHOUT WARRANTY OF ANY KIND;
+# including but not limited to the WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE and NONINFRINGEMENT.
+#
+# You should have received a copy of the MIT License along with *cloudguard*.
+# If not, see <http://opensource.org/licenses/MIT>.
+#
+import typing as ty
+import datetime
+
+import httpx
+import pytest
+
+from cloudguard.sync import (
+    Snapshot,
+    Collection,
+    SyncEngine,
+    since_param,
+    parse_watermark,
+)
+from cloudguard.pagination import PagePaginator
+from cloudguard.credentials import APICredentials
+
+
+class Server(object):
+    """A mock API listing records changed at or after a watermark."""
+
+    def __init__(self):
+        self.records: ty.List[ty.Dict[str, ty.Any]] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        params = request.url.params
+        since = params.get("since")
+        records = [
+            r for r in self.records if since is None or r["lastModified"] >= since
+        ]
+        size = int(params["pageSize"])
+        start = (int(params["pageNumber"]) - 1) * size
+        return httpx.Response(200, json={"items": records[start : start + size]})
+
+
+#: Collection of the records of the mock API.
+collection = Collection(
+    name="records",
+    method="GET",
+    url="/records",
+    paginator=PagePaginator(items_key="items", page_size=2),
+    updated_key="lastModified",
+    since=since_param("since"),
+)
+
+
+@pytest.fixture
+def server() -> Server:
+    """Mock API holding the records to synchronise."""
+    return Server()
+
+
+@pytest.fixture
+def engine(make_client, server: Server, tmp_path) -> SyncEngine:
+    """Synchronisation engine fetching the records of the mock API."""
+    return SyncEngine(make_client(server), tmp_path)
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("2023-01-02", datetime.datetime(2023, 1, 2, tzinfo=datetime.timezone.utc)),
+        (
+            "2023-01-02T10:00:00Z",
+            datetime.datetime(2023, 1, 2, 10, tzinfo=datetime.timezone.utc),
+        ),
+        (
+            "2023-01-02T12:00:00+0200",
+            datetime.datetime(2023, 1, 2, 10, tzinfo=datetime.timezone.utc),
+        ),
+        (
+            "2023-01-02T10:00:00.1234567Z",
+            datetime.datetime(2023, 1, 2, 10, 0, 0, 123456, datetime.timezone.utc),
+        ),
+        (
+            "2023-01-02 10:00",
+            datetime.datetime(2023, 1, 2, 10, tzinfo=datetime.timezone.utc),
+        ),
+        ("version 2", "version 2"),
+        (1672531200, 1672531200),
+    ],
+)
+def test_parse_watermark(value: ty.Any, expected: ty.Any):
+    """ISO 8601 timestamps are parsed as aware datetimes, other values are
+    kept as is.
+
+    """
+    assert parse_watermark(value) == expected
+
+
+def test_snapshot_watermark_compared_in_time(tmp_path):
+    """Timestamps with different offsets or precisions are compared in time
+    rather than as strings.
+
+    """
+    snapshot = Snapshot(tmp_path)
+    with snapshot.update() as update:
+        update.add({"id": 1, "lastModified": "2023-01-01T09:30:00Z"})
+        # Earlier, though greater as a string.
+        update.add({"id": 2, "lastModified": "2023-01-01T10:00:00+01:00"})
+        # The same time as the first record.
+        update.add({"id": 3, "lastModified": "2023-01-01T09:30:00.000Z"})
+
+    assert snapshot.watermark == "2023-01-01T09:30:00Z"
+    assert sorted(snapshot.seen) == [1, 3]
+
+    with snapshot.update() as update:
+        update.add({"id": 3, "lastModified": "2023-01-01T10:30:00+01:00"})
+
+    assert update.count == 0
+
+
+def test_snapshot_watermark(tmp_path):
+    """The watermark is the greatest update time of the written records."""
+    snapshot = Snapshot(tmp_path)
+    with snapshot.update() as update:
+        update.add({"id": 1, "lastModified": "2023-01-02"})
+        update.add({"id": 2, "lastModified": "2023-01-01"})
+        update.add({"id": 3, "lastModified": "2023-01-02"})
+
+    assert snapshot.watermark == "2023-01-02"
+    assert sorted(snapshot.seen) == [1, 3]
+    # The state is persisted.
+    assert Snapshot(tmp_path).watermark == "2023-01-02"
+
+
+def test_snapshot_skips_seen(tmp_path):
+    """Records at the watermark already written are not written again."""
+    snapshot = Snapshot(tmp_path)
+    with snapshot.update() as update:
+        update.add({"id": 1, "lastModified": "2023-01-01"})
+
+    with snapshot.update() as update:
+        update.add({"id": 1, "lastModified": "2023-01-01"})
+        update.add({"id": 2, "lastModified": "2023-01-01"})
+
+    assert update.count == 1
+    assert sorted(snapshot.seen) == [1, 2]
+    assert sorted(snapshot.records()) == [1, 2]
+
+
+def test_snapshot_discarded_on_error(tmp_path):
+    """An interrupted update leaves the snapshot untouched."""
+    snapshot = Snapshot(tmp_path)
+    with snapshot.update() as update:
+        update.add({"id": 1, "lastModified": "2023-01-01"})
+
+    with pytest.raises(RuntimeError):
+        with snapshot.update() as update:
+            update.add({"id": 2, "lastModified": "2023-01-02"})
+            raise RuntimeError
+
+    assert snapshot.watermark == "2023-01-01"
+    assert list(snapshot.records()) == [1]
+
+
+def test_sync_incremental(engine: SyncEngine, server: Server):
+    """Only the records changed since the previous synchronisation are
+    fetched.
+
+    """
+    server.records = [{"id": i, "lastModified": f"2023-01-0{i}"} for i in (1, 2, 3)]
+    result = engine.sync(collection)
+
+    assert result.full
+    assert result.fetched == 3
+    assert result.watermark == "2023-01-03"
+
+    server.records[0] = {"id": 1, "lastModified": "2023-01-04", "name": "new"}
+    result = engine.sync(collection)
+
+    assert not result.full
+    assert result.since == "2023-01-03"
+    assert result.fetched == 1
+    assert result.watermark == "2023-01-04"
+    assert engine.snapshot(collection).records()[1]["name"] == "new"
+
+
+def test_sync_record_at_watermark(engine: SyncEngine, server: Server):
+    """A record changed at the same time as the watermark but after the
+    previous synchronisation is not missed.
+
+    """
+    server.records = [{"id": 1, "lastModified": "2023-01-01"}]
+    engine.sync(collection)
+
+    server.records.append({"id": 2, "lastModified": "2023-01-01"})
+    result = engine.sync(collection)
+
+    assert result.fetched == 1
+    assert result.watermark == "2023-01-01"
+    assert sorted(engine.snapshot(collection).records()) == [1, 2]
+
+    # Nothing changed since.
+    assert engine.sync(collection).fetched == 0
+
+
+def test_sync_full(engine: SyncEngine, server: Server):
+    """A full synchronisation replaces the snapshot."""
+    server.records = [{"id": i, "lastModified": f"2023-01-0{i}"} for i in (1, 2, 3)]
+    engine.sync(collection)
+
+    del server.records[0]
+    result = engine.sync(collection, full=True)
+
+    assert result.full
+    assert result.fetched == 2
+    assert sorted(engine.snapshot(collection).records()) == [2, 3]
+
+
+def test_sync_tenant_kept_across_rotation(
+    make_client, server: Server, config, tmp_path
+):
+    """Snapshots kept for a tenant are reused once the credentials rotated."""
+    server.records = [{"id": 1, "lastModified": "2023-01-01"}]
+    client = make_client(server)
+    assert SyncEngine(client, tmp_path, tenant="123").sync(collection).full
+
+    client.rotate_credentials(APICredentials("rotated", "secret"))
+    result = SyncEngine(client, tmp_path, tenant="123").sync(collection)
+
+    assert not result.full
+    assert result.fetched == 0
+
+
+def test_sync_tenant_from_config(make_client, server: Server, config, tmp_path):
+    """The tenant is read from the configuration when not given."""
+    config.sync.tenant = "123"
+    engine = SyncEngine(make_client(server, config), tmp_path)
+
+    assert engine.tenant == "123"
+    assert engine.snapshot(collection).path == (
+        SyncEngine(make_client(server), tmp_path, tenant="123")
+        .snapshot(collection)
+        .path
+    )
+
+
+def test_sync_default_tenant_follows_rotation(make_client, server: Server, tmp_path):
+    """Without tenant, snapshots are kept by the API key in use, not by the
+    one of the configuration.
+
+    """
+    client = make_client(server)
+    engine = SyncEngine(client, tmp_path)
+    before = engine.snapshot(collection).path
+
+    client.rotate_credentials(APICredentials("rotated", "secret"))
+
+    assert engine.snapshot(collection).path != before
+    assert client.config.credentials.api.key == "key"